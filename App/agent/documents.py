@@ -0,0 +1,199 @@
+"""
+============================================
+YASAA VISION - Döküman Referansları ve Önbelleği
+============================================
+Araştırmacı eskiden bulduğu sayfaların TAM metnini (komşu sayfa
+ekleriyle) state'e koyuyordu. Bu metinler her düğüme kopyalanıyor,
+checkpoint'e yazılıyor ve arayüzde sadece 200 karakterlik önizleme
+için kullanılıyordu.
+
+Şimdi state'te küçük referanslar taşınır:
+    {"id": "3f9a...", "parent_id": "text:ab12:145", "source": "Benham.pdf",
+     "page": 145, "score": 0.83, "snippet": "A deep Life line indicates..."}
+
+Tam metin process içi bir LRU önbellekte (DOC_CACHE_MAX_MB) durur ve
+sadece ihtiyaç olunca (Abla'nın prompt'u) okunur. Önbellekte yoksa
+(yeniden başlatma, başka replika) parent sayfa veritabanından okunur;
+o da olmazsa snippet kullanılır.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+from App.agent.state import DocumentRef
+from App.core.metrics import record_cache
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+DOC_CACHE_MAX_MB: float = settings.get_float("DOC_CACHE_MAX_MB", 32)
+DOC_SNIPPET_CHARS: int = settings.get_int("DOC_SNIPPET_CHARS", 240)
+"""
+DOC_CACHE_MAX_MB: Tam metin önbelleğinin boyut sınırı (aşılınca en eski metin düşer)
+DOC_SNIPPET_CHARS: Referansta taşınan önizleme uzunluğu
+"""
+
+# Parent kimliklerinden tam sayfa metni okuyan fonksiyon (Araştırmacı verir)
+ParentLoader = Callable[[List[str]], Dict[str, str]]
+
+
+# ============================================
+# TAM METİN ÖNBELLEĞİ
+# ============================================
+class DocumentCache:
+    """
+    Döküman kimliği → tam metin (LRU, toplam byte ile sınırlı, thread-safe).
+    """
+
+    def __init__(self, max_bytes: int = int(DOC_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._texts: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, doc_id: str, text: str) -> None:
+        with self._lock:
+            previous = self._texts.pop(doc_id, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._texts[doc_id] = text
+            self._bytes += len(text)
+            while self._bytes > self.max_bytes and len(self._texts) > 1:
+                _, dropped = self._texts.popitem(last=False)
+                self._bytes -= len(dropped)
+
+    def get(self, doc_id: str) -> Optional[str]:
+        with self._lock:
+            text = self._texts.get(doc_id)
+            if text is not None:
+                self._texts.move_to_end(doc_id)
+            return text
+
+    def clear(self) -> None:
+        with self._lock:
+            self._texts.clear()
+            self._bytes = 0
+
+
+# Process genelinde tek önbellek
+document_cache = DocumentCache()
+
+
+# ============================================
+# REFERANS OLUŞTURMA / ÇÖZME
+# ============================================
+def make_snippet(text: str, limit: int = DOC_SNIPPET_CHARS) -> str:
+    """Boşlukları sadeleştirilmiş kısa önizleme."""
+    compact = re.sub(r"\s+", " ", text).strip()
+    return compact if len(compact) <= limit else compact[:limit].rstrip() + "..."
+
+
+def make_document_ref(
+    text: str,
+    source: Optional[str] = None,
+    page: Optional[int] = None,
+    score: Optional[float] = None,
+    parent_id: Optional[str] = None
+) -> DocumentRef:
+    """
+    Tam metni önbelleğe koyar ve state'e girecek referansı döndürür.
+
+    Kimlik metnin SHA-256'sıdır: aynı bağlam tekrar bulunursa önbellekte
+    tek kopya durur.
+
+    Args:
+        text: Prompt'a girecek tam metin
+        source: Kitap dosyası
+        page: Sayfa numarası
+        score: Vector arama skoru (en iyi parça)
+        parent_id: Tam sayfa kimliği (önbellek kaçarsa buradan okunur)
+
+    Returns:
+        DocumentRef
+    """
+    doc_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    document_cache.put(doc_id, text)
+    return DocumentRef(
+        id=doc_id,
+        parent_id=parent_id,
+        source=source,
+        page=page,
+        score=round(score, 4) if score is not None else None,
+        snippet=make_snippet(text)
+    )
+
+
+def resolve_documents(
+    references: Iterable[Union[DocumentRef, str]],
+    loader: Optional[ParentLoader] = None
+) -> List[str]:
+    """
+    Referansların tam metinlerini sırayla döndürür.
+
+    Önbellek (referansın kendi metni) → önbellekteki parent sayfa →
+    (loader ile) parent sayfa → snippet. Düz string'ler (eski state,
+    testler) olduğu gibi geçer.
+
+    Veritabanından okunan sayfa parent_id altında önbelleğe yazılır:
+    id, genişletilmiş parça metninin özetidir, ona başka içerik yazılmaz.
+
+    Args:
+        references: DocumentRef veya metin listesi
+        loader: Eksik parent_id'leri TEK sorguda okuyan fonksiyon
+
+    Returns:
+        List[str]: Prompt'a girecek metinler
+    """
+    references = list(references)
+    texts: List[Optional[str]] = []
+    missing: List[str] = []
+
+    for reference in references:
+        if isinstance(reference, str):
+            texts.append(reference)
+            continue
+        text = document_cache.get(reference["id"])
+        parent_id = reference.get("parent_id")
+        if text is None and parent_id:
+            text = document_cache.get(parent_id)
+        record_cache("document", hit=text is not None)
+        texts.append(text)
+        if text is None and parent_id and parent_id not in missing:
+            missing.append(parent_id)
+
+    loaded: Dict[str, str] = {}
+    if missing and loader is not None:
+        try:
+            loaded = loader(missing)
+        except Exception as e:
+            logger.warning(f"   ⚠️ Parent sayfalar okunamadı, önizlemeler kullanılıyor: {e}")
+
+    resolved: List[str] = []
+    for reference, text in zip(references, texts):
+        if text is None:
+            text = loaded.get(reference.get("parent_id") or "") or reference.get("snippet", "")
+            if text and reference.get("parent_id") in loaded:
+                document_cache.put(reference["parent_id"], text)
+        resolved.append(text)
+
+    if missing:
+        logger.info(f"   📄 {len(missing)} döküman önbellekte yoktu, {len(loaded)} tanesi veritabanından okundu")
+    return resolved
+
+
+def describe_reference(reference: Union[DocumentRef, str]) -> Dict[str, Any]:
+    """Arayüz için kaynak/sayfa/skor/önizleme (düz metinleri de kabul eder)."""
+    if isinstance(reference, str):
+        return {"source": None, "page": None, "score": None, "snippet": make_snippet(reference, 200)}
+    return {key: reference.get(key) for key in ("source", "page", "score", "snippet")}
@@ -8,6 +8,9 @@ ana iş akışını (workflow) oluşturur.
 Akış:
     [Başlangıç]
          ↓
+    [🔎 Ön Eleme] → Yerel (CPU) kontrol: el/kalite barizce kötü mü?
+         ↓ Geçti         ↓ Reddetti
+         ↓              [❌ Bitir]
     [👁️ Gözcü] → El fotoğrafını analiz et
          ↓
     {El tespit edildi mi?}
@@ -20,14 +23,25 @@ Akış:
 
 Bu yapı bir DAG (Directed Acyclic Graph) oluşturur.
 LangGraph bu graph'ı derler ve çalıştırılabilir hale getirir.
+
+Checkpointer ile (sohbet arayüzü):
+    State, thread_id başına checkpoint'te saklanır. Her tur sadece yeni
+    kullanıcı mesajını gönderir (messages add_messages ile birikir);
+    Vision raporu ve image_ref checkpoint'te kalır, Gözcü aynı fotoğraf
+    için API'yi tekrar çağırmaz.
+
+    >>> app = build_graph(checkpointer=create_checkpointer())
+    >>> config = {"configurable": {"thread_id": "oturum-123"}}
+    >>> app.invoke({"messages": [HumanMessage("Aşk hayatım?")]}, config=config)
 ============================================
 """
 
 # ============================================
 # IMPORTS - Gerekli Kütüphaneler
 # ============================================
+import sqlite3  # SQLite checkpointer bağlantısı
 import logging  # Profesyonel loglama
-from typing import Literal  # Type hints için
+from typing import Any, Iterable, Literal, Optional  # Type hints için
 
 from langgraph.graph import (  # LangGraph bileşenleri
     StateGraph,  # Graph oluşturucu
@@ -36,19 +50,50 @@ from langgraph.graph import (  # LangGraph bileşenleri
 
 # Kendi modüllerimiz
 from App.agent.state import AgentState  # State tanımı
+from App.agent.nodes.prescreen_node import prescreen_node  # Ön eleme
 from App.agent.nodes.vision_node import vision_analysis_node  # Gözcü
 from App.agent.nodes.retrieval_node import retrieval_node  # Araştırmacı
 from App.agent.nodes.persona_node import persona_node  # Abla
+from App.core.metrics import instrument_node  # Düğüm süre/hata metrikleri
+from App.core.settings import settings  # Lazy ayarlar
 
 # ============================================
 # LOGGING AYARLARI
 # ============================================
 logger = logging.getLogger(__name__)
 
+# ============================================
+# CHECKPOINT AYARLARI
+# ============================================
+GRAPH_CHECKPOINTER: str = settings.get("GRAPH_CHECKPOINTER", "sqlite").lower()
+GRAPH_CHECKPOINT_PATH: str = settings.get("GRAPH_CHECKPOINT_PATH", "checkpoints.db")
+"""
+GRAPH_CHECKPOINTER: sqlite | memory
+    (sqlite: yeniden başlatmada ve aynı dosyayı gören replikalarda sohbet devam eder;
+     langgraph-checkpoint-sqlite yüklü değilse memory'ye düşülür)
+GRAPH_CHECKPOINT_PATH: SQLite checkpoint dosyası
+"""
+
 
 # ============================================
 # ROUTER FONKSİYONLARI
 # ============================================
+def route_after_prescreen(state: AgentState) -> Literal["continue", "stop"]:
+    """
+    Ön elemeden sonra: reddedildiyse (error_message) Gözcü'ye gitmeden bitir.
+
+    Args:
+        state: Mevcut graph state'i
+
+    Returns:
+        Literal["continue", "stop"]: Akış yönü
+    """
+    if state.get("error_message"):
+        logger.warning("   🚦 Router: Ön eleme reddetti → Akışı bitir (Vision çağrısı yok)")
+        return "stop"
+    return "continue"
+
+
 def route_after_vision(state: AgentState) -> Literal["continue", "stop"]:
     """
     Gözcü'den sonra akışın nereye gideceğine karar verir.
@@ -80,10 +125,69 @@ def route_after_vision(state: AgentState) -> Literal["continue", "stop"]:
         return "stop"
 
 
+# ============================================
+# CHECKPOINTER
+# ============================================
+def create_checkpointer(kind: str = GRAPH_CHECKPOINTER, path: str = GRAPH_CHECKPOINT_PATH) -> Any:
+    """
+    Ayardaki LangGraph checkpointer'ını oluşturur.
+
+    Args:
+        kind: sqlite | memory
+        path: SQLite dosyası
+
+    Returns:
+        BaseCheckpointSaver: build_graph(checkpointer=...) için
+    """
+    from langgraph.checkpoint.memory import MemorySaver
+
+    if kind == "memory":
+        return MemorySaver()
+    if kind != "sqlite":
+        raise ValueError(f"Bilinmeyen GRAPH_CHECKPOINTER: {kind} (sqlite | memory)")
+
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        logger.warning("⚠️ langgraph-checkpoint-sqlite yüklü değil, checkpoint'ler bellekte tutulacak")
+        return MemorySaver()
+
+    connection = sqlite3.connect(path, check_same_thread=False)
+    logger.info(f"💾 Checkpoint deposu: {path}")
+    return SqliteSaver(connection)
+
+
+def delete_checkpoint_threads(checkpointer: Any, thread_ids: Iterable[str]) -> int:
+    """
+    Thread'lerin tüm checkpoint'lerini siler.
+
+    Checkpointer thread başına her turun state'ini (mesajlar, rapor)
+    saklar ve kendiliğinden silmez: "Yeni Sohbet"te bırakılan ve
+    oturum deposunun temizlediği thread'ler buradan silinir.
+
+    Args:
+        checkpointer: create_checkpointer() çıktısı
+        thread_ids: Silinecek thread'ler
+
+    Returns:
+        int: Silinen thread sayısı (hata verenler hariç)
+    """
+    deleted = 0
+    for thread_id in thread_ids:
+        try:
+            checkpointer.delete_thread(thread_id)
+            deleted += 1
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoint thread'i silinemedi ({thread_id[:8]}): {e}")
+    if deleted:
+        logger.info(f"🧹 {deleted} checkpoint thread'i silindi")
+    return deleted
+
+
 # ============================================
 # GRAPH BUILDER
 # ============================================
-def build_graph() -> StateGraph:
+def build_graph(checkpointer: Optional[Any] = None) -> StateGraph:
     """
     Yasaa Vision agent'ının iş akışını oluşturur ve derler.
 
@@ -94,6 +198,10 @@ def build_graph() -> StateGraph:
     4. Koşullu yönlendirmeleri ayarlar
     5. Graph'ı derler (compile)
 
+    Args:
+        checkpointer: Verilirse state thread_id başına saklanır
+            (invoke/stream config'inde {"configurable": {"thread_id": ...}} gerekir)
+
     Returns:
         Compiled StateGraph: Çalıştırılmaya hazır graph
 
@@ -120,25 +228,33 @@ def build_graph() -> StateGraph:
     # ==========================================
     # Her node bir isim ve bir fonksiyon alır
     # Fonksiyon: state alır → güncellenmiş state parçası döndürür
+    # instrument_node: süre histogramı + hata sayacı (App.core.metrics)
+
+    # 🔎 Ön Eleme: Barizce el olmayan / kalitesiz fotoğrafları yerel olarak eler
+    workflow.add_node(
+        "image_prescreen",
+        instrument_node("image_prescreen")(prescreen_node)
+    )
+    logger.info("   ✅ Node eklendi: image_prescreen (Ön Eleme)")
 
     # 👁️ Gözcü: El fotoğrafını analiz eder
     workflow.add_node(
         "vision_scanner",  # Node adı (benzersiz)
-        vision_analysis_node  # Çalıştırılacak fonksiyon
+        instrument_node("vision_scanner")(vision_analysis_node)  # Çalıştırılacak fonksiyon
     )
     logger.info("   ✅ Node eklendi: vision_scanner (Gözcü)")
 
     # 📚 Araştırmacı: MongoDB'de arama yapar
     workflow.add_node(
         "knowledge_retriever",
-        retrieval_node
+        instrument_node("knowledge_retriever")(retrieval_node)
     )
     logger.info("   ✅ Node eklendi: knowledge_retriever (Araştırmacı)")
 
     # 🗣️ Abla: Son yorumu üretir
     workflow.add_node(
         "fortune_teller",
-        persona_node
+        instrument_node("fortune_teller")(persona_node)
     )
     logger.info("   ✅ Node eklendi: fortune_teller (Abla)")
 
@@ -146,12 +262,23 @@ def build_graph() -> StateGraph:
     # ADIM 3: Başlangıç Noktasını Belirle
     # ==========================================
     # Graph'ın hangi node'dan başlayacağını söyle
-    workflow.set_entry_point("vision_scanner")
-    logger.info("   🚀 Başlangıç noktası: vision_scanner")
+    workflow.set_entry_point("image_prescreen")
+    logger.info("   🚀 Başlangıç noktası: image_prescreen")
 
     # ==========================================
     # ADIM 4: Koşullu Yönlendirme (Conditional Edge)
     # ==========================================
+    # Ön elemeden sonra: Geçtiyse Gözcü, reddettiyse bitir
+    workflow.add_conditional_edges(
+        "image_prescreen",
+        route_after_prescreen,
+        {
+            "continue": "vision_scanner",
+            "stop": END
+        }
+    )
+    logger.info("   🔀 Koşullu edge eklendi: image_prescreen → (continue/stop)")
+
     # Gözcü'den sonra: El varsa devam, yoksa bitir
     workflow.add_conditional_edges(
         "vision_scanner",  # Kaynak node
@@ -179,7 +306,7 @@ def build_graph() -> StateGraph:
     # ADIM 6: Derleme (Compile)
     # ==========================================
     # Graph'ı çalıştırılabilir hale getir
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     logger.info("   ✅ Graph derlendi ve hazır!")
 
     return app
@@ -201,7 +328,10 @@ def visualize_graph():
     mermaid_diagram = """
     ```mermaid
     graph TD
-        Start((🚀 Başlangıç)) --> Vision[👁️ GÖZCÜ<br/>vision_scanner]
+        Start((🚀 Başlangıç)) --> Prescreen[🔎 ÖN ELEME<br/>image_prescreen]
+
+        Prescreen -- ✅ Geçti --> Vision[👁️ GÖZCÜ<br/>vision_scanner]
+        Prescreen -- ❌ Reddetti --> ErrorEnd
 
         Vision --> Router{El Tespit<br/>Edildi mi?}
 
@@ -212,6 +342,7 @@ def visualize_graph():
 
         Persona --> Success((🏁 Fal<br/>Tamamlandı))
 
+        style Prescreen fill:#e8f5e9
         style Vision fill:#e1f5fe
         style Retriever fill:#fff3e0
         style Persona fill:#fce4ec
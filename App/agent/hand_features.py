@@ -0,0 +1,223 @@
+"""
+============================================
+YASAA VISION - El Özellikleri Şeması (Structured Vision)
+============================================
+VISION_OUTPUT_MODE=structured iken Gözcü 400-500 kelimelik düzyazı
+yerine bu şemaya uyan JSON döndürür (OpenAI structured outputs,
+strict JSON schema). Faydası:
+
+- Vision çıktı token'ı düzyazının küçük bir kısmı → daha hızlı çağrı
+- Araştırmacı sorgusu ve Abla prompt'u, özelliklerin kısa bir
+  metin hâlini (render_compact) kullanır → daha küçük prompt'lar
+- Kanonik değerler (enum'lar) önbellek ve özellik bazlı arama için
+  kararlı anahtarlar verir (feature_keys)
+
+Şema her alanı zorunlu tutar (strict mod şartı); bilinmeyen değerler
+için null/"absent"/"unclear" kullanılır.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+from typing import Any, Dict, List, Literal, Optional, Type
+
+from pydantic import BaseModel, ConfigDict
+
+# ============================================
+# KANONİK DEĞERLER
+# ============================================
+HandType = Literal["square", "spatulate", "philosophic", "conic", "psychic", "elementary", "mixed"]
+Flesh = Literal["soft", "elastic", "firm", "unclear"]
+Depth = Literal["deep", "medium", "faint", "chained", "absent", "unclear"]
+MountRating = Literal["flat", "normal", "raised", "padded", "overdeveloped", "unclear"]
+Length = Literal["short", "medium", "long", "unclear"]
+TipShape = Literal["square", "conic", "pointed", "spatulate", "mixed", "unclear"]
+Joints = Literal["smooth", "knotty", "unclear"]
+Mark = Literal["island", "break", "chain", "branch", "fork", "cross", "star", "square", "grille", "dot"]
+
+
+class _Strict(BaseModel):
+    """Strict JSON schema için: fazladan alan yok (additionalProperties: false)."""
+    model_config = ConfigDict(extra="forbid")
+
+
+# ============================================
+# ŞEMA
+# ============================================
+class LineFeature(_Strict):
+    """Bir el çizgisi."""
+    present: bool
+    start: Optional[str]      # Örn. "between thumb and index", "joined with life line"
+    end: Optional[str]        # Örn. "under jupiter", "wrist", "mount of moon"
+    path: Optional[str]       # Örn. "wide curve around venus", "straight", "sloping"
+    depth: Depth
+    marks: List[Mark]
+
+
+class Lines(_Strict):
+    life: LineFeature
+    head: LineFeature
+    heart: LineFeature
+    fate: LineFeature
+
+
+class Mounts(_Strict):
+    """Tepeler (flat/normal/raised/padded/overdeveloped)."""
+    venus: MountRating
+    jupiter: MountRating
+    saturn: MountRating
+    apollo: MountRating
+    mercury: MountRating
+    moon: MountRating
+    mars_positive: MountRating
+    mars_negative: MountRating
+    plain_of_mars: Literal["hollow", "normal", "filled", "unclear"]
+
+
+class FingerFeature(_Strict):
+    length: Length
+    tip: TipShape
+    joints: Joints
+
+
+class Fingers(_Strict):
+    index: FingerFeature
+    middle: FingerFeature
+    ring: FingerFeature
+    little: FingerFeature
+
+
+class Thumb(_Strict):
+    setting: Literal["high", "medium", "low", "unclear"]
+    flexibility: Literal["stiff", "supple", "unclear"]
+    dominant_phalange: Literal["will", "logic", "equal", "unclear"]
+
+
+class HandFeatures(_Strict):
+    """Gözcü'nün yapılandırılmış raporu."""
+    is_hand: bool
+    low_quality: bool
+    hand_type: HandType
+    palm_shape: Literal["square", "oblong", "unclear"]
+    flesh: Flesh
+    lines: Lines
+    mounts: Mounts
+    fingers: Fingers
+    thumb: Thumb
+    skin_texture: Literal["fine", "medium", "coarse", "unclear"]
+    line_density: Literal["few", "moderate", "many", "unclear"]
+    other_marks: List[str]    # Kısa gözlemler (Girdle of Venus, sister line, ...)
+
+
+class HandDetection(_Strict):
+    """Ucuz ön tespit (VISION_TIERED): el var mı, avuç içi nerede?"""
+    is_hand: bool
+    palm_visible: bool
+    box: List[float]          # [x0, y0, x1, y1], 0-1 arası (sol üst köşe orijin)
+
+
+def response_format(model: Type[BaseModel] = HandFeatures, name: str = "hand_features") -> Dict[str, Any]:
+    """OpenAI structured outputs için response_format (strict JSON schema)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": model.model_json_schema()
+        }
+    }
+
+
+# ============================================
+# KISA METİN (Araştırmacı sorgusu + Abla prompt'u)
+# ============================================
+def _known(value: Optional[str]) -> bool:
+    return bool(value) and value not in ("unclear", "absent")
+
+
+def _render_line(name: str, line: LineFeature) -> str:
+    if not line.present or line.depth == "absent":
+        return f"{name}: absent."
+    parts = [part for part in (
+        f"starts {line.start}" if line.start else None,
+        line.path,
+        f"ends {line.end}" if line.end else None,
+        line.depth if _known(line.depth) else None,
+        f"marks: {', '.join(line.marks)}" if line.marks else None
+    ) if part]
+    return f"{name}: {'; '.join(parts) or 'present'}."
+
+
+def render_compact(features: HandFeatures) -> str:
+    """
+    Özellikleri kısa, kesin ifadeli bir teknik rapora çevirir.
+
+    Düzyazı raporun yerini alır (visual_analysis_report); "unclear"
+    değerler yazılmaz.
+
+    Returns:
+        str: Birkaç satırlık rapor
+    """
+    lines = [
+        f"Hand Shape: {features.hand_type.capitalize()} hand"
+        + (f", {features.palm_shape} palm" if _known(features.palm_shape) else "")
+        + (f", {features.flesh} flesh" if _known(features.flesh) else "") + ".",
+        _render_line("Life Line", features.lines.life),
+        _render_line("Head Line", features.lines.head),
+        _render_line("Heart Line", features.lines.heart),
+        _render_line("Fate Line", features.lines.fate),
+    ]
+
+    mounts = [
+        f"{name.replace('_', ' ').capitalize()} {rating}"
+        for name, rating in features.mounts.model_dump().items()
+        if _known(rating) and rating != "normal"
+    ]
+    if mounts:
+        lines.append(f"Prominent Mounts: {', '.join(mounts)}.")
+
+    fingers = [
+        f"{name} {'/'.join(value for value in finger.values() if _known(value))}"
+        for name, finger in features.fingers.model_dump().items()
+        if any(_known(value) for value in finger.values())
+    ]
+    if fingers:
+        lines.append(f"Fingers: {'; '.join(fingers)}.")
+
+    thumb = [f"{key.replace('_', ' ')} {value}" for key, value in features.thumb.model_dump().items() if _known(value)]
+    if thumb:
+        lines.append(f"Thumb: {', '.join(thumb)}.")
+
+    skin = [f"{label} {value}" for label, value in (("skin", features.skin_texture), ("line density", features.line_density))
+            if _known(value)]
+    if skin:
+        lines.append(f"Texture: {', '.join(skin)}.")
+
+    if features.other_marks:
+        lines.append(f"Other: {'; '.join(features.other_marks)}.")
+
+    return "\n".join(lines)
+
+
+def feature_keys(features: HandFeatures) -> List[str]:
+    """
+    Kanonik özellik anahtarları (önbellek / özellik bazlı arama için).
+
+    Örnek: ["hand_type=square", "life.depth=deep", "life.mark=island", "mount.venus=padded"]
+    """
+    keys = [f"hand_type={features.hand_type}"]
+    for name, line in features.lines:
+        if not line.present:
+            keys.append(f"{name}=absent")
+            continue
+        if _known(line.depth):
+            keys.append(f"{name}.depth={line.depth}")
+        keys.extend(f"{name}.mark={mark}" for mark in sorted(set(line.marks)))
+    keys.extend(
+        f"mount.{name}={rating}"
+        for name, rating in features.mounts.model_dump().items()
+        if _known(rating) and rating != "normal"
+    )
+    keys.extend(f"thumb.{key}={value}" for key, value in features.thumb.model_dump().items() if _known(value))
+    return keys
@@ -5,6 +5,7 @@ YASAA VISION - Agent Nodes Package
 Bu paket, LangGraph agent düğümlerini içerir.
 
 Düğümler:
+- prescreen_node: Ön Eleme - Fotoğrafı Gözcü'den önce yerel olarak eler
 - vision_node: Gözcü - El fotoğrafını analiz eder
 - retrieval_node: Araştırmacı - MongoDB'den bilgi çeker
 - persona_node: Abla - Son cevabı oluşturur
@@ -14,12 +15,14 @@ Her düğüm AgentState alır, işler ve güncellenmiş state döndürür.
 """
 
 # Düğümleri dışarıya aç (import kolaylığı için)
+from App.agent.nodes.prescreen_node import prescreen_node
 from App.agent.nodes.vision_node import vision_analysis_node
 from App.agent.nodes.retrieval_node import retrieval_node
 from App.agent.nodes.persona_node import persona_node
 
 # Tüm node'ları tek seferde import etmek için
 __all__ = [
+    "prescreen_node",
     "vision_analysis_node",
     "retrieval_node",
     "persona_node"
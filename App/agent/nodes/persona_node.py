@@ -25,19 +25,24 @@ Tarih: 2024
 # ============================================
 # IMPORTS - Gerekli Kütüphaneler
 # ============================================
-import os                                      # Environment değişkenleri için
 import logging                                 # Profesyonel loglama
-from typing import Dict, Any, List             # Type hints için
+from typing import TYPE_CHECKING, Dict, Any, List  # Type hints için
 
-from dotenv import load_dotenv                 # .env dosyası okuma
-from langchain_openai import ChatOpenAI        # GPT-4o modeli
 from langchain_core.messages import (          # Mesaj formatları
     SystemMessage,
-    HumanMessage
+    HumanMessage,
+    AIMessage
 )
 
 # Kendi modüllerimiz
 from App.agent.state import AgentState
+from App.agent.documents import resolve_documents
+from App.agent.nodes.retrieval_node import load_parent_texts
+from App.core.cassette import cassette_chat_model, is_replaying
+from App.core.settings import settings          # Lazy ayarlar (.env / secrets)
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI    # Sadece type hint; import ilk çağrıda
 
 
 # ============================================
@@ -50,22 +55,12 @@ logger = logging.getLogger(__name__)
 # ============================================
 # ENVIRONMENT DEĞİŞKENLERİ
 # ============================================
-# .env dosyasını yükle
-load_dotenv()
-
-
-import streamlit as st
-def get_secret(name: str):
-    return st.secrets.get(name) or os.getenv(name)
-
-
-# --- API Anahtarı ---
-OPENAI_API_KEY: str = get_secret("OPENAI_API_KEY")
-#OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY","")
+# .env ilk okumada yüklenir; OPENAI_API_KEY (ortam / .env / Streamlit
+# secrets) import anında değil, model ilk oluşturulurken okunur
 
 # --- Model Ayarları ---
-PERSONA_MODEL: str = os.getenv("VISION_MODEL", "gpt-4o")  # Aynı model
-PERSONA_MAX_TOKENS: int = int(os.getenv("PERSONA_MAX_TOKENS", "1500"))
+PERSONA_MODEL: str = settings.get("VISION_MODEL", "gpt-4o")  # Aynı model
+PERSONA_MAX_TOKENS: int = int(settings.get("PERSONA_MAX_TOKENS", "1500"))
 """
 PERSONA_MAX_TOKENS: Abla'nın cevap uzunluğu
 - 1000: Kısa, öz yorumlar
@@ -77,7 +72,7 @@ PERSONA_MAX_TOKENS: Abla'nın cevap uzunluğu
 # ============================================
 # MODEL BAŞLATMA
 # ============================================
-def _get_persona_llm() -> ChatOpenAI:
+def _get_persona_llm() -> "ChatOpenAI":
     """
     Abla persona için GPT-4o modelini başlatır.
 
@@ -85,17 +80,21 @@ def _get_persona_llm() -> ChatOpenAI:
         ChatOpenAI: Yapılandırılmış model instance'ı
 
     Raises:
-        ValueError: API key eksikse
+        ValueError: API key eksikse (kaset replay modunda gerekmez)
     """
-    if not OPENAI_API_KEY:
+    api_key = settings.secret("OPENAI_API_KEY")
+    if not api_key and not is_replaying():
         raise ValueError("❌ OPENAI_API_KEY .env dosyasında bulunamadı!")
 
-    return ChatOpenAI(
+    from langchain_openai import ChatOpenAI
+
+    # CASSETTE_MODE=record/replay ise çağrılar kasete yazılır / kasetten okunur
+    return cassette_chat_model(lambda: ChatOpenAI(
         model=PERSONA_MODEL,
-        api_key=OPENAI_API_KEY,
+        api_key=api_key,
         max_tokens=PERSONA_MAX_TOKENS,
         temperature=0.8  # Biraz yaratıcılık için
-    )
+    ), PERSONA_MODEL)
 
 
 # ============================================
@@ -389,6 +388,7 @@ def persona_node(state: AgentState) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: State güncellemeleri
             - final_response: Abla'nın Türkçe yorumu
+            - messages: [AIMessage(yorum)] (sohbet geçmişine eklenir)
             - error_message: Hata varsa mesaj
 
     Flow:
@@ -405,7 +405,7 @@ def persona_node(state: AgentState) -> Dict[str, Any]:
     # ADIM 1: Verileri Al
     # ==========================================
     vision_report = state.get("visual_analysis_report", "")
-    book_references = state.get("retrieved_documents", [])
+    document_refs = state.get("retrieved_documents", [])  # Referanslar; tam metin ADIM 4'te
     messages = state.get("messages", [])  # Kullanıcı mesajları
 
     # Kontrol: En azından gözcü raporu olmalı
@@ -418,7 +418,7 @@ def persona_node(state: AgentState) -> Dict[str, Any]:
         }
 
     logger.info(f"   📝 Gözcü raporu: {len(vision_report)} karakter")
-    logger.info(f"   📚 Kitap referansı: {len(book_references)} adet")
+    logger.info(f"   📚 Kitap referansı: {len(document_refs)} adet")
 
     # ==========================================
     # ADIM 2: Kullanıcı Sorusunu ve Sohbet Geçmişini Çıkar
@@ -448,6 +448,9 @@ def persona_node(state: AgentState) -> Dict[str, Any]:
     # System message: Abla personası (güçlendirilmiş)
     system_message = SystemMessage(content=ABLA_SYSTEM_PROMPT)
 
+    # Referansların tam metinleri (döküman önbelleği → parent sayfa → önizleme)
+    book_references = resolve_documents(document_refs, loader=load_parent_texts)
+
     # User message: Sohbet geçmişi + Soru + Teknik veri + Referanslar
     user_content = _build_user_content(
         vision_report=vision_report,
@@ -486,6 +489,7 @@ def persona_node(state: AgentState) -> Dict[str, Any]:
 
     return {
         "final_response": abla_response,
+        "messages": [AIMessage(content=abla_response)],  # add_messages: geçmişe eklenir
         "error_message": None
     }
 
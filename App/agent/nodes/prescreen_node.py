@@ -0,0 +1,285 @@
+"""
+============================================
+YASAA VISION - Fotoğraf Ön Eleme (Ön Gözcü)
+============================================
+Gözcü'den ÖNCE çalışan, sadece CPU kullanan (Pillow + NumPy) kontrol.
+
+Neden?
+- "NOT_A_HAND" / "LOW_QUALITY" cevabını şimdiye kadar ancak tam bir
+  GPT-4o Vision çağrısının (saniyeler + ücret) sonunda öğreniyorduk
+- Kedi, ekran görüntüsü, karanlık / bulanık fotoğraflar burada
+  milisaniyeler içinde elenir; graph Gözcü'ye hiç uğramadan biter
+
+Kontroller (küçültülmüş kopya üzerinde):
+1. Çözünürlük: kısa kenar PRESCREEN_MIN_SIDE'dan küçükse
+2. Grafik: piksellerin çoğu tamamen düz renk VE kenarlar keskinse
+   (ekran görüntüsü, çizim)
+3. Pozlama: ortalama parlaklık çok düşük / çok yüksekse
+4. Netlik: Laplacian varyansı PRESCREEN_MIN_SHARPNESS'ın altındaysa
+5. Ten bölgesi: YCbCr ten aralığındaki piksel oranı ve bu bölgenin
+   en-boy oranı makul değilse (gri tonlu fotoğraflarda atlanır)
+
+Eşikler bilerek gevşektir: sadece BARİZ redler burada elenir, şüpheli
+her fotoğraf Gözcü'ye gider. Çözülemeyen fotoğraf (bilinmeyen format)
+da Gözcü'ye bırakılır.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+# ============================================
+# IMPORTS - Gerekli Kütüphaneler
+# ============================================
+import io
+import base64
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict
+
+from App.agent.state import AgentState
+from App.agent.nodes.vision_node import NOT_A_HAND_MESSAGE, image_fingerprint
+from App.core.metrics import record_prescreen, record_rejection
+from App.core.settings import settings
+
+if TYPE_CHECKING:
+    import numpy as np  # Sadece type hint; import ilk fotoğrafta
+
+
+# ============================================
+# LOGGING AYARLARI
+# ============================================
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# AYARLAR
+# ============================================
+PRESCREEN_MODE: str = settings.get("PRESCREEN_MODE", "enforce").lower()
+PRESCREEN_MIN_SIDE: int = settings.get_int("PRESCREEN_MIN_SIDE", 200)
+PRESCREEN_MIN_BRIGHTNESS: float = settings.get_float("PRESCREEN_MIN_BRIGHTNESS", 35)
+PRESCREEN_MAX_BRIGHTNESS: float = settings.get_float("PRESCREEN_MAX_BRIGHTNESS", 235)
+PRESCREEN_MIN_SHARPNESS: float = settings.get_float("PRESCREEN_MIN_SHARPNESS", 12)
+PRESCREEN_MAX_FLAT_FRACTION: float = settings.get_float("PRESCREEN_MAX_FLAT_FRACTION", 0.6)
+PRESCREEN_MIN_SKIN_FRACTION: float = settings.get_float("PRESCREEN_MIN_SKIN_FRACTION", 0.05)
+PRESCREEN_MAX_SKIN_ASPECT: float = settings.get_float("PRESCREEN_MAX_SKIN_ASPECT", 4.0)
+"""
+PRESCREEN_MODE: enforce (barizleri ele) | shadow (sadece logla/say) | off
+PRESCREEN_MIN_SIDE: Orijinal fotoğrafın kısa kenarı için alt sınır (piksel)
+PRESCREEN_MIN_BRIGHTNESS / PRESCREEN_MAX_BRIGHTNESS: Ortalama parlaklık (0-255) aralığı
+PRESCREEN_MIN_SHARPNESS: Laplacian varyansı alt sınırı (256 px kopyada; net fotoğraflar 100+)
+PRESCREEN_MAX_FLAT_FRACTION: Komşularıyla aynı renkteki piksel oranı üst sınırı (ekran görüntüsü)
+PRESCREEN_MIN_SKIN_FRACTION: Ten rengi piksel oranı alt sınırı
+PRESCREEN_MAX_SKIN_ASPECT: Ten bölgesinin uzun/kısa kenar oranı üst sınırı
+"""
+
+# Analiz bu boyuta küçültülmüş kopyada yapılır (hız için)
+_ANALYSIS_SIZE: int = 256
+
+# YCbCr ten aralığı (Chai & Ngan): farklı ten renklerinde Cr/Cb dar bir bantta kalır
+_SKIN_CR = (133, 173)
+_SKIN_CB = (77, 127)
+_SKIN_MIN_Y = 40
+
+# Ortalama doygunluk (0-255) bunun altındaysa fotoğraf gri tonlu sayılır (ten kontrolü atlanır)
+_GRAYSCALE_SATURATION_MAX = 18
+
+# Kalite sorunları → kullanıcıya gösterilecek açıklama
+_QUALITY_PROBLEMS: Dict[str, str] = {
+    "resolution": "çok küçük",
+    "too_dark": "çok karanlık",
+    "too_bright": "çok parlak, ışık patlamış",
+    "blurry": "bulanık",
+    "too_large": "çok büyük"
+}
+
+
+# ============================================
+# SONUÇ
+# ============================================
+@dataclass
+class PrescreenResult:
+    """
+    Ön eleme kararı.
+
+    Attributes:
+        verdict: pass | not_hand | low_quality
+        reason: Kararın sebebi (ok, resolution, too_large, too_dark, blurry, graphic, no_skin, ...)
+        measurements: Ölçülen değerler (log ve eşik ayarı için)
+    """
+    verdict: str
+    reason: str
+    measurements: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def rejected(self) -> bool:
+        return self.verdict != "pass"
+
+
+# ============================================
+# ÖLÇÜMLER
+# ============================================
+def _laplacian_variance(gray: "np.ndarray") -> float:
+    """4-komşu Laplacian'ın varyansı (düşük = bulanık)."""
+    center = gray[1:-1, 1:-1]
+    laplacian = gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:] - 4 * center
+    return float(laplacian.var())
+
+
+def _flat_fraction(gray: "np.ndarray") -> float:
+    """Sağ ve alt komşusuyla birebir aynı olan piksel oranı (fotoğraflarda gürültü var, grafiklerde yok)."""
+    same_right = gray[:-1, :-1] == gray[:-1, 1:]
+    same_down = gray[:-1, :-1] == gray[1:, :-1]
+    return float((same_right & same_down).mean())
+
+
+def _skin_region(ycbcr: "np.ndarray") -> Dict[str, float]:
+    """
+    Ten rengi piksellerin oranı ve kapsadıkları bölgenin en-boy oranı.
+
+    Bölge, satır/sütun izdüşümlerinden bulunur (en az %5'i ten olan
+    satır ve sütunlar); bağlı bileşen analizi gerekmez.
+    """
+    y, cb, cr = ycbcr[..., 0], ycbcr[..., 1], ycbcr[..., 2]
+    mask = ((cr >= _SKIN_CR[0]) & (cr <= _SKIN_CR[1]) &
+            (cb >= _SKIN_CB[0]) & (cb <= _SKIN_CB[1]) & (y >= _SKIN_MIN_Y))
+
+    fraction = float(mask.mean())
+    rows = (mask.mean(axis=1) >= 0.05).nonzero()[0]
+    columns = (mask.mean(axis=0) >= 0.05).nonzero()[0]
+    if not len(rows) or not len(columns):
+        return {"skin_fraction": fraction, "skin_aspect": 0.0}
+
+    height = rows[-1] - rows[0] + 1
+    width = columns[-1] - columns[0] + 1
+    return {"skin_fraction": fraction, "skin_aspect": float(max(height, width) / min(height, width))}
+
+
+def prescreen_image(image_base64: str) -> PrescreenResult:
+    """
+    Base64 fotoğrafı yerel olarak değerlendirir.
+
+    Args:
+        image_base64: Kullanıcının fotoğrafı (Base64)
+
+    Returns:
+        PrescreenResult: pass ise Gözcü'ye gidilir
+    """
+    import numpy as np
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+        width, height = image.size
+        image.draft("RGB", (_ANALYSIS_SIZE * 2, _ANALYSIS_SIZE * 2))  # JPEG: düşük çözünürlükte çöz
+        image = image.convert("RGB")
+    except Image.DecompressionBombError as e:
+        # Piksel sayısı PIL sınırının çok üstünde (Exception'dan türer, OSError değil):
+        # Gözcü'ye de gönderilmez, kullanıcıdan daha küçük fotoğraf istenir
+        logger.info(f"   ℹ️ Ön eleme: fotoğraf çok büyük: {e}")
+        return PrescreenResult("low_quality", "too_large")
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        # Bilinmeyen format (örn. eklentisiz HEIC): karar Gözcü'nün
+        logger.info(f"   ℹ️ Ön eleme fotoğrafı çözemedi, Gözcü'ye bırakılıyor: {e}")
+        return PrescreenResult("pass", "undecodable")
+
+    measurements: Dict[str, float] = {"width": width, "height": height}
+    if min(width, height) < PRESCREEN_MIN_SIDE:
+        return PrescreenResult("low_quality", "resolution", measurements)
+
+    image.thumbnail((_ANALYSIS_SIZE, _ANALYSIS_SIZE))
+    gray = np.asarray(image.convert("L"), dtype=np.float32)
+
+    measurements["brightness"] = float(gray.mean())
+    measurements["sharpness"] = _laplacian_variance(gray)
+    measurements["flat_fraction"] = _flat_fraction(gray)
+
+    # Düz alanlar + keskin kenarlar = ekran görüntüsü / çizim. Bulanık ya da
+    # simsiyah fotoğraflar da düzdür ama keskin değildir; onlar kalite sorunu
+    if (measurements["flat_fraction"] > PRESCREEN_MAX_FLAT_FRACTION
+            and measurements["sharpness"] >= PRESCREEN_MIN_SHARPNESS):
+        return PrescreenResult("not_hand", "graphic", measurements)
+
+    if measurements["brightness"] < PRESCREEN_MIN_BRIGHTNESS:
+        return PrescreenResult("low_quality", "too_dark", measurements)
+    if measurements["brightness"] > PRESCREEN_MAX_BRIGHTNESS:
+        return PrescreenResult("low_quality", "too_bright", measurements)
+    if measurements["sharpness"] < PRESCREEN_MIN_SHARPNESS:
+        return PrescreenResult("low_quality", "blurry", measurements)
+
+    measurements["saturation"] = float(np.asarray(image.convert("HSV"))[..., 1].mean())
+    if measurements["saturation"] < _GRAYSCALE_SATURATION_MAX:
+        return PrescreenResult("pass", "grayscale", measurements)
+
+    measurements.update(_skin_region(np.asarray(image.convert("YCbCr"), dtype=np.int16)))
+    if measurements["skin_fraction"] < PRESCREEN_MIN_SKIN_FRACTION:
+        return PrescreenResult("not_hand", "no_skin", measurements)
+    if measurements["skin_aspect"] > PRESCREEN_MAX_SKIN_ASPECT:
+        return PrescreenResult("not_hand", "skin_shape", measurements)
+
+    return PrescreenResult("pass", "ok", measurements)
+
+
+def rejection_message(result: PrescreenResult) -> str:
+    """Reddin kullanıcıya gösterilecek (Abla ağzından) mesajı."""
+    if result.verdict == "not_hand":
+        return NOT_A_HAND_MESSAGE
+    problem = _QUALITY_PROBLEMS.get(result.reason, "net değil")
+    return (f"Kuzum fotoğraf {problem}, çizgilerini göremiyorum. "
+            "Aydınlık bir yerde avuç içini net gösteren bir fotoğraf atar mısın?")
+
+
+# ============================================
+# ANA NODE FONKSİYONU
+# ============================================
+def prescreen_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Fotoğrafı Gözcü'den önce yerel olarak eler.
+
+    Args:
+        state: Mevcut graph state'i (AgentState)
+
+    Returns:
+        Dict[str, Any]: State güncellemeleri
+            - Geçerse: error_message None (önceki turun hatası router'ı etkilemesin)
+            - Reddedilirse: is_hand_detected False, error_message, user_image_bytes None
+    """
+    image_data = state.get("user_image_bytes")
+
+    # Resim yok veya raporu checkpoint'te olan aynı fotoğraf → Gözcü karar verir
+    if PRESCREEN_MODE == "off" or not image_data or (
+        state.get("visual_analysis_report") and image_fingerprint(image_data) == state.get("image_ref")
+    ):
+        return {"error_message": None}
+
+    logger.info("--- 🔎 ÖN ELEME: Fotoğraf yerel olarak kontrol ediliyor... ---")
+    started = time.perf_counter()
+    try:
+        result = prescreen_image(image_data)
+    except ImportError as e:
+        logger.warning(f"   ⚠️ Ön eleme atlandı (Pillow/NumPy yüklü değil): {e}")
+        return {"error_message": None}
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    record_prescreen(result.verdict, result.reason)
+    details = ", ".join(f"{key}={value:.3g}" for key, value in result.measurements.items())
+    if not result.rejected:
+        logger.info(f"   ✅ Ön eleme geçti ({result.reason}, {elapsed_ms:.0f} ms) {details}")
+        return {"error_message": None}
+
+    if PRESCREEN_MODE == "shadow":
+        logger.warning(f"   👀 [shadow] Ön eleme reddederdi: {result.verdict}/{result.reason} "
+                       f"({elapsed_ms:.0f} ms) {details}")
+        return {"error_message": None}
+
+    logger.warning(f"   ❌ Ön eleme reddetti: {result.verdict}/{result.reason} ({elapsed_ms:.0f} ms) {details}")
+    record_rejection(result.verdict)  # Kullanıcı girdisi, sistem hatası değil
+    return {
+        "is_hand_detected": False,
+        "visual_analysis_report": None,
+        "hand_features": None,
+        "image_ref": None,
+        "user_image_bytes": None,
+        "error_message": rejection_message(result)
+    }
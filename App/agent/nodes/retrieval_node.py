@@ -3,19 +3,22 @@
 YASAA VISION - Retrieval Node (Araştırmacı)
 ============================================
 Bu düğüm, Gözcü'nün teknik raporunu alır ve
-MongoDB Atlas'ta semantik arama yaparak ilgili
-kitap sayfalarını bulur.
+bilgi bankasında semantik arama yaparak ilgili
+kitap sayfalarını bulur (MongoDB Atlas veya yerel
+Chroma / NumPy index'i, bkz. App.core.vector_backends).
 
 Görev:
 - Gözcü'nün raporunu sorgu olarak kullan
-- MongoDB Vector Search ile en alakalı sayfaları bul
+- Vector arama ile en alakalı parçaları (chunk) bul
+- Gerekiyorsa parçayı tam sayfaya veya komşu sayfaya genişlet
 - Bulunan bilgileri state'e ekle
 
 Çıktı:
-- retrieved_documents: Kitaplardan bulunan ilgili sayfalar
+- retrieved_documents: Bulunan bağlamların referansları (kimlik, kaynak,
+  sayfa, skor, önizleme); tam metinler App.agent.documents önbelleğinde
 
 Akış:
-    Gözcü Raporu → Embedding → Similarity Search → Sonuçlar
+    Gözcü Raporu → Embedding → Parça Araması → Small-to-Big → Sonuçlar
 
 Yazar: Ahmet Ruçhan
 Tarih: 2024
@@ -25,17 +28,22 @@ Tarih: 2024
 # ============================================
 # IMPORTS - Gerekli Kütüphaneler
 # ============================================
-import os                                      # Environment değişkenleri için
 import logging                                 # Profesyonel loglama
-from typing import Dict, Any, List, Optional   # Type hints için
-
-from dotenv import load_dotenv                 # .env dosyası okuma
-from pymongo import MongoClient                # MongoDB bağlantısı
-from langchain_openai import OpenAIEmbeddings  # Embedding modeli
-from langchain_mongodb import MongoDBAtlasVectorSearch  # Vektör arama
+import threading
+from typing import Dict, Any, List, Optional, Set  # Type hints için
 
 # Kendi modüllerimiz
-from App.agent.state import AgentState
+from App.agent.state import AgentState, DocumentRef
+from App.agent.documents import make_document_ref
+from App.core.vector_backends import VECTOR_BACKEND, create_vector_backend
+from App.core.kb_pointer import make_parent_id
+from App.core.text import (
+    ends_mid_sentence,
+    head_sentences,
+    starts_mid_sentence,
+    tail_sentences
+)
+from App.core.settings import settings          # Lazy ayarlar (.env / secrets)
 
 
 # ============================================
@@ -48,88 +56,194 @@ logger = logging.getLogger(__name__)
 # ============================================
 # ENVIRONMENT DEĞİŞKENLERİ
 # ============================================
-# .env dosyasını yükle
-load_dotenv()
-
-# --- API Anahtarı ---
-OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-
-# --- MongoDB Ayarları ---
-MONGO_URI: str = os.getenv("MONGO_URI", "")
-DB_NAME: str = os.getenv("DB_NAME", "YasaaVisionDB")
-COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "palmistry_knowledge")
-INDEX_NAME: str = os.getenv("INDEX_NAME", "vector_index")
-
-# --- Model Ayarları ---
-EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+# .env ilk okumada yüklenir; bağlantı ayarları (MongoDB, VECTOR_BACKEND,
+# EMBEDDING_MODEL) App.core.vector_backends'te
 
 # --- RAG Ayarları ---
-RAG_TOP_K: int = int(os.getenv("RAG_TOP_K", "5"))
+RAG_TOP_K: int = int(settings.get("RAG_TOP_K", "5"))
+RAG_FETCH_MULTIPLIER: int = int(settings.get("RAG_FETCH_MULTIPLIER", "3"))
+RAG_PARENT_EXPAND_HITS: int = int(settings.get("RAG_PARENT_EXPAND_HITS", "2"))
+RAG_NEIGHBOUR_CHARS: int = int(settings.get("RAG_NEIGHBOUR_CHARS", "400"))
 
-MAX_LENGTH: int = int(os.getenv("MAX_LENGTH", "3000"))  # Gözcü raporu için maksimum karakter limiti
+MAX_LENGTH: int = int(settings.get("MAX_LENGTH", "3000"))  # Gözcü raporu için maksimum karakter limiti
 
 """
 RAG_TOP_K: Kaç adet sonuç getirilecek?
 - Düşük (3): Hızlı, az bağlam
 - Yüksek (10): Yavaş, çok bağlam
 - Önerilen: 5 (denge)
+
+RAG_FETCH_MULTIPLIER: Parça araması RAG_TOP_K'nın kaç katı sonuç getirsin?
+- Aynı sayfadan birden fazla parça gelebilir; gruplanınca RAG_TOP_K sayfa kalır
+
+RAG_PARENT_EXPAND_HITS: Aynı sayfadan en az bu kadar parça eşleşirse
+tam sayfa (parent) kullanılır; daha azsa sadece eşleşen parça gider
+
+RAG_NEIGHBOUR_CHARS: Parça sayfa sınırında cümle ortasında kesiliyorsa
+komşu sayfadan eklenecek en fazla karakter (tam cümleler)
 """
 
 
 # ============================================
-# VECTOR STORE BAĞLANTISI
+# VECTOR ARKA UCU
 # ============================================
-# Global değişkenler (lazy initialization için)
-_vector_store: Optional[MongoDBAtlasVectorSearch] = None
+# Lazy initialization: ilk aramada VECTOR_BACKEND'e göre kurulur
+_backend: Optional[Any] = None
+_backend_lock = threading.Lock()
+
+
+def _get_backend() -> Any:
+    """
+    Vector arka ucunu döndürür (mongodb | chroma | numpy, bkz. vector_backends).
 
+    İlk çağrıda kurulur, sonraki çağrılarda aynı instance döndürülür.
+    Arka uç aktif bilgi bankası versiyonunu / yerel index'in yeni
+    senkronizasyonunu kendisi takip eder.
 
-def _get_vector_store() -> MongoDBAtlasVectorSearch:
+    Raises:
+        ValueError: Gerekli environment değişkenleri eksikse veya yerel
+            index senkronize edilmemişse
     """
-    MongoDB Atlas Vector Store bağlantısını döndürür.
+    global _backend
+
+    with _backend_lock:
+        if _backend is None:
+            _backend = create_vector_backend(VECTOR_BACKEND)
+        return _backend
 
-    Lazy initialization kullanır - ilk çağrıda bağlantı kurulur,
-    sonraki çağrılarda aynı instance döndürülür.
+
+def load_parent_texts(parent_ids: List[str]) -> Dict[str, str]:
+    """
+    Tam sayfa metinlerini TEK sorguda okur.
+
+    Döküman önbelleğinde olmayan referanslar için (yeniden başlatma,
+    başka replikanın checkpoint'i) App.agent.documents kullanır.
 
     Returns:
-        MongoDBAtlasVectorSearch: Vector store instance
+        Dict[str, str]: parent_id → sayfa metni
+    """
+    return _get_backend().load_parents(parent_ids)
 
-    Raises:
-        ValueError: Gerekli environment değişkenleri eksikse
+
+# ============================================
+# SMALL-TO-BIG GENİŞLETME
+# ============================================
+def _neighbour_ids(metadata: Dict[str, Any], text: str) -> Dict[str, str]:
     """
-    global _vector_store
+    Tek parça eşleşmesinde gereken komşu sayfa kimlikleri.
 
-    # Zaten bağlıysa, mevcut instance'ı döndür
-    if _vector_store is not None:
-        return _vector_store
+    Sadece sayfanın ilk parçası cümle ortasında başlıyorsa önceki,
+    son parçası cümle ortasında bitiyorsa sonraki sayfa gerekir.
 
-    # Gerekli değişkenleri kontrol et
-    if not OPENAI_API_KEY:
-        raise ValueError("❌ OPENAI_API_KEY .env dosyasında bulunamadı!")
+    Returns:
+        Dict[str, str]: {"previous"/"next": parent_id}
+    """
+    if "file_hash" not in metadata or "page" not in metadata:
+        return {}
 
-    if not MONGO_URI:
-        raise ValueError("❌ MONGO_URI .env dosyasında bulunamadı!")
+    neighbours: Dict[str, str] = {}
+    doc_type, file_hash, page = metadata["type"], metadata["file_hash"], metadata["page"]
+    pipeline = metadata.get("pipeline")
 
-    logger.info(f"🔌 MongoDB'ye bağlanılıyor: {DB_NAME}/{COLLECTION_NAME}")
+    if metadata.get("chunk_index") == 0 and page > 1 and starts_mid_sentence(text):
+        neighbours["previous"] = make_parent_id(doc_type, file_hash, page - 1, pipeline)
 
-    # Embedding modeli oluştur
-    embeddings = OpenAIEmbeddings(
-        model=EMBEDDING_MODEL,
-        api_key=OPENAI_API_KEY
-    )
+    if metadata.get("chunk_index") == metadata.get("chunk_count", 0) - 1 and ends_mid_sentence(text):
+        neighbours["next"] = make_parent_id(doc_type, file_hash, page + 1, pipeline)
 
-    # MongoDB client ve collection
-    client = MongoClient(MONGO_URI)
-    collection = client[DB_NAME][COLLECTION_NAME]
+    return neighbours
 
-    # Vector store oluştur
-    _vector_store = MongoDBAtlasVectorSearch(
-        collection=collection,
-        embedding=embeddings,
-        index_name=INDEX_NAME
+
+def _make_reference(text: str, hits: List[Any]) -> DocumentRef:
+    """Sayfa grubunun metnini önbelleğe koyar; kaynak/sayfa/en iyi skor ile referans döndürür."""
+    metadata = hits[0].metadata
+    scores = [doc.metadata["score"] for doc in hits if doc.metadata.get("score") is not None]
+    return make_document_ref(
+        text,
+        source=metadata.get("source"),
+        page=metadata.get("page"),
+        score=max(scores) if scores else None,
+        parent_id=metadata.get("parent_id")
     )
 
-    logger.info("✅ MongoDB Vector Store bağlantısı kuruldu")
-    return _vector_store
+
+def _expand_chunks(docs: List[Any], top_k: int) -> List[DocumentRef]:
+    """
+    Eşleşen parçaları sayfa bazında gruplar ve sadece gerektiğinde genişletir.
+
+    - Aynı sayfadan RAG_PARENT_EXPAND_HITS+ parça → tam sayfa (parent)
+    - Tek parça → parçanın kendisi; sayfa sınırında cümle kesikse
+      komşu sayfanın ilgili cümleleri eklenir
+    - parent_id'siz eski dökümanlar (tam sayfa) → olduğu gibi
+
+    Gerekli tüm parent'lar TEK sorguyla çekilir. Parent bulunamazsa
+    parçaların kendisi kullanılır. Metinler döküman önbelleğine konur,
+    state'e sadece referansları girer.
+
+    Args:
+        docs: similarity_search sonuçları (skora göre sıralı)
+        top_k: En fazla kaç bağlam döndürülecek
+
+    Returns:
+        List[DocumentRef]: Bağlam referansları (ilk eşleşme sırasıyla)
+    """
+    # 1. Sayfa bazında grupla (ilk eşleşme sırası korunur)
+    groups: Dict[str, List[Any]] = {}
+    for index, doc in enumerate(docs):
+        key = doc.metadata.get("parent_id") or f"__legacy_{index}"
+        groups.setdefault(key, []).append(doc)
+
+    selected = list(groups.items())[:top_k]
+
+    # 2. Hangi parent'lar gerekli?
+    needed: Set[str] = set()
+    neighbours: Dict[str, Dict[str, str]] = {}
+
+    for key, hits in selected:
+        if "parent_id" not in hits[0].metadata:
+            continue
+        if len(hits) >= RAG_PARENT_EXPAND_HITS:
+            needed.add(key)
+        elif len(hits) == 1 and RAG_NEIGHBOUR_CHARS > 0:
+            neighbours[key] = _neighbour_ids(hits[0].metadata, hits[0].page_content)
+            needed.update(neighbours[key].values())
+
+    parents: Dict[str, str] = {}
+    if needed:
+        try:
+            parents = load_parent_texts(list(needed))
+        except Exception as e:
+            logger.warning(f"   ⚠️ Parent sayfalar okunamadı, parçalar kullanılıyor: {e}")
+
+    # 3. Bağlamları oluştur
+    references: List[DocumentRef] = []
+    expanded, extended = 0, 0
+
+    for key, hits in selected:
+        if key in parents and len(hits) >= RAG_PARENT_EXPAND_HITS:
+            references.append(_make_reference(parents[key], hits))
+            expanded += 1
+            continue
+
+        hits = sorted(hits, key=lambda doc: doc.metadata.get("chunk_index", 0))
+        text = "\n...\n".join(doc.page_content for doc in hits)
+
+        previous_id = neighbours.get(key, {}).get("previous")
+        if previous_id in parents:
+            text = f"{tail_sentences(parents[previous_id], RAG_NEIGHBOUR_CHARS)} {text}"
+            extended += 1
+
+        next_id = neighbours.get(key, {}).get("next")
+        if next_id in parents:
+            text = f"{text} {head_sentences(parents[next_id], RAG_NEIGHBOUR_CHARS)}"
+            extended += 1
+
+        references.append(_make_reference(text, hits))
+
+    if expanded or extended:
+        logger.info(f"   🧩 Small-to-big: {expanded} tam sayfa, {extended} komşu sayfa eki")
+
+    return references
 
 
 # ============================================
@@ -173,7 +287,7 @@ def retrieval_node(state: AgentState) -> Dict[str, Any]:
     Gözcü'nün raporuna göre veritabanında akademik bilgi arar.
 
     Bu fonksiyon LangGraph tarafından çağrılır.
-    State'ten Gözcü raporunu alır, MongoDB'de arama yapar,
+    State'ten Gözcü raporunu alır, vector arka ucunda arama yapar,
     bulunan dökümanları state'e ekler.
 
     Args:
@@ -181,20 +295,22 @@ def retrieval_node(state: AgentState) -> Dict[str, Any]:
 
     Returns:
         Dict[str, Any]: State güncellemeleri
-            - retrieved_documents: Bulunan kitap sayfaları
+            - retrieved_documents: Bulunan kitap sayfalarının referansları
             - error_message: Hata varsa mesaj
 
     Flow:
         1. State'den vision_analysis_report'u al
         2. Rapor yoksa boş döndür
-        3. MongoDB'de similarity search yap
-        4. Sonuçları state'e ekle
+        3. Parça araması yap (RAG_TOP_K x RAG_FETCH_MULTIPLIER)
+        4. Parçaları sayfaya göre grupla, gerekiyorsa genişlet
+        5. Sonuçları state'e ekle
 
     Semantik Arama Nasıl Çalışır?
         1. Gözcü raporu: "Life line is deep and curved around Venus"
         2. Bu metin embedding'e çevrilir (1536 boyutlu vektör)
-        3. MongoDB'deki tüm sayfa vektörleriyle karşılaştırılır
-        4. En benzer K sayfa döndürülür (cosine similarity)
+        3. Bilgi bankasındaki parça vektörleriyle karşılaştırılır
+        4. En benzer parçalar döndürülür (cosine similarity)
+        5. En fazla K sayfa bağlamı prompt'a gider
     """
     logger.info("--- 📚 ARAŞTIRMACI NODE: Kitaplar Taranıyor... ---")
 
@@ -214,10 +330,10 @@ def retrieval_node(state: AgentState) -> Dict[str, Any]:
     logger.info(f"   📝 Gözcü raporu alındı ({len(vision_report)} karakter)")
 
     # ==========================================
-    # ADIM 2: Vector Store'u Hazırla
+    # ADIM 2: Vector Arka Ucunu Hazırla
     # ==========================================
     try:
-        vector_store = _get_vector_store()
+        backend = _get_backend()
     except ValueError as e:
         logger.error(f"   ❌ Vector store hatası: {e}")
         return {
@@ -238,15 +354,18 @@ def retrieval_node(state: AgentState) -> Dict[str, Any]:
     # ADIM 4: Similarity Search Yap
     # ==========================================
     try:
-        logger.info(f"   🔄 MongoDB'de arama yapılıyor (top_k={RAG_TOP_K})...")
+        fetch_k = RAG_TOP_K * max(RAG_FETCH_MULTIPLIER, 1)
+        logger.info(f"   🔄 {backend.name} üzerinde arama yapılıyor (top_k={RAG_TOP_K}, parça={fetch_k})...")
 
-        # Semantik arama - en benzer K dokümanı getir
-        docs = vector_store.similarity_search(
+        # Semantik arama - en benzer parçaları getir (sayfa başına birden fazla olabilir)
+        # include_scores: skor metadata["score"]'a yazılır (referanslarda taşınır)
+        docs = backend.similarity_search(
             query=search_query,
-            k=RAG_TOP_K
+            k=fetch_k,
+            include_scores=True
         )
 
-        logger.info(f"   ✅ {len(docs)} adet sonuç bulundu")
+        logger.info(f"   ✅ {len(docs)} adet parça bulundu")
 
     except Exception as e:
         logger.error(f"   ❌ Arama hatası: {e}")
@@ -258,27 +377,24 @@ def retrieval_node(state: AgentState) -> Dict[str, Any]:
     # ==========================================
     # ADIM 5: Sonuçları İşle
     # ==========================================
-    # Document objelerinden sadece içerikleri al
-    retrieved_contents: List[str] = []
-
     for i, doc in enumerate(docs):
-        # Her dokümanın kaynağını ve sayfa numarasını logla
+        # Her parçanın kaynağını ve sayfa numarasını logla
         source = doc.metadata.get("source", "Bilinmeyen")
         page = doc.metadata.get("page", "?")
 
-        logger.debug(f"   📖 Sonuç {i+1}: {source} - Sayfa {page}")
+        logger.debug(f"   📖 Sonuç {i+1}: {source} - Sayfa {page} (parça {doc.metadata.get('chunk_index', '-')})")
 
-        # İçeriği listeye ekle
-        retrieved_contents.append(doc.page_content)
+    # Parçaları sayfaya göre grupla, sadece gerektiğinde genişlet
+    retrieved_references: List[DocumentRef] = _expand_chunks(docs, RAG_TOP_K)
 
     # Sonuç özeti
-    if retrieved_contents:
-        logger.info(f"   📚 Toplam {len(retrieved_contents)} sayfa referans bulundu")
+    if retrieved_references:
+        logger.info(f"   📚 Toplam {len(retrieved_references)} sayfa referans bulundu")
     else:
         logger.warning("   ⚠️ İlgili referans bulunamadı")
 
     return {
-        "retrieved_documents": retrieved_contents,
+        "retrieved_documents": retrieved_references,
         "error_message": None
     }
 
@@ -321,7 +437,8 @@ def _test_retrieval_node():
     if result.get('retrieved_documents'):
         print(f"\n📖 İlk sonuç önizleme:")
         first_doc = result['retrieved_documents'][0]
-        print(f"   {first_doc[:200]}...")
+        print(f"   {first_doc['source']} - Sayfa {first_doc['page']} (skor {first_doc['score']})")
+        print(f"   {first_doc['snippet']}")
 
     print("\n" + "=" * 50)
     print("✅ Test tamamlandı!")
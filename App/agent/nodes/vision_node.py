@@ -13,6 +13,26 @@ Görev:
 Çıktı:
 - is_hand_detected: El tespit edildi mi?
 - visual_analysis_report: Teknik analiz raporu
+- hand_features: Yapılandırılmış özellikler (VISION_OUTPUT_MODE=structured)
+
+Çıktı modları (VISION_OUTPUT_MODE):
+- narrative: 400-500 kelimelik düzyazı rapor (varsayılan)
+- structured: HandFeatures şemasına uyan JSON (strict structured output),
+  rapor olarak kısa bir metin hâli kullanılır
+
+Kademeli analiz (VISION_TIERED):
+1. Ucuz tespit: küçük model (VISION_DETECT_MODEL), detail=low, kısa
+   prompt → el var mı, avuç içi görünüyor mu, avuç nerede (kutu)?
+2. Sadece onaylanan eller tam analize gider, ve sadece kırpılmış
+   avuç bölgesi gönderilir (daha küçük resim → daha az görsel token)
+Tespit başarısız olursa (API hatası, kaset eksik) eski tek adımlı
+akışa düşülür; red kararını sadece tespit modeli verir.
+
+Rapor önbelleği (App.agent.vision_cache):
+Her rapor fotoğrafın algısal hash'iyle saklanır. Aynı elin yeniden
+kaydedilmiş / ekran görüntüsü alınmış / hafif kırpılmış kopyası aynı
+oturumda gelirse rapor önbellekten gelir, model çağrılmaz. Birebir aynı
+fotoğraf (image_ref) her oturumda önbellekten gelir.
 
 Yazar: Ahmet Ruçhan
 Tarih: 2024
@@ -22,16 +42,31 @@ Tarih: 2024
 # ============================================
 # IMPORTS - Gerekli Kütüphaneler
 # ============================================
-import os                                      # Environment değişkenleri için
+import io                                      # Kırpma için bellek içi resim
+import base64                                  # Kırpılan resmin yeniden kodlanması
+import time                                    # Tespit süresi (log)
+import hashlib                                 # Fotoğraf özeti (rapor yeniden kullanımı)
 import logging                                 # Profesyonel loglama
-from typing import Dict, Any                   # Type hints için
+from typing import TYPE_CHECKING, Dict, Any, List, Optional   # Type hints için
 
-from dotenv import load_dotenv                 # .env dosyası okuma
-from langchain_openai import ChatOpenAI        # GPT-4o modeli
 from langchain_core.messages import HumanMessage  # Mesaj formatı
 
 # Kendi modüllerimiz
 from App.agent.state import AgentState
+from App.agent.vision_cache import VisionReportCache, get_vision_cache, perceptual_hash
+from App.agent.hand_features import (            # Structured rapor şeması
+    HandDetection,
+    HandFeatures,
+    feature_keys,
+    render_compact,
+    response_format
+)
+from App.core.cassette import cassette_chat_model, is_replaying
+from App.core.metrics import record_rejection
+from App.core.settings import settings          # Lazy ayarlar (.env / secrets)
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI    # Sadece type hint; import ilk çağrıda
 
 
 # ============================================
@@ -44,45 +79,106 @@ logger = logging.getLogger(__name__)
 # ============================================
 # ENVIRONMENT DEĞİŞKENLERİ
 # ============================================
-# .env dosyasını yükle
-load_dotenv()
+# .env ilk okumada yüklenir; OPENAI_API_KEY (ortam / .env / Streamlit
+# secrets) import anında değil, model ilk oluşturulurken okunur
 
-import streamlit as st
-def get_secret(name: str):
-    return st.secrets.get(name) or os.getenv(name)
+# --- Model Ayarları ---
+VISION_MODEL: str = settings.get("VISION_MODEL", "gpt-4o")
+VISION_MAX_TOKENS: int = int(settings.get("VISION_MAX_TOKENS", "4000"))
+VISION_OUTPUT_MODE: str = settings.get("VISION_OUTPUT_MODE", "narrative").lower()
+VISION_STRUCTURED_MAX_TOKENS: int = int(settings.get("VISION_STRUCTURED_MAX_TOKENS", "1200"))
+"""
+VISION_OUTPUT_MODE: narrative (düzyazı) | structured (HandFeatures JSON)
+VISION_STRUCTURED_MAX_TOKENS: Structured modda çıktı sınırı
+    (tam doldurulmuş şema ~600-800 token; düzyazı için 4000 ayrılıyordu)
+"""
 
+# --- Kademeli Analiz ---
+VISION_TIERED: bool = settings.get_bool("VISION_TIERED", True)
+VISION_DETECT_MODEL: str = settings.get("VISION_DETECT_MODEL", "gpt-4o-mini")
+VISION_DETECT_MAX_TOKENS: int = settings.get_int("VISION_DETECT_MAX_TOKENS", 80)
+VISION_CROP_PADDING: float = settings.get_float("VISION_CROP_PADDING", 0.08)
+VISION_CROP_MAX_AREA: float = settings.get_float("VISION_CROP_MAX_AREA", 0.85)
+"""
+VISION_TIERED: Tam analizden önce ucuz tespit + kırpma yapılsın mı
+VISION_DETECT_MODEL: Tespit modeli (detail=low ile sabit ~85 görsel token)
+VISION_DETECT_MAX_TOKENS: Tespit cevabı sınırı (kutu JSON'u ~40 token)
+VISION_CROP_PADDING: Kutunun her yanına eklenen pay (kenar uzunluğunun oranı)
+VISION_CROP_MAX_AREA: Kutu fotoğrafın bu oranından büyükse kırpılmaz (kazanç yok)
+"""
 
-# --- API Anahtarı ---
-#OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-OPENAI_API_KEY: str = get_secret("OPENAI_API_KEY")
+# Tam analize giden resim, sağlayıcının zaten küçülteceği boyuta sığdırılır
+# (detail=high: uzun kenar ≤ 2048, kısa kenar ≤ 768); fazlası boşa upload
+_MAX_LONG_SIDE: int = 2048
+_MAX_SHORT_SIDE: int = 768
+_CROP_JPEG_QUALITY: int = 90
 
 
-# --- Model Ayarları ---
-VISION_MODEL: str = os.getenv("VISION_MODEL", "gpt-4o")
-VISION_MAX_TOKENS: int = int(os.getenv("VISION_MAX_TOKENS", "4000"))
+# Kullanıcıya gösterilen red mesajı (ön eleme de kullanır)
+NOT_A_HAND_MESSAGE: str = ("Kuzum bu el fotoğrafı değil gibi görünüyor. "
+                           "Avuç içini düzgünce gösteren bir fotoğraf atar mısın?")
 
 
 # ============================================
 # MODEL BAŞLATMA
 # ============================================
-def _get_vision_llm() -> ChatOpenAI:
+def _get_vision_llm(structured: bool = False) -> "ChatOpenAI":
     """
     GPT-4o Vision modelini başlatır.
 
+    langchain_openai burada import edilir: graph'ı import etmek (CLI,
+    testler, worker'lar) OpenAI client'ını yüklemez.
+
+    Args:
+        structured: True ise cevap HandFeatures JSON şemasına zorlanır
+
     Returns:
         ChatOpenAI: Yapılandırılmış model instance'ı
 
     Raises:
-        ValueError: API key eksikse
+        ValueError: API key eksikse (kaset replay modunda gerekmez)
     """
-    if not OPENAI_API_KEY:
+    api_key = settings.secret("OPENAI_API_KEY")
+    if not api_key and not is_replaying():
         raise ValueError("❌ OPENAI_API_KEY .env dosyasında bulunamadı!")
 
-    return ChatOpenAI(
+    from langchain_openai import ChatOpenAI
+
+    # CASSETTE_MODE=record/replay ise çağrılar kasete yazılır / kasetten okunur
+    if structured:
+        return cassette_chat_model(lambda: ChatOpenAI(
+            model=VISION_MODEL,
+            api_key=api_key,
+            max_tokens=VISION_STRUCTURED_MAX_TOKENS,
+            model_kwargs={"response_format": response_format()}  # Strict JSON schema
+        ), VISION_MODEL)
+
+    return cassette_chat_model(lambda: ChatOpenAI(
         model=VISION_MODEL,           # gpt-4o (vision destekli)
-        api_key=OPENAI_API_KEY,       # API anahtarı
+        api_key=api_key,              # API anahtarı
         max_tokens=VISION_MAX_TOKENS  # Maksimum çıktı uzunluğu
-    )
+    ), VISION_MODEL)
+
+
+def _get_detect_llm() -> "ChatOpenAI":
+    """
+    Ucuz tespit modelini başlatır (cevap HandDetection şemasına zorlanır).
+
+    Raises:
+        ValueError: API key eksikse (kaset replay modunda gerekmez)
+    """
+    api_key = settings.secret("OPENAI_API_KEY")
+    if not api_key and not is_replaying():
+        raise ValueError("❌ OPENAI_API_KEY .env dosyasında bulunamadı!")
+
+    from langchain_openai import ChatOpenAI
+
+    return cassette_chat_model(lambda: ChatOpenAI(
+        model=VISION_DETECT_MODEL,
+        api_key=api_key,
+        max_tokens=VISION_DETECT_MAX_TOKENS,
+        model_kwargs={"response_format": response_format(HandDetection, "hand_detection")}
+    ), VISION_DETECT_MODEL)
 
 
 # ============================================
@@ -196,6 +292,133 @@ Every statement must be DEFINITIVE - you are the expert, speak with authority.
 """
 
 
+# Structured mod: şema alanları tanımlar, prompt sadece kuralları verir
+VISION_STRUCTURED_PROMPT: str = """
+**ROLE:** Expert Chiromancy (Palmistry) Morphologist.
+
+**TASK:** Examine the hand image and fill in the JSON feature record. Physical observations only, no interpretations.
+
+**RULES:**
+- Use the most specific value that the image supports; use "unclear" only when the feature is not visible.
+- Lines: start/end/path are short phrases using palmistry landmarks (e.g. "between thumb and index", "under jupiter", "wide curve around venus"). Set present=false for a missing line.
+- Mounts: rate each one; "normal" means average development.
+- other_marks: at most 5 short notes (e.g. "girdle of venus", "sister line to life line", "simian line").
+- is_hand=false ONLY if the image clearly shows something that is not a hand; partial or angled hands are hands.
+- low_quality=true if the image is blurry, dark or the palm is only partly visible.
+"""
+
+
+# Kademeli modun ilk adımı: sadece karar + kutu
+VISION_DETECT_PROMPT: str = """
+Is there a human hand in this image, and is the palm side visible?
+- is_hand=false ONLY if the image clearly shows something that is not a hand (animal, object, text, scenery).
+- palm_visible=false ONLY if the image clearly shows the back of the hand.
+- When in doubt, answer true.
+- box: the tightest box around the palm AND fingers as [x0, y0, x1, y1], fractions of image width/height (0-1), origin top-left. Use [0, 0, 1, 1] if unsure.
+"""
+
+
+# ============================================
+# KADEMELİ ANALİZ: TESPİT + KIRPMA
+# ============================================
+def _detect_hand(image_data: str) -> Optional[HandDetection]:
+    """
+    Ucuz tespit çağrısı (detail=low).
+
+    Returns:
+        HandDetection veya None (tespit yapılamadı → tek adımlı akış)
+    """
+    started = time.perf_counter()
+    try:
+        llm = _get_detect_llm()
+        message = HumanMessage(content=[
+            {"type": "text", "text": VISION_DETECT_PROMPT},
+            {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_data}", "detail": "low"}},
+        ])
+        detection = HandDetection.model_validate_json(llm.invoke([message]).content or "{}")
+    except Exception as e:
+        summary = str(e).splitlines()[0] if str(e) else ""
+        logger.warning(f"   ⚠️ Tespit adımı başarısız, tek adımlı analize geçiliyor ({type(e).__name__}): {summary}")
+        return None
+
+    logger.info(f"   🔍 Tespit ({VISION_DETECT_MODEL}, {(time.perf_counter() - started) * 1000:.0f} ms): "
+                f"el={detection.is_hand}, avuç={detection.palm_visible}, kutu={detection.box}")
+    return detection
+
+
+def crop_to_box(image_data: str, box: List[float]) -> str:
+    """
+    Fotoğrafı tespit kutusuna (paylı) kırpar ve sağlayıcı sınırlarına sığdırır.
+
+    Kırpmanın kazancı yoksa, kutu geçersizse veya fotoğraf EXIF ile
+    döndürülmüşse (kutunun hangi yöne göre verildiği belirsiz) orijinal
+    fotoğraf döner.
+
+    Args:
+        image_data: Base64 fotoğraf
+        box: [x0, y0, x1, y1], 0-1 arası
+
+    Returns:
+        str: Base64 JPEG (veya orijinal)
+    """
+    try:
+        from PIL import Image
+
+        if len(box) != 4:
+            return image_data
+        x0, y0, x1, y1 = (min(max(float(value), 0.0), 1.0) for value in box)
+        if x1 <= x0 or y1 <= y0:
+            return image_data
+
+        x0, x1 = max(x0 - VISION_CROP_PADDING, 0.0), min(x1 + VISION_CROP_PADDING, 1.0)
+        y0, y1 = max(y0 - VISION_CROP_PADDING, 0.0), min(y1 + VISION_CROP_PADDING, 1.0)
+        if (x1 - x0) * (y1 - y0) > VISION_CROP_MAX_AREA:
+            return image_data
+
+        image = Image.open(io.BytesIO(base64.b64decode(image_data)))
+        if image.getexif().get(0x0112, 1) != 1:  # Orientation etiketi
+            return image_data
+
+        width, height = image.size
+        cropped = image.convert("RGB").crop((round(x0 * width), round(y0 * height),
+                                             round(x1 * width), round(y1 * height)))
+        scale = min(1.0, _MAX_LONG_SIDE / max(cropped.size), _MAX_SHORT_SIDE / min(cropped.size))
+        if scale < 1.0:
+            cropped = cropped.resize((max(1, round(cropped.width * scale)), max(1, round(cropped.height * scale))),
+                                     Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        cropped.save(buffer, "JPEG", quality=_CROP_JPEG_QUALITY)
+        result = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    except Exception as e:
+        logger.warning(f"   ⚠️ Kırpma yapılamadı, orijinal fotoğraf gönderiliyor: {e}")
+        return image_data
+
+    logger.info(f"   ✂️ Avuç bölgesi kırpıldı: {width}x{height} → {cropped.width}x{cropped.height} "
+                f"({len(image_data)} → {len(result)} karakter)")
+    return result
+
+
+def _analyze_structured(llm: Any, image_data: str) -> HandFeatures:
+    """
+    Structured modda Vision çağrısı ve şema doğrulaması.
+
+    Raises:
+        pydantic.ValidationError: Cevap şemaya uymuyorsa (örn. model reddi / yarım JSON)
+    """
+    message = HumanMessage(content=[
+        {"type": "text", "text": VISION_STRUCTURED_PROMPT},
+        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_data}"}},
+    ])
+    response = llm.invoke([message])
+    return HandFeatures.model_validate_json(response.content or "{}")
+
+
+def image_fingerprint(image_base64: str) -> str:
+    """Base64 fotoğrafın SHA-256 özeti (state'teki image_ref)."""
+    return hashlib.sha256(image_base64.encode("utf-8")).hexdigest()
+
+
 # ============================================
 # ANA NODE FONKSİYONU
 # ============================================
@@ -213,14 +436,19 @@ def vision_analysis_node(state: AgentState) -> Dict[str, Any]:
         Dict[str, Any]: State güncellemeleri
             - is_hand_detected: El tespit edildi mi?
             - visual_analysis_report: Teknik rapor (veya None)
+            - image_ref: Analiz edilen fotoğrafın özeti
+            - user_image_bytes: Analiz bitince (başarılı ya da değil) None;
+              base64 checkpoint'e yazılmaz
             - error_message: Hata mesajı (veya None)
 
     Flow:
         1. State'den resim verisini al
-        2. Resim yoksa atla
-        3. GPT-4o'ya gönder
-        4. Sonucu parse et
-        5. State güncellemelerini döndür
+        2. Aynı fotoğrafın raporu zaten varsa (checkpoint) onu kullan
+        3. Resim yoksa atla
+        4. (VISION_TIERED) Ucuz tespit: el değilse bitir, else avucu kırp
+        5. GPT-4o'ya gönder
+        6. Sonucu parse et
+        7. State güncellemelerini döndür
     """
     logger.info("--- 👁️ GÖZCÜ NODE: Fotoğraf Analiz Ediliyor... ---")
 
@@ -228,6 +456,16 @@ def vision_analysis_node(state: AgentState) -> Dict[str, Any]:
     # ADIM 1: Resim Verisini Al
     # ==========================================
     image_data = state.get("user_image_bytes")
+    previous_report = state.get("visual_analysis_report")
+
+    # Takip sorusu: rapor checkpoint'te, fotoğraf değişmedi → API çağrısı yok
+    if previous_report and (not image_data or image_fingerprint(image_data) == state.get("image_ref")):
+        logger.info("   ♻️ Önceki analiz raporu kullanılıyor (fotoğraf değişmedi)")
+        return {
+            "is_hand_detected": True,
+            "user_image_bytes": None,
+            "error_message": None
+        }
 
     # Resim yoksa - kullanıcı sadece sohbet ediyor olabilir
     if not image_data:
@@ -235,25 +473,70 @@ def vision_analysis_node(state: AgentState) -> Dict[str, Any]:
         return {
             "is_hand_detected": False,
             "visual_analysis_report": None,
+            "hand_features": None,
             "error_message": None  # Bu bir hata değil, sadece resim yok
         }
 
     logger.info(f"   📸 Resim verisi alındı ({len(image_data)} karakter)")
 
+    # ==========================================
+    # ADIM 1b: Rapor Önbelleği (aynı / yakın kopya fotoğraf)
+    # ==========================================
+    image_ref = image_fingerprint(image_data)  # Orijinal fotoğrafın özeti (kırpılmışın değil)
+    report_cache = get_vision_cache(_report_version())
+    phash = perceptual_hash(image_data) if report_cache is not None else None
+    owner = state.get("session_id")  # Yakın kopya araması sadece bu oturumun raporlarında
+    if report_cache is not None:
+        cached = report_cache.lookup(image_ref, phash, owner)
+        if cached is not None:
+            logger.info(f"   ♻️ Rapor önbellekten geldi (Hamming mesafesi {cached.distance}), Vision çağrısı yok")
+            return {
+                "is_hand_detected": True,
+                "visual_analysis_report": cached.report,
+                "hand_features": cached.hand_features,
+                "image_ref": image_ref,
+                "user_image_bytes": None,
+                "error_message": None
+            }
+
     # ==========================================
     # ADIM 2: GPT-4o Vision'ı Hazırla
     # ==========================================
+    structured = VISION_OUTPUT_MODE == "structured"
     try:
-        llm = _get_vision_llm()
-        logger.info(f"   🤖 Model yüklendi: {VISION_MODEL}")
+        llm = _get_vision_llm(structured=structured)
+        logger.info(f"   🤖 Model yüklendi: {VISION_MODEL} ({VISION_OUTPUT_MODE})")
     except ValueError as e:
         logger.error(f"   ❌ Model yükleme hatası: {e}")
         return {
             "is_hand_detected": False,
             "visual_analysis_report": None,
+            "hand_features": None,
+            "user_image_bytes": None,
             "error_message": "Sistem hatası oluştu, lütfen tekrar deneyin."
         }
 
+    # ==========================================
+    # ADIM 2b: Kademeli Analiz (Tespit + Kırpma)
+    # ==========================================
+    if VISION_TIERED:
+        detection = _detect_hand(image_data)
+        if detection is not None and not (detection.is_hand and detection.palm_visible):
+            logger.warning("   ❌ Tespit: el / avuç içi yok, tam analiz yapılmıyor")
+            record_rejection("not_a_hand")
+            return {
+                "is_hand_detected": False,
+                "visual_analysis_report": None,
+                "hand_features": None,
+                "user_image_bytes": None,
+                "error_message": NOT_A_HAND_MESSAGE
+            }
+        if detection is not None:
+            image_data = crop_to_box(image_data, detection.box)
+
+    if structured:
+        return _remember_report(report_cache, phash, owner, _structured_result(llm, image_data, image_ref))
+
     # ==========================================
     # ADIM 3: Mesajı Hazırla ve Gönder
     # ==========================================
@@ -290,6 +573,8 @@ def vision_analysis_node(state: AgentState) -> Dict[str, Any]:
         return {
             "is_hand_detected": False,
             "visual_analysis_report": None,
+            "hand_features": None,
+            "user_image_bytes": None,
             "error_message": "Fotoğrafı analiz edemedim, tekrar dener misin kuzum?"
         }
 
@@ -307,11 +592,13 @@ def vision_analysis_node(state: AgentState) -> Dict[str, Any]:
 
     if is_rejection:
         logger.warning("   ❌ Gönderilen fotoğraf el değil")
+        record_rejection("not_a_hand")
         return {
             "is_hand_detected": False,
             "visual_analysis_report": None,
-            "error_message": "Kuzum bu el fotoğrafı değil gibi görünüyor. "
-                           "Avuç içini düzgünce gösteren bir fotoğraf atar mısın?"
+            "hand_features": None,
+            "user_image_bytes": None,
+            "error_message": NOT_A_HAND_MESSAGE
         }
 
     # Durum 2: Düşük kalite ama el
@@ -324,9 +611,91 @@ def vision_analysis_node(state: AgentState) -> Dict[str, Any]:
     logger.info("   ✅ El fotoğrafı başarıyla analiz edildi")
     logger.debug(f"   📝 Analiz önizleme: {analysis[:200]}...")
 
-    return {
+    return _remember_report(report_cache, phash, owner, {
         "is_hand_detected": True,
         "visual_analysis_report": analysis,
+        "hand_features": None,  # Düzyazı modunda yapılandırılmış özellik yok
+        "image_ref": image_ref,
+        "user_image_bytes": None,  # Rapor hazır; base64 checkpoint'lerde taşınmaz
+        "error_message": None
+    })
+
+
+def _report_version() -> str:
+    """
+    Önbellek anahtarı: model + çıktı modu + prompt + kademeli analiz ayarları.
+
+    Kademeli analizde tam model kırpılmış avucu görür; tespit modeli, tespit
+    prompt'u veya kırpma ayarları değişince rapor da değişir. Bunlardan biri
+    değişince eski raporlar kullanılmaz.
+    """
+    prompt = VISION_STRUCTURED_PROMPT if VISION_OUTPUT_MODE == "structured" else VISION_ANALYSIS_PROMPT
+    if VISION_TIERED:
+        tiering = f"tiered:{VISION_DETECT_MODEL}:{VISION_CROP_PADDING}:{VISION_CROP_MAX_AREA}:{VISION_DETECT_PROMPT}"
+    else:
+        tiering = "single"
+    digest = hashlib.sha256(f"{prompt}\n{tiering}".encode("utf-8")).hexdigest()[:8]
+    return f"{VISION_MODEL}:{VISION_OUTPUT_MODE}:{'tiered' if VISION_TIERED else 'single'}:{digest}"
+
+
+def _remember_report(
+    cache: Optional[VisionReportCache],
+    phash: Optional[int],
+    owner: Optional[str],
+    result: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Başarılı analizi oturumun raporu olarak önbelleğe yazar (hatalar ve redler yazılmaz)."""
+    if cache is not None and result.get("is_hand_detected") and result.get("visual_analysis_report"):
+        try:
+            cache.put(result["image_ref"], phash, result["visual_analysis_report"],
+                      result.get("hand_features"), owner)
+        except Exception as e:
+            logger.warning(f"   ⚠️ Rapor önbelleğe yazılamadı: {e}")
+    return result
+
+
+def _structured_result(llm: Any, image_data: str, image_ref: str) -> Dict[str, Any]:
+    """Structured modda analiz + state güncellemeleri (narrative ile aynı sözleşme)."""
+    try:
+        logger.info("   🔄 GPT-4o Vision API çağrısı yapılıyor (structured)...")
+        features = _analyze_structured(llm, image_data)
+    except Exception as e:
+        # API hatası veya şemaya uymayan cevap (pydantic ValidationError)
+        summary = str(e).splitlines()[0] if str(e) else ""
+        logger.error(f"   ❌ Vision hatası ({type(e).__name__}): {summary}")
+        return {
+            "is_hand_detected": False,
+            "visual_analysis_report": None,
+            "hand_features": None,
+            "user_image_bytes": None,
+            "error_message": "Fotoğrafı analiz edemedim, tekrar dener misin kuzum?"
+        }
+
+    if not features.is_hand:
+        logger.warning("   ❌ Gönderilen fotoğraf el değil")
+        record_rejection("not_a_hand")
+        return {
+            "is_hand_detected": False,
+            "visual_analysis_report": None,
+            "hand_features": None,
+            "user_image_bytes": None,
+            "error_message": NOT_A_HAND_MESSAGE
+        }
+
+    report = render_compact(features)
+    if features.low_quality:
+        logger.warning("   ⚠️ Düşük kaliteli el fotoğrafı")
+        report += "\n\n[NOT: Fotoğraf kalitesi düşük, analiz kısıtlı olabilir]"
+
+    logger.info(f"   ✅ El özellikleri çıkarıldı: {len(feature_keys(features))} özellik, "
+                f"rapor {len(report)} karakter")
+
+    return {
+        "is_hand_detected": True,
+        "visual_analysis_report": report,
+        "hand_features": features.model_dump(),
+        "image_ref": image_ref,
+        "user_image_bytes": None,
         "error_message": None
     }
 
@@ -352,6 +721,7 @@ def _test_vision_node():
         "messages": [],
         "user_image_bytes": None,  # Test için resim yok
         "visual_analysis_report": None,
+        "hand_features": None,
         "retrieved_documents": [],
         "final_response": None,
         "is_hand_detected": False,
@@ -26,9 +26,38 @@ from typing import (
     TypedDict,      # Tip güvenli dictionary tanımı için
     List,           # Liste tipi için
     Optional,       # Opsiyonel (None olabilir) tipler için
+    Dict,           # Sözlük tipi için
+    Any,            # Serbest değerler için
     Annotated       # LangGraph için özel annotasyonlar
 )
 from langchain_core.messages import BaseMessage  # Chat mesaj tipi
+from langgraph.graph.message import add_messages  # Mesaj listesi reducer'ı (append)
+
+
+# ============================================
+# DÖKÜMAN REFERANSI
+# ============================================
+class DocumentRef(TypedDict):
+    """
+    Araştırmacı'nın bulduğu bir bağlamın kompakt referansı.
+
+    Tam metin state'te taşınmaz; App.agent.documents önbelleğinde durur
+    ve sadece Abla'nın prompt'u hazırlanırken okunur.
+
+    Attributes:
+        id: Tam metnin özeti (önbellek anahtarı)
+        parent_id: Tam sayfa kimliği (önbellekte yoksa buradan okunur)
+        source: Kitap dosyası
+        page: Sayfa numarası
+        score: Vector arama skoru (sayfanın en iyi parçası)
+        snippet: Kısa önizleme (arayüz için)
+    """
+    id: str
+    parent_id: Optional[str]
+    source: Optional[str]
+    page: Optional[int]
+    score: Optional[float]
+    snippet: str
 
 
 # ============================================
@@ -45,10 +74,13 @@ class AgentState(TypedDict):
     - Bavulu bir sonraki düğüme verir
 
     Attributes:
-        messages: Kullanıcı ile olan chat geçmişi
+        messages: Kullanıcı ile olan chat geçmişi (add_messages ile birikir)
         user_image_bytes: Kullanıcının gönderdiği el fotoğrafı (Base64)
+        image_ref: Raporun ait olduğu fotoğrafın SHA-256 özeti
+        session_id: Kullanıcının oturumu (rapor önbelleğinin kapsamı)
         visual_analysis_report: Gözcü'nün teknik raporu
-        retrieved_documents: MongoDB'den çekilen ilgili sayfalar
+        hand_features: Yapılandırılmış el özellikleri (structured modda)
+        retrieved_documents: MongoDB'den bulunan sayfaların referansları
         final_response: Abla'nın son cevabı
         is_hand_detected: Fotoğrafın gerçekten el olup olmadığı
         error_message: Hata durumunda kullanıcıya gösterilecek mesaj
@@ -58,11 +90,16 @@ class AgentState(TypedDict):
     # 1. KULLANICIDAN GELENLER
     # ==========================================
 
-    messages: List[BaseMessage]
+    messages: Annotated[List[BaseMessage], add_messages]
     """
     Chat geçmişi - Kullanıcı ve asistanın önceki mesajları.
     LangChain'in BaseMessage formatında saklanır.
     Örnek: [HumanMessage("Elime bakar mısın?"), AIMessage("Tabii...")]
+
+    add_messages reducer'ı: Düğümlerin ve girdinin döndürdüğü mesajlar
+    mevcut listeye EKLENİR (üzerine yazılmaz). Checkpointer'lı graph'ta
+    her tur sadece yeni kullanıcı mesajı gönderilir; geçmiş checkpoint'te
+    durur. Abla'nın cevabı da buraya AIMessage olarak eklenir.
     """
 
     user_image_bytes: Optional[str]
@@ -76,6 +113,28 @@ class AgentState(TypedDict):
     - JSON içinde taşınabilir
     
     None olabilir: Kullanıcı sadece soru soruyorsa resim olmayabilir.
+
+    Gözcü analizden sonra bu alanı None yapar: MB'larca base64 her
+    checkpoint'e tekrar yazılmaz, checkpoint'te sadece image_ref kalır.
+    """
+
+    image_ref: Optional[str]
+    """
+    Analiz edilen fotoğrafın SHA-256 özeti.
+
+    visual_analysis_report bu fotoğrafa aittir. Aynı fotoğraf tekrar
+    gönderilirse (veya hiç gönderilmezse) Gözcü raporu yeniden kullanır,
+    Vision API'yi tekrar çağırmaz.
+    """
+
+    session_id: Optional[str]
+    """
+    Kullanıcının oturum kimliği (app.py'deki session_id).
+
+    Gözcü'nün rapor önbelleği yakın kopya (pHash) eşleşmelerini sadece
+    bu oturumun raporlarında arar: başka kullanıcının benzer görünen
+    fotoğrafının raporu verilmez. None ise sadece birebir aynı fotoğraf
+    önbellekten gelir.
     """
 
     # ==========================================
@@ -97,24 +156,35 @@ class AgentState(TypedDict):
     Yorumu Abla yapacak.
     """
 
+    hand_features: Optional[Dict[str, Any]]
+    """
+    VISION_OUTPUT_MODE=structured iken Gözcü'nün yapılandırılmış
+    özellikleri (App.agent.hand_features.HandFeatures.model_dump()).
+
+    visual_analysis_report bu durumda bu kaydın kısa metin hâlidir.
+    Düzyazı modunda None.
+    """
+
     # ==========================================
     # 3. ARAŞTIRMACI'NIN ÇIKTILARI (Retrieval Node)
     # ==========================================
 
-    retrieved_documents: List[str]
+    retrieved_documents: List[DocumentRef]
     """
-    MongoDB'den semantic search ile bulunan kitap sayfaları.
+    MongoDB'den semantic search ile bulunan kitap sayfalarının referansları.
     
     Gözcü'nün raporundaki terimler (örn: "deep life line")
     kullanılarak veritabanında arama yapılır.
     
     Örnek:
     [
-        "--- PAGE 322 ---\nThe deep Life line indicates...",
-        "--- PAGE 145 ---\nWhen the Mount of Venus is padded..."
+        {"id": "3f9a1c...", "parent_id": "text:ab12...:322", "source": "Benham.pdf",
+         "page": 322, "score": 0.83, "snippet": "The deep Life line indicates..."},
+        ...
     ]
     
-    Bu bilgiler Abla'ya "akademik kaynak" olarak verilir.
+    Tam metinler (Abla'ya "akademik kaynak" olarak verilenler)
+    App.agent.documents.resolve_documents ile okunur.
     """
 
     # ==========================================
@@ -170,7 +240,8 @@ class AgentState(TypedDict):
 # ============================================
 def create_initial_state(
     user_message: str = "",
-    image_bytes: Optional[str] = None
+    image_bytes: Optional[str] = None,
+    session_id: Optional[str] = None
 ) -> AgentState:
     """
     Yeni bir graph çalıştırması için başlangıç state'i oluşturur.
@@ -181,6 +252,7 @@ def create_initial_state(
     Args:
         user_message: Kullanıcının ilk mesajı
         image_bytes: Varsa, Base64 formatında el fotoğrafı
+        session_id: Varsa, kullanıcının oturum kimliği
 
     Returns:
         AgentState: Başlangıç değerleri ile doldurulmuş state
@@ -202,7 +274,10 @@ def create_initial_state(
     return AgentState(
         messages=initial_messages,
         user_image_bytes=image_bytes,
+        image_ref=None,                    # Henüz analiz edilmiş fotoğraf yok
+        session_id=session_id,
         visual_analysis_report=None,      # Henüz analiz yapılmadı
+        hand_features=None,                # Henüz özellik çıkarılmadı
         retrieved_documents=[],            # Henüz arama yapılmadı
         final_response=None,               # Henüz cevap oluşturulmadı
         is_hand_detected=False,            # Henüz kontrol edilmedi
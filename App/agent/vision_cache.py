@@ -0,0 +1,399 @@
+"""
+============================================
+YASAA VISION - Vision Rapor Önbelleği (Algısal Hash)
+============================================
+Kullanıcılar aynı eli sık sık tekrar yükler: yeniden kaydedilmiş,
+ekran görüntüsü alınmış, biraz kırpılmış hâlleriyle. Byte hash'i
+(image_ref) bunları yakalamaz; her biri yeni bir GPT-4o çağrısıydı.
+
+Burada her rapor, fotoğrafın 64 bitlik algısal hash'i (pHash) ile
+saklanır:
+    pHash: kenarlardaki düz bantlar (ekran görüntüsü çubukları) kırpılır,
+    gri ton 32x32'ye küçültülür, DCT'nin en düşük 8x8 frekansı medyana
+    göre bitlere çevrilir. Yeniden sıkıştırma, ölçekleme, hafif kırpma
+    ve parlaklık farkları sadece birkaç biti değiştirir.
+
+Arama:
+1. Birebir aynı fotoğraf (image_ref) → doğrudan (tüm oturumlar)
+2. Aynı oturumun BK-tree'sinde Hamming mesafesi ≤ VISION_CACHE_MAX_DISTANCE
+   olan en yakın hash
+
+Yakın kopya araması oturumla sınırlıdır: pHash "benzer görünen" demektir,
+"aynı el" değil. Başka kullanıcının benzer fotoğrafına onun raporunu
+vermek yanlış okuma (ve rapor sızıntısı) olur. Birebir aynı byte'lar
+aynı fotoğraftır; o rapor herkese verilebilir.
+
+Bellekte sadece hash'ler ve kimlikler durur (kayıt başı ~100 byte);
+raporlar SQLite'tan sadece isabet olunca okunur. Raporlar rapor
+versiyonuyla (model + çıktı modu + prompt + tespit/kırpma ayarları)
+anahtarlanır; bunlardan biri değişince eski raporlar kullanılmaz.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import io
+import json
+import time
+import base64
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from App.core.metrics import record_cache
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+VISION_CACHE_ENABLED: bool = settings.get_bool("VISION_CACHE_ENABLED", True)
+VISION_CACHE_PATH: str = settings.get("VISION_CACHE_PATH", "vision_reports.db")
+VISION_CACHE_MAX_DISTANCE: int = settings.get_int("VISION_CACHE_MAX_DISTANCE", 6)
+VISION_CACHE_MAX_ENTRIES: int = settings.get_int("VISION_CACHE_MAX_ENTRIES", 50000)
+"""
+VISION_CACHE_ENABLED: Rapor önbelleği açık mı
+VISION_CACHE_PATH: SQLite dosyası (replikalar aynı dosyayı görürse raporları paylaşır)
+VISION_CACHE_MAX_DISTANCE: Aynı fotoğraf sayılacak en büyük Hamming mesafesi (64 bit üzerinden;
+    farklı eller tipik olarak 20+, aynı fotoğrafın kopyaları 0-6)
+VISION_CACHE_MAX_ENTRIES: Saklanan rapor sınırı (aşılınca en uzun süredir kullanılmayan %10 silinir)
+"""
+
+# pHash boyutları
+_HASH_INPUT_SIZE: int = 32
+_HASH_BITS_SIDE: int = 8
+
+# Kenar kırpma: standart sapması bunun altındaki satır/sütunlar düz bant sayılır
+# (siyah/beyaz çubuklar, çerçeveler; fotoğraf arka planı gürültülüdür, kırpılmaz)
+_BORDER_FLAT_STD: float = 3.0
+
+
+# ============================================
+# ALGISAL HASH
+# ============================================
+_dct_matrix_cache: Dict[int, Any] = {}
+
+
+def _dct_matrix(size: int) -> Any:
+    """Ortonormal DCT-II matrisi (scipy gerekmez)."""
+    import numpy as np
+
+    matrix = _dct_matrix_cache.get(size)
+    if matrix is None:
+        k = np.arange(size)[:, None]
+        n = np.arange(size)[None, :]
+        matrix = np.sqrt(2.0 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+        matrix[0, :] = np.sqrt(1.0 / size)
+        _dct_matrix_cache[size] = matrix
+    return matrix
+
+
+def _trim_borders(pixels: Any) -> Any:
+    """Kenarlardaki düz bantları (ekran görüntüsü çubukları, letterbox, çerçeve) kırpar."""
+    import numpy as np
+
+    # Satır ve sütunlar sırayla, değişmeyene kadar kırpılır: yatay çubuklar
+    # sütunların std'sini şişirir, çubuklar gidince sütunlar doğru ölçülür
+    trimmed = pixels
+    for _ in range(3):
+        rows = np.flatnonzero(trimmed.std(axis=1) >= _BORDER_FLAT_STD)
+        if not len(rows):
+            return pixels
+        trimmed = trimmed[rows[0]:rows[-1] + 1]
+        columns = np.flatnonzero(trimmed.std(axis=0) >= _BORDER_FLAT_STD)
+        if not len(columns):
+            return pixels
+        previous_shape = trimmed.shape
+        trimmed = trimmed[:, columns[0]:columns[-1] + 1]
+        if trimmed.shape == previous_shape:
+            break
+    # Neredeyse tamamını kırpmak bir hata işaretidir (düz bir grafik), olduğu gibi bırak
+    return trimmed if trimmed.size >= 0.25 * pixels.size else pixels
+
+
+def perceptual_hash(image_base64: str) -> Optional[int]:
+    """
+    Fotoğrafın 64 bitlik pHash'i.
+
+    Args:
+        image_base64: Base64 fotoğraf
+
+    Returns:
+        int veya None (çözülemeyen fotoğraf / Pillow-NumPy yok)
+    """
+    try:
+        import numpy as np
+        from PIL import Image, ImageOps
+
+        image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+        image.draft("L", (_HASH_INPUT_SIZE * 8, _HASH_INPUT_SIZE * 8))  # JPEG: küçük çöz
+        image = ImageOps.exif_transpose(image).convert("L")
+        image.thumbnail((256, 256))
+        trimmed = _trim_borders(np.asarray(image, dtype=np.float64))
+        image = Image.fromarray(trimmed.astype(np.uint8)).resize((_HASH_INPUT_SIZE, _HASH_INPUT_SIZE), Image.LANCZOS)
+    except Exception as e:
+        logger.debug(f"   pHash hesaplanamadı: {e}")
+        return None
+
+    pixels = np.asarray(image, dtype=np.float64)
+    dct = _dct_matrix(_HASH_INPUT_SIZE)
+    low = (dct @ pixels @ dct.T)[:_HASH_BITS_SIDE, :_HASH_BITS_SIDE].flatten()
+    median = np.median(low[1:])  # DC (ortalama parlaklık) medyanı kaydırmasın
+    return int("".join("1" if value > median else "0" for value in low), 2)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+# ============================================
+# BK-TREE
+# ============================================
+class BKTree:
+    """
+    Hamming mesafesi için BK-tree: her düğümün çocukları, düğüme olan
+    mesafeye göre dallanır. Üçgen eşitsizliği sayesinde aramada sadece
+    |d - r| ... d + r aralığındaki dallara inilir.
+
+    Düğüm: [hash, kimlikler, {mesafe: çocuk}]
+    """
+
+    def __init__(self):
+        self._root: Optional[list] = None
+        self.size = 0
+
+    def add(self, value: int, key: str) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [key], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [key], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, str]]:
+        """max_distance içindeki (mesafe, kimlik) çiftleri, yakından uzağa."""
+        if self._root is None:
+            return []
+        found: List[Tuple[int, str]] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                found.extend((distance, key) for key in node[1])
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+
+# ============================================
+# RAPOR ÖNBELLEĞİ
+# ============================================
+@dataclass
+class CachedReport:
+    """Önbellekten dönen rapor."""
+    image_ref: str
+    report: str
+    hand_features: Optional[Dict[str, Any]]
+    distance: int
+
+
+class VisionReportCache:
+    """
+    (image_ref, rapor versiyonu) → rapor, pHash ile yakın kopya araması.
+
+    Kullanım:
+        cache = VisionReportCache(version="gpt-4o:narrative:3fa2c1")
+        hit = cache.lookup(image_ref, phash, owner=session_id)
+        ...
+        cache.put(image_ref, phash, report, hand_features, owner=session_id)
+
+    owner: Raporu üreten oturum. Yakın kopya (pHash) araması sadece
+    aynı owner'ın raporlarında yapılır; owner None ise sadece birebir arama.
+    """
+
+    def __init__(
+        self,
+        version: str,
+        path: str = VISION_CACHE_PATH,
+        max_distance: int = VISION_CACHE_MAX_DISTANCE,
+        max_entries: int = VISION_CACHE_MAX_ENTRIES
+    ):
+        self.version = version
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS vision_reports (
+                    image_ref       TEXT NOT NULL,
+                    version         TEXT NOT NULL,
+                    phash           TEXT,
+                    report          TEXT NOT NULL,
+                    hand_features   TEXT,
+                    created_at      REAL NOT NULL,
+                    last_hit_at     REAL NOT NULL,
+                    hits            INTEGER NOT NULL DEFAULT 0,
+                    owner           TEXT,
+                    PRIMARY KEY (image_ref, version)
+                )
+            """)
+            # owner sonradan eklendi: eski dosyalara kolon ekle (eski raporlar sadece birebir bulunur)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(vision_reports)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE vision_reports ADD COLUMN owner TEXT")
+        self._refs: Dict[str, Optional[int]] = {}
+        self._trees: Dict[str, BKTree] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Bu versiyonun hash'lerini belleğe (owner başına BK-tree) yükler (kilit altında veya init'te)."""
+        rows = self._conn.execute(
+            "SELECT image_ref, phash, owner FROM vision_reports WHERE version = ? ORDER BY last_hit_at DESC LIMIT ?",
+            (self.version, self.max_entries)
+        ).fetchall()
+        self._refs = {}
+        self._trees = {}
+        for image_ref, phash, owner in rows:
+            value = int(phash, 16) if phash else None
+            self._refs[image_ref] = value
+            self._index(image_ref, value, owner)
+        logger.info(f"🖐️ Vision rapor önbelleği: {len(self._refs)} rapor ({self.path})")
+
+    def _index(self, image_ref: str, phash: Optional[int], owner: Optional[str]) -> None:
+        """Hash'i owner'ın BK-tree'sine ekler (owner'sız raporlar sadece birebir bulunur)."""
+        if phash is None or not owner:
+            return
+        tree = self._trees.get(owner)
+        if tree is None:
+            tree = self._trees[owner] = BKTree()
+        tree.add(phash, image_ref)
+
+    def lookup(self, image_ref: str, phash: Optional[int], owner: Optional[str] = None) -> Optional[CachedReport]:
+        """
+        Aynı veya (aynı oturumda) algısal olarak yakın fotoğrafın raporu.
+
+        Args:
+            image_ref: Fotoğrafın SHA-256'sı
+            phash: perceptual_hash() (None ise sadece birebir arama)
+            owner: Oturum kimliği (None ise sadece birebir arama)
+
+        Returns:
+            CachedReport veya None
+        """
+        with self._lock:
+            candidates: List[Tuple[int, str]] = []
+            if image_ref in self._refs:
+                candidates.append((0, image_ref))
+            tree = self._trees.get(owner) if owner else None
+            if phash is not None and tree is not None:
+                candidates.extend(tree.search(phash, self.max_distance))
+
+            for distance, candidate in candidates:
+                row = self._conn.execute(
+                    "SELECT report, hand_features FROM vision_reports WHERE image_ref = ? AND version = ?",
+                    (candidate, self.version)
+                ).fetchone()
+                if row is None:  # Başka replika silmiş
+                    continue
+                with self._conn:
+                    self._conn.execute(
+                        "UPDATE vision_reports SET last_hit_at = ?, hits = hits + 1 WHERE image_ref = ? AND version = ?",
+                        (time.time(), candidate, self.version)
+                    )
+                record_cache("vision_report", hit=True)
+                return CachedReport(
+                    image_ref=candidate,
+                    report=row[0],
+                    hand_features=json.loads(row[1]) if row[1] else None,
+                    distance=distance
+                )
+
+        record_cache("vision_report", hit=False)
+        return None
+
+    def put(
+        self,
+        image_ref: str,
+        phash: Optional[int],
+        report: str,
+        hand_features: Optional[Dict[str, Any]] = None,
+        owner: Optional[str] = None
+    ) -> None:
+        """Raporu owner'ın raporu olarak yazar; sınır aşılırsa en uzun süredir kullanılmayanları siler."""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO vision_reports
+                        (image_ref, version, phash, report, hand_features, created_at, last_hit_at, hits, owner)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)
+                """, (image_ref, self.version, f"{phash:016x}" if phash is not None else None,
+                      report, json.dumps(hand_features) if hand_features else None, now, now, owner))
+            if image_ref not in self._refs:
+                self._refs[image_ref] = phash
+                self._index(image_ref, phash, owner)
+            if len(self._refs) > self.max_entries:
+                self._prune()
+
+    def _prune(self) -> None:
+        """En uzun süredir kullanılmayan %10'u siler ve ağacı yeniden kurar (kilit altında)."""
+        keep = int(self.max_entries * 0.9)
+        with self._conn:
+            self._conn.execute("""
+                DELETE FROM vision_reports WHERE version = ? AND image_ref NOT IN (
+                    SELECT image_ref FROM vision_reports WHERE version = ? ORDER BY last_hit_at DESC LIMIT ?
+                )
+            """, (self.version, self.version, keep))
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================
+# PROCESS GENELİNDE TEK ÖNBELLEK
+# ============================================
+_cache: Optional[VisionReportCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_vision_cache(version: str) -> Optional[VisionReportCache]:
+    """
+    Ayarlardaki rapor önbelleği (kapalıysa veya açılamıyorsa None).
+
+    Args:
+        version: Rapor versiyonu (değişirse önbellek o versiyonla yeniden açılır)
+    """
+    global _cache
+    if not VISION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.version != version:
+            try:
+                _cache = VisionReportCache(version)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Vision rapor önbelleği açılamadı: {e}")
+                return None
+        return _cache
@@ -0,0 +1,18 @@
+"""
+============================================
+YASAA VISION - Benchmark Package
+============================================
+Ağ, API anahtarı veya MongoDB gerektirmeden performans ölçen araçlar.
+
+Modüller:
+- fakes: Sahte chat/embedding modelleri + bellek içi MongoDB/vector store
+- ingest_bench: Ingest pipeline'larını örnek PDF'lerle uçtan uca ölçer
+- graph_bench: LangGraph akışının model dışı gecikmesi
+- import_bench: Temiz process'te modül import süresi (soğuk başlangıç)
+- environment: Baseline'ın alındığı ortam (Python, kütüphane sürümleri, işlemci)
+
+Sonuçlar kayıtlı bir baseline JSON ile karşılaştırılır; gerileme
+varsa komut sıfırdan farklı kodla çıkar. Baseline başka bir ortamda
+alınmışsa gerilemeler sadece raporlanır.
+============================================
+"""
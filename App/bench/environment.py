@@ -0,0 +1,121 @@
+"""
+============================================
+YASAA VISION - Benchmark Ortam Bilgisi
+============================================
+Baseline'lar mutlak süre ve bellek saklar; bu sayılar yorumlayıcıya,
+kütüphane sürümlerine ve makineye bağlıdır (gerçek langgraph ile
+build_graph ~3 ms, başka bir sürümle çok farklı olabilir). Başka bir
+ortamda alınmış baseline ile karşılaştırmak her makinede "gerileme"
+üretir ve CI kapısını anlamsız kılar.
+
+Her baseline, alındığı ortamı ("environment") yanında saklar:
+    python, platform, işlemci, çekirdek sayısı, ölçülen kütüphanelerin sürümleri
+
+Karşılaştırmada ortam farklıysa farklar yazdırılır ve gerilemeler
+sadece bilgi amaçlı raporlanır (çıkış kodu 0); baseline o ortamda
+--save-baseline ile yenilenmelidir.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import platform
+from importlib import metadata
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _cpu_model() -> str:
+    """İşlemci modeli (Linux'ta /proc/cpuinfo; yoksa platform.processor())."""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as handle:
+            for line in handle:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def package_version(name: str) -> Optional[str]:
+    """Kurulu dağıtımın sürümü (kurulu değilse None)."""
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment_info(packages: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Ölçümün alındığı ortam.
+
+    Args:
+        packages: Sürümü kaydedilecek dağıtımlar (örn. "langgraph")
+
+    Returns:
+        Dict[str, Any]: python, platform, cpu, cpu_count, packages
+    """
+    return {
+        "python": sys.version.split()[0],
+        "platform": f"{platform.system()}-{platform.machine()}",
+        "cpu": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "packages": {name: package_version(name) for name in packages}
+    }
+
+
+def environment_differences(baseline: Optional[Dict[str, Any]], current: Dict[str, Any]) -> List[str]:
+    """
+    Baseline ortamı ile şimdiki ortam arasındaki farklar.
+
+    Ortam bilgisi olmayan (eski) baseline tek bir fark olarak raporlanır.
+
+    Returns:
+        List[str]: "alan: baseline → şimdi" satırları (boşsa aynı ortam)
+    """
+    if not baseline:
+        return ["environment: baseline'da ortam bilgisi yok"]
+
+    differences = []
+    for key, value in current.items():
+        if key == "packages":
+            continue
+        if baseline.get(key) != value:
+            differences.append(f"{key}: {baseline.get(key)} → {value}")
+
+    base_packages = baseline.get("packages", {})
+    for name, version in current.get("packages", {}).items():
+        if base_packages.get(name) != version:
+            differences.append(f"{name}: {base_packages.get(name)} → {version}")
+    return differences
+
+
+def comparable_baseline(
+    baseline: Dict[str, Any],
+    settings: Dict[str, Any],
+    environment: Dict[str, Any]
+) -> bool:
+    """
+    Baseline'ın aynı ayar ve ortamda alınıp alınmadığını yazdırır.
+
+    Returns:
+        bool: True ise gerilemeler kapı olarak kullanılabilir (çıkış kodu 1);
+            False ise sadece bilgi amaçlıdır
+    """
+    comparable = True
+    if baseline.get("settings") != settings:
+        print(f"⚠️ Baseline farklı ayarlarla alınmış: {baseline.get('settings')} (şimdi: {settings})")
+        comparable = False
+
+    differences = environment_differences(baseline.get("environment"), environment)
+    if differences:
+        print("⚠️ Baseline başka bir ortamda alınmış:")
+        for difference in differences:
+            print(f"   - {difference}")
+        comparable = False
+
+    if not comparable:
+        print("   ℹ️ Gerilemeler bilgi amaçlıdır; bu ortamda --save-baseline ile yenileyin")
+    return comparable
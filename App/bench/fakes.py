@@ -0,0 +1,542 @@
+"""
+============================================
+YASAA VISION - Sahte Modeller ve Bellek İçi Depo
+============================================
+Benchmark'ların OpenAI ve MongoDB'ye gitmeden çalışması için:
+
+- FakeChatModel: ChatOpenAI yerine geçer; ayarlanabilir gecikme ve
+  hata oranı, çağrı sayısı ve yüklenen byte sayısı tutar
+- FakeEmbeddings: OpenAIEmbeddings yerine geçer; metnin hash'inden
+  deterministik vektör üretir
+- FakeClient / InMemoryDatabase / InMemoryCollection: ingest ve
+  retrieval'ın kullandığı pymongo alt kümesi (bulk_write, find,
+  delete_many, distinct, update_one...)
+- InMemoryVectorStore: MongoDBAtlasVectorSearch yerine geçer;
+  kosinüs benzerliği saf Python ile hesaplanır
+
+Gecikme time.sleep ile verilir; gerçek API gibi GIL'i bırakır, böylece
+VISION_CONCURRENCY gibi paralellik ayarları gerçekçi ölçülür.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import math
+import time
+import random
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+# ============================================
+# AYARLAR
+# ============================================
+FAKE_VISION_LATENCY: float = float(os.getenv("FAKE_VISION_LATENCY", "0.5"))
+FAKE_EMBED_LATENCY: float = float(os.getenv("FAKE_EMBED_LATENCY", "0.1"))
+FAKE_ERROR_RATE: float = float(os.getenv("FAKE_ERROR_RATE", "0"))
+FAKE_RESPONSE_CHARS: int = int(os.getenv("FAKE_RESPONSE_CHARS", "1500"))
+FAKE_EMBEDDING_DIMENSIONS: int = int(os.getenv("FAKE_EMBEDDING_DIMENSIONS", "256"))
+"""
+FAKE_VISION_LATENCY: Sahte Vision çağrısı başına bekleme (saniye)
+FAKE_EMBED_LATENCY: Sahte embedding isteği başına bekleme (saniye)
+FAKE_ERROR_RATE: Çağrıların hata fırlatma olasılığı (0-1)
+FAKE_RESPONSE_CHARS: Sahte Vision cevabının uzunluğu (karakter)
+FAKE_EMBEDDING_DIMENSIONS: Sahte embedding vektör boyutu
+"""
+
+# Sahte cevaplar bu cümlelerden örülür (chunker gerçek cümle sınırları görsün)
+_SENTENCES = [
+    "The life line curves widely around the mount of Venus.",
+    "A forked head line indicates a versatile and imaginative mind.",
+    "Short vertical marks below the little finger are called medical stigmata.",
+    "The heart line rises toward the index finger and ends in a small branch.",
+    "Diagram 3 shows the seven mounts labelled with their planetary names.",
+    "A clear fate line starting from the wrist suggests early independence.",
+    "Islands on a line are read as periods of weakened energy.",
+    "The girdle of Venus appears as a broken arc above the heart line."
+]
+
+
+class FakeResponse:
+    """Chat modelinin döndürdüğü mesajın (AIMessage) gereken kısmı."""
+
+    def __init__(self, content: str, input_tokens: int, output_tokens: int):
+        self.content = content
+        self.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+        self.response_metadata = {"model_name": "fake-vision"}
+
+
+# ============================================
+# SAHTE CHAT MODELİ
+# ============================================
+class FakeChatModel:
+    """
+    ChatOpenAI yerine geçen sahte model.
+
+    Hem dict mesajları ({"role", "content"}) hem de LangChain mesaj
+    objelerini (HumanMessage) kabul eder. Resim içeren parçaların
+    data URL'leri "yüklenen byte" olarak sayılır.
+
+    Kullanım:
+        llm = FakeChatModel(latency=0.5, error_rate=0.02)
+        response = llm.invoke(messages)
+        print(llm.stats)
+    """
+
+    def __init__(
+        self,
+        latency: float = FAKE_VISION_LATENCY,
+        error_rate: float = FAKE_ERROR_RATE,
+        response_chars: int = FAKE_RESPONSE_CHARS,
+        seed: int = 42,
+        fixed_response: Optional[str] = None,
+        **_: Any
+    ):
+        # **_: ChatOpenAI'nin model=, max_tokens=, api_key= gibi argümanları yutulur
+        # fixed_response: Her çağrıda aynı cevap (örn. structured output JSON'u)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.response_chars = response_chars
+        self.fixed_response = fixed_response
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "calls": 0,
+            "errors": 0,
+            "images": 0,
+            "bytes_uploaded": 0
+        }
+
+    def invoke(self, messages: Iterable[Any], *args: Any, **kwargs: Any) -> FakeResponse:
+        """Gecikme ekler, istatistik tutar, sahte cevap veya hata döndürür."""
+        images, uploaded = 0, 0
+        for message in messages:
+            content = message.get("content") if isinstance(message, dict) else getattr(message, "content", "")
+            parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+            for part in parts:
+                if part.get("type") == "image_url":
+                    images += 1
+                    uploaded += len(part["image_url"]["url"])
+                else:
+                    uploaded += len(part.get("text", "").encode("utf-8"))
+
+        with self._lock:
+            call_index = self.stats["calls"]
+            self.stats["calls"] += 1
+            self.stats["images"] += images
+            self.stats["bytes_uploaded"] += uploaded
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+
+        time.sleep(self.latency)
+
+        if failed:
+            raise RuntimeError("Sahte Vision hatası (FAKE_ERROR_RATE)")
+
+        return FakeResponse(
+            self._response_text(call_index),
+            input_tokens=uploaded // 4,
+            output_tokens=self.response_chars // 4
+        )
+
+    def _response_text(self, call_index: int) -> str:
+        """Cümlelerden response_chars uzunluğunda metin örer."""
+        if self.fixed_response is not None:
+            return self.fixed_response
+        sentences: List[str] = []
+        length = 0
+        index = call_index
+        while length < self.response_chars:
+            sentence = _SENTENCES[index % len(_SENTENCES)]
+            sentences.append(sentence)
+            length += len(sentence) + 1
+            index += 1
+        return " ".join(sentences)
+
+
+# ============================================
+# SAHTE EMBEDDING
+# ============================================
+class FakeEmbeddings:
+    """
+    OpenAIEmbeddings yerine geçen deterministik embedding.
+
+    Aynı metin her zaman aynı birim vektörü verir; benzerlik araması
+    anlamlı değildir ama boyut, bellek ve akış gerçek modelle aynıdır.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = FAKE_EMBEDDING_DIMENSIONS,
+        latency: float = FAKE_EMBED_LATENCY,
+        error_rate: float = FAKE_ERROR_RATE,
+        seed: int = 7,
+        **_: Any
+    ):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.error_rate = error_rate
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "texts": 0,
+            "errors": 0
+        }
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        generator = random.Random(digest)
+        vector = [generator.uniform(-1.0, 1.0) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+
+        time.sleep(self.latency)
+
+        if failed:
+            raise RuntimeError("Sahte embedding hatası (FAKE_ERROR_RATE)")
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+# ============================================
+# BELLEK İÇİ MONGODB
+# ============================================
+_MISSING = object()
+
+
+def _compare(value: Any, condition: Any) -> bool:
+    """Tek bir alan koşulunu değerlendirir (eşitlik veya $operatör dict'i)."""
+    if not (isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition)):
+        return (value is _MISSING and condition is None) or value == condition
+
+    for operator, operand in condition.items():
+        present = value is not _MISSING
+        if operator == "$in":
+            if not ((not present and None in operand) or (present and value in operand)):
+                return False
+        elif operator == "$nin":
+            if (not present and None in operand) or (present and value in operand):
+                return False
+        elif operator == "$exists":
+            if present != bool(operand):
+                return False
+        elif operator == "$ne":
+            if (value if present else None) == operand:
+                return False
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            if not present or value is None:
+                return False
+            if not {
+                "$gt": value > operand,
+                "$gte": value >= operand,
+                "$lt": value < operand,
+                "$lte": value <= operand
+            }[operator]:
+                return False
+        else:
+            raise NotImplementedError(f"Desteklenmeyen operatör: {operator}")
+    return True
+
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Belge MongoDB filtresine uyuyor mu? (benchmark'ta kullanılan alt küme)"""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif not _compare(document.get(key, _MISSING), condition):
+            return False
+    return True
+
+
+class _Result:
+    """pymongo sonuç objelerinin (InsertManyResult, BulkWriteResult...) sayaçları."""
+
+    def __init__(self, **counts: Any):
+        self.inserted_count = 0
+        self.upserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.inserted_ids: List[Any] = []
+        self.upserted_id = None
+        self.__dict__.update(counts)
+
+
+class InMemoryCollection:
+    """pymongo Collection'ın ingest/retrieval'da kullanılan alt kümesi."""
+
+    def __init__(self, database: "InMemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self._documents: Dict[Any, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    # ---------- Yazma ----------
+    def _new_id(self) -> str:
+        self._next_id += 1
+        return f"{self.name}:{self._next_id}"
+
+    def insert_one(self, document: Dict[str, Any]) -> _Result:
+        with self._lock:
+            document = dict(document)
+            document.setdefault("_id", self._new_id())
+            if document["_id"] in self._documents:
+                raise DuplicateKeyError(f"E11000 duplicate key: {document['_id']}")
+            self._documents[document["_id"]] = document
+            return _Result(inserted_id=document["_id"], inserted_count=1)
+
+    def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True) -> _Result:
+        ids = [self.insert_one(document).inserted_id for document in documents]
+        return _Result(inserted_ids=ids, inserted_count=len(ids))
+
+    def replace_one(self, query: Dict[str, Any], document: Dict[str, Any], upsert: bool = False) -> _Result:
+        with self._lock:
+            existing = self.find_one(query)
+            if existing is not None:
+                self._documents[existing["_id"]] = {**document, "_id": existing["_id"]}
+                return _Result(matched_count=1, modified_count=1)
+            if not upsert:
+                return _Result()
+            new_id = document.get("_id", query.get("_id", self._new_id()))
+            self._documents[new_id] = {**document, "_id": new_id}
+            return _Result(upserted_count=1, upserted_id=new_id)
+
+    def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> _Result:
+        with self._lock:
+            existing = self.find_one(query)
+            if existing is None:
+                if not upsert:
+                    return _Result()
+                existing = {key: value for key, value in query.items() if not key.startswith("$")}
+                existing.setdefault("_id", self._new_id())
+                upserted = True
+            else:
+                upserted = False
+
+            for key, value in update.get("$set", {}).items():
+                existing[key] = value
+            for key in update.get("$unset", {}):
+                existing.pop(key, None)
+
+            self._documents[existing["_id"]] = existing
+            if upserted:
+                return _Result(upserted_count=1, upserted_id=existing["_id"])
+            return _Result(matched_count=1, modified_count=1)
+
+    def bulk_write(self, operations: List[Any], ordered: bool = True) -> _Result:
+        """InsertOne / ReplaceOne listesini uygular (pymongo op objeleri)."""
+        totals = _Result()
+        for operation in operations:
+            if hasattr(operation, "_filter"):
+                result = self.replace_one(operation._filter, operation._doc, upsert=bool(operation._upsert))
+                totals.matched_count += result.matched_count
+                totals.modified_count += result.modified_count
+                totals.upserted_count += result.upserted_count
+            else:
+                self.insert_one(operation._doc)
+                totals.inserted_count += 1
+        return totals
+
+    def delete_many(self, query: Dict[str, Any]) -> _Result:
+        with self._lock:
+            doomed = [key for key, document in self._documents.items() if matches(document, query)]
+            for key in doomed:
+                del self._documents[key]
+            return _Result(deleted_count=len(doomed))
+
+    def delete_one(self, query: Dict[str, Any]) -> _Result:
+        with self._lock:
+            document = self.find_one(query)
+            if document is None:
+                return _Result()
+            del self._documents[document["_id"]]
+            return _Result(deleted_count=1)
+
+    # ---------- Okuma ----------
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            found = [dict(document) for document in self._documents.values() if matches(document, query)]
+
+        if projection:
+            included = {key for key, flag in projection.items() if flag}
+            excluded = {key for key, flag in projection.items() if not flag}
+            if included:
+                found = [{key: value for key, value in document.items() if key in included or key == "_id"}
+                         for document in found]
+            found = [{key: value for key, value in document.items() if key not in excluded} for document in found]
+        return found
+
+    def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        found = self.find(query, projection)
+        return found[0] if found else None
+
+    def count_documents(self, query: Dict[str, Any]) -> int:
+        return len(self.find(query))
+
+    def estimated_document_count(self) -> int:
+        return len(self._documents)
+
+    def distinct(self, key: str, query: Optional[Dict[str, Any]] = None) -> List[Any]:
+        values: List[Any] = []
+        for document in self.find(query):
+            value = document.get(key)
+            if value is not None and value not in values:
+                values.append(value)
+        return values
+
+    def create_index(self, *args: Any, **kwargs: Any) -> str:
+        return "fake_index"
+
+
+class InMemoryDatabase:
+    """pymongo Database'in gereken kısmı; collection'lar ilk erişimde oluşur."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, InMemoryCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = InMemoryCollection(self, name)
+            return self._collections[name]
+
+    def get_collection(self, name: str) -> InMemoryCollection:
+        return self[name]
+
+    def create_collection(self, name: str) -> InMemoryCollection:
+        return self[name]
+
+    def drop_collection(self, name: str) -> None:
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+
+class FakeClient:
+    """
+    MongoClient yerine geçer.
+
+    Tüm instance'lar aynı bellek içi "sunucuyu" paylaşır; ingest'in farklı
+    yerlerde açtığı client'lar aynı veriyi görür.
+    """
+
+    _databases: Dict[str, InMemoryDatabase] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        pass
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = InMemoryDatabase(name)
+            return self._databases[name]
+
+    def get_database(self, name: str) -> InMemoryDatabase:
+        return self[name]
+
+    def close(self) -> None:
+        pass
+
+    @classmethod
+    def reset(cls) -> None:
+        """Tüm bellek içi veriyi siler."""
+        with cls._lock:
+            cls._databases.clear()
+
+
+# ============================================
+# BELLEK İÇİ VECTOR STORE
+# ============================================
+class InMemoryVectorStore:
+    """
+    MongoDBAtlasVectorSearch yerine geçer.
+
+    Ingest tarafı sadece .embeddings ve .collection kullanır (BatchingWriter);
+    retrieval tarafı similarity_search ile tüm collection'ı tarar.
+    """
+
+    def __init__(
+        self,
+        collection: InMemoryCollection,
+        embeddings: Any,
+        text_key: str = "text",
+        embedding_key: str = "embedding"
+    ):
+        self.collection = collection
+        self.embeddings = embeddings
+        self.text_key = text_key
+        self.embedding_key = embedding_key
+
+    def add_documents(self, documents: List[Any]) -> List[Any]:
+        texts = [document.page_content for document in documents]
+        vectors = self.embeddings.embed_documents(texts)
+        records = [
+            {**document.metadata, self.text_key: text, self.embedding_key: vector}
+            for document, text, vector in zip(documents, texts, vectors)
+        ]
+        return self.collection.insert_many(records).inserted_ids
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        pre_filter: Optional[Dict[str, Any]] = None,
+        include_scores: bool = False,
+        **_: Any
+    ):
+        from langchain_core.documents import Document
+
+        query_vector = self.embeddings.embed_query(query)
+        scored = []
+        for record in self.collection.find(pre_filter):
+            vector = record.get(self.embedding_key)
+            if not vector:
+                continue
+            score = sum(a * b for a, b in zip(query_vector, vector))
+            scored.append((score, record))
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [
+            Document(
+                page_content=record.get(self.text_key, ""),
+                metadata={
+                    **{key: value for key, value in record.items()
+                       if key not in (self.text_key, self.embedding_key)},
+                    **({"score": score} if include_scores else {})
+                }
+            )
+            for score, record in scored[:k]
+        ]
@@ -0,0 +1,509 @@
+"""
+============================================
+YASAA VISION - Graph Gecikme Benchmark'ı
+============================================
+build_graph() akışının model çağrıları DIŞINDAKİ maliyetini ölçer.
+Gözcü ve Abla'nın modelleri FakeChatModel ile, Araştırmacı'nın
+MongoDB'si bellek içi vector store ile değiştirilir; böylece ölçülen
+süre graph'ın, prompt hazırlamanın ve state taşımanın kendisidir.
+
+Kullanım:
+    python -m App.bench.graph_bench                         # Ölç, baseline ile karşılaştır
+    python -m App.bench.graph_bench --save-baseline         # Sonucu baseline olarak kaydet
+    python -m App.bench.graph_bench --iterations 500 --model-latency 0.01
+
+Senaryolar (her biri invoke ve stream ile):
+- first_turn: Fotoğraf + ilk soru
+- follow_up: Önceki rapor ve birkaç mesajlık geçmişle ikinci soru
+- long_history: Yüzlerce mesajlık sohbet geçmişi
+- large_image: Birkaç MB'lık base64 fotoğraf
+
+Mikro ölçümler: build_graph, _build_user_content,
+_build_chat_history_text, state kopyalama.
+
+Her ölçüm için p50/p95/p99 (ms) ve tracemalloc ile çağrı başına
+en yüksek ayrılan bellek (KB) raporlanır. Graph senaryolarında
+"overhead" = toplam süre - node fonksiyonlarının içinde geçen süre.
+Baseline'a göre tolerans dışı kötüleşme varsa çıkış kodu 1'dir. Baseline
+alındığı ortamı (python, işlemci, langgraph / langchain-core sürümleri)
+saklar; ortam veya ayarlar farklıysa gerilemeler sadece raporlanır
+(bkz. App.bench.environment).
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import copy
+import gc
+import json
+import time
+import base64
+import logging
+import argparse
+import importlib
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from App.bench.environment import comparable_baseline, environment_info
+
+# ============================================
+# AYARLAR
+# ============================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))  # Ablacim/
+
+GRAPH_BENCH_BASELINE_PATH: str = os.getenv(
+    "GRAPH_BENCH_BASELINE_PATH", os.path.join(project_root, "bench_baseline_graph.json")
+)
+GRAPH_BENCH_TOLERANCE: float = float(os.getenv("GRAPH_BENCH_TOLERANCE", "0.25"))
+GRAPH_BENCH_TAIL_TOLERANCE: float = float(os.getenv("GRAPH_BENCH_TAIL_TOLERANCE", "1.0"))
+GRAPH_BENCH_MIN_DELTA_MS: float = float(os.getenv("GRAPH_BENCH_MIN_DELTA_MS", "1.5"))
+"""
+GRAPH_BENCH_BASELINE_PATH: Karşılaştırılacak / kaydedilecek baseline JSON
+GRAPH_BENCH_TOLERANCE: p50, overhead ve bellek için izin verilen kötüleşme oranı (0.25 = %25)
+GRAPH_BENCH_TAIL_TOLERANCE: p95 için izin verilen kötüleşme oranı (1.0 = 2 katı)
+GRAPH_BENCH_MIN_DELTA_MS: Bundan küçük mutlak süre farkları gerileme sayılmaz
+    (paylaşımlı makinede aynı kodla iki çalıştırma arasında ~1 ms oynar)
+"""
+
+# Baseline'da karşılaştırılan metrikler (hepsi düşük = iyi). p99 sadece
+# raporlanır: 200 turda p99 ikinci en yavaş turdur, tek bir kesinti
+# aynı kodla 1.5-2 kat oynatır
+COMPARED_METRICS = ("p50_ms", "p95_ms", "overhead_p50_ms", "alloc_peak_kb")
+TAIL_METRICS = ("p95_ms",)
+
+# Sonuçları belirleyen dağıtımlar (sürümleri baseline'a yazılır)
+MEASURED_PACKAGES = (
+    "langgraph", "langgraph-checkpoint", "langchain-core", "pydantic", "numpy", "Pillow"
+)
+
+# Senaryo boyutları
+LONG_HISTORY_MESSAGES: int = 400
+LARGE_IMAGE_BYTES: int = 6 * 1024 * 1024
+SMALL_IMAGE_BYTES: int = 300 * 1024
+KB_PAGES: int = 60
+
+# Sahte tespit modelinin cevabı (kademeli Vision'ın ilk adımı)
+DETECTION_RESPONSE: str = '{"is_hand": true, "palm_visible": true, "box": [0.2, 0.15, 0.8, 0.9]}'
+
+
+# ============================================
+# ÖLÇÜM YARDIMCILARI
+# ============================================
+def percentile(samples: List[float], q: float) -> float:
+    """Sıralı örneklerden doğrusal enterpolasyonlu yüzdelik."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples_s: List[float]) -> Dict[str, float]:
+    """Saniye cinsinden örneklerden ms yüzdelikleri."""
+    return {
+        "runs": len(samples_s),
+        "p50_ms": round(percentile(samples_s, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(samples_s, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(samples_s, 0.99) * 1000, 4)
+    }
+
+
+def measure_allocations(function: Callable[[], Any], runs: int = 3) -> float:
+    """
+    Fonksiyonun bir çağrısında ayrılan en yüksek bellek (KB).
+
+    tracemalloc süreyi bozduğu için zamanlamadan AYRI çalıştırılır.
+    """
+    tracemalloc.start()
+    try:
+        peak = 0
+        for _ in range(runs):
+            tracemalloc.reset_peak()
+            baseline_size, _ = tracemalloc.get_traced_memory()
+            function()
+            _, run_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, run_peak - baseline_size)
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def bench_callable(function: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, float]:
+    """
+    Fonksiyonu ölçer: gecikme yüzdelikleri + ayrılan bellek.
+
+    Zamanlama sırasında GC kapalıdır (timeit gibi): deepcopy gibi çok
+    obje ayıran ölçümlerde döngüsel GC'nin denk geldiği turlar p95/p99'u
+    rastgele 5-10 kat şişirip aynı makinede "gerileme" üretiyordu.
+    """
+    for _ in range(warmup):
+        function()
+
+    samples: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            function()
+            samples.append(time.perf_counter() - started)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    return {**summarize(samples), "alloc_peak_kb": measure_allocations(function)}
+
+
+class NodeTimer:
+    """Graph node'larının içinde geçen süreyi toplar (overhead = toplam - node)."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def wrap(self, node: Callable) -> Callable:
+        def timed(state):
+            started = time.perf_counter()
+            try:
+                return node(state)
+            finally:
+                self.seconds += time.perf_counter() - started
+        timed.__name__ = node.__name__
+        return timed
+
+
+# ============================================
+# SAHTE ORTAM
+# ============================================
+def install_fakes(args: argparse.Namespace) -> NodeTimer:
+    """
+    Node'ların modellerini ve vector store'unu sahteleriyle değiştirir.
+
+    Node fonksiyonları App.agent.graph'ın globallerinden okunur; burada
+    sarılmaları build_graph()'ın süre ölçen sürümleri kullanmasını sağlar.
+
+    Returns:
+        NodeTimer: Node sürelerini toplayan zamanlayıcı
+    """
+    from App.bench.fakes import FakeChatModel, FakeClient, FakeEmbeddings, InMemoryVectorStore
+    from App.core.metrics import (
+        instrumented_chat_model,
+        instrumented_collection,
+        instrumented_embeddings,
+        instrumented_vector_store
+    )
+    from App.core.vector_backends import MongoVectorBackend
+    from App.ingest.chunker import build_page_records
+    # App.agent.nodes paketi node fonksiyonlarını modüllerle aynı adla dışarı açar
+    # (retrieval_node vb.); "import ... as" fonksiyonu verir, modülü değil
+    graph_module = importlib.import_module("App.agent.graph")
+    persona_module = importlib.import_module("App.agent.nodes.persona_node")
+    retrieval_module = importlib.import_module("App.agent.nodes.retrieval_node")
+    vision_module = importlib.import_module("App.agent.nodes.vision_node")
+    prescreen_module = importlib.import_module("App.agent.nodes.prescreen_node")
+
+    # Sahteler production'daki gibi metrik/span sarmalayıcılarıyla sarılır;
+    # ölçülen yol, gerçek client'ların yoluyla aynıdır
+    vision_fake = FakeChatModel(latency=args.model_latency, response_chars=2500)
+    persona_fake = FakeChatModel(latency=args.model_latency, response_chars=8000)
+    vision_llm = instrumented_chat_model(vision_fake, "fake-vision")
+    persona_llm = instrumented_chat_model(persona_fake, "fake-persona")
+    detect_fake = FakeChatModel(latency=args.model_latency, fixed_response=DETECTION_RESPONSE)
+    detect_llm = instrumented_chat_model(detect_fake, "fake-detect")
+    vision_module._get_vision_llm = lambda structured=False: vision_llm
+    vision_module._get_detect_llm = lambda: detect_llm
+    # Rapor önbelleği kapalı: her iterasyon Vision yolunu ölçsün (ve diske yazılmasın)
+    vision_module.get_vision_cache = lambda version: None
+    persona_module._get_persona_llm = lambda: persona_llm
+
+    # Bellek içi bilgi bankası: gerçek chunker ile parçalanmış sahte sayfalar
+    database = FakeClient()["graph_bench"]
+    embeddings = FakeEmbeddings(latency=0)
+    chunks, parents = database["chunks"], database["pages"]
+
+    page_text = persona_fake._response_text(0)[:2400]
+    records = []
+    for page in range(1, KB_PAGES + 1):
+        metadata = {"source": "bench.pdf", "file_hash": "b" * 64, "page": page, "type": "hybrid_book_page"}
+        parent, page_chunks = build_page_records(page_text, metadata, "bench")
+        parents.insert_one(parent)
+        records.extend(page_chunks)
+    vectors = embeddings.embed_documents([text for text, _ in records])
+    chunks.insert_many([
+        {**meta, "text": text, "embedding": vector}
+        for (text, meta), vector in zip(records, vectors)
+    ])
+
+    store = instrumented_vector_store(InMemoryVectorStore(chunks, instrumented_embeddings(embeddings, "fake-embedding")), chunks)
+    parents_view = instrumented_collection(parents)
+    backend = MongoVectorBackend(vector_store=store, parents=parents_view)
+    retrieval_module._get_backend = lambda: backend
+
+    timer = NodeTimer()
+    graph_module.prescreen_node = timer.wrap(prescreen_module.prescreen_node)
+    graph_module.vision_analysis_node = timer.wrap(vision_module.vision_analysis_node)
+    graph_module.retrieval_node = timer.wrap(retrieval_module.retrieval_node)
+    graph_module.persona_node = timer.wrap(persona_module.persona_node)
+    return timer
+
+
+def fake_image(size: int) -> str:
+    """
+    Yaklaşık verilen boyutta (JPEG byte) geçerli bir avuç içi taklidi, base64.
+
+    Ten rengi zemin + doku gürültüsü + koyu çizgiler: ön eleme geçer,
+    kırpma ve yeniden kodlama gerçek bir fotoğraftaki gibi çalışır.
+    Tohum sabittir; ölçümler çalıştırmalar arası karşılaştırılabilir.
+    """
+    import io
+    import numpy as np
+    from PIL import Image
+
+    def encode(height: int) -> bytes:
+        rng = np.random.default_rng(size)
+        width = height * 3 // 4
+        pixels = np.array([205.0, 150.0, 125.0], dtype=np.float32) + rng.normal(0, 28, (height, width, 3))
+
+        # Yaşam / akıl / kalp çizgisi gibi üç koyu eğri
+        rows, cols = np.mgrid[0:height, 0:width]
+        for offset, bend in ((0.35, 0.10), (0.5, 0.05), (0.65, -0.08)):
+            curve = height * (offset + bend * np.sin(cols / width * np.pi))
+            pixels[np.abs(rows - curve) < max(height // 200, 2)] *= 0.55
+
+        buffer = io.BytesIO()
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=92)
+        return buffer.getvalue()
+
+    # Bir deneme kodlamasıyla bayt/piksel oranı bulunur, boyut buna göre seçilir
+    height = 512
+    height = max(int(height * (size / len(encode(height))) ** 0.5), 256)
+    return base64.b64encode(encode(height)).decode("utf-8")
+
+
+def build_history(count: int) -> List[Any]:
+    """Kullanıcı/Abla sırasıyla count mesajlık sohbet geçmişi."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    history: List[Any] = []
+    for index in range(count):
+        if index % 2 == 0:
+            history.append(HumanMessage(content=f"Kalp çizgim aşk hayatım hakkında ne söylüyor? ({index})"))
+        else:
+            history.append(AIMessage(content="Bak kuzum, kalp çizgin Jüpiter tepesine doğru yükseliyor. " * 40))
+    history.append(HumanMessage(content="Peki kariyerim için ne dersin?"))
+    return history
+
+
+def build_scenarios() -> Dict[str, Dict[str, Any]]:
+    """Graph'a verilecek input state'leri (app.py'nin kurduğu biçimde)."""
+    from App.agent.state import create_initial_state
+
+    small_image = fake_image(SMALL_IMAGE_BYTES)
+    first_turn = create_initial_state("Elime bakar mısın?", small_image)
+
+    follow_up = create_initial_state("", small_image)
+    follow_up["messages"] = build_history(5)
+    follow_up["visual_analysis_report"] = "HAND SHAPE: Square. Life line is deep. " * 50
+
+    long_history = create_initial_state("", small_image)
+    long_history["messages"] = build_history(LONG_HISTORY_MESSAGES)
+
+    large_image = create_initial_state("Elime bakar mısın?", fake_image(LARGE_IMAGE_BYTES))
+
+    return {
+        "first_turn": first_turn,
+        "follow_up": follow_up,
+        "long_history": long_history,
+        "large_image": large_image
+    }
+
+
+# ============================================
+# BENCHMARK'LAR
+# ============================================
+def bench_graph(app: Any, timer: NodeTimer, state: Dict[str, Any], mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    """Tek senaryoyu invoke veya stream ile ölçer; overhead ayrı raporlanır."""
+    def run() -> None:
+        if mode == "invoke":
+            app.invoke(state)
+        else:
+            for _ in app.stream(state):
+                pass
+
+    for _ in range(args.warmup):
+        run()
+
+    totals: List[float] = []
+    overheads: List[float] = []
+    for _ in range(args.iterations):
+        timer.seconds = 0.0
+        started = time.perf_counter()
+        run()
+        total = time.perf_counter() - started
+        totals.append(total)
+        overheads.append(max(total - timer.seconds, 0.0))
+
+    return {
+        **summarize(totals),
+        "overhead_p50_ms": round(percentile(overheads, 0.50) * 1000, 4),
+        "overhead_p95_ms": round(percentile(overheads, 0.95) * 1000, 4),
+        "alloc_peak_kb": measure_allocations(run)
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """Tüm graph senaryolarını ve mikro ölçümleri çalıştırır."""
+    timer = install_fakes(args)
+
+    from App.agent.graph import build_graph
+    from App.agent.nodes.persona_node import _build_chat_history_text, _build_user_content
+
+    results: Dict[str, Dict[str, float]] = {}
+    scenarios = build_scenarios()
+    app = build_graph()
+
+    for name, state in scenarios.items():
+        for mode in ("invoke", "stream"):
+            print(f"⏱️ {name}/{mode}...")
+            results[f"graph.{name}.{mode}"] = bench_graph(app, timer, state, mode, args)
+
+    # Mikro ölçümler
+    print("⏱️ mikro ölçümler...")
+    long_state = scenarios["long_history"]
+    report = scenarios["follow_up"]["visual_analysis_report"]
+    references = [long_state["messages"][1].content[:1200]] * 5
+    history_text = _build_chat_history_text(long_state["messages"])
+
+    micro: Dict[str, Callable[[], Any]] = {
+        "build_graph": build_graph,
+        "build_user_content": lambda: _build_user_content(report, references, "Kariyerim?", history_text),
+        "build_chat_history_text": lambda: _build_chat_history_text(long_state["messages"]),
+        # app.py her turda state'i yeniden kurar; LangGraph kanalları referans taşır
+        "state_copy": lambda: {**long_state, "messages": list(long_state["messages"])},
+        "state_deepcopy": lambda: copy.deepcopy(long_state)
+    }
+    for name, function in micro.items():
+        iterations = max(args.iterations // 4, 5) if name in ("build_graph", "state_deepcopy") else args.iterations
+        results[f"micro.{name}"] = bench_callable(function, iterations, args.warmup)
+
+    return results
+
+
+# ============================================
+# RAPOR + BASELINE
+# ============================================
+def compare_to_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_delta_ms: float,
+    tail_tolerance: float = GRAPH_BENCH_TAIL_TOLERANCE
+) -> List[str]:
+    """
+    Sonuçları baseline ile karşılaştırır.
+
+    Kuyruk metrikleri (TAIL_METRICS) tail_tolerance ile, diğerleri
+    tolerance ile karşılaştırılır; süre farkı min_delta_ms'i de aşmalıdır.
+
+    Returns:
+        List[str]: Tolerans dışı kötüleşmeler (boşsa gerileme yok)
+    """
+    regressions: List[str] = []
+
+    for name, metrics in results.items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            print(f"   ℹ️ {name}: baseline'da yok, karşılaştırılmadı")
+            continue
+
+        for metric in COMPARED_METRICS:
+            current, previous = metrics.get(metric), base.get(metric)
+            if current is None or previous is None:
+                continue
+            # Süre metriklerinde çok küçük farklar gürültüdür
+            if metric.endswith("_ms") and current - previous < min_delta_ms:
+                continue
+            allowed = tail_tolerance if metric in TAIL_METRICS else tolerance
+            if current > previous * (1 + allowed):
+                regressions.append(f"{name}.{metric}: {previous} → {current}")
+
+    return regressions
+
+
+def print_report(results: Dict[str, Dict[str, float]]) -> None:
+    """Sonuçları okunur tablo olarak basar."""
+    print("=" * 78)
+    print(f"{'📊 GRAPH BENCHMARK':<36}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ovh p50':>9}{'alloc KB':>10}")
+    print("=" * 78)
+    for name, metrics in results.items():
+        overhead = metrics.get("overhead_p50_ms")
+        print(f"{name:<36}{metrics['p50_ms']:>9.3f}{metrics['p95_ms']:>9.3f}{metrics['p99_ms']:>9.3f}"
+              f"{(f'{overhead:.3f}' if overhead is not None else '-'):>9}{metrics['alloc_peak_kb']:>10.1f}")
+    print("=" * 78)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="🔮 Yasaa Vision - Graph Gecikme Benchmark'ı")
+    parser.add_argument("--iterations", type=int, default=200, help="Ölçüm başına tekrar sayısı")
+    parser.add_argument("--warmup", type=int, default=5, help="Ölçüm öncesi ısınma turu")
+    parser.add_argument("--model-latency", type=float, default=0.0,
+                        help="Sahte model gecikmesi (sn); 0 = sadece graph maliyeti")
+    parser.add_argument("--baseline", default=GRAPH_BENCH_BASELINE_PATH, help="Baseline JSON dosyası")
+    parser.add_argument("--tolerance", type=float, default=GRAPH_BENCH_TOLERANCE, help="İzin verilen kötüleşme oranı")
+    parser.add_argument("--tail-tolerance", type=float, default=GRAPH_BENCH_TAIL_TOLERANCE,
+                        help="p95 için izin verilen kötüleşme oranı")
+    parser.add_argument("--save-baseline", action="store_true", help="Sonucu baseline olarak kaydet")
+    parser.add_argument("--output", help="Sonuç JSON'unu bu dosyaya da yaz")
+    parser.add_argument("--verbose", action="store_true", help="Node loglarını göster")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
+    settings = {
+        "iterations": args.iterations,
+        "model_latency": args.model_latency
+    }
+    environment = environment_info(MEASURED_PACKAGES)
+    results = run_benchmarks(args)
+    print_report(results)
+
+    report = {"settings": settings, "environment": environment, "benchmarks": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"💾 Baseline kaydedildi: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ Baseline yok ({args.baseline}); kaydetmek için --save-baseline")
+        sys.exit(0)
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+
+    comparable = comparable_baseline(baseline, settings, environment)
+    regressions = compare_to_baseline(results, baseline, args.tolerance, GRAPH_BENCH_MIN_DELTA_MS, args.tail_tolerance)
+    if regressions:
+        print(f"{'❌' if comparable else '⚠️'} {len(regressions)} metrikte %{args.tolerance * 100:.0f}'den fazla kötüleşme:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1 if comparable else 0)
+
+    print(f"✅ Baseline'a göre gerileme yok (tolerans: %{args.tolerance * 100:.0f})")
@@ -0,0 +1,328 @@
+"""
+============================================
+YASAA VISION - Import Süresi Benchmark'ı
+============================================
+Soğuk başlangıç maliyetini ölçer: her modül temiz bir Python
+process'inde import edilir, import süresi ve import sırasında
+yüklenen ağır bağımlılıklar kaydedilir.
+
+Ayarlar ve API anahtarları App.core.settings üzerinden ilk kullanımda
+okunur; langchain_openai / langchain_mongodb / pymongo ilk çağrıda
+import edilir. Bu benchmark, birinin modül seviyesine tekrar
+`import streamlit` ya da load_dotenv() eklemesini yakalar.
+
+Kullanım:
+    python -m App.bench.import_bench                    # Ölç, baseline ile karşılaştır
+    python -m App.bench.import_bench --save-baseline    # Sonucu baseline olarak kaydet
+    python -m App.bench.import_bench --check            # CI: baseline yoksa da hata
+    python -m App.bench.import_bench --runs 9 --importtime
+
+Her modül için:
+- import_ms: importlib.import_module() süresi (medyan)
+- process_ms: Yorumlayıcı açılışı dahil toplam süre (medyan)
+- modules: Import sonrası sys.modules'a eklenen modül sayısı
+- heavy: Yüklenmemesi gereken ağır modüllerden yüklenenler
+
+Ağır modül sızıntısı baseline'dan bağımsız olarak her zaman hatadır;
+süre gerilemesi ise tolerans dışındaysa çıkış kodu 1'dir. Baseline
+alındığı ortamı (Python, kütüphane sürümleri, işlemci) saklar; başka
+ortamda süre gerilemeleri sadece bilgi amaçlıdır (App.bench.environment).
+--check ile baseline dosyası yoksa da çıkış kodu 1'dir (CI kapısı
+dosya silinince sessizce geçmesin).
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Any, Dict, List
+
+from App.bench.environment import comparable_baseline, environment_info
+
+# ============================================
+# AYARLAR
+# ============================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))  # Ablacim/
+
+IMPORT_BENCH_BASELINE_PATH: str = os.getenv(
+    "IMPORT_BENCH_BASELINE_PATH", os.path.join(project_root, "bench_baseline_import.json")
+)
+IMPORT_BENCH_TOLERANCE: float = float(os.getenv("IMPORT_BENCH_TOLERANCE", "0.30"))
+IMPORT_BENCH_MIN_DELTA_MS: float = float(os.getenv("IMPORT_BENCH_MIN_DELTA_MS", "15"))
+"""
+IMPORT_BENCH_BASELINE_PATH: Karşılaştırılacak / kaydedilecek baseline JSON
+IMPORT_BENCH_TOLERANCE: İzin verilen kötüleşme oranı (0.30 = %30)
+IMPORT_BENCH_MIN_DELTA_MS: Bundan küçük mutlak farklar gerileme sayılmaz
+    (process açılışı ve disk önbelleği gürültüsü)
+"""
+
+# Ölçülen modüller
+TARGET_MODULES = (
+    "App.core.settings",
+    "App.core.cassette",
+    "App.agent.graph",
+    "App.ingest.page_workers",
+    "App.ingest.ingest_hybrid",
+    "App.ingest.ingest_scanned",
+    "App.ingest.ingest_batch",
+)
+
+# Hiçbir hedef modülün import sırasında yüklememesi gereken ağır bağımlılıklar
+HEAVY_MODULES = (
+    "streamlit",
+    "langchain_openai",
+    "langchain_mongodb",
+    "pymongo",
+    "openai",
+    "chromadb",
+)
+
+# Baseline'da karşılaştırılan metrikler (hepsi düşük = iyi)
+COMPARED_METRICS = ("import_ms", "process_ms")
+
+# Import süresini belirleyen, baseline ortamına kaydedilen dağıtımlar
+MEASURED_PACKAGES = ("langgraph", "langchain-core", "pydantic", "numpy", "Pillow", "PyMuPDF")
+
+# Alt process'te çalışan ölçüm kodu
+_CHILD_SCRIPT = """
+import sys, json, time, importlib
+before = set(sys.modules)
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+loaded = set(sys.modules) - before
+heavy = sorted(name for name in json.loads(sys.argv[2]) if name in sys.modules)
+print(json.dumps({"import_ms": elapsed * 1000, "modules": len(loaded), "heavy": heavy}))
+"""
+
+
+# ============================================
+# ÖLÇÜM
+# ============================================
+def median(samples: List[float]) -> float:
+    """Örneklerin medyanı (process ölçümlerinde ortalamadan daha kararlı)."""
+    ordered = sorted(samples)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def _child_environment() -> Dict[str, str]:
+    """
+    Alt process ortamı: proje kökü PYTHONPATH'te, cassette/metrik/trace kapalı.
+
+    Ölçüm, açık bir özelliğin değil modülün kendi import maliyetidir.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [project_root, env.get("PYTHONPATH", "")]))
+    env.update({"CASSETTE_MODE": "off", "METRICS_ENABLED": "false", "TRACING_ENABLED": "false"})
+    env.pop("PYTHONIMPORTTIME", None)
+    return env
+
+
+def import_once(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Modülü temiz bir process'te bir kez import eder.
+
+    Returns:
+        Dict: import_ms, process_ms, modules, heavy (veya error)
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD_SCRIPT, module, json.dumps(HEAVY_MODULES)],
+        cwd=project_root, env=env, capture_output=True, text=True
+    )
+    process_ms = (time.perf_counter() - start) * 1000
+
+    if completed.returncode != 0:
+        last_line = (completed.stderr.strip().splitlines() or ["?"])[-1]
+        return {"error": last_line}
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_ms"] = process_ms
+    return result
+
+
+def slowest_imports(module: str, env: Dict[str, str], top: int = 8) -> List[Dict[str, Any]]:
+    """
+    `python -X importtime` çıktısından en pahalı (kümülatif) importlar.
+
+    Returns:
+        List[Dict]: name, cumulative_ms (büyükten küçüğe)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root, env=env, capture_output=True, text=True
+    )
+    entries: List[Dict[str, Any]] = []
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line.split(":", 1)[1].split("|")
+            entries.append({"name": name.strip(), "cumulative_ms": int(cumulative) / 1000})
+        except ValueError:
+            continue
+
+    entries.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return entries[:top]
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """Her hedef modülü args.runs kez ölçer, medyanları döner."""
+    env = _child_environment()
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for module in args.modules:
+        # İlk çalıştırma .pyc üretir; ölçüme dahil edilmez
+        warmup = import_once(module, env)
+        if "error" in warmup:
+            results[module] = {"error": warmup["error"]}
+            continue
+
+        runs = [import_once(module, env) for _ in range(args.runs)]
+        runs = [run for run in runs if "error" not in run]
+        results[module] = {
+            "import_ms": round(median([run["import_ms"] for run in runs]), 2),
+            "process_ms": round(median([run["process_ms"] for run in runs]), 2),
+            "modules": runs[-1]["modules"],
+            "heavy": runs[-1]["heavy"],
+        }
+        if args.importtime:
+            results[module]["slowest"] = slowest_imports(module, env)
+
+    return results
+
+
+# ============================================
+# RAPOR / BASELINE
+# ============================================
+def find_heavy_leaks(results: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Import sırasında ağır modül yükleyen hedefler."""
+    return [
+        f"{module}: {', '.join(metrics['heavy'])}"
+        for module, metrics in results.items()
+        if metrics.get("heavy")
+    ]
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    min_delta_ms: float
+) -> List[str]:
+    """
+    Sonuçları baseline ile karşılaştırır.
+
+    Returns:
+        List[str]: Tolerans dışı kötüleşmeler (boşsa gerileme yok)
+    """
+    regressions: List[str] = []
+
+    for name, metrics in results.items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or "error" in base:
+            print(f"   ℹ️ {name}: baseline'da yok, karşılaştırılmadı")
+            continue
+
+        for metric in COMPARED_METRICS:
+            current, previous = metrics.get(metric), base.get(metric)
+            if current is None or previous is None:
+                continue
+            if current - previous < min_delta_ms:
+                continue
+            if current > previous * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {previous} → {current}")
+
+    return regressions
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    """Sonuçları okunur tablo olarak basar."""
+    print("=" * 78)
+    print(f"{'📦 IMPORT BENCHMARK':<32}{'import ms':>11}{'process ms':>12}{'modules':>9}  heavy")
+    print("=" * 78)
+    for name, metrics in results.items():
+        if "error" in metrics:
+            print(f"{name:<32}  ❌ {metrics['error'][:40]}")
+            continue
+        heavy = ", ".join(metrics["heavy"]) or "-"
+        print(f"{name:<32}{metrics['import_ms']:>11.1f}{metrics['process_ms']:>12.1f}"
+              f"{metrics['modules']:>9}  {heavy}")
+        for entry in metrics.get("slowest", []):
+            print(f"   └─ {entry['name']:<48}{entry['cumulative_ms']:>9.1f} ms")
+    print("=" * 78)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="🔮 Yasaa Vision - Import Süresi Benchmark'ı")
+    parser.add_argument("modules", nargs="*", default=list(TARGET_MODULES),
+                        help="Ölçülecek modüller (varsayılan: tüm hedefler)")
+    parser.add_argument("--runs", type=int, default=5, help="Modül başına temiz process sayısı")
+    parser.add_argument("--importtime", action="store_true",
+                        help="-X importtime ile en pahalı importları da göster")
+    parser.add_argument("--baseline", default=IMPORT_BENCH_BASELINE_PATH, help="Baseline JSON dosyası")
+    parser.add_argument("--tolerance", type=float, default=IMPORT_BENCH_TOLERANCE, help="İzin verilen kötüleşme oranı")
+    parser.add_argument("--save-baseline", action="store_true", help="Sonucu baseline olarak kaydet")
+    parser.add_argument("--check", action="store_true", help="Baseline yoksa hata ver (CI)")
+    parser.add_argument("--output", help="Sonuç JSON'unu bu dosyaya da yaz")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    settings = {"runs": args.runs}
+    environment = environment_info(MEASURED_PACKAGES)
+    results = run_benchmarks(args)
+    print_report(results)
+
+    report = {"settings": settings, "environment": environment, "benchmarks": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    failed = [name for name, metrics in results.items() if "error" in metrics]
+    if failed:
+        print(f"❌ Import edilemeyen modüller: {', '.join(failed)}")
+        sys.exit(1)
+
+    leaks = find_heavy_leaks(results)
+    if leaks:
+        print("❌ Import sırasında ağır bağımlılık yüklendi (ilk kullanıma ertelenmeli):")
+        for leak in leaks:
+            print(f"   - {leak}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"💾 Baseline kaydedildi: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"{'❌' if args.check else 'ℹ️'} Baseline yok ({args.baseline}); kaydetmek için --save-baseline")
+        sys.exit(1 if args.check else 0)
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+
+    comparable = comparable_baseline(baseline, settings, environment)
+    regressions = compare_to_baseline(results, baseline, args.tolerance, IMPORT_BENCH_MIN_DELTA_MS)
+    if regressions:
+        print(f"{'❌' if comparable else '⚠️'} {len(regressions)} metrikte %{args.tolerance * 100:.0f}'den fazla kötüleşme:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1 if comparable else 0)
+
+    print(f"✅ Baseline'a göre gerileme yok (tolerans: %{args.tolerance * 100:.0f})")
@@ -0,0 +1,463 @@
+"""
+============================================
+YASAA VISION - Offline Ingest Benchmark
+============================================
+ingest_hybrid, ingest_scanned ve ingest_batch'i örnek PDF'ler
+(varsayılan: Test/bench_docs) üzerinde uçtan uca çalıştırır. OpenAI ve
+MongoDB yerine App.bench.fakes kullanılır: ağ, API anahtarı ve
+maliyet yoktur; gecikme ve hata oranı ayarlanabilir.
+
+Kullanım:
+    python -m App.bench.ingest_bench                          # Üç pipeline, baseline ile karşılaştır
+    python -m App.bench.ingest_bench hybrid scanned           # Sadece seçilenler
+    python -m App.bench.ingest_bench --save-baseline          # Sonucu baseline olarak kaydet
+    python -m App.bench.ingest_bench --vision-latency 1.5 --error-rate 0.05
+
+Her pipeline ayrı bir alt process'te çalışır; böylece peak RSS ve CPU
+süresi pipeline'a özeldir (önceki pipeline'ın belleği karışmaz).
+Render worker'ları (spawn) o alt process'in çocuklarıdır.
+
+Ölçülenler (pipeline başına):
+- wall_s, pages_per_s: Toplam süre ve sayfa hızı
+- renders, renders_per_s, render_bytes: Worker'ların ürettiği sayfa görüntüleri
+- vision_calls, vision_errors, bytes_uploaded: Sahte Vision'a giden istekler
+- embed_requests, embedded_texts: Sahte embedding istekleri
+- stages: Aşama başına öğe sayısı ve meşgul süre (extract_wait = yazma
+  tarafının worker'ları beklediği süre)
+- peak_rss_mb, worker_peak_rss_mb: Ana process ve en büyük worker belleği
+- cpu_s, cpu_utilisation: Tüm process'lerin CPU süresi / (süre x çekirdek)
+
+Varsayılan korpus App.bench.sample_pdf'in ürettiği 6 sayfalık PDF'tir:
+text, vektör diyagram, taranmış sayfa ve üç sayfada tekrar eden aynı
+gömülü fotoğraf (render, VISION_FULL ve resim önbelleği yolları ölçülür).
+
+Baseline'a göre tolerans dışı kötüleşme varsa çıkış kodu 1'dir. Peak
+RSS yorumlayıcı ve kütüphane sürümüyle onlarca MB oynar: oran toleransına
+ek olarak BENCH_RSS_SLACK_MB'lık mutlak fark da aşılmalıdır. Baseline
+alındığı ortamı saklar; ortam farklıysa gerilemeler sadece bilgi
+amaçlıdır (App.bench.environment).
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import importlib
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from App.bench.environment import comparable_baseline, environment_info
+
+try:
+    import resource  # Sadece Unix; yoksa bellek/CPU ölçümü atlanır
+except ImportError:
+    resource = None
+
+# ============================================
+# AYARLAR
+# ============================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))  # Ablacim/
+
+BENCH_PDF_FOLDER: str = os.getenv("BENCH_PDF_FOLDER", os.path.join(project_root, "Test", "bench_docs"))
+BENCH_BASELINE_PATH: str = os.getenv("BENCH_BASELINE_PATH", os.path.join(project_root, "bench_baseline_ingest.json"))
+BENCH_TOLERANCE: float = float(os.getenv("BENCH_TOLERANCE", "0.2"))
+BENCH_RSS_SLACK_MB: float = float(os.getenv("BENCH_RSS_SLACK_MB", "32"))
+"""
+BENCH_PDF_FOLDER: Benchmark'ta işlenecek PDF klasörü (App.bench.sample_pdf ile üretilir)
+BENCH_BASELINE_PATH: Karşılaştırılacak / kaydedilecek baseline JSON
+BENCH_TOLERANCE: İzin verilen kötüleşme oranı (0.2 = %20)
+BENCH_RSS_SLACK_MB: RSS metriklerinde bundan küçük mutlak artışlar gerileme sayılmaz
+"""
+
+PIPELINES: List[str] = ["hybrid", "scanned", "batch"]
+
+# Baseline karşılaştırmasında metriklerin yönü
+HIGHER_IS_BETTER = ("pages_per_s", "renders_per_s")
+LOWER_IS_BETTER = ("wall_s", "cpu_s", "peak_rss_mb", "worker_peak_rss_mb",
+                   "vision_calls", "bytes_uploaded", "embed_requests")
+RSS_METRICS = ("peak_rss_mb", "worker_peak_rss_mb")
+
+# Ingest maliyetini belirleyen, baseline ortamına kaydedilen dağıtımlar
+MEASURED_PACKAGES = ("PyMuPDF", "Pillow", "numpy", "langchain-core", "pymongo")
+
+
+# ============================================
+# AŞAMA ÖLÇÜMÜ
+# ============================================
+class StageTimer:
+    """Aşama başına öğe sayısı ve toplam meşgul süre (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"items": 0, "busy_s": 0.0})
+            entry["items"] += 1
+            entry["busy_s"] += seconds
+
+    def wrap(self, stage: str, function: Callable) -> Callable:
+        """Fonksiyonu, her çağrısını bu aşamaya yazacak şekilde sarar."""
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return timed
+
+
+def _wrap_page_results(iter_page_results: Callable, timer: StageTimer, renders: Dict[str, int]) -> Callable:
+    """
+    iter_page_results'ı sarar: worker'ı bekleme süresi ve render sayısı.
+
+    Worker'lar spawn ile açıldığı için içlerine ölçüm eklenemez; render
+    ve çıkarma maliyeti, sonuçların ana process'e geliş hızından okunur.
+    """
+    def wrapped(jobs, worker_fn, *args, **kwargs):
+        results = iter_page_results(jobs, worker_fn, *args, **kwargs)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(results)
+            except StopIteration:
+                return
+            timer.record("extract_wait", time.perf_counter() - started)
+            if item.get("page_image"):
+                renders["renders"] += 1
+                renders["render_bytes"] += len(item["page_image"])
+            yield item
+    return wrapped
+
+
+def _usage() -> Dict[str, Optional[float]]:
+    """Bu process ve bitmiş çocuklarının CPU süresi ve peak RSS'i (MB)."""
+    if resource is None:
+        return {"cpu_s": None, "peak_rss_mb": None, "worker_peak_rss_mb": None}
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux'ta ru_maxrss KB, macOS'ta byte
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "cpu_s": own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        "peak_rss_mb": round(own.ru_maxrss / scale, 1),
+        "worker_peak_rss_mb": round(children.ru_maxrss / scale, 1)
+    }
+
+
+def count_pages(folder: str) -> int:
+    """Klasördeki PDF'lerin toplam sayfa sayısı."""
+    import fitz  # PyMuPDF
+
+    total = 0
+    for pdf_path in sorted(Path(folder).glob("*.pdf")):
+        with fitz.open(str(pdf_path)) as doc:
+            total += len(doc)
+    return total
+
+
+# ============================================
+# ALT PROCESS: TEK PIPELINE
+# ============================================
+def run_child(pipeline: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Tek bir ingest pipeline'ını sahte modellerle çalıştırır.
+
+    Ortam değişkenleri ingest modülleri import edilmeden ÖNCE ayarlanır:
+    modüller ayarlarını import anında okur ve spawn worker'ları da aynı
+    ortamı görür. Manifest ve resim önbelleği geçici klasördedir; her
+    çalıştırma tüm sayfaları sıfırdan işler.
+    """
+    workdir = tempfile.mkdtemp(prefix=f"ingest_bench_{pipeline}_")
+    folder = os.path.abspath(args.pdf_folder)
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "MONGO_URI": "mongodb://bench",
+        "MANIFEST_PATH": os.path.join(workdir, "ingest_manifest.db"),
+        "IMAGE_CACHE_PATH": os.path.join(workdir, "image_descriptions.db"),
+        "PLAN_PATH": os.path.join(workdir, "ingest_plan.json"),
+        "PDF_FOLDER": folder,
+        "SCANNED_PDF_FOLDER": folder,
+        "INGEST_BUDGET_USD": "0"
+    })
+
+    from App.bench.fakes import FakeChatModel, FakeClient, FakeEmbeddings, InMemoryVectorStore
+
+    module = importlib.import_module(f"App.ingest.ingest_{pipeline}")
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    llm = FakeChatModel(latency=args.vision_latency, error_rate=args.error_rate)
+    embeddings = FakeEmbeddings(latency=args.embed_latency, error_rate=args.error_rate)
+    timer = StageTimer()
+    renders = {"renders": 0, "render_bytes": 0}
+
+    def fake_vector_store(*vector_args: Any, collection_name: str = module.COLLECTION_NAME) -> InMemoryVectorStore:
+        # hybrid/scanned: get_vector_store(collection_name), batch: get_vector_store(embeddings, collection_name)
+        name = vector_args[-1] if vector_args and isinstance(vector_args[-1], str) else collection_name
+        return InMemoryVectorStore(FakeClient()[module.DB_NAME][name], embeddings)
+
+    module.mongo_client = lambda uri: FakeClient()
+    module.get_vector_store = fake_vector_store
+
+    started = time.perf_counter()
+
+    if pipeline == "batch":
+        module.initialize_models = lambda: (llm, embeddings)
+        module.process_pdf = timer.wrap("book", module.process_pdf)
+        module.analyze_image_with_vision = timer.wrap("vision", module.analyze_image_with_vision)
+        module.batch_process_pdfs(folder)
+    else:
+        module.initialize_vision_model = lambda: llm
+        module.iter_page_results = _wrap_page_results(module.iter_page_results, timer, renders)
+        module.vision_stage = timer.wrap("vision", module.vision_stage)
+        module.write_stage = timer.wrap("write", module.write_stage)
+        sys.argv = [module.__name__]
+        module.main()
+
+    wall_s = time.perf_counter() - started
+    usage = _usage()
+    pages = count_pages(folder)
+
+    # Sahte model hiç çağrılmadıysa pipeline gerçek client'a gitmiştir
+    # (sarmalama kaçtı); ölçülen sayılar anlamsız, benchmark başarısız sayılır
+    if pages and not llm.stats["calls"]:
+        raise RuntimeError(f"{pipeline}: {pages} sayfa işlendi ama sahte Vision modeli hiç çağrılmadı")
+
+    database = FakeClient()[module.DB_NAME]
+    stored = {name: database[name].estimated_document_count() for name in database.list_collection_names()}
+
+    cpu_s = usage["cpu_s"]
+    return {
+        "pages": pages,
+        "wall_s": round(wall_s, 3),
+        "pages_per_s": round(pages / wall_s, 3) if wall_s else 0.0,
+        "renders": renders["renders"],
+        "renders_per_s": round(renders["renders"] / wall_s, 3) if wall_s else 0.0,
+        "render_bytes": renders["render_bytes"],
+        "vision_calls": llm.stats["calls"],
+        "vision_errors": llm.stats["errors"],
+        "images_uploaded": llm.stats["images"],
+        "bytes_uploaded": llm.stats["bytes_uploaded"],
+        "embed_requests": embeddings.stats["requests"],
+        "embedded_texts": embeddings.stats["texts"],
+        "stored_documents": stored,
+        "stages": {
+            stage: {
+                "items": int(entry["items"]),
+                "busy_s": round(entry["busy_s"], 3),
+                "items_per_s": round(entry["items"] / wall_s, 3) if wall_s else 0.0
+            }
+            for stage, entry in timer.stages.items()
+        },
+        "cpu_s": round(cpu_s, 3) if cpu_s is not None else None,
+        "cpu_utilisation": round(cpu_s / (wall_s * (os.cpu_count() or 1)), 3) if cpu_s and wall_s else None,
+        "peak_rss_mb": usage["peak_rss_mb"],
+        "worker_peak_rss_mb": usage["worker_peak_rss_mb"]
+    }
+
+
+# ============================================
+# ANA PROCESS: KARŞILAŞTIRMA
+# ============================================
+def run_pipelines(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    """Her pipeline'ı ayrı alt process'te çalıştırır, sonuçlarını toplar."""
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for pipeline in args.pipelines:
+        print(f"⏱️ {pipeline} çalışıyor...")
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as handle:
+            result_path = handle.name
+
+        command = [
+            sys.executable, "-m", "App.bench.ingest_bench",
+            "--child", pipeline,
+            "--result-file", result_path,
+            "--pdf-folder", args.pdf_folder,
+            "--vision-latency", str(args.vision_latency),
+            "--embed-latency", str(args.embed_latency),
+            "--error-rate", str(args.error_rate)
+        ]
+        if args.verbose:
+            command.append("--verbose")
+
+        completed = subprocess.run(command, cwd=project_root)
+        try:
+            if completed.returncode != 0:
+                raise RuntimeError(f"çıkış kodu {completed.returncode}")
+            with open(result_path, encoding="utf-8") as handle:
+                results[pipeline] = json.load(handle)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"❌ {pipeline} benchmark'ı başarısız: {e}")
+            results[pipeline] = {"error": str(e)}
+        finally:
+            if os.path.exists(result_path):
+                os.remove(result_path)
+
+    return results
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Any],
+    tolerance: float,
+    rss_slack_mb: float = BENCH_RSS_SLACK_MB
+) -> List[str]:
+    """
+    Sonuçları baseline ile karşılaştırır.
+
+    RSS metrikleri hem oranı hem rss_slack_mb'lık mutlak farkı aşarsa
+    gerileme sayılır (küçük baseline'da %20 birkaç MB'lık gürültüdür).
+
+    Returns:
+        List[str]: Tolerans dışı kötüleşmeler (boşsa gerileme yok)
+    """
+    regressions: List[str] = []
+
+    for pipeline, metrics in results.items():
+        base = baseline.get("pipelines", {}).get(pipeline)
+        if not base:
+            print(f"   ℹ️ {pipeline}: baseline'da yok, karşılaştırılmadı")
+            continue
+        if "error" in metrics:
+            regressions.append(f"{pipeline}: çalışmadı ({metrics['error']})")
+            continue
+
+        for metric in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            current, previous = metrics.get(metric), base.get(metric)
+            if current is None or previous is None:
+                continue
+
+            if metric in HIGHER_IS_BETTER:
+                worse = current < previous * (1 - tolerance)
+            else:
+                worse = current > previous * (1 + tolerance) if previous else current > 0
+            if metric in RSS_METRICS and current - previous <= rss_slack_mb:
+                worse = False
+
+            if worse:
+                regressions.append(f"{pipeline}.{metric}: {previous} → {current}")
+
+    return regressions
+
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    """Sonuçları okunur tablo olarak basar."""
+    print("=" * 60)
+    print("📊 INGEST BENCHMARK")
+    print("=" * 60)
+
+    for pipeline, metrics in results.items():
+        if "error" in metrics:
+            print(f"❌ {pipeline}: {metrics['error']}")
+            continue
+
+        print(f"🔧 {pipeline}: {metrics['pages']} sayfa, {metrics['wall_s']:.2f} sn "
+              f"({metrics['pages_per_s']:.2f} sayfa/sn)")
+        print(f"   🖼️ Render: {metrics['renders']} ({metrics['renders_per_s']:.2f}/sn, "
+              f"{metrics['render_bytes'] / 1024:.0f} KB)")
+        print(f"   👁️ Vision: {metrics['vision_calls']} çağrı, {metrics['vision_errors']} hata, "
+              f"{metrics['bytes_uploaded'] / 1024:.0f} KB yüklendi")
+        print(f"   🧮 Embedding: {metrics['embed_requests']} istek, {metrics['embedded_texts']} metin")
+        for stage, entry in metrics["stages"].items():
+            print(f"   ⏱️ {stage}: {entry['items']} öğe, {entry['busy_s']:.2f} sn meşgul, "
+                  f"{entry['items_per_s']:.2f}/sn")
+        if metrics["peak_rss_mb"] is not None:
+            print(f"   💾 Peak RSS: {metrics['peak_rss_mb']} MB (worker: {metrics['worker_peak_rss_mb']} MB)")
+            print(f"   🔥 CPU: {metrics['cpu_s']:.2f} sn (kullanım: %{(metrics['cpu_utilisation'] or 0) * 100:.0f})")
+
+    print("=" * 60)
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="🔮 Yasaa Vision - Offline Ingest Benchmark",
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("pipelines", nargs="*", help=f"Çalıştırılacak pipeline'lar (varsayılan: {' '.join(PIPELINES)})")
+    parser.add_argument("--pdf-folder", default=BENCH_PDF_FOLDER, help="İşlenecek PDF klasörü")
+    parser.add_argument("--vision-latency", type=float, default=0.5, help="Sahte Vision gecikmesi (sn)")
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="Sahte embedding gecikmesi (sn)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Sahte çağrı hata oranı (0-1)")
+    parser.add_argument("--baseline", default=BENCH_BASELINE_PATH, help="Baseline JSON dosyası")
+    parser.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE, help="İzin verilen kötüleşme oranı")
+    parser.add_argument("--rss-slack-mb", type=float, default=BENCH_RSS_SLACK_MB,
+                        help="RSS'te gerileme sayılmayacak mutlak artış (MB)")
+    parser.add_argument("--save-baseline", action="store_true", help="Sonucu baseline olarak kaydet")
+    parser.add_argument("--output", help="Sonuç JSON'unu bu dosyaya da yaz")
+    parser.add_argument("--verbose", action="store_true", help="Ingest loglarını göster")
+    # Dahili: tek pipeline'ı bu process'te çalıştır
+    parser.add_argument("--child", choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    unknown = [name for name in args.pipelines if name not in PIPELINES]
+    if unknown:
+        parser.error(f"Bilinmeyen pipeline: {', '.join(unknown)} (seçenekler: {', '.join(PIPELINES)})")
+    args.pipelines = args.pipelines or PIPELINES
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+
+    if args.child:
+        result = run_child(args.child, args)
+        with open(args.result_file, "w", encoding="utf-8") as handle:
+            json.dump(result, handle)
+        sys.exit(0)
+
+    settings = {
+        "pdf_folder": os.path.relpath(os.path.abspath(args.pdf_folder), project_root),
+        "vision_latency": args.vision_latency,
+        "embed_latency": args.embed_latency,
+        "error_rate": args.error_rate
+    }
+    environment = environment_info(MEASURED_PACKAGES)
+    results = run_pipelines(args)
+    print_report(results)
+
+    report = {"settings": settings, "environment": environment, "pipelines": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+    failed = [pipeline for pipeline, metrics in results.items() if "error" in metrics]
+    if failed:
+        print(f"❌ Çalışmayan pipeline'lar: {', '.join(failed)}")
+        sys.exit(1)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"💾 Baseline kaydedildi: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"ℹ️ Baseline yok ({args.baseline}); kaydetmek için --save-baseline")
+        sys.exit(0)
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+
+    comparable = comparable_baseline(baseline, settings, environment)
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.rss_slack_mb)
+    if regressions:
+        print(f"{'❌' if comparable else '⚠️'} {len(regressions)} metrikte %{args.tolerance * 100:.0f}'den fazla kötüleşme:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1 if comparable else 0)
+
+    print(f"✅ Baseline'a göre gerileme yok (tolerans: %{args.tolerance * 100:.0f})")
@@ -0,0 +1,208 @@
+"""
+============================================
+YASAA VISION - Benchmark Örnek PDF'i
+============================================
+Ingest benchmark'ının varsayılan korpusu. Eskiden Test/docs'taki tek
+sayfalık bir CV ölçülüyordu: tek sayfa, sadece text; render, taranmış
+sayfa ve resim önbelleği yolları hiç çalışmıyordu.
+
+Bu modül, her ingest yolunu çalıştıran küçük, deterministik bir PDF
+üretir (Test/bench_docs/yasaa_bench_sample.pdf olarak depodadır):
+
+    1. Sadece text                      → TEXT_ONLY
+    2. Text + vektör diyagram (el çizgileri) → HYBRID (bölge render)
+    3. Taranmış sayfa (text katmanı yok)     → VISION_FULL
+    4-6. Text + AYNI gömülü fotoğraf         → TEXT_WITH_IMAGES, 5-6'da
+         resim önbelleği / aynı xref
+
+Kullanım:
+    python -m App.bench.sample_pdf                          # Depodaki dosyayı yeniden üret
+    python -m App.bench.sample_pdf --output /tmp/sample.pdf
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import io
+import os
+import random
+import argparse
+
+# ============================================
+# AYARLAR
+# ============================================
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))  # Ablacim/
+
+SAMPLE_PDF_PATH: str = os.path.join(project_root, "Test", "bench_docs", "yasaa_bench_sample.pdf")
+"""
+SAMPLE_PDF_PATH: Üretilen örnek PDF (ingest_bench'in varsayılan klasöründe)
+"""
+
+# A4 (pt)
+_PAGE_WIDTH, _PAGE_HEIGHT = 595, 842
+_MARGIN = 56
+
+# Sabit metadata: aynı kod aynı byte'ları üretir (git diff'i gürültüsüz)
+_METADATA = {
+    "title": "Yasaa Vision Benchmark Sample",
+    "author": "Yasaa Vision",
+    "subject": "Ingest benchmark corpus",
+    "creator": "App.bench.sample_pdf",
+    "producer": "App.bench.sample_pdf",
+    "creationDate": "D:20240101000000Z",
+    "modDate": "D:20240101000000Z"
+}
+
+_SENTENCES = [
+    "The heart line begins under the index finger and runs across the palm toward the edge of the hand.",
+    "According to Dr. Benham, a forked ending shows a balance between feeling and reason.",
+    "The head line starts between the thumb and the index finger; its length shows the span of attention.",
+    "A long life line that curves widely around the mount of Venus is read as vitality, not as length of life.",
+    "Square palms with short fingers belong to the practical type described in Fig. 3.",
+    "When the fate line rises from the wrist and reaches the middle finger, the career is steady.",
+    "Small crosses, islands and chains on a line mark periods of strain rather than single events.",
+    "The mount of Jupiter under the index finger is full in ambitious and outgoing hands.",
+    "Conic hands have tapering fingers; the older books call them the artistic type.",
+    "A clear girdle of Venus above the heart line is said to show a sensitive temperament."
+]
+
+
+# ============================================
+# İÇERİK
+# ============================================
+def _paragraphs(seed: int, count: int = 5, sentences: int = 5) -> str:
+    """Deterministik, cümle yapısı gerçekçi sayfa metni."""
+    generator = random.Random(seed)
+    return "\n\n".join(
+        " ".join(generator.choice(_SENTENCES) for _ in range(sentences))
+        for _ in range(count)
+    )
+
+
+def _photo_jpeg(seed: int, size=(360, 480)) -> bytes:
+    """Gürültülü, düşük frekanslı "fotoğraf" (MIN_IMAGE_SIZE'ın üstünde, JPEG)."""
+    import numpy as np
+    from PIL import Image
+
+    generator = np.random.default_rng(seed)
+    coarse = generator.uniform(40, 220, (6, 8, 3)).astype(np.uint8)
+    image = Image.fromarray(coarse).resize((size[1], size[0]), Image.BICUBIC)
+    noise = generator.normal(0, 6, (size[0], size[1], 3))
+    pixels = np.clip(np.asarray(image, dtype=np.float64) + noise, 0, 255).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def _draw_hand_diagram(page, rect) -> None:
+    """Vektör el diyagramı: avuç, parmaklar ve çizgiler (layout'ta ≥15 path)."""
+    import fitz  # PyMuPDF
+
+    palm = fitz.Rect(rect.x0 + 40, rect.y0 + 110, rect.x1 - 40, rect.y1 - 10)
+    page.draw_rect(palm, color=(0.2, 0.2, 0.2), width=1.2)
+    finger_width = palm.width / 4
+    for index in range(4):
+        x0 = palm.x0 + index * finger_width + 4
+        page.draw_rect(fitz.Rect(x0, rect.y0 + 10 + (index % 2) * 15, x0 + finger_width - 8, palm.y0),
+                       color=(0.2, 0.2, 0.2), width=1.0)
+        for joint in (1, 2):
+            y = rect.y0 + 10 + (index % 2) * 15 + joint * 30
+            page.draw_line((x0, y), (x0 + finger_width - 8, y), color=(0.5, 0.5, 0.5), width=0.6)
+
+    # Kalp, akıl, hayat ve kader çizgileri (eğriler)
+    lines = [
+        ((palm.x1, palm.y0 + 30), (palm.x0 + 60, palm.y0 + 20), (palm.x0 + 30, palm.y0 + 45)),
+        ((palm.x0, palm.y0 + 60), (palm.x0 + 90, palm.y0 + 50), (palm.x1 - 20, palm.y0 + 80)),
+        ((palm.x0 + 10, palm.y0 + 55), (palm.x0 + 40, palm.y1 - 40), (palm.x0 + 80, palm.y1)),
+        ((palm.x0 + palm.width / 2, palm.y1), (palm.x0 + palm.width / 2 + 10, palm.y0 + 80),
+         (palm.x0 + palm.width / 2, palm.y0 + 10))
+    ]
+    for start, control, end in lines:
+        page.draw_bezier(start, control, control, end, color=(0.6, 0.1, 0.1), width=1.5)
+        page.draw_circle(end, 2.5, color=(0.6, 0.1, 0.1), fill=(0.6, 0.1, 0.1))
+
+
+def _text_page(document, title: str, seed: int, text_bottom: float = _PAGE_HEIGHT - _MARGIN):
+    """Başlık + paragraflar; sayfayı döndürür."""
+    import fitz  # PyMuPDF
+
+    page = document.new_page(width=_PAGE_WIDTH, height=_PAGE_HEIGHT)
+    page.insert_text((_MARGIN, _MARGIN), title, fontsize=16, fontname="helv")
+    page.insert_textbox(
+        fitz.Rect(_MARGIN, _MARGIN + 20, _PAGE_WIDTH - _MARGIN, text_bottom),
+        _paragraphs(seed), fontsize=10.5, fontname="helv"
+    )
+    return page
+
+
+def _scanned_page_jpeg(seed: int) -> bytes:
+    """Bir text sayfasını ~100 dpi gri JPEG'e çevirir (text katmanı olmayan tarama)."""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    with fitz.open() as scratch:
+        _text_page(scratch, "Chapter 3 - The Scanned Plates", seed)
+        pixmap = scratch[0].get_pixmap(matrix=fitz.Matrix(1.4, 1.4), colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=60)
+    return buffer.getvalue()
+
+
+# ============================================
+# PDF
+# ============================================
+def build_sample_pdf(path: str = SAMPLE_PDF_PATH) -> str:
+    """
+    Örnek PDF'i üretir.
+
+    Args:
+        path: Çıktı dosyası (klasör yoksa oluşturulur)
+
+    Returns:
+        str: Yazılan dosya yolu
+    """
+    import fitz  # PyMuPDF
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    photo = _photo_jpeg(11)
+
+    with fitz.open() as document:
+        # 1. Sadece text
+        _text_page(document, "Chapter 1 - The Major Lines", seed=1)
+
+        # 2. Text + vektör diyagram
+        page = _text_page(document, "Chapter 2 - Reading the Diagram", seed=2, text_bottom=470)
+        _draw_hand_diagram(page, fitz.Rect(150, 490, 445, _PAGE_HEIGHT - _MARGIN))
+
+        # 3. Taranmış sayfa: sadece tam sayfa resim
+        page = document.new_page(width=_PAGE_WIDTH, height=_PAGE_HEIGHT)
+        page.insert_image(page.rect, stream=_scanned_page_jpeg(seed=3))
+
+        # 4-6. Text + aynı fotoğraf (tek xref, üç sayfada)
+        photo_xref = 0
+        for number in (4, 5, 6):
+            page = _text_page(document, f"Chapter {number} - Hand Photographs", seed=number, text_bottom=520)
+            photo_rect = fitz.Rect(170, 540, 425, _PAGE_HEIGHT - _MARGIN)
+            if photo_xref:
+                page.insert_image(photo_rect, xref=photo_xref)
+            else:
+                photo_xref = page.insert_image(photo_rect, stream=photo)
+
+        document.set_metadata(_METADATA)
+        document.save(path, garbage=4, deflate=True, no_new_id=True)
+
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="🔮 Yasaa Vision - Benchmark örnek PDF'i")
+    parser.add_argument("--output", default=SAMPLE_PDF_PATH, help="Çıktı dosyası")
+    args = parser.parse_args()
+
+    written = build_sample_pdf(args.output)
+    print(f"📄 Örnek PDF yazıldı: {written} ({os.path.getsize(written) / 1024:.0f} KB)")
@@ -0,0 +1,14 @@
+"""
+============================================
+YASAA VISION - Core Package
+============================================
+Agent düğümleri ve ingest script'lerinin ortak kullandığı altyapı.
+
+Modüller:
+- settings: Lazy ayarlar (ortam → .env → Streamlit secrets, ilk kullanımda)
+- cassette: OpenAI/MongoDB çağrılarını kaydet (record) / tekrar oynat (replay)
+- session_store: Sohbet oturumları (LRU bellek + SQLite/dosya)
+- metrics: Düğüm ve dış çağrı metrikleri (Prometheus metin formatı)
+- tracing: Okuma başına span'ler (JSONL / OTLP dosyası)
+============================================
+"""
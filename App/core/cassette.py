@@ -0,0 +1,421 @@
+"""
+============================================
+YASAA VISION - Kayıt/Tekrar Oynatma (Cassette)
+============================================
+ChatOpenAI, OpenAIEmbeddings ve MongoDBAtlasVectorSearch çağrılarını
+diske kaydeder ve ağ olmadan aynen geri oynatır. Önbellekleme,
+paralellik gibi performans deneyleri laptop'ta, tekrarlanabilir
+şekilde yapılabilir.
+
+Modlar (CASSETTE_MODE):
+    off    → Hiçbir şey yapılmaz, gerçek servisler kullanılır (varsayılan)
+    record → Gerçek çağrı yapılır; istek + cevap + süre kaydedilir
+    replay → Ağa HİÇ gidilmez; cevap kasetten, kaydedilen süre kadar
+             (CASSETTE_LATENCY_SCALE ile ölçeklenmiş) beklenerek döner
+
+Kasetler içerik adreslidir: dosya adı isteğin (model + mesajlar +
+resimler) SHA-256'sıdır. Aynı istek her zaman aynı kaydı bulur;
+kayıt sırası, thread sayısı veya batch boyutu önemli değildir.
+
+    <CASSETTE_DIR>/chat/ab/ab12....json
+    <CASSETTE_DIR>/embedding/...        (metin başına bir vektör)
+    <CASSETTE_DIR>/vector_search/...
+    <CASSETTE_DIR>/mongo_find/...
+
+Replay'de MongoDB yazmaları bellek içi depoya gider (App.bench.fakes).
+Ingest'i replay ederken MANIFEST_PATH ve IMAGE_CACHE_PATH'i geçici
+dosyalara yönlendirin; kayıt sırasında da boş bir IMAGE_CACHE_PATH
+kullanın, yoksa önbellekten gelen resimler kasete hiç girmez.
+
+Kullanım:
+    CASSETTE_MODE=record python -m App.ingest.ingest_hybrid
+    CASSETTE_MODE=replay CASSETTE_LATENCY_SCALE=0.1 python main.py
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import json
+import time
+import logging
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from App.core.metrics import (
+    instrumented_chat_model,
+    instrumented_collection,
+    instrumented_embeddings,
+    instrumented_vector_store
+)
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+CASSETTE_MODE: str = settings.get("CASSETTE_MODE", "off").lower()
+CASSETTE_DIR: str = settings.get("CASSETTE_DIR", "cassettes")
+CASSETTE_LATENCY_SCALE: float = float(settings.get("CASSETTE_LATENCY_SCALE", "1.0"))
+"""
+CASSETTE_MODE: off | record | replay
+CASSETTE_DIR: Kasetlerin tutulduğu klasör
+CASSETTE_LATENCY_SCALE: Replay'de kaydedilen sürenin çarpanı
+- 1.0: Orijinal gecikme (gerçekçi yük testi)
+- 0.1: 10 kat hızlı
+- 0: Beklemeden döner
+"""
+
+MODES = ("off", "record", "replay")
+if CASSETTE_MODE not in MODES:
+    raise ValueError(f"❌ Geçersiz CASSETTE_MODE: {CASSETTE_MODE} (seçenekler: {', '.join(MODES)})")
+
+
+class CassetteMissError(LookupError):
+    """Replay modunda istenen çağrı kasette yok."""
+
+
+def is_replaying() -> bool:
+    """Replay modunda mıyız? (API anahtarı / MongoDB URI gerekmez)"""
+    return CASSETTE_MODE == "replay"
+
+
+def _json_default(value: Any) -> Any:
+    """JSON'a doğrudan yazılamayan değerler (ObjectId, datetime...) metne çevrilir."""
+    return str(value)
+
+
+# ============================================
+# KASET DEPOSU
+# ============================================
+class Cassette:
+    """
+    İçerik adresli kayıt deposu.
+
+    Her kayıt ayrı bir JSON dosyasıdır; yazma geçici dosya + rename ile
+    atomiktir, paralel Vision thread'leri aynı anda kayıt yapabilir.
+    """
+
+    def __init__(self, directory: str = CASSETTE_DIR, latency_scale: float = CASSETTE_LATENCY_SCALE):
+        self.directory = Path(directory)
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"recorded": 0, "replayed": 0, "missed": 0}
+
+    @staticmethod
+    def key(kind: str, payload: Any) -> str:
+        """İsteğin içerik adresi (kanonik JSON'un SHA-256'sı)."""
+        canonical = json.dumps({"kind": kind, "payload": payload}, sort_keys=True,
+                               ensure_ascii=False, default=_json_default)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _path(self, kind: str, key: str) -> Path:
+        return self.directory / kind / key[:2] / f"{key}.json"
+
+    def save(self, kind: str, key: str, record: Dict[str, Any]) -> None:
+        path = self._path(kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            json.dump({**record, "recorded_at": time.time()}, file, ensure_ascii=False, default=_json_default)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self.stats["recorded"] += 1
+
+    def load(self, kind: str, key: str) -> Dict[str, Any]:
+        """
+        Kaydı okur; kaydedilen gecikme kadar (ölçekli) bekler.
+
+        Raises:
+            CassetteMissError: Kayıt yoksa
+        """
+        path = self._path(kind, key)
+        try:
+            with open(path, encoding="utf-8") as file:
+                record = json.load(file)
+        except FileNotFoundError:
+            with self._lock:
+                self.stats["missed"] += 1
+            logger.error(f"   📼 Kasette yok: {kind}/{key[:12]} ({self.directory})")
+            raise CassetteMissError(f"Kasette yok: {kind}/{key}") from None
+
+        with self._lock:
+            self.stats["replayed"] += 1
+
+        delay = record.get("latency_s", 0.0) * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        return record
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    """Süreç genelinde tek kaset deposu (lazy)."""
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette()
+            logger.info(f"📼 Kaset modu: {CASSETTE_MODE} ({_cassette.directory}, gecikme x{CASSETTE_LATENCY_SCALE})")
+        return _cassette
+
+
+# ============================================
+# İSTEK ÖZETLERİ
+# ============================================
+def _image_digest(url: str) -> str:
+    """Data URL'yi kısa bir özete çevirir (kasete MB'larca base64 yazılmaz)."""
+    return f"<image sha256={hashlib.sha256(url.encode('utf-8')).hexdigest()} chars={len(url)}>"
+
+
+def _serialize_messages(messages: List[Any]) -> List[Dict[str, Any]]:
+    """Dict veya LangChain mesajlarını kanonik, kısa bir listeye çevirir."""
+    serialized = []
+    for message in messages:
+        if isinstance(message, dict):
+            role, content = message.get("role", "user"), message.get("content", "")
+        else:
+            role, content = getattr(message, "type", message.__class__.__name__), getattr(message, "content", "")
+
+        if isinstance(content, list):
+            content = [
+                {"type": "image_url", "image_url": _image_digest(part["image_url"]["url"]),
+                 "detail": part["image_url"].get("detail")}
+                if part.get("type") == "image_url" else part
+                for part in content
+            ]
+        serialized.append({"role": role, "content": content})
+    return serialized
+
+
+# ============================================
+# CHAT MODELİ
+# ============================================
+class CassetteChatModel:
+    """
+    ChatOpenAI sarmalayıcısı (invoke).
+
+    record: gerçek modeli çağırır, cevabı kaydeder, orijinal cevabı döndürür
+    replay: model hiç oluşturulmaz; kayıttan AIMessage üretilir
+    """
+
+    def __init__(self, llm: Any, model_name: str, cassette: Optional[Cassette] = None):
+        self.llm = llm
+        self.model_name = model_name
+        self.cassette = cassette or get_cassette()
+
+    def invoke(self, messages: List[Any], *args: Any, **kwargs: Any) -> Any:
+        from langchain_core.messages import AIMessage
+
+        key = Cassette.key("chat", {"model": self.model_name, "messages": _serialize_messages(messages)})
+
+        if self.llm is None:
+            record = self.cassette.load("chat", key)
+            return AIMessage(
+                content=record["content"],
+                response_metadata=record.get("response_metadata") or {},
+                **({"usage_metadata": record["usage_metadata"]} if record.get("usage_metadata") else {})
+            )
+
+        started = time.perf_counter()
+        response = self.llm.invoke(messages, *args, **kwargs)
+        self.cassette.save("chat", key, {
+            "model": self.model_name,
+            "request": _serialize_messages(messages),
+            "content": response.content,
+            "usage_metadata": getattr(response, "usage_metadata", None),
+            "response_metadata": getattr(response, "response_metadata", None),
+            "latency_s": time.perf_counter() - started
+        })
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        inner = self.__dict__.get("llm")
+        if inner is None:
+            raise AttributeError(f"Replay modunda model yok: {name}")
+        return getattr(inner, name)
+
+
+# ============================================
+# EMBEDDING
+# ============================================
+class CassetteEmbeddings:
+    """
+    OpenAIEmbeddings sarmalayıcısı.
+
+    Kayıt METİN başınadır: batch boyutu veya flush zamanlaması değişse de
+    (BatchingWriter) her metin vektörünü bulur. İsteğin süresi metinlere
+    eşit bölünür; replay'de bir isteğin beklemesi metinlerinin toplamıdır.
+    """
+
+    def __init__(self, embeddings: Any, model_name: str, cassette: Optional[Cassette] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cassette = cassette or get_cassette()
+
+    def _key(self, text: str) -> str:
+        return Cassette.key("embedding", {"model": self.model_name, "text": text})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.embeddings is None:
+            return [self.cassette.load("embedding", self._key(text))["vector"] for text in texts]
+
+        started = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        share = (time.perf_counter() - started) / max(len(texts), 1)
+
+        for text, vector in zip(texts, vectors):
+            self.cassette.save("embedding", self._key(text), {
+                "model": self.model_name,
+                "chars": len(text),
+                "vector": vector,
+                "latency_s": share
+            })
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def __getattr__(self, name: str) -> Any:
+        inner = self.__dict__.get("embeddings")
+        if inner is None:
+            raise AttributeError(f"Replay modunda embedding modeli yok: {name}")
+        return getattr(inner, name)
+
+
+# ============================================
+# VECTOR STORE + MONGODB OKUMALARI
+# ============================================
+class CassetteVectorStore:
+    """
+    MongoDBAtlasVectorSearch sarmalayıcısı.
+
+    similarity_search kaydedilir/oynatılır. Ingest'in kullandığı
+    .collection ve .embeddings alanları replay'de de vardır (yazmalar
+    bellek içi depoya gider).
+    """
+
+    def __init__(self, store: Any, collection: Any, embeddings: Any, cassette: Optional[Cassette] = None):
+        self.store = store
+        self.collection = collection
+        self.embeddings = embeddings
+        self.cassette = cassette or get_cassette()
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Any]:
+        from langchain_core.documents import Document
+
+        key = Cassette.key("vector_search", {"query": query, "k": k, "kwargs": kwargs})
+
+        if self.store is None:
+            record = self.cassette.load("vector_search", key)
+            return [Document(page_content=doc["page_content"], metadata=doc["metadata"])
+                    for doc in record["documents"]]
+
+        started = time.perf_counter()
+        docs = self.store.similarity_search(query, k=k, **kwargs)
+        self.cassette.save("vector_search", key, {
+            "query": query[:200],
+            "k": k,
+            "documents": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs],
+            "latency_s": time.perf_counter() - started
+        })
+        return docs
+
+    def __getattr__(self, name: str) -> Any:
+        inner = self.__dict__.get("store")
+        if inner is None:
+            raise AttributeError(f"Replay modunda vector store yok: {name}")
+        return getattr(inner, name)
+
+
+class CassetteCollection:
+    """
+    MongoDB collection sarmalayıcısı: find() kaydedilir/oynatılır.
+
+    Retrieval'ın parent sayfa okumaları için; diğer metodlar olduğu
+    gibi alttaki collection'a gider (replay'de bellek içi).
+    """
+
+    def __init__(self, collection: Any, cassette: Optional[Cassette] = None):
+        self.collection = collection
+        self.cassette = cassette or get_cassette()
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        key = Cassette.key("mongo_find", {"query": query, "projection": projection})
+
+        if CASSETTE_MODE == "replay":
+            return self.cassette.load("mongo_find", key)["documents"]
+
+        started = time.perf_counter()
+        documents = list(self.collection.find(query, projection))
+        self.cassette.save("mongo_find", key, {
+            "query": query,
+            "documents": documents,
+            "latency_s": time.perf_counter() - started
+        })
+        return documents
+
+    def __getattr__(self, name: str) -> Any:
+        if "collection" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.collection, name)
+
+
+# ============================================
+# FABRİKALAR (off modunda sıfır maliyet)
+# ============================================
+# Client'lar tek bu noktadan oluşturulduğu için metrik sarmalayıcıları
+# (App.core.metrics) da burada, kasetin DIŞINA eklenir: replay'de
+# ölçülen süre, oynatılan (ölçeklenmiş) gecikmedir.
+def cassette_chat_model(factory: Callable[[], Any], model_name: str) -> Any:
+    """Chat modelini moda göre döndürür (replay'de factory çağrılmaz)."""
+    if CASSETTE_MODE == "off":
+        llm = factory()
+    else:
+        llm = CassetteChatModel(None if is_replaying() else factory(), model_name)
+    return instrumented_chat_model(llm, model_name)
+
+
+def cassette_embeddings(factory: Callable[[], Any], model_name: str) -> Any:
+    """Embedding modelini moda göre döndürür (replay'de factory çağrılmaz)."""
+    if CASSETTE_MODE == "off":
+        embeddings = factory()
+    else:
+        embeddings = CassetteEmbeddings(None if is_replaying() else factory(), model_name)
+    return instrumented_embeddings(embeddings, model_name)
+
+
+def cassette_vector_store(factory: Callable[[], Any], collection: Any, embeddings: Any) -> Any:
+    """Vector store'u moda göre döndürür (replay'de factory çağrılmaz)."""
+    if CASSETTE_MODE == "off":
+        store = factory()
+    else:
+        store = CassetteVectorStore(None if is_replaying() else factory(), collection, embeddings)
+    return instrumented_vector_store(store, collection)
+
+
+def cassette_collection(collection: Any) -> Any:
+    """Okumaları kaydedilecek/oynatılacak (ve ölçülecek) collection."""
+    if CASSETTE_MODE != "off":
+        collection = CassetteCollection(collection)
+    return instrumented_collection(collection)
+
+
+def mongo_client(uri: str) -> Any:
+    """MongoClient; replay'de ağa gitmeyen bellek içi client."""
+    if is_replaying():
+        from App.bench.fakes import FakeClient
+        return FakeClient()
+
+    # pymongo sadece gerçek bağlantıda yüklenir (import maliyeti)
+    from pymongo import MongoClient
+    return MongoClient(uri)
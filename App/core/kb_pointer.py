@@ -0,0 +1,110 @@
+"""
+============================================
+YASAA VISION - Bilgi Bankası Pointer'ı (Okuma Tarafı)
+============================================
+Retrieval'ın hangi bilgi bankası versiyonunu okuyacağını söyleyen
+pointer dökümanı ve onun TTL'li önbelleği.
+
+Pointer'ı yazan taraf (build / switch / GC) App.ingest.kb_versions'tadır;
+burada sadece çalışan uygulamanın ihtiyacı olan okuma durur. Böylece
+App.core (vector arka uçları) ingest paketine bağımlı olmaz.
+
+Pointer dökümanı (KB_POINTER_COLLECTION içinde, _id = COLLECTION_NAME):
+    {"_id": "palmistry_knowledge", "active": 3, "building": 4, "retired": [2]}
+
+Versiyon n'in collection'ları: <COLLECTION_NAME>_v{n} + <PARENT_COLLECTION_NAME>_v{n}
+(versiyon 0 = versiyonsuz, eski kurulum).
+
+Parent sayfa kimliği (make_parent_id) de buradadır: ingest sayfaları bu
+kimlikle yazar, Araştırmacı komşu sayfaları aynı kimlikle okur.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from App.core.metrics import record_cache
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+COLLECTION_NAME: str = settings.get("COLLECTION_NAME", "palmistry_knowledge")
+PARENT_COLLECTION_NAME: str = settings.get("PARENT_COLLECTION_NAME", "palmistry_pages")
+KB_POINTER_COLLECTION: str = settings.get("KB_POINTER_COLLECTION", "kb_versions")
+KB_POINTER_TTL_SECONDS: float = float(settings.get("KB_POINTER_TTL_SECONDS", "30"))
+"""
+KB_POINTER_COLLECTION: Pointer dökümanlarının tutulduğu collection
+KB_POINTER_TTL_SECONDS: Retrieval pointer'ı kaç saniyede bir yeniden okusun
+    (geçişten sonra en geç bu kadar sürede yeni versiyona geçilir)
+"""
+
+
+def versioned_name(name: str, version: int) -> str:
+    """Versiyonun collection adı (versiyon 0 = versiyonsuz ad)."""
+    return name if version == 0 else f"{name}_v{version}"
+
+
+def make_parent_id(doc_type: str, file_hash: str, page: int, pipeline: Optional[str] = None) -> str:
+    """
+    Sayfanın kararlı kimliği (aynı sayfa tekrar işlenince aynı kalır).
+
+    Pipeline kimliğe girer: aynı type'ı yazan pipeline'lar (ingest_batch
+    ve ingest_hybrid: hybrid_book_page) birbirinin sayfasını ezmez.
+    """
+    if pipeline is None:
+        return f"{doc_type}:{file_hash[:16]}:{page}"
+    return f"{doc_type}:{pipeline}:{file_hash[:16]}:{page}"
+
+
+def read_pointer(db: Any, base: str = COLLECTION_NAME) -> Dict[str, Any]:
+    """Pointer dökümanını okur (yoksa versiyon 0 aktif)."""
+    pointer = db[KB_POINTER_COLLECTION].find_one({"_id": base})
+    return pointer or {"_id": base, "active": 0, "building": None, "retired": []}
+
+
+class ActiveVersionCache:
+    """
+    Aktif versiyon numarasını TTL ile önbellekler (retrieval her istekte Mongo'ya gitmez).
+
+    Kullanım:
+        cache = ActiveVersionCache()
+        version = cache.get(db)
+        chunks = db[versioned_name(COLLECTION_NAME, version)]
+    """
+
+    def __init__(self, ttl_seconds: float = KB_POINTER_TTL_SECONDS, base: str = COLLECTION_NAME):
+        self.ttl_seconds = ttl_seconds
+        self.base = base
+        self._version: Optional[int] = None
+        self._expires_at: float = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Any) -> int:
+        with self._lock:
+            now = time.monotonic()
+            if self._version is not None and now < self._expires_at:
+                record_cache("kb_pointer", hit=True)
+                return self._version
+            record_cache("kb_pointer", hit=False)
+
+            try:
+                version = int(read_pointer(db, self.base)["active"])
+            except Exception as e:
+                # Pointer okunamazsa bilinen son versiyonla devam (yoksa versiyonsuz)
+                logger.warning(f"   ⚠️ KB pointer okunamadı, önceki versiyon kullanılıyor: {e}")
+                version = self._version if self._version is not None else 0
+
+            if self._version is not None and version != self._version:
+                logger.info(f"   🔀 Bilgi bankası versiyonu değişti: v{self._version} → v{version}")
+
+            self._version = version
+            self._expires_at = now + self.ttl_seconds
+            return version
@@ -0,0 +1,607 @@
+"""
+============================================
+YASAA VISION - Metrikler (Prometheus)
+============================================
+Graph düğümlerinin ve dış servis çağrılarının süre, token, byte,
+hata ve önbellek sayaçları. Bir falın gecikmesinin nereye gittiğini
+(Vision mı, arama mı, Abla mı?) production'da görmek için.
+
+Ölçülenler:
+    yasaa_node_duration_seconds{node}                  Histogram
+    yasaa_node_errors_total{node}                      Counter (exception / sistem hatası)
+    yasaa_node_rejections_total{node,reason}           Counter (beklenen redler: el değil, karanlık...)
+    yasaa_external_call_duration_seconds{service,target} Histogram
+    yasaa_external_call_errors_total{service,target}   Counter
+    yasaa_llm_tokens_total{model,kind}                 Counter (prompt/completion)
+    yasaa_payload_bytes_total{service,direction}       Counter (upload/download)
+    yasaa_cache_lookups_total{cache,result}            Counter (hit/miss)
+    yasaa_prescreen_total{verdict,reason}              Counter (ön eleme kararları)
+
+service: openai_chat, openai_embeddings, mongo_search, mongo_find,
+         local_search (VECTOR_BACKEND=chroma/numpy)
+
+Dış çağrılar, client'ların oluşturulduğu tek yerde (App.core.cassette
+fabrikaları) sarılır; düğümler graph.py'de instrument_node ile sarılır.
+Bağımlılık yoktur (prometheus_client gerekmez), metin formatı elle
+üretilir.
+
+Kullanım:
+    METRICS_PORT=9464 streamlit run app.py
+    curl localhost:9464/metrics
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import time
+import logging
+import threading
+import functools
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from App.core.tracing import TRACING_ENABLED, set_attribute, span
+from App.core.settings import settings
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+METRICS_ENABLED: bool = settings.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_PORT: int = int(settings.get("METRICS_PORT", "0"))
+"""
+METRICS_ENABLED: false ise (ve TRACING_ENABLED da false ise) sarmalayıcılar
+                 hiç eklenmez (sıfır maliyet)
+METRICS_PORT: /metrics HTTP endpoint'inin portu (0 = sunucu açılmaz)
+"""
+
+# Aynı sarmalayıcılar span'leri de açar (App.core.tracing)
+INSTRUMENTATION_ENABLED: bool = METRICS_ENABLED or TRACING_ENABLED
+
+# Saniye cinsinden histogram sınırları (Vision çağrıları 10-30 sn sürebilir)
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                                      1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+# ============================================
+# METRİK TİPLERİ
+# ============================================
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    """{a="x",b="y"} biçiminde etiket metni."""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_float(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Counter:
+    """Etiketli, sadece artan sayaç (thread-safe)."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def values(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_float(value)}"
+                for key, value in sorted(self.values().items())]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Etiketli histogram: kova sayaçları + toplam + adet (thread-safe)."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def series(self) -> Dict[Tuple[str, ...], Dict[str, Any]]:
+        with self._lock:
+            return {key: {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}
+                    for key, s in self._series.items()}
+
+    def quantile(self, series: Dict[str, Any], q: float) -> Optional[float]:
+        """
+        Kovalardan yaklaşık kantil (kovanın içinde doğrusal).
+
+        Prometheus'un histogram_quantile hesabıyla aynı mantık; debug
+        paneli için yeterli hassasiyettedir.
+        """
+        if not series["count"]:
+            return None
+        rank = q * series["count"]
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, series["counts"]):
+            if count and seen + count >= rank:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound if bound != float("inf") else lower
+        return lower
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self.series().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                le = f'le="{_format_float(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_float(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+# ============================================
+# METRİKLER
+# ============================================
+NODE_DURATION = Histogram("yasaa_node_duration_seconds",
+                          "Graph düğümü çalışma süresi", ["node"])
+NODE_ERRORS = Counter("yasaa_node_errors_total",
+                      "Hata ile biten düğüm çalışmaları", ["node"])
+EXTERNAL_DURATION = Histogram("yasaa_external_call_duration_seconds",
+                              "Dış servis (OpenAI/MongoDB) çağrı süresi", ["service", "target"])
+EXTERNAL_ERRORS = Counter("yasaa_external_call_errors_total",
+                          "Hata ile biten dış servis çağrıları", ["service", "target"])
+TOKENS = Counter("yasaa_llm_tokens_total",
+                 "LLM token kullanımı", ["model", "kind"])
+PAYLOAD_BYTES = Counter("yasaa_payload_bytes_total",
+                        "Dış servislere giden/gelen veri", ["service", "direction"])
+CACHE_LOOKUPS = Counter("yasaa_cache_lookups_total",
+                        "Önbellek aramaları", ["cache", "result"])
+PRESCREEN_RESULTS = Counter("yasaa_prescreen_total",
+                            "Yerel fotoğraf ön eleme kararları", ["verdict", "reason"])
+NODE_REJECTIONS = Counter("yasaa_node_rejections_total",
+                          "Kullanıcı girdisi yüzünden beklenen redler (hata değil)", ["node", "reason"])
+
+REGISTRY: List[Any] = [NODE_DURATION, NODE_ERRORS, EXTERNAL_DURATION, EXTERNAL_ERRORS,
+                       TOKENS, PAYLOAD_BYTES, CACHE_LOOKUPS, PRESCREEN_RESULTS, NODE_REJECTIONS]
+
+
+def render_metrics() -> str:
+    """Tüm metrikleri Prometheus metin formatında döndürür."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Tüm sayaçları sıfırlar (benchmark ve debug için)."""
+    for metric in REGISTRY:
+        metric.reset()
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Önbellek aramasını sayar ve aktif span'e cache.<ad> olarak yazar."""
+    result = "hit" if hit else "miss"
+    set_attribute(f"cache.{cache}", result)
+    if METRICS_ENABLED:
+        CACHE_LOOKUPS.inc(cache=cache, result=result)
+
+
+def record_prescreen(verdict: str, reason: str) -> None:
+    """Ön eleme kararını sayar ve aktif span'e prescreen.* olarak yazar."""
+    set_attribute("prescreen.verdict", verdict)
+    set_attribute("prescreen.reason", reason)
+    if METRICS_ENABLED:
+        PRESCREEN_RESULTS.inc(verdict=verdict, reason=reason)
+
+
+# ============================================
+# DÜĞÜM ÖLÇÜMÜ
+# ============================================
+# Çalışan düğümün sonucu (instrument_node kurar, record_rejection doldurur)
+_node_outcome: ContextVar[Optional[Dict[str, str]]] = ContextVar("yasaa_node_outcome", default=None)
+
+
+def record_rejection(reason: str) -> None:
+    """
+    Düğümün error_message'ının beklenen bir red olduğunu işaretler.
+
+    Kedi fotoğrafı, karanlık fotoğraf, "el değil" kararı kullanıcı girdisidir,
+    sistem hatası değildir: yasaa_node_errors_total yerine
+    yasaa_node_rejections_total'a sayılır ve span hata olarak işaretlenmez.
+    """
+    set_attribute("rejection", reason)
+    outcome = _node_outcome.get()
+    if outcome is not None:
+        outcome["rejection"] = reason
+
+
+def instrument_node(name: str) -> Callable[[Callable], Callable]:
+    """
+    Graph düğümünü süre/hata ölçümü ve bir span ile saran decorator.
+
+    Düğümler hataları yakalayıp error_message döndürdüğü için, exception
+    kadar error_message dolu dönüşler de hata sayılır; düğüm
+    record_rejection() ile beklenen bir red işaretlediyse sayılmaz.
+
+    Kullanım:
+        workflow.add_node("vision_scanner", instrument_node("vision_scanner")(vision_analysis_node))
+    """
+    def decorator(function: Callable) -> Callable:
+        if not INSTRUMENTATION_ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(state: Any, *args: Any, **kwargs: Any) -> Any:
+            with span(name) as node_span:
+                outcome: Dict[str, str] = {}
+                token = _node_outcome.set(outcome)
+                started = time.perf_counter()
+                try:
+                    result = function(state, *args, **kwargs)
+                except Exception:
+                    NODE_ERRORS.inc(node=name)
+                    raise
+                finally:
+                    NODE_DURATION.observe(time.perf_counter() - started, node=name)
+                    _node_outcome.reset(token)
+
+                if isinstance(result, dict) and result.get("error_message"):
+                    if "rejection" in outcome:
+                        NODE_REJECTIONS.inc(node=name, reason=outcome["rejection"])
+                    else:
+                        NODE_ERRORS.inc(node=name)
+                        node_span.set_error(result["error_message"])
+            return result
+        return wrapper
+    return decorator
+
+
+class _ExternalCall:
+    """
+    Dış çağrının süresini ve hatasını kaydeden context manager.
+
+    Çağrı için bir çocuk span açar; sarmalayıcılar token, k gibi
+    özellikleri self.span üzerinden ekler.
+    """
+
+    def __init__(self, service: str, target: str, **attributes: Any):
+        self.service = service
+        self.target = target
+        self._span_context = span(service, target=target, **attributes)
+
+    def __enter__(self) -> "_ExternalCall":
+        self.span = self._span_context.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> bool:
+        EXTERNAL_DURATION.observe(time.perf_counter() - self.started,
+                                  service=self.service, target=self.target)
+        if exc_type is not None:
+            EXTERNAL_ERRORS.inc(service=self.service, target=self.target)
+        self._span_context.__exit__(exc_type, exc, traceback)
+        return False
+
+
+# ============================================
+# DIŞ SERVİS SARMALAYICILARI
+# ============================================
+def _content_bytes(content: Any) -> int:
+    """Mesaj içeriğinin (metin + base64 resim URL'leri) byte boyutu."""
+    if isinstance(content, str):
+        return len(content.encode("utf-8"))
+    total = 0
+    for part in content or []:
+        if not isinstance(part, dict):
+            total += len(str(part).encode("utf-8"))
+        elif part.get("type") == "image_url":
+            image_url = part.get("image_url")
+            url = image_url.get("url", "") if isinstance(image_url, dict) else image_url or ""
+            total += len(url)
+        else:
+            total += len(str(part.get("text", "")).encode("utf-8"))
+    return total
+
+
+def _token_usage(response: Any) -> Tuple[int, int]:
+    """Cevaptan (prompt, completion) token sayısı; bilinmiyorsa 0."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage:
+        return int(usage.get("input_tokens", 0)), int(usage.get("output_tokens", 0))
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    return int(token_usage.get("prompt_tokens", 0)), int(token_usage.get("completion_tokens", 0))
+
+
+class InstrumentedChatModel:
+    """ChatOpenAI sarmalayıcısı: invoke süresi, token ve byte sayaçları."""
+
+    def __init__(self, llm: Any, model_name: str):
+        self.llm = llm
+        self.model_name = model_name
+
+    def invoke(self, messages: Any, *args: Any, **kwargs: Any) -> Any:
+        if isinstance(messages, list):
+            upload = sum(_content_bytes(getattr(message, "content", message)) for message in messages)
+        else:
+            upload = _content_bytes(messages)
+        PAYLOAD_BYTES.inc(upload, service="openai_chat", direction="upload")
+
+        with _ExternalCall("openai_chat", self.model_name, model=self.model_name,
+                           upload_bytes=upload) as call:
+            response = self.llm.invoke(messages, *args, **kwargs)
+            prompt_tokens, completion_tokens = _token_usage(response)
+            call.span.set_attribute("prompt_tokens", prompt_tokens)
+            call.span.set_attribute("completion_tokens", completion_tokens)
+
+        TOKENS.inc(prompt_tokens, model=self.model_name, kind="prompt")
+        TOKENS.inc(completion_tokens, model=self.model_name, kind="completion")
+        PAYLOAD_BYTES.inc(_content_bytes(getattr(response, "content", "")),
+                          service="openai_chat", direction="download")
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        if "llm" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+class InstrumentedEmbeddings:
+    """Embeddings sarmalayıcısı: istek süresi ve gönderilen metin byte'ı."""
+
+    def __init__(self, embeddings: Any, model_name: str):
+        self.embeddings = embeddings
+        self.model_name = model_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        PAYLOAD_BYTES.inc(sum(len(text.encode("utf-8")) for text in texts),
+                          service="openai_embeddings", direction="upload")
+        with _ExternalCall("openai_embeddings", self.model_name, model=self.model_name, texts=len(texts)):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        PAYLOAD_BYTES.inc(len(text.encode("utf-8")), service="openai_embeddings", direction="upload")
+        with _ExternalCall("openai_embeddings", self.model_name, model=self.model_name, texts=1):
+            return self.embeddings.embed_query(text)
+
+    def __getattr__(self, name: str) -> Any:
+        if "embeddings" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+
+class InstrumentedVectorStore:
+    """
+    Vector store sarmalayıcısı: similarity_search süresi.
+
+    Sorgu embedding'i store'un kendi embeddings nesnesinden geçtiği için
+    ayrıca openai_embeddings altında da görünür.
+    """
+
+    def __init__(self, store: Any, target: str, service: str = "mongo_search"):
+        self.store = store
+        self.target = target
+        self.service = service
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Any]:
+        with _ExternalCall(self.service, self.target, k=k,
+                           pre_filter=bool(kwargs.get("pre_filter"))) as call:
+            docs = self.store.similarity_search(query, k=k, **kwargs)
+            call.span.set_attribute("documents", len(docs))
+        PAYLOAD_BYTES.inc(sum(len(doc.page_content.encode("utf-8")) for doc in docs),
+                          service=self.service, direction="download")
+        return docs
+
+    def __getattr__(self, name: str) -> Any:
+        if "store" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+
+class InstrumentedCollection:
+    """MongoDB collection sarmalayıcısı: find süresi (parent sayfa okuma)."""
+
+    def __init__(self, collection: Any, target: str):
+        self.collection = collection
+        self.target = target
+
+    def find(self, *args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        # Cursor'ı burada tüketiyoruz; yoksa süre ağ turunu kapsamaz
+        with _ExternalCall("mongo_find", self.target) as call:
+            documents = list(self.collection.find(*args, **kwargs))
+            call.span.set_attribute("documents", len(documents))
+        return documents
+
+    def __getattr__(self, name: str) -> Any:
+        if "collection" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.collection, name)
+
+
+def _target_name(collection: Any) -> str:
+    return str(getattr(collection, "name", "") or "unknown")
+
+
+def instrumented_chat_model(llm: Any, model_name: str) -> Any:
+    return InstrumentedChatModel(llm, model_name) if INSTRUMENTATION_ENABLED else llm
+
+
+def instrumented_embeddings(embeddings: Any, model_name: str) -> Any:
+    return InstrumentedEmbeddings(embeddings, model_name) if INSTRUMENTATION_ENABLED else embeddings
+
+
+def instrumented_vector_store(store: Any, collection: Any, service: str = "mongo_search") -> Any:
+    return InstrumentedVectorStore(store, _target_name(collection), service) if INSTRUMENTATION_ENABLED else store
+
+
+def instrumented_collection(collection: Any) -> Any:
+    return InstrumentedCollection(collection, _target_name(collection)) if INSTRUMENTATION_ENABLED else collection
+
+
+# ============================================
+# ÖZET (DEBUG PANELİ)
+# ============================================
+def metrics_summary() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Debug paneli için okunabilir özet.
+
+    Returns:
+        Dict: nodes / external (adet, hata, ortalama, p95 ms),
+              tokens (model → prompt/completion), caches (hit oranı)
+    """
+    def latency_rows(histogram: Histogram, errors: Counter) -> List[Dict[str, Any]]:
+        error_values = errors.values()
+        rows = []
+        for key, series in sorted(histogram.series().items()):
+            p95 = histogram.quantile(series, 0.95)
+            row = dict(zip(histogram.labelnames, key))
+            row.update({
+                "count": series["count"],
+                "errors": int(error_values.get(key, 0)),
+                "avg_ms": round(series["sum"] / series["count"] * 1000, 1) if series["count"] else 0.0,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+            })
+            rows.append(row)
+        return rows
+
+    tokens: Dict[str, Dict[str, Any]] = {}
+    for (model, kind), value in TOKENS.values().items():
+        tokens.setdefault(model, {"model": model, "prompt": 0, "completion": 0})[kind] = int(value)
+
+    caches: Dict[str, Dict[str, Any]] = {}
+    for (cache, result), value in CACHE_LOOKUPS.values().items():
+        caches.setdefault(cache, {"cache": cache, "hit": 0, "miss": 0})[result] = int(value)
+    for row in caches.values():
+        total = row["hit"] + row["miss"]
+        row["hit_rate"] = round(row["hit"] / total, 3) if total else 0.0
+
+    return {
+        "nodes": latency_rows(NODE_DURATION, NODE_ERRORS),
+        "external": latency_rows(EXTERNAL_DURATION, EXTERNAL_ERRORS),
+        "tokens": sorted(tokens.values(), key=lambda row: row["model"]),
+        "caches": sorted(caches.values(), key=lambda row: row["cache"])
+    }
+
+
+# ============================================
+# HTTP ENDPOINT
+# ============================================
+def _make_handler() -> type:
+    """
+    GET /metrics handler sınıfı.
+
+    http.server ~30 ms import maliyeti getirir; sadece sunucu gerçekten
+    açılırken yüklenir.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        """Sadece GET /metrics."""
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # Her scrape'i loglamak gürültü yapar
+            pass
+
+    return _MetricsHandler
+
+
+_server: Optional["ThreadingHTTPServer"] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0") -> Optional["ThreadingHTTPServer"]:
+    """
+    /metrics endpoint'ini arka plan thread'inde başlatır.
+
+    Birden fazla çağrılabilir (Streamlit her etkileşimde script'i yeniden
+    çalıştırır); sunucu process başına bir kez açılır.
+
+    Args:
+        port: Dinlenecek port (0 ise sunucu açılmaz)
+        host: Dinlenecek adres
+
+    Returns:
+        Sunucu (açılmadıysa None)
+    """
+    global _server
+
+    if not port or not METRICS_ENABLED:
+        return None
+
+    with _server_lock:
+        if _server is not None:
+            return _server
+        from http.server import ThreadingHTTPServer
+
+        try:
+            _server = ThreadingHTTPServer((host, port), _make_handler())
+        except OSError as e:
+            logger.warning(f"⚠️ Metrik sunucusu açılamadı (port {port}): {e}")
+            return None
+        thread = threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        logger.info(f"📈 Metrikler yayında: http://{host}:{port}/metrics")
+        return _server
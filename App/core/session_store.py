@@ -0,0 +1,592 @@
+"""
+============================================
+YASAA VISION - Oturum Deposu (Session Store)
+============================================
+Streamlit her oturumun mesajlarını (3000 kelimelik cevaplar dahil),
+base64 fotoğrafını ve Vision raporunu process belleğinde süresiz
+tutuyordu: bellek eşzamanlı + boşta bekleyen kullanıcı sayısıyla
+büyüyor, yeniden başlatmada her şey kayboluyordu.
+
+İki katman:
+1. Sıcak katman (process belleği, LRU):
+   Son kullanılan oturumlar. Oturum sayısı, toplam byte ve boşta
+   kalma süresiyle sınırlı; sınır aşılınca en eski oturum bellekten
+   düşer (diskte durur, istenince geri okunur).
+
+2. Kalıcı katman (SQLite veya dosyalar):
+   Her kayıt write-through yazılır. Aynı dosyayı/klasörü gören
+   birden fazla Streamlit/API replikası aynı oturumu paylaşır; sıcak
+   katmandaki kopya, diskteki damgası değiştiyse yeniden okunur.
+   Fotoğraflar içerik hash'iyle ayrı saklanır (aynı fotoğraf bir kez).
+   SESSION_TTL_HOURS'tan eski ve SESSION_STORE_MAX_MB'ı aşan oturumlar
+   (en eskiden başlayarak) silinir.
+
+Silinen oturumların graph checkpoint thread'leri on_delete ile
+bildirilir (app.py checkpointer'dan siler); yoksa checkpoints.db
+oturumlar silindikten sonra da sınırsız büyür.
+
+Kullanım:
+    from App.core.session_store import get_session_store
+
+    store = get_session_store()
+    session = store.get(session_id)       # Yoksa boş oturum
+    session.messages.append(HumanMessage(content="..."))
+    store.save(session)
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from App.core.metrics import record_cache
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+SESSION_STORE_BACKEND: str = settings.get("SESSION_STORE_BACKEND", "sqlite").lower()
+SESSION_STORE_PATH: str = settings.get(
+    "SESSION_STORE_PATH", "sessions" if SESSION_STORE_BACKEND == "file" else "sessions.db"
+)
+SESSION_HOT_MAX_SESSIONS: int = settings.get_int("SESSION_HOT_MAX_SESSIONS", 200)
+SESSION_HOT_MAX_MB: float = settings.get_float("SESSION_HOT_MAX_MB", 64)
+SESSION_HOT_IDLE_SECONDS: float = settings.get_float("SESSION_HOT_IDLE_SECONDS", 900)
+SESSION_TTL_HOURS: float = settings.get_float("SESSION_TTL_HOURS", 72)
+SESSION_STORE_MAX_MB: float = settings.get_float("SESSION_STORE_MAX_MB", 2048)
+SESSION_PURGE_INTERVAL_SECONDS: float = settings.get_float("SESSION_PURGE_INTERVAL_SECONDS", 300)
+"""
+SESSION_STORE_BACKEND: sqlite | file | memory
+    (memory: kalıcı katman yok; sıcak katmandan düşen oturum kaybolur)
+SESSION_STORE_PATH: SQLite dosyası veya oturum klasörü (replikalar arasında paylaşılabilir)
+SESSION_HOT_MAX_SESSIONS: Process belleğinde tutulacak en fazla oturum
+SESSION_HOT_MAX_MB: Sıcak katmanın toplam boyut sınırı (fotoğraflar dahil)
+SESSION_HOT_IDLE_SECONDS: Bu kadar süre dokunulmayan oturum bellekten düşer
+SESSION_TTL_HOURS: Bu kadar süredir güncellenmeyen oturum diskten silinir
+SESSION_STORE_MAX_MB: Kalıcı katmanın boyut sınırı (aşılınca en eski oturumlar silinir)
+SESSION_PURGE_INTERVAL_SECONDS: Disk temizliğinin en sık çalışma aralığı
+"""
+
+
+# Oturum kimliği: uuid4().hex (URL'den gelir; dosya adı olarak kullanılır)
+_SESSION_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def is_valid_session_id(session_id: Any) -> bool:
+    """Kimlik uuid4().hex biçiminde mi (yol ayırıcı, '..' vb. içeremez)."""
+    return isinstance(session_id, str) and _SESSION_ID_PATTERN.fullmatch(session_id) is not None
+
+
+# ============================================
+# OTURUM VERİSİ
+# ============================================
+@dataclass
+class SessionData:
+    """
+    Bir sohbet oturumunun durumu.
+
+    thread_id: Graph checkpoint'inin anahtarı; "Yeni Sohbet" yeni bir
+    thread başlatır (None ise session_id kullanılır).
+    """
+    session_id: str
+    messages: List[Any] = field(default_factory=list)
+    image_base64: Optional[str] = None
+    vision_report: Optional[str] = None
+    updated_at: float = 0.0
+    thread_id: Optional[str] = None
+
+    @property
+    def graph_thread_id(self) -> str:
+        return self.thread_id or self.session_id
+
+    def byte_size(self) -> int:
+        """Yaklaşık bellek boyutu (mesaj metinleri + fotoğraf + rapor)."""
+        text = sum(len(str(getattr(message, "content", ""))) for message in self.messages)
+        return text + len(self.image_base64 or "") + len(self.vision_report or "")
+
+
+def _dump_messages(messages: List[Any]) -> str:
+    """LangChain mesajlarını JSON'a çevirir (sadece tür + içerik)."""
+    return json.dumps(
+        [{"type": message.type, "content": message.content} for message in messages],
+        ensure_ascii=False
+    )
+
+
+def _load_messages(payload: str) -> List[Any]:
+    """JSON'dan LangChain mesajlarını geri kurar."""
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+    classes = {"human": HumanMessage, "ai": AIMessage, "system": SystemMessage}
+    return [
+        classes.get(item["type"], HumanMessage)(content=item["content"])
+        for item in json.loads(payload or "[]")
+    ]
+
+
+def _image_hash(image_base64: Optional[str]) -> Optional[str]:
+    if not image_base64:
+        return None
+    return hashlib.sha256(image_base64.encode("utf-8")).hexdigest()
+
+
+# ============================================
+# KALICI KATMAN: SQLITE
+# ============================================
+class SQLiteSessionBackend:
+    """
+    Oturumları tek SQLite dosyasında tutar (WAL; birden fazla process okuyup yazabilir).
+
+    Fotoğraflar session_images tablosunda hash ile tutulur; hiçbir
+    oturumun göstermediği fotoğraf temizlikte silinir.
+    """
+
+    def __init__(self, path: str = SESSION_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id      TEXT PRIMARY KEY,
+                    messages        TEXT NOT NULL,
+                    image_hash      TEXT,
+                    vision_report   TEXT,
+                    byte_size       INTEGER NOT NULL,
+                    updated_at      REAL NOT NULL,
+                    thread_id       TEXT
+                )
+            """)
+            # thread_id sonradan eklendi: eski dosyalara kolon ekle
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+            if "thread_id" not in columns:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN thread_id TEXT")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS session_images (
+                    image_hash      TEXT PRIMARY KEY,
+                    data            TEXT NOT NULL,
+                    byte_size       INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+
+    def load(self, session_id: str) -> Optional[SessionData]:
+        """Oturumu okur (yoksa None)."""
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT s.messages, i.data, s.vision_report, s.updated_at, s.thread_id
+                FROM sessions s LEFT JOIN session_images i ON i.image_hash = s.image_hash
+                WHERE s.session_id = ?
+            """, (session_id,)).fetchone()
+        if row is None:
+            return None
+        messages, image, report, updated_at, thread_id = row
+        return SessionData(session_id, _load_messages(messages), image, report, updated_at, thread_id)
+
+    def stamp(self, session_id: str) -> Optional[float]:
+        """Oturumun son yazılma zamanı (replika değişikliğini anlamak için)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, session: SessionData) -> float:
+        """Oturumu yazar, yeni damgayı döndürür."""
+        image_hash = _image_hash(session.image_base64)
+        with self._lock, self._conn:
+            if image_hash:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO session_images (image_hash, data, byte_size) VALUES (?, ?, ?)",
+                    (image_hash, session.image_base64, len(session.image_base64))
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions "
+                "(session_id, messages, image_hash, vision_report, byte_size, updated_at, thread_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session.session_id, _dump_messages(session.messages), image_hash,
+                 session.vision_report, session.byte_size(), session.updated_at, session.thread_id)
+            )
+        return session.updated_at
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge(self, max_age_seconds: float, max_bytes: int) -> List[str]:
+        """
+        Eski oturumları ve boyut sınırını aşan en eski oturumları siler.
+
+        Returns:
+            List[str]: Silinen oturumların checkpoint thread'leri
+        """
+        threads: List[str] = []
+        with self._lock, self._conn:
+            cutoff = time.time() - max_age_seconds
+            expired = self._conn.execute(
+                "SELECT session_id, thread_id FROM sessions WHERE updated_at < ?", (cutoff,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+            threads.extend(thread_id or session_id for session_id, thread_id in expired)
+
+            total = self._conn.execute("SELECT COALESCE(SUM(byte_size), 0) FROM sessions").fetchone()[0]
+            if total > max_bytes:
+                for session_id, size, thread_id in self._conn.execute(
+                    "SELECT session_id, byte_size, thread_id FROM sessions ORDER BY updated_at"
+                ).fetchall():
+                    if total <= max_bytes:
+                        break
+                    self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                    total -= size
+                    threads.append(thread_id or session_id)
+
+            self._conn.execute(
+                "DELETE FROM session_images WHERE image_hash NOT IN "
+                "(SELECT image_hash FROM sessions WHERE image_hash IS NOT NULL)"
+            )
+        return threads
+
+
+# ============================================
+# KALICI KATMAN: DOSYALAR
+# ============================================
+class FileSessionBackend:
+    """
+    Oturum başına bir JSON dosyası + images/<hash>.b64 (paylaşımlı disk/NFS için).
+
+    Yazmalar geçici dosya + os.replace ile atomiktir; damga dosyanın
+    mtime'ıdır.
+    """
+
+    def __init__(self, directory: str = SESSION_STORE_PATH):
+        self.directory = directory
+        self.image_directory = os.path.join(directory, "images")
+        os.makedirs(self.image_directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        """
+        Raises:
+            ValueError: Kimlik uuid4().hex değilse (klasör dışına yol kurulmaz)
+        """
+        if not is_valid_session_id(session_id):
+            raise ValueError(f"❌ Geçersiz oturum kimliği: {str(session_id)[:40]!r}")
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    @staticmethod
+    def _write_atomic(path: str, text: str) -> None:
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temp_path, path)
+
+    def load(self, session_id: str) -> Optional[SessionData]:
+        try:
+            with open(self._path(session_id), encoding="utf-8") as file:
+                record = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        image = None
+        if record.get("image_hash"):
+            try:
+                with open(os.path.join(self.image_directory, f"{record['image_hash']}.b64"), encoding="utf-8") as file:
+                    image = file.read()
+            except FileNotFoundError:
+                logger.warning(f"⚠️ Oturum fotoğrafı bulunamadı: {record['image_hash'][:12]}")
+        return SessionData(
+            session_id, _load_messages(record["messages"]), image,
+            record.get("vision_report"), record.get("updated_at", 0.0), record.get("thread_id")
+        )
+
+    def stamp(self, session_id: str) -> Optional[float]:
+        try:
+            return os.stat(self._path(session_id)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def save(self, session: SessionData) -> float:
+        image_hash = _image_hash(session.image_base64)
+        if image_hash:
+            image_path = os.path.join(self.image_directory, f"{image_hash}.b64")
+            if not os.path.exists(image_path):
+                self._write_atomic(image_path, session.image_base64)
+
+        self._write_atomic(self._path(session.session_id), json.dumps({
+            "messages": _dump_messages(session.messages),
+            "image_hash": image_hash,
+            "vision_report": session.vision_report,
+            "byte_size": session.byte_size(),
+            "updated_at": session.updated_at,
+            "thread_id": session.thread_id
+        }, ensure_ascii=False))
+        return self.stamp(session.session_id) or session.updated_at
+
+    def delete(self, session_id: str) -> None:
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def purge(self, max_age_seconds: float, max_bytes: int) -> List[str]:
+        """
+        Eski / boyut sınırını aşan oturumları ve sahipsiz fotoğrafları siler.
+
+        Returns:
+            List[str]: Silinen oturumların checkpoint thread'leri
+        """
+        entries: List[Tuple[float, int, str]] = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        images = {name[:-4]: os.path.join(self.image_directory, name)
+                  for name in os.listdir(self.image_directory) if name.endswith(".b64")}
+        total = sum(size for _, size, _ in entries) + sum(os.path.getsize(path) for path in images.values())
+
+        cutoff = time.time() - max_age_seconds
+        threads, kept = [], []
+        for mtime, size, path in entries:
+            if mtime < cutoff or total > max_bytes:
+                threads.append(self._thread_id(path))
+                os.remove(path)
+                total -= size
+            else:
+                kept.append(path)
+
+        used = set()
+        for path in kept:
+            with open(path, encoding="utf-8") as file:
+                used.add(json.load(file).get("image_hash"))
+        for image_hash, path in images.items():
+            if image_hash not in used:
+                os.remove(path)
+        return threads
+
+    @staticmethod
+    def _thread_id(path: str) -> str:
+        """Oturum dosyasının checkpoint thread'i (okunamazsa dosya adındaki session_id)."""
+        session_id = os.path.basename(path)[:-len(".json")]
+        try:
+            with open(path, encoding="utf-8") as file:
+                return json.load(file).get("thread_id") or session_id
+        except (OSError, ValueError):
+            return session_id
+
+
+# ============================================
+# SICAK KATMAN + DEPO
+# ============================================
+@dataclass
+class _HotEntry:
+    session: SessionData
+    stamp: Optional[float]
+    byte_size: int
+    last_access: float
+
+
+class SessionStore:
+    """
+    LRU sıcak katman + (opsiyonel) kalıcı katman.
+
+    Thread-safe: Streamlit her oturumu ayrı thread'de çalıştırır.
+
+    on_delete: Silinen oturumların checkpoint thread'leriyle çağrılır
+        (delete, disk temizliği ve kalıcı katman yoksa bellekten düşme).
+    """
+
+    def __init__(
+        self,
+        backend: Any = None,
+        max_sessions: int = SESSION_HOT_MAX_SESSIONS,
+        max_bytes: int = int(SESSION_HOT_MAX_MB * 1024 * 1024),
+        idle_seconds: float = SESSION_HOT_IDLE_SECONDS,
+        on_delete: Optional[Callable[[List[str]], None]] = None
+    ):
+        self.backend = backend
+        self.on_delete = on_delete
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._hot: "OrderedDict[str, _HotEntry]" = OrderedDict()
+        self._hot_bytes = 0
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self.stats = {"hot_hits": 0, "disk_loads": 0, "evicted": 0, "purged": 0}
+
+    # ==========================================
+    # OKUMA / YAZMA
+    # ==========================================
+    def get(self, session_id: str) -> SessionData:
+        """
+        Oturumu döndürür; yoksa boş bir oturum oluşturur (henüz yazmaz).
+
+        Sıcak katmandaki kopya, başka bir replika diske daha yeni bir
+        sürüm yazdıysa yeniden okunur.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._hot.get(session_id)
+            if entry is not None:
+                self._hot.move_to_end(session_id)
+                entry.last_access = now
+
+        if entry is not None and (self.backend is None or self.backend.stamp(session_id) == entry.stamp):
+            with self._lock:
+                self.stats["hot_hits"] += 1
+            record_cache("session", hit=True)
+            return entry.session
+
+        record_cache("session", hit=False)
+        session = self.backend.load(session_id) if self.backend is not None else None
+        if session is None:
+            session = SessionData(session_id)
+        else:
+            with self._lock:
+                self.stats["disk_loads"] += 1
+
+        stamp = self.backend.stamp(session_id) if self.backend is not None else None
+        self._remember(session, stamp, now)
+        return session
+
+    def save(self, session: SessionData) -> None:
+        """Oturumu kalıcı katmana yazar (write-through) ve sıcak katmanı günceller."""
+        session.updated_at = time.time()
+        stamp = self.backend.save(session) if self.backend is not None else None
+        self._remember(session, stamp, session.updated_at)
+        self._maybe_purge()
+
+    def delete(self, session_id: str) -> None:
+        """Oturumu her iki katmandan ve checkpoint thread'ini siler."""
+        with self._lock:
+            entry = self._hot.pop(session_id, None)
+            if entry is not None:
+                self._hot_bytes -= entry.byte_size
+        session = entry.session if entry is not None else None
+        if self.backend is not None:
+            session = session or self.backend.load(session_id)
+            self.backend.delete(session_id)
+        self._notify_deleted([session.graph_thread_id if session else session_id])
+
+    # ==========================================
+    # SINIRLAR
+    # ==========================================
+    def _remember(self, session: SessionData, stamp: Optional[float], now: float) -> None:
+        """Oturumu sıcak katmana koyar ve sınırları uygular."""
+        size = session.byte_size()
+        with self._lock:
+            previous = self._hot.pop(session.session_id, None)
+            if previous is not None:
+                self._hot_bytes -= previous.byte_size
+            self._hot[session.session_id] = _HotEntry(session, stamp, size, now)
+            self._hot_bytes += size
+            lost = self._evict(now)
+        # Kalıcı katman yoksa bellekten düşen oturum geri gelmez: thread'i de silinir
+        self._notify_deleted(lost)
+
+    def _evict(self, now: float) -> List[str]:
+        """
+        Boşta kalan ve sınırı aşan en eski oturumları bellekten düşürür (lock altında).
+
+        Returns:
+            List[str]: Kalıcı katman yoksa kaybolan oturumların checkpoint thread'leri
+        """
+        lost: List[str] = []
+        while self._hot:
+            session_id, oldest = next(iter(self._hot.items()))
+            idle = now - oldest.last_access > self.idle_seconds
+            over = len(self._hot) > self.max_sessions or self._hot_bytes > self.max_bytes
+            # Son eklenen oturum tek başına sınırı aşsa bile bellekte kalır
+            if not (idle or over) or len(self._hot) == 1:
+                break
+            self._hot.popitem(last=False)
+            self._hot_bytes -= oldest.byte_size
+            self.stats["evicted"] += 1
+            if self.backend is None:
+                logger.info(f"🗑️ Oturum bellekten düştü (kalıcı katman yok): {session_id[:8]}")
+                lost.append(oldest.session.graph_thread_id)
+        return lost
+
+    def _maybe_purge(self) -> None:
+        """Kalıcı katmanı en fazla SESSION_PURGE_INTERVAL_SECONDS'ta bir temizler."""
+        if self.backend is None:
+            return
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge < SESSION_PURGE_INTERVAL_SECONDS:
+                return
+            self._last_purge = now
+        try:
+            threads = self.backend.purge(SESSION_TTL_HOURS * 3600, int(SESSION_STORE_MAX_MB * 1024 * 1024))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"⚠️ Oturum temizliği başarısız: {e}")
+            return
+        if threads:
+            with self._lock:
+                self.stats["purged"] += len(threads)
+            logger.info(f"🧹 {len(threads)} eski oturum silindi")
+            self._notify_deleted(threads)
+
+    def _notify_deleted(self, thread_ids: List[str]) -> None:
+        """Silinen oturumların thread'lerini on_delete'e iletir (hata oturum akışını bozmaz)."""
+        if not thread_ids or self.on_delete is None:
+            return
+        try:
+            self.on_delete(thread_ids)
+        except Exception as e:
+            logger.warning(f"⚠️ Checkpoint thread'leri silinemedi: {e}")
+
+    def hot_usage(self) -> Dict[str, float]:
+        """Sıcak katman doluluğu (debug paneli için)."""
+        with self._lock:
+            return {"sessions": len(self._hot), "mb": round(self._hot_bytes / 1024 / 1024, 2)}
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def create_backend(kind: str = SESSION_STORE_BACKEND, path: str = SESSION_STORE_PATH) -> Any:
+    """
+    Ayardaki kalıcı katmanı oluşturur.
+
+    Args:
+        kind: sqlite | file | memory
+        path: SQLite dosyası veya klasör
+
+    Returns:
+        Backend (memory için None)
+    """
+    if kind == "sqlite":
+        return SQLiteSessionBackend(path)
+    if kind == "file":
+        return FileSessionBackend(path)
+    if kind == "memory":
+        return None
+    raise ValueError(f"Bilinmeyen SESSION_STORE_BACKEND: {kind} (sqlite | file | memory)")
+
+
+def get_session_store() -> SessionStore:
+    """Süreç genelinde tek oturum deposu (lazy)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SessionStore(create_backend())
+            logger.info(f"💾 Oturum deposu: {SESSION_STORE_BACKEND} ({SESSION_STORE_PATH})")
+        return _store
@@ -0,0 +1,162 @@
+"""
+============================================
+YASAA VISION - Ayarlar (Lazy Settings)
+============================================
+Tüm modüllerin ortak ayar kaynağı. Önceden her modül import anında
+load_dotenv() çağırıyor, düğümler de API anahtarı için streamlit'i
+import edip st.secrets okuyordu; main.py, ingest script'leri ve
+spawn worker'ları hiç kullanmadıkları Streamlit'in açılış maliyetini
+ödüyordu.
+
+Çözüm sırası:
+    1. Ortam değişkeni (os.environ)
+    2. .env dosyası (ilk get() çağrısında bir kez okunur; var olan
+       ortam değişkenlerini ezmez)
+    3. Streamlit secrets (sadece secret() için ve sadece streamlit
+       zaten yüklüyse, yani `streamlit run` altında)
+
+Değerler önbelleğe alınmaz: os.environ okumak ucuzdur ve benchmark /
+alt process'lerin ortamı değiştirmesi hemen görünür. Önbelleğe alınan,
+.env'in okunmuş olması ve secrets sonucudur.
+
+Kullanım:
+    from App.core.settings import settings
+
+    VISION_MODEL: str = settings.get("VISION_MODEL", "gpt-4o")
+    RAG_TOP_K: int = settings.get_int("RAG_TOP_K", 5)
+    api_key = settings.secret("OPENAI_API_KEY")   # Fonksiyon içinde, ilk kullanımda
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))  # Ablacim/
+
+DOTENV_PATH: str = os.getenv("DOTENV_PATH", os.path.join(project_root, ".env"))
+"""
+DOTENV_PATH: Okunacak .env dosyası (yoksa çalışma klasöründen yukarı aranır)
+"""
+
+_TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+class Settings:
+    """
+    Lazy, process genelinde tek ayar nesnesi (thread-safe).
+
+    .env ve Streamlit secrets sadece gerçekten bir ayar istendiğinde
+    okunur; import etmek hiçbir yan etki üretmez.
+    """
+
+    def __init__(self, dotenv_path: str = DOTENV_PATH):
+        self.dotenv_path = dotenv_path
+        self._lock = threading.Lock()
+        self._dotenv_loaded = False
+        self._secrets: Dict[str, Optional[str]] = {}
+
+    # ==========================================
+    # KAYNAKLAR
+    # ==========================================
+    def _ensure_dotenv(self) -> None:
+        """.env'i bir kez os.environ'a yükler (mevcut değerler korunur)."""
+        if self._dotenv_loaded:
+            return
+        with self._lock:
+            if self._dotenv_loaded:
+                return
+            try:
+                from dotenv import find_dotenv, load_dotenv
+
+                path = self.dotenv_path if os.path.exists(self.dotenv_path) else find_dotenv(usecwd=True)
+                if path:
+                    load_dotenv(path, override=False)
+            except ImportError:
+                # python-dotenv yoksa sadece ortam değişkenleri kullanılır
+                logger.debug("python-dotenv yüklü değil, .env okunmadı")
+            self._dotenv_loaded = True
+
+    def _streamlit_secret(self, name: str) -> Optional[str]:
+        """
+        Streamlit secrets'tan değer (streamlit yüklü değilse None).
+
+        Streamlit burada import EDİLMEZ: sys.modules'ta yoksa CLI/worker
+        çalışıyordur ve secrets dosyası da yoktur.
+        """
+        if "streamlit" not in sys.modules:
+            return None
+        with self._lock:
+            if name in self._secrets:
+                return self._secrets[name]
+        try:
+            value = sys.modules["streamlit"].secrets.get(name)
+        except Exception:
+            # secrets.toml yoksa streamlit exception fırlatır
+            value = None
+        value = str(value) if value is not None else None
+        with self._lock:
+            self._secrets[name] = value
+        return value
+
+    # ==========================================
+    # OKUMA
+    # ==========================================
+    def get(self, name: str, default: Any = None) -> Any:
+        """
+        Ayarı ortamdan (gerekirse .env'i yükleyerek) okur.
+
+        Args:
+            name: Değişken adı
+            default: Tanımlı değilse dönecek değer
+
+        Returns:
+            str veya default
+        """
+        value = os.environ.get(name)
+        if value is not None:
+            return value
+        self._ensure_dotenv()
+        return os.environ.get(name, default)
+
+    def get_int(self, name: str, default: int) -> int:
+        return int(self.get(name, default))
+
+    def get_float(self, name: str, default: float) -> float:
+        return float(self.get(name, default))
+
+    def get_bool(self, name: str, default: bool = False) -> bool:
+        value = self.get(name)
+        if value is None:
+            return default
+        return str(value).strip().lower() in _TRUE_VALUES
+
+    def secret(self, name: str, default: str = "") -> str:
+        """
+        Gizli değer (API anahtarı, bağlantı URI'si): ortam → .env → Streamlit secrets.
+
+        Modül seviyesinde değil, kullanıldığı fonksiyonun içinde çağrılmalı;
+        böylece import sırasında secrets okunmaz.
+        """
+        value = self.get(name)
+        if value:
+            return value
+        return self._streamlit_secret(name) or default
+
+    def reset(self) -> None:
+        """Önbelleği temizler (.env ve secrets bir sonraki okumada yeniden okunur)."""
+        with self._lock:
+            self._dotenv_loaded = False
+            self._secrets.clear()
+
+
+# Process genelinde tek nesne
+settings = Settings()
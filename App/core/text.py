@@ -0,0 +1,96 @@
+"""
+============================================
+YASAA VISION - Cümle Sınırları
+============================================
+Ingest'in parçalayıcısı (App.ingest.chunker) ve Araştırmacı'nın
+komşu sayfa genişletmesi (retrieval_node) aynı cümle kurallarını
+kullanır: parça sınırları ile genişletme sınırları aynı yerdedir.
+
+- split_sentences: Metni cümle offset'lerine böler (kısaltmalar,
+  ondalık sayılar ve paragraf sonları dahil)
+- head_sentences / tail_sentences: Baştan / sondan tam cümleler
+- ends_mid_sentence / starts_mid_sentence: Sayfa geçişinde cümle bölünmüş mü
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import re
+from typing import List, Tuple
+
+# Cümle sonu: . ! ? … (tırnak/parantez kapanışı olabilir) + boşluk
+_SENTENCE_END = re.compile(r"[.!?…][\"'”’)\]]*\s+")
+
+# Cümle sonu sayılmayacak kısaltmalar (noktadan önceki kelime)
+_ABBREVIATIONS = {
+    "fig", "figs", "no", "nos", "vs", "dr", "mr", "mrs", "ms", "st", "vol", "pl",
+    "p", "pp", "ch", "ca", "cf", "e.g", "i.e", "etc", "şek", "bkz", "vb", "s"
+}
+
+
+# ============================================
+# CÜMLELER
+# ============================================
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    Metni cümlelere böler, (başlangıç, bitiş) offset'lerini döndürür.
+
+    Paragraf sonu (boş satır) her zaman cümle sonudur. Kısaltmalar
+    ("Fig. 3", "Dr. Benham") ve ondalık sayılar cümleyi bölmez.
+
+    Args:
+        text: Sayfa metni
+
+    Returns:
+        List[Tuple[int, int]]: text[start:end] = cümle (baştaki boşluk hariç)
+    """
+    spans: List[Tuple[int, int]] = []
+
+    for paragraph in re.finditer(r"\S(?:.|\n(?!\s*\n))*", text):
+        start = paragraph.start()
+        para_end = start + len(paragraph.group().rstrip())
+
+        for match in _SENTENCE_END.finditer(text, start, para_end):
+            word = re.search(r"([\w.]+)[.!?…]$", text[start:match.start() + 1])
+            if word and word.group(1).lower().rstrip(".") in _ABBREVIATIONS:
+                continue
+            spans.append((start, match.start() + 1))
+            start = match.end()
+
+        if start < para_end:
+            spans.append((start, para_end))
+
+    return spans
+
+
+def head_sentences(text: str, max_chars: int) -> str:
+    """Metnin başından, max_chars'ı aşmayan tam cümleler (en az bir cümle)."""
+    result_end = 0
+    for start, end in split_sentences(text):
+        if result_end and end > max_chars:
+            break
+        result_end = end
+    return text[:result_end].strip()
+
+
+def tail_sentences(text: str, max_chars: int) -> str:
+    """Metnin sonundan, max_chars'ı aşmayan tam cümleler (en az bir cümle)."""
+    result_start = len(text)
+    for start, end in reversed(split_sentences(text)):
+        if result_start < len(text) and len(text) - start > max_chars:
+            break
+        result_start = start
+    return text[result_start:].strip()
+
+
+def ends_mid_sentence(text: str) -> bool:
+    """Metin cümle ortasında mı bitiyor? (sayfa sonraki sayfada devam ediyor)"""
+    stripped = text.rstrip()
+    return bool(stripped) and stripped[-1] not in ".!?…:\"'”’)]"
+
+
+def starts_mid_sentence(text: str) -> bool:
+    """Metin cümle ortasında mı başlıyor? (önceki sayfanın devamı)"""
+    stripped = text.lstrip()
+    return bool(stripped) and stripped[0].islower()
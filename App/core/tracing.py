@@ -0,0 +1,389 @@
+"""
+============================================
+YASAA VISION - Span İzleme (Tracing)
+============================================
+Her fal okuması için bir kök span, altında her graph düğümü ve her
+OpenAI/MongoDB çağrısı için çocuk span'ler. Metrikler ortalamayı
+gösterir; tek bir yavaş okumanın şelale (waterfall) görünümü için
+span'ler gerekir.
+
+    reading                                   8.412 s
+    ├─ vision_scanner                         5.901 s
+    │  └─ openai_chat  model=gpt-4o           5.887 s
+    ├─ knowledge_retriever                    0.934 s
+    │  ├─ mongo_search  k=5                   0.813 s
+    │  │  └─ openai_embeddings                0.211 s
+    │  └─ mongo_find  cache.kb_pointer=hit    0.098 s
+    └─ fortune_teller                         1.560 s
+       └─ openai_chat  model=gpt-4o           1.551 s
+
+Span'ler contextvars ile taşınır: LangGraph düğümleri app.invoke ve
+app.stream içinde çalışırken (langchain'in thread havuzu context'i
+kopyalar) çağıranın kök span'ini ebeveyn olarak görür.
+
+Dışa aktarım collector gerektirmez, dosyaya yazılır:
+    jsonl → Biten her span bir satır (OTel alan adlarıyla)
+    otlp  → Kök span bitince tüm trace tek satır OTLP/JSON
+            (resourceSpans; OTel Collector file receiver formatı)
+
+Kullanım:
+    TRACING_ENABLED=true streamlit run app.py
+    python -m App.core.tracing traces.jsonl --slowest 3   # Şelale görünümü
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+TRACING_ENABLED: bool = settings.get("TRACING_ENABLED", "false").lower() == "true"
+TRACE_EXPORT_PATH: str = settings.get("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_EXPORT_FORMAT: str = settings.get("TRACE_EXPORT_FORMAT", "jsonl").lower()
+"""
+TRACING_ENABLED: Span üretimi (kapalıyken span() hiçbir şey yapmaz)
+TRACE_EXPORT_PATH: Span'lerin eklendiği dosya
+TRACE_EXPORT_FORMAT: jsonl (span başına satır) | otlp (trace başına OTLP/JSON satırı)
+"""
+
+EXPORT_FORMATS = ("jsonl", "otlp")
+if TRACE_EXPORT_FORMAT not in EXPORT_FORMATS:
+    raise ValueError(f"❌ Geçersiz TRACE_EXPORT_FORMAT: {TRACE_EXPORT_FORMAT} "
+                     f"(seçenekler: {', '.join(EXPORT_FORMATS)})")
+
+SERVICE_NAME = "yasaa-vision"
+
+# Kökü hiç bitmeyen trace'ler (çöken process) bellekte birikmesin
+_MAX_PENDING_SPANS = 10000
+
+
+# ============================================
+# SPAN
+# ============================================
+class Span:
+    """Tek bir işlem: ad, zaman aralığı, özellikler ve durum."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status = "error"
+        self.error = message
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        """jsonl formatındaki satır (OTel alan adları)."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON span nesnesi."""
+        otlp = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error or ""} if self.status == "error" else {"code": 1}
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _NoopSpan:
+    """Tracing kapalıyken dönen span; çağıran kod kontrol yapmak zorunda kalmaz."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("yasaa_current_span", default=None)
+
+
+# ============================================
+# DIŞA AKTARIM
+# ============================================
+class FileSpanExporter:
+    """
+    Span'leri dosyaya ekler (collector gerekmez).
+
+    jsonl: Her span bitince yazılır.
+    otlp: Span'ler trace bazında bekletilir, kök span bitince trace tek
+          satır resourceSpans olarak yazılır.
+    """
+
+    def __init__(self, path: str = TRACE_EXPORT_PATH, export_format: str = TRACE_EXPORT_FORMAT):
+        self.path = path
+        self.export_format = export_format
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Span]] = {}
+        self._pending_count = 0
+
+    def export(self, span: Span) -> None:
+        if self.export_format == "jsonl":
+            self._write(span.to_dict())
+            return
+
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            self._pending_count += 1
+            if span.parent_id is not None and self._pending_count < _MAX_PENDING_SPANS:
+                return
+            # Kök bitti (veya tampon doldu): trace'i yaz
+            spans = self._pending.pop(span.trace_id)
+            self._pending_count -= len(spans)
+
+        self._write({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "App.core.tracing"},
+                    "spans": [item.to_otlp() for item in spans]
+                }]
+            }]
+        })
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        try:
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    handle.write(line)
+        except OSError as e:
+            # İzleme asla okumayı bozmamalı
+            logger.warning(f"⚠️ Span yazılamadı ({self.path}): {e}")
+
+
+_exporter: Optional[FileSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> FileSpanExporter:
+    """Process genelinde tek exporter (ilk kullanımda oluşturulur)."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = FileSpanExporter()
+        return _exporter
+
+
+# ============================================
+# API
+# ============================================
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Yeni span açar; mevcut span varsa onun çocuğudur, yoksa yeni trace başlar.
+
+    Exception span'e hata olarak yazılır ve yeniden fırlatılır.
+
+    Kullanım:
+        with span("reading", messages=len(messages)) as root:
+            result = app.invoke(inputs)
+            root.set_attribute("is_hand_detected", result["is_hand_detected"])
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    current = Span(
+        name,
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.set_error(f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        get_exporter().export(current)
+
+
+def current_span() -> Any:
+    """Aktif span (yoksa veya tracing kapalıysa no-op span)."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def set_attribute(key: str, value: Any) -> None:
+    """Aktif span'e özellik ekler (span yoksa bir şey yapmaz)."""
+    current_span().set_attribute(key, value)
+
+
+# ============================================
+# ŞELALE GÖRÜNÜMÜ (CLI)
+# ============================================
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    """jsonl veya otlp dosyasındaki span'leri düz listeye çevirir."""
+    spans = []
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "resourceSpans" not in record:
+                spans.append(record)
+                continue
+            for resource in record["resourceSpans"]:
+                for scope in resource.get("scopeSpans", []):
+                    for item in scope.get("spans", []):
+                        attributes = {}
+                        for attribute in item.get("attributes", []):
+                            value = attribute["value"]
+                            attributes[attribute["key"]] = next(iter(value.values()), None)
+                        status = item.get("status", {})
+                        spans.append({
+                            "traceId": item["traceId"],
+                            "spanId": item["spanId"],
+                            "parentSpanId": item.get("parentSpanId"),
+                            "name": item["name"],
+                            "startTimeUnixNano": int(item["startTimeUnixNano"]),
+                            "endTimeUnixNano": int(item["endTimeUnixNano"]),
+                            "attributes": attributes,
+                            "status": "error" if status.get("code") == 2 else "ok",
+                            "error": status.get("message") or None
+                        })
+    return spans
+
+
+def format_waterfall(spans: List[Dict[str, Any]], width: int = 40) -> str:
+    """
+    Tek bir trace'in span'lerini ağaç + zaman çubuğu olarak çizer.
+
+    Args:
+        spans: Aynı traceId'ye ait span'ler
+        width: Zaman çubuğunun karakter genişliği
+
+    Returns:
+        str: Çok satırlı metin
+    """
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {item["spanId"] for item in spans}
+    for item in spans:
+        parent = item.get("parentSpanId") if item.get("parentSpanId") in ids else None
+        children.setdefault(parent, []).append(item)
+    for items in children.values():
+        items.sort(key=lambda item: item["startTimeUnixNano"])
+
+    start = min(item["startTimeUnixNano"] for item in spans)
+    end = max(item["endTimeUnixNano"] for item in spans)
+    total = max(end - start, 1)
+    lines = []
+
+    def walk(item: Dict[str, Any], prefix: str, connector: str) -> None:
+        offset = int((item["startTimeUnixNano"] - start) / total * width)
+        length = max(1, int((item["endTimeUnixNano"] - item["startTimeUnixNano"]) / total * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        details = " ".join(f"{key}={value}" for key, value in item.get("attributes", {}).items()
+                           if key in ("model", "k", "documents", "prompt_tokens", "completion_tokens")
+                           or key.startswith("cache."))
+        label = f"{prefix}{connector}{item['name']}" + (f"  {details}" if details else "")
+        flag = " ❌" if item.get("status") == "error" else ""
+        duration = (item["endTimeUnixNano"] - item["startTimeUnixNano"]) / 1e6
+        lines.append(f"{label[:72]:<72} {duration:>10.1f} ms |{bar:<{width}}|{flag}")
+
+        kids = children.get(item["spanId"], [])
+        child_prefix = prefix + ("" if not connector else ("   " if connector == "└─ " else "│  "))
+        for index, kid in enumerate(kids):
+            walk(kid, child_prefix, "└─ " if index == len(kids) - 1 else "├─ ")
+
+    for root in children.get(None, []):
+        walk(root, "", "")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Span dosyasından en yavaş okumaların şelale görünümü")
+    parser.add_argument("path", nargs="?", default=TRACE_EXPORT_PATH, help="jsonl/otlp span dosyası")
+    parser.add_argument("--slowest", type=int, default=5, help="Gösterilecek trace sayısı")
+    parser.add_argument("--name", default=None, help="Sadece bu addaki kök span'ler (örn. reading)")
+    args = parser.parse_args()
+
+    try:
+        spans = load_spans(args.path)
+    except FileNotFoundError:
+        print(f"❌ Dosya bulunamadı: {args.path}")
+        sys.exit(1)
+
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    for item in spans:
+        if item.get("endTimeUnixNano") is not None:
+            traces.setdefault(item["traceId"], []).append(item)
+
+    roots = [item for item in spans if not item.get("parentSpanId") and item["traceId"] in traces]
+    if args.name:
+        roots = [item for item in roots if item["name"] == args.name]
+    roots.sort(key=lambda item: item["endTimeUnixNano"] - item["startTimeUnixNano"], reverse=True)
+
+    print(f"📊 {len(traces)} trace, {len(spans)} span ({args.path})")
+    for root in roots[:args.slowest]:
+        print("\n" + "=" * 60)
+        print(f"🔎 trace {root['traceId']}")
+        print("=" * 60)
+        print(format_waterfall(traces[root["traceId"]]))
+
+
+if __name__ == "__main__":
+    main()
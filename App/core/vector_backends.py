@@ -0,0 +1,588 @@
+"""
+============================================
+YASAA VISION - Vector Arka Uçları (Araştırmacı)
+============================================
+Araştırmacı'nın parça araması ve tam sayfa okuması artık tek bir
+arayüzün arkasında; hangi arka ucun kullanılacağı VECTOR_BACKEND ile
+seçilir:
+
+    mongodb → MongoDB Atlas Vector Search (varsayılan; ingest buraya yazar)
+    chroma  → Yerel, kalıcı ChromaDB collection'ı (HNSW, cosine)
+    numpy   → Bellekte NumPy matrisi (tam tarama, tek matris çarpımı)
+
+Yerel arka uçlar aktif bilgi bankası versiyonunun aynasıdır ve
+App.ingest.sync_vectors ile doldurulur (embedding'ler yeniden
+hesaplanmaz, Mongo'dan kopyalanır). Tek makine kurulumları ve geliştirme
+ortamı harici veritabanı olmadan milisaniyeler içinde arar; kaset
+replay'i ile birlikte testler tamamen çevrimdışı koşar. Sorgunun
+embedding'i her arka uçta EMBEDDING_MODEL ile (kasetlenebilir) alınır.
+
+Arayüz (tüm arka uçlar):
+    backend.name
+    backend.similarity_search(query, k, include_scores=False) → List[Document]
+        metadata: ingest metadata'sı (_id, source, page, parent_id,
+        chunk_index, ...) + include_scores ise "score" (Atlas'ın cosine
+        ölçeği: (1 + cos) / 2, 0-1 arası)
+    backend.load_parents(parent_ids) → {parent_id: sayfa metni}
+
+Yerel dizin (VECTOR_LOCAL_DIR):
+    manifest.json           Aktif dosyalar, kaynak KB versiyonu, embedding modeli
+                            (başka senkronizasyondan taşınan bölüm kendi kb_version /
+                            embedding_model / pages değerlerini taşır)
+    pages.<damga>.db        Tam sayfalar (SQLite, iki arka uç ortak kullanır)
+    vectors.<damga>.npy     numpy: normalize edilmiş embedding matrisi (float32)
+    records.<damga>.jsonl   numpy: parça metni + metadata (satır = matris satırı)
+    chroma/                 chroma: <COLLECTION_NAME>_<damga> collection'ı
+
+Senkronizasyon yeni damgalı dosyaları yazar, manifest'i en son ve
+atomik olarak değiştirir; çalışan uygulama manifest değişince (her
+aramada tek stat) yeni dosyalara geçer.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from App.core.cassette import (
+    cassette_collection,
+    cassette_embeddings,
+    cassette_vector_store,
+    is_replaying,
+    mongo_client
+)
+from App.core.kb_pointer import PARENT_COLLECTION_NAME, ActiveVersionCache, versioned_name
+from App.core.metrics import instrumented_vector_store
+from App.core.settings import settings
+
+if TYPE_CHECKING:
+    # Sadece type hint; ağır kütüphaneler ilk kullanımda yüklenir
+    import numpy as np
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_mongodb import MongoDBAtlasVectorSearch
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+VECTOR_BACKEND: str = settings.get("VECTOR_BACKEND", "mongodb").lower()
+VECTOR_LOCAL_DIR: str = settings.get("VECTOR_LOCAL_DIR", "vector_local")
+
+DB_NAME: str = settings.get("DB_NAME", "YasaaVisionDB")
+COLLECTION_NAME: str = settings.get("COLLECTION_NAME", "palmistry_knowledge")
+INDEX_NAME: str = settings.get("INDEX_NAME", "vector_index")
+EMBEDDING_MODEL: str = settings.get("EMBEDDING_MODEL", "text-embedding-3-small")
+"""
+VECTOR_BACKEND: Araştırmacı'nın arka ucu (mongodb | chroma | numpy)
+- mongodb: Çok replikalı kurulumlar; ingest'ten hemen sonra güncel
+- chroma: Tek makine; büyük bilgi bankalarında HNSW ile alt-doğrusal arama
+- numpy: Tek makine / geliştirme / test; birkaç yüz bin parçaya kadar
+  tam tarama (kesin sonuç) milisaniyeler içinde
+VECTOR_LOCAL_DIR: Yerel arka uçların dosyaları (sync_vectors buraya yazar)
+"""
+
+BACKENDS: Tuple[str, ...] = ("mongodb", "chroma", "numpy")
+LOCAL_BACKENDS: Tuple[str, ...] = ("chroma", "numpy")
+MANIFEST_FILE = "manifest.json"
+
+# Arama sonucuna metadata olarak girmeyen alanlar
+_RECORD_FIELDS = ("text", "embedding")
+
+
+# ============================================
+# ORTAK: SORGU EMBEDDING'İ
+# ============================================
+_embeddings: Optional["OpenAIEmbeddings"] = None
+_embeddings_lock = threading.Lock()
+
+
+def get_query_embeddings() -> "OpenAIEmbeddings":
+    """
+    Sorgu embedding modeli (tüm arka uçlar; ingest'teki modelle aynı olmalı).
+
+    Raises:
+        ValueError: OPENAI_API_KEY eksikse (kaset replay'i hariç)
+    """
+    global _embeddings
+
+    with _embeddings_lock:
+        if _embeddings is None:
+            api_key = settings.secret("OPENAI_API_KEY")
+            if not api_key and not is_replaying():
+                raise ValueError("❌ OPENAI_API_KEY .env dosyasında bulunamadı!")
+
+            from langchain_openai import OpenAIEmbeddings
+
+            _embeddings = cassette_embeddings(lambda: OpenAIEmbeddings(
+                model=EMBEDDING_MODEL,
+                api_key=api_key
+            ), EMBEDDING_MODEL)
+        return _embeddings
+
+
+def cosine_to_score(cosine: float) -> float:
+    """Cosine benzerliğini Atlas'ın skor ölçeğine çevirir ((1 + cos) / 2)."""
+    return (1.0 + cosine) / 2.0
+
+
+def chunk_metadata(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Parça kaydının arama sonucunda görünen metadata'sı (metin ve embedding hariç)."""
+    metadata = {key: value for key, value in record.items() if key not in _RECORD_FIELDS}
+    if "_id" in metadata:
+        metadata["_id"] = str(metadata["_id"])
+    return metadata
+
+
+def _make_document(text: str, metadata: Dict[str, Any], score: float, include_scores: bool) -> Any:
+    from langchain_core.documents import Document
+
+    # Kopya: çağıran metadata'yı değiştirse de yüklü index bozulmaz
+    metadata = {**metadata, "score": score} if include_scores else dict(metadata)
+    return Document(page_content=text, metadata=metadata)
+
+
+# ============================================
+# MONGODB ATLAS
+# ============================================
+class MongoVectorBackend:
+    """
+    MongoDB Atlas Vector Search.
+
+    Aktif bilgi bankası versiyonu değişince (blue/green geçiş, bkz.
+    kb_pointer / kb_versions) aynı client ve embedding modeliyle yeni versiyonun
+    collection'larına geçer.
+    """
+
+    name = "mongodb"
+
+    def __init__(self, vector_store: Any = None, parents: Any = None):
+        """
+        Args:
+            vector_store: Hazır vector store (benchmark/test; bağlantı kurulmaz)
+            parents: Hazır parent collection'ı (vector_store ile birlikte verilir)
+
+        Raises:
+            ValueError: Gerekli environment değişkenleri eksikse
+        """
+        self._vector_store = vector_store
+        self._parents = parents
+        self._fixed = vector_store is not None
+        self._client: Any = None
+        self._active_version = ActiveVersionCache(base=COLLECTION_NAME)
+        if not self._fixed:
+            self._connect()
+
+    def _connect(self) -> None:
+        # Gerekli değişkenleri kontrol et (kaset replay modunda ağa gidilmez)
+        get_query_embeddings()
+        mongo_uri = settings.secret("MONGO_URI")
+        if not mongo_uri and not is_replaying():
+            raise ValueError("❌ MONGO_URI .env dosyasında bulunamadı!")
+
+        self._client = mongo_client(mongo_uri)
+        version = self._active_version.get(self._client[DB_NAME])
+        chunks = versioned_name(COLLECTION_NAME, version)
+        logger.info(f"🔌 MongoDB'ye bağlanılıyor: {DB_NAME}/{chunks} (v{version})")
+
+        self._vector_store = self._build_vector_store(self._client[DB_NAME][chunks])
+        logger.info("✅ MongoDB Vector Store bağlantısı kuruldu")
+
+    @staticmethod
+    def _build_vector_store(collection: Any) -> "MongoDBAtlasVectorSearch":
+        """Collection için vector store (CASSETTE_MODE'a göre kaydedilen / oynatılan)."""
+        from langchain_mongodb import MongoDBAtlasVectorSearch
+
+        embeddings = get_query_embeddings()
+        return cassette_vector_store(lambda: MongoDBAtlasVectorSearch(
+            collection=collection,
+            embedding=embeddings,
+            index_name=INDEX_NAME
+        ), collection, embeddings)
+
+    def vector_store(self) -> "MongoDBAtlasVectorSearch":
+        """Aktif versiyonun vector store'u (versiyon değiştiyse yenisi kurulur)."""
+        if self._fixed:
+            return self._vector_store
+
+        chunks = versioned_name(COLLECTION_NAME, self._active_version.get(self._client[DB_NAME]))
+        if self._vector_store.collection.name != chunks:
+            self._vector_store = self._build_vector_store(self._client[DB_NAME][chunks])
+        return self._vector_store
+
+    def _parent_collection(self) -> Any:
+        """Aktif versiyonun tam sayfalarının (embedding'siz) tutulduğu collection."""
+        if self._fixed:
+            return self._parents
+
+        parents = versioned_name(PARENT_COLLECTION_NAME, self._active_version.get(self._client[DB_NAME]))
+        return cassette_collection(self._client[DB_NAME][parents])
+
+    def similarity_search(self, query: str, k: int = 4, include_scores: bool = False, **kwargs: Any) -> List[Any]:
+        return self.vector_store().similarity_search(query=query, k=k, include_scores=include_scores, **kwargs)
+
+    def load_parents(self, parent_ids: Iterable[str]) -> Dict[str, str]:
+        cursor = self._parent_collection().find({"_id": {"$in": list(set(parent_ids))}}, {"text": 1})
+        return {parent["_id"]: parent["text"] for parent in cursor}
+
+
+# ============================================
+# YEREL DİZİN: MANIFEST + SAYFALAR
+# ============================================
+def read_manifest(directory: str = VECTOR_LOCAL_DIR) -> Optional[Dict[str, Any]]:
+    """Yerel index manifest'i (senkronize edilmemişse None)."""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(directory: str, manifest: Dict[str, Any]) -> None:
+    """Manifest'i atomik yazar (okuyan taraf yarım dosya görmez)."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def chroma_collection_name(stamp: str) -> str:
+    """Senkronizasyon damgalı Chroma collection adı (Chroma: 3-512 karakter, [a-zA-Z0-9._-])."""
+    return re.sub(r"[^a-zA-Z0-9._-]", "_", f"{COLLECTION_NAME}_{stamp}")
+
+
+class LocalPageStore:
+    """
+    Tam sayfalar (parent_id → metin), SQLite.
+
+    Çalışan uygulama salt okunur açar; sync_vectors write_pages ile
+    yeni damgalı dosyayı yazar.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def load(self, parent_ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(set(parent_ids))
+        if not ids:
+            return {}
+
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, text FROM pages WHERE id IN ({placeholders})", ids).fetchall()
+        return dict(rows)
+
+
+def write_pages(path: str, pages: Iterable[Dict[str, Any]]) -> int:
+    """
+    Parent sayfalarını yeni bir SQLite dosyasına yazar.
+
+    Args:
+        path: Hedef dosya (yoksa oluşturulur)
+        pages: {"_id", "text"} dökümanları
+
+    Returns:
+        int: Yazılan sayfa sayısı
+    """
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS pages (id TEXT PRIMARY KEY, text TEXT NOT NULL)")
+        count = 0
+        for page in pages:
+            conn.execute("INSERT OR REPLACE INTO pages (id, text) VALUES (?, ?)", (str(page["_id"]), page.get("text") or ""))
+            count += 1
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+# ============================================
+# YEREL ARKA UÇLAR
+# ============================================
+class _LocalVectorBackend(ABC):
+    """
+    Yerel arka uçların ortak kısmı: manifest takibi, sorgu embedding'i,
+    parent sayfaları.
+
+    Alt sınıflar _open(manifest, section) ve _search(vector, k,
+    include_scores) sağlamak zorundadır (eksikse sınıf örneklenemez).
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str = VECTOR_LOCAL_DIR):
+        """
+        Raises:
+            ValueError: Yerel index senkronize edilmemişse
+        """
+        self.directory = directory
+        self.manifest: Dict[str, Any] = {}
+        self._pages: Optional[LocalPageStore] = None
+        self._manifest_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def _refresh(self) -> None:
+        """Manifest değiştiyse (yeni senkronizasyon) yeni dosyaları yükler."""
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            if self._manifest_mtime is None:
+                raise ValueError(f"❌ Yerel vector index yok ({self.directory}); "
+                                 f"önce: python -m App.ingest.sync_vectors --target {self.name}")
+            return  # Manifest silindi: yüklü index'le devam
+
+        if mtime == self._manifest_mtime:
+            return
+
+        with self._lock:
+            if mtime == self._manifest_mtime:
+                return
+
+            manifest = read_manifest(self.directory) or {}
+            section = manifest.get(self.name)
+            if not section:
+                raise ValueError(f"❌ {self.name} index'i senkronize edilmemiş ({self.directory}); "
+                                 f"python -m App.ingest.sync_vectors --target {self.name}")
+            # Başka arka ucun senkronizasyonunda taşınan bölüm kendi
+            # versiyonunu, modelini ve sayfa dosyasını yanında getirir
+            embedding_model = section.get("embedding_model", manifest.get("embedding_model"))
+            if embedding_model != EMBEDDING_MODEL:
+                logger.warning(f"   ⚠️ Yerel index {embedding_model} ile kurulmuş, "
+                               f"sorgular {EMBEDDING_MODEL} ile; sonuçlar anlamsız olabilir")
+
+            self._open(manifest, section)
+            # Eski sayfa dosyasının bağlantısı, onu kullanan aramalar bitince kapanır
+            pages = section.get("pages", manifest["pages"])
+            self._pages = LocalPageStore(os.path.join(self.directory, pages["file"]))
+            self.manifest = manifest
+            self._manifest_mtime = mtime
+
+        logger.info(f"📂 Yerel vector index ({self.name}): {section['count']} parça, "
+                    f"KB v{section.get('kb_version', manifest.get('kb_version'))} ({self.directory})")
+
+    @abstractmethod
+    def _open(self, manifest: Dict[str, Any], section: Dict[str, Any]) -> None:
+        """Manifest'teki kendi bölümünün dosyalarını açar (kilit altında)."""
+
+    @abstractmethod
+    def _search(self, vector: List[float], k: int, include_scores: bool) -> List[Any]:
+        """Normalize edilmemiş sorgu vektörüne en yakın k parça (Document listesi)."""
+
+    def similarity_search(self, query: str, k: int = 4, include_scores: bool = False, **_: Any) -> List[Any]:
+        self._refresh()
+        vector = get_query_embeddings().embed_query(query)
+        return self._search(vector, k, include_scores)
+
+    def load_parents(self, parent_ids: Iterable[str]) -> Dict[str, str]:
+        self._refresh()
+        return self._pages.load(parent_ids)
+
+
+class NumpyVectorBackend(_LocalVectorBackend):
+    """
+    Bellekte tam tarama: normalize edilmiş matris × sorgu vektörü.
+
+    Sonuçlar kesindir (yaklaşık değil); 100 bin × 1536 boyutta bir
+    arama tek matris çarpımıdır (~10 ms), bu projenin bilgi bankası
+    boyutunda 1 ms'nin altında.
+    """
+
+    name = "numpy"
+
+    def _open(self, manifest: Dict[str, Any], section: Dict[str, Any]) -> None:
+        import numpy as np
+
+        vectors = np.load(os.path.join(self.directory, section["vectors"]))
+        with open(os.path.join(self.directory, section["records"]), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+        if len(records) != len(vectors):
+            raise ValueError(f"❌ numpy index bozuk: {len(vectors)} vektör, {len(records)} kayıt")
+
+        # Tek atama: eşzamanlı aramalar ya eski ya yeni çifti görür
+        self._index: Tuple["np.ndarray", List[Dict[str, Any]]] = (vectors, records)
+
+    def _search(self, vector: List[float], k: int, include_scores: bool) -> List[Any]:
+        import numpy as np
+
+        vectors, records = self._index
+        k = min(k, len(records))
+        if k <= 0:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm:
+            query = query / norm
+
+        cosines = vectors @ query
+        top = np.argpartition(-cosines, k - 1)[:k]
+        top = top[np.argsort(-cosines[top])]
+        return [
+            _make_document(records[i]["text"], records[i]["metadata"], cosine_to_score(float(cosines[i])), include_scores)
+            for i in top
+        ]
+
+
+class ChromaVectorBackend(_LocalVectorBackend):
+    """
+    Yerel, kalıcı ChromaDB (HNSW, cosine uzaklığı).
+
+    Chroma metadata'sı sadece skaler değer taşır; _id kayıt kimliğinden
+    geri konur.
+    """
+
+    name = "chroma"
+
+    def _open(self, manifest: Dict[str, Any], section: Dict[str, Any]) -> None:
+        import chromadb
+
+        client = chromadb.PersistentClient(path=os.path.join(self.directory, "chroma"))
+        self._collection = client.get_collection(section["collection"], embedding_function=None)
+
+    def _search(self, vector: List[float], k: int, include_scores: bool) -> List[Any]:
+        collection = self._collection
+        if k <= 0:
+            return []
+
+        result = collection.query(
+            query_embeddings=[list(vector)],
+            n_results=k,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            _make_document(text or "", {**(metadata or {}), "_id": doc_id},
+                           cosine_to_score(1.0 - distance), include_scores)
+            for doc_id, text, metadata, distance in zip(
+                result["ids"][0], result["documents"][0], result["metadatas"][0], result["distances"][0]
+            )
+        ]
+
+
+# ============================================
+# YEREL INDEX YAZICILARI (sync_vectors)
+# ============================================
+class NumpyIndexWriter:
+    """Parça batch'lerini damgalı .npy + .jsonl dosyalarına yazar."""
+
+    name = "numpy"
+
+    def __init__(self, directory: str, stamp: str):
+        self.directory = directory
+        self.vectors_file = f"vectors.{stamp}.npy"
+        self.records_file = f"records.{stamp}.jsonl"
+        self.count = 0
+        self._batches: List["np.ndarray"] = []
+        self._records = open(os.path.join(directory, self.records_file), "w", encoding="utf-8")
+
+    def add(self, chunks: List[Dict[str, Any]]) -> None:
+        import numpy as np
+
+        matrix = np.asarray([chunk["embedding"] for chunk in chunks], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._batches.append(matrix / norms)
+
+        for chunk in chunks:
+            self._records.write(json.dumps({"text": chunk.get("text") or "", "metadata": chunk_metadata(chunk)},
+                                           ensure_ascii=False, default=str) + "\n")
+        self.count += len(chunks)
+
+    def commit(self) -> Dict[str, Any]:
+        import numpy as np
+
+        self._records.close()
+        matrix = np.vstack(self._batches) if self._batches else np.zeros((0, 0), dtype=np.float32)
+        np.save(os.path.join(self.directory, self.vectors_file), matrix)
+        return {"vectors": self.vectors_file, "records": self.records_file, "count": self.count}
+
+    def discard(self) -> None:
+        self._records.close()
+        for name in (self.vectors_file, self.records_file):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _chroma_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Chroma'nın kabul ettiği metadata (skaler, None'sız; diğerleri JSON metni)."""
+    return {
+        key: value if isinstance(value, (str, int, float, bool)) else json.dumps(value, ensure_ascii=False, default=str)
+        for key, value in metadata.items()
+        if key != "_id" and value is not None
+    }
+
+
+class ChromaIndexWriter:
+    """Parça batch'lerini damgalı yeni bir Chroma collection'ına yazar."""
+
+    name = "chroma"
+
+    def __init__(self, directory: str, stamp: str):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=os.path.join(directory, "chroma"))
+        self.collection_name = chroma_collection_name(stamp)
+        self.collection = self.client.create_collection(
+            self.collection_name,
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None
+        )
+        self.count = 0
+
+    def add(self, chunks: List[Dict[str, Any]]) -> None:
+        self.collection.add(
+            ids=[str(chunk["_id"]) for chunk in chunks],
+            embeddings=[list(chunk["embedding"]) for chunk in chunks],
+            documents=[chunk.get("text") or "" for chunk in chunks],
+            metadatas=[_chroma_metadata(chunk_metadata(chunk)) for chunk in chunks]
+        )
+        self.count += len(chunks)
+
+    def commit(self) -> Dict[str, Any]:
+        return {"collection": self.collection_name, "count": self.count}
+
+    def discard(self) -> None:
+        self.client.delete_collection(self.collection_name)
+
+
+INDEX_WRITERS = {"numpy": NumpyIndexWriter, "chroma": ChromaIndexWriter}
+
+
+# ============================================
+# FABRİKA
+# ============================================
+def create_vector_backend(kind: str = VECTOR_BACKEND, directory: str = VECTOR_LOCAL_DIR) -> Any:
+    """
+    VECTOR_BACKEND'e göre arka ucu oluşturur.
+
+    Yerel aramalar metriklerde local_search servisi altında görünür
+    (Mongo araması kaset fabrikasında mongo_search olarak sarılır).
+
+    Raises:
+        ValueError: Bilinmeyen arka uç, eksik ayar veya senkronize edilmemiş yerel index
+    """
+    if kind == "mongodb":
+        return MongoVectorBackend()
+    if kind == "numpy":
+        backend = NumpyVectorBackend(directory)
+    elif kind == "chroma":
+        backend = ChromaVectorBackend(directory)
+    else:
+        raise ValueError(f"❌ Bilinmeyen VECTOR_BACKEND: {kind} ({' | '.join(BACKENDS)})")
+
+    return instrumented_vector_store(backend, backend, service="local_search")
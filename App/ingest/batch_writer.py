@@ -0,0 +1,246 @@
+"""
+============================================
+YASAA VISION - Toplu Embedding + Toplu Yazma
+============================================
+Sayfa başına bir embedding isteği + bir MongoDB insert yerine
+sayfaları tamponda biriktirip:
+- Tek istekte çok sayıda metni embed eder
+- Tek round trip'te sırasız (unordered) bulk upsert yapar
+
+Tampon şu durumlardan biri olunca boşaltılır (flush):
+- Metin sayısı EMBED_BATCH_SIZE'a ulaştı
+- Tahmini token toplamı EMBED_MAX_TOKENS_PER_REQUEST'e ulaştı
+- İlk bekleyen kayıt WRITE_FLUSH_SECONDS'tan eski
+
+Belge formatı MongoDBAtlasVectorSearch ile aynıdır:
+    {"text": ..., "embedding": [...], <metadata alanları>}
+
+Metadata'da "_id" varsa (chunker.make_chunk_id) belge upsert edilir:
+aynı parça tekrar yazılınca kopya oluşmaz, mevcut belge güncellenir.
+"_id" yoksa eskisi gibi düz insert yapılır.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+EMBED_BATCH_SIZE: int = int(settings.get("EMBED_BATCH_SIZE", "256"))
+EMBED_MAX_TOKENS_PER_REQUEST: int = int(settings.get("EMBED_MAX_TOKENS_PER_REQUEST", "250000"))
+WRITE_FLUSH_SECONDS: float = float(settings.get("WRITE_FLUSH_SECONDS", "30"))
+"""
+EMBED_BATCH_SIZE: Tek embedding isteğindeki en fazla metin sayısı
+    (OpenAI sınırı 2048 girdi; 256 güvenli ve bellek dostu)
+EMBED_MAX_TOKENS_PER_REQUEST: Tek istekteki en fazla tahmini token
+    (OpenAI sınırı ~300k token/istek; pay bırakıldı)
+WRITE_FLUSH_SECONDS: Tampon en fazla kaç saniye bekletilsin
+"""
+
+# Kaba token tahmini: ~3 karakter = 1 token (Türkçe/İngilizce karışık metin için temkinli)
+_CHARS_PER_TOKEN: int = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Metnin token sayısını kabaca tahmin eder (tokenizer yüklemeden)."""
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def upsert_documents(collection: Any, documents: List[Dict[str, Any]]) -> int:
+    """
+    "_id"'li belgeleri tek round trip'te upsert eder (embedding'siz kayıtlar için).
+
+    Returns:
+        int: Yazılan (eklenen + güncellenen) belge sayısı
+    """
+    if not documents:
+        return 0
+
+    # pymongo ilk yazmada yüklenir (worker'lar bu modülü import eder ama yazmaz)
+    from pymongo import ReplaceOne
+    from pymongo.errors import BulkWriteError
+
+    operations = [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents]
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.matched_count
+    except BulkWriteError as e:
+        logger.error(f"   ❌ Upsert'te {len(documents)} belgeden bazıları yazılamadı: "
+                     f"{e.details.get('writeErrors', [])[:1]}")
+        return e.details.get("nUpserted", 0) + e.details.get("nMatched", 0)
+
+
+# ============================================
+# TOPLU YAZICI
+# ============================================
+class BatchingWriter:
+    """
+    Metinleri tamponlayıp toplu embed eden ve toplu yazan yardımcı.
+
+    Kullanım:
+        writer = BatchingWriter(embeddings, collection)
+        for page in pages:
+            writer.add(text, metadata)
+        writer.flush()
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        collection: Any,
+        text_key: str = "text",
+        embedding_key: str = "embedding",
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_tokens: int = EMBED_MAX_TOKENS_PER_REQUEST,
+        flush_seconds: float = WRITE_FLUSH_SECONDS
+    ):
+        self.embeddings = embeddings
+        self.collection = collection
+        self.text_key = text_key
+        self.embedding_key = embedding_key
+        self.batch_size = max(batch_size, 1)
+        self.max_tokens = max_tokens
+        self.flush_seconds = flush_seconds
+
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._tokens: int = 0
+        self._first_added_at: Optional[float] = None
+
+        self.stats: Dict[str, int] = {
+            "embed_requests": 0,
+            "write_requests": 0,
+            "written": 0,
+            "failed": 0
+        }
+
+    def add(self, text: str, metadata: Dict[str, Any]) -> None:
+        """
+        Metni tampona ekler; eşiklerden biri aşılırsa tamponu boşaltır.
+
+        Args:
+            text: Embed edilecek metin
+            metadata: Belgeye eklenecek alanlar
+        """
+        tokens = estimate_tokens(text)
+
+        # Bu metin eklenince istek sınırı aşılacaksa önce mevcut tamponu gönder
+        if self._texts and self._tokens + tokens > self.max_tokens:
+            self.flush()
+
+        if self._first_added_at is None:
+            self._first_added_at = time.monotonic()
+
+        self._texts.append(text)
+        self._metadatas.append(metadata)
+        self._tokens += tokens
+
+        if len(self._texts) >= self.batch_size:
+            self.flush()
+        elif time.monotonic() - self._first_added_at >= self.flush_seconds:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Tampondaki metinleri tek istekte embed eder ve toplu yazar.
+
+        Returns:
+            int: Bu flush'ta yazılan belge sayısı
+        """
+        if not self._texts:
+            return 0
+
+        texts, metadatas = self._texts, self._metadatas
+        self._texts, self._metadatas = [], []
+        self._tokens = 0
+        self._first_added_at = None
+
+        return self._write(texts, metadatas)
+
+    def write_batch(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> int:
+        """
+        Verilen metinleri tampondan bağımsız, HEMEN yazar.
+
+        Metinler yine istek sınırlarına (adet + token) göre parçalanır.
+        Çağıran taraf kaç belgenin yazıldığını bilmek istediğinde
+        kullanılır (örn. manifest'e sadece başarıyla yazılan sayfaları
+        işlemek için).
+
+        Returns:
+            int: Yazılan belge sayısı
+        """
+        written = 0
+        chunk_texts: List[str] = []
+        chunk_metadatas: List[Dict[str, Any]] = []
+        chunk_tokens = 0
+
+        for text, metadata in zip(texts, metadatas):
+            tokens = estimate_tokens(text)
+            if chunk_texts and (len(chunk_texts) >= self.batch_size or chunk_tokens + tokens > self.max_tokens):
+                written += self._write(chunk_texts, chunk_metadatas)
+                chunk_texts, chunk_metadatas, chunk_tokens = [], [], 0
+
+            chunk_texts.append(text)
+            chunk_metadatas.append(metadata)
+            chunk_tokens += tokens
+
+        if chunk_texts:
+            written += self._write(chunk_texts, chunk_metadatas)
+
+        return written
+
+    def _write(self, texts: List[str], metadatas: List[Dict[str, Any]]) -> int:
+        """Tek embedding isteği + tek bulk upsert."""
+        # 1. Toplu embedding (tek HTTP isteği)
+        try:
+            vectors = self.embeddings.embed_documents(texts)
+            self.stats["embed_requests"] += 1
+        except Exception as e:
+            logger.error(f"   ❌ Toplu embedding hatası ({len(texts)} metin): {e}")
+            self.stats["failed"] += len(texts)
+            return 0
+
+        documents = [
+            {self.text_key: text, self.embedding_key: vector, **metadata}
+            for text, vector, metadata in zip(texts, vectors, metadatas)
+        ]
+
+        # 2. Sırasız bulk upsert (bir belge hata verse de diğerleri yazılır)
+        from pymongo import InsertOne, ReplaceOne
+        from pymongo.errors import BulkWriteError
+
+        operations = [
+            ReplaceOne({"_id": document["_id"]}, document, upsert=True) if "_id" in document
+            else InsertOne(document)
+            for document in documents
+        ]
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            written = result.inserted_count + result.upserted_count + result.matched_count
+        except BulkWriteError as e:
+            written = sum(e.details.get(key, 0) for key in ("nInserted", "nUpserted", "nMatched"))
+            logger.error(f"   ❌ Toplu yazmada {len(documents) - written} belge yazılamadı: "
+                         f"{e.details.get('writeErrors', [])[:1]}")
+        except Exception as e:
+            written = 0
+            logger.error(f"   ❌ Toplu yazma hatası ({len(documents)} belge): {e}")
+
+        self.stats["write_requests"] += 1
+        self.stats["written"] += written
+        self.stats["failed"] += len(documents) - written
+
+        logger.info(f"   💾 {written}/{len(documents)} belge toplu yazıldı")
+        return written
+
+    def close(self) -> None:
+        """Kalan tamponu yazar."""
+        self.flush()
@@ -0,0 +1,182 @@
+"""
+============================================
+YASAA VISION - Cümle Bazlı Parçalama (Chunking)
+============================================
+Sayfaları cümle sınırlarına hizalı küçük parçalara (chunk) böler.
+
+Eskiden:
+- Her sayfa TEK döküman olarak embed ediliyordu
+- Başına önceki sayfanın son 500 karakteri ekleniyordu (overlap)
+  → Aynı metin iki kez embed edilip iki kez saklanıyordu
+  → Arama sonucu olarak koca sayfalar prompt'a giriyordu
+
+Şimdi (small-to-big):
+- Parçalar (child) embed edilir ve aranır → isabetli eşleşme
+- Sayfanın tamamı (parent) embed EDİLMEDEN ayrı collection'da durur
+- Her parça parent_id + başlangıç/bitiş offset'i taşır
+- Retrieval sadece gerektiğinde parçayı sayfaya veya komşu sayfaya genişletir
+
+Kimlikler kararlıdır (tekrar çalıştırmada aynı _id → upsert, kopya yok):
+    parent: <type>:<file_hash[:16]>:<sayfa>
+    parça:  <file_hash[:16]>:<sayfa>:<parça no>:<pipeline versiyonu>
+
+Overlap yok: sayfa geçişindeki bağlam, retrieval sırasında komşu
+sayfadan cümle hizalı olarak eklenir. Cümle kuralları ve parent
+kimliği retrieval ile ortaktır (App.core.text, App.core.kb_pointer).
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+from App.core.kb_pointer import make_parent_id
+from App.core.text import split_sentences
+from App.core.settings import settings
+
+# ============================================
+# AYARLAR
+# ============================================
+CHUNK_MAX_CHARS: int = int(settings.get("CHUNK_MAX_CHARS", "1200"))
+CHUNK_MIN_CHARS: int = int(settings.get("CHUNK_MIN_CHARS", "200"))
+PARENT_COLLECTION_NAME: str = settings.get("PARENT_COLLECTION_NAME", "palmistry_pages")
+"""
+CHUNK_MAX_CHARS: Bir parçanın en fazla karakter sayısı (~300 token)
+CHUNK_MIN_CHARS: Bundan kısa son parça bir öncekiyle birleştirilir
+PARENT_COLLECTION_NAME: Tam sayfaların (embedding'siz) tutulduğu collection
+"""
+
+# Köşeli parantezli bölüm başlıkları ([DIAGRAM ANALYSIS], [EMBEDDED IMAGES]...)
+# her zaman yeni parça başlatır. "^" yok: match(text, pos) zaten pos'a
+# bağlıdır, "^" ise sadece metnin en başında eşleşirdi
+_SECTION_START = re.compile(r"\[[A-Z][A-Z _\-]+[\]:]")
+
+
+# ============================================
+# CÜMLELER
+# ============================================
+def _split_long(text: str, start: int, end: int, max_chars: int) -> List[Tuple[int, int]]:
+    """max_chars'tan uzun cümleyi kelime sınırından böler."""
+    pieces: List[Tuple[int, int]] = []
+
+    while end - start > max_chars:
+        cut = text.rfind(" ", start, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        pieces.append((start, cut))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+
+    if start < end:
+        pieces.append((start, end))
+    return pieces
+
+
+# ============================================
+# PARÇALAR
+# ============================================
+def chunk_text(
+    text: str,
+    max_chars: int = CHUNK_MAX_CHARS,
+    min_chars: int = CHUNK_MIN_CHARS
+) -> List[Dict[str, Any]]:
+    """
+    Metni cümle hizalı parçalara böler.
+
+    Cümleler max_chars dolana kadar aynı parçaya eklenir. Bölüm
+    başlığı ([DIAGRAM ANALYSIS] gibi) her zaman yeni parça başlatır.
+
+    Args:
+        text: Sayfa metni
+        max_chars: Parça üst sınırı
+        min_chars: Kısa son parça öncekiyle birleştirilir
+
+    Returns:
+        List[Dict[str, Any]]: {"text", "start", "end"} - text == metin[start:end]
+    """
+    spans: List[Tuple[int, int]] = []
+    for start, end in split_sentences(text):
+        spans.extend(_split_long(text, start, end, max_chars))
+
+    chunks: List[Tuple[int, int]] = []
+    current_start, current_end = None, None
+
+    for start, end in spans:
+        new_section = bool(_SECTION_START.match(text, start))
+
+        if current_start is not None and (new_section or end - current_start > max_chars):
+            chunks.append((current_start, current_end))
+            current_start = None
+
+        if current_start is None:
+            current_start = start
+        current_end = end
+
+    if current_start is not None:
+        chunks.append((current_start, current_end))
+
+    # Çok kısa son parçayı öncekine ekle (bölüm başlığı değilse)
+    if (len(chunks) > 1 and chunks[-1][1] - chunks[-1][0] < min_chars
+            and not _SECTION_START.match(text, chunks[-1][0])
+            and chunks[-1][1] - chunks[-2][0] <= max_chars + min_chars):
+        chunks[-2:] = [(chunks[-2][0], chunks[-1][1])]
+
+    return [{"text": text[start:end], "start": start, "end": end} for start, end in chunks]
+
+
+# ============================================
+# KAYITLAR
+# ============================================
+def make_chunk_id(file_hash: str, page: int, chunk_index: int, pipeline_version: str) -> str:
+    """
+    Parçanın kararlı kimliği.
+
+    Aynı kitap + sayfa + parça + pipeline versiyonu her zaman aynı _id'yi
+    verir; tekrar ingest kopya eklemez, mevcut belgenin üstüne yazar.
+    Prompt/ayar değişince versiyon değişir → yeni _id, eskisi temizlenir.
+    """
+    return f"{file_hash[:16]}:{page}:{chunk_index}:{pipeline_version}"
+
+
+def build_page_records(
+    content: str,
+    metadata: Dict[str, Any],
+    pipeline_version: str
+) -> Tuple[Dict[str, Any], List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Sayfa içeriğinden parent kaydı ve embed edilecek parçaları üretir.
+
+    Args:
+        content: Sayfanın nihai içeriği (text + Vision açıklamaları)
+        metadata: Sayfa metadata'sı; en az "type", "file_hash", "page"
+            (+ "pipeline": parent kimliğine girer)
+        pipeline_version: Parça kimliğine giren pipeline versiyonu
+
+    Returns:
+        Tuple[parent, chunks]:
+            parent: {"_id", "text", **metadata} (embedding'siz, parent collection'a)
+            chunks: [(parça metni, parça metadata'sı)] (embed edilip aranır,
+                    metadata'daki "_id" ile upsert edilir)
+    """
+    parent_id = make_parent_id(metadata["type"], metadata["file_hash"], metadata["page"], metadata.get("pipeline"))
+    parent = {"_id": parent_id, "text": content, **metadata}
+
+    pieces = chunk_text(content)
+    chunks = [
+        (piece["text"], {
+            **metadata,
+            "_id": make_chunk_id(metadata["file_hash"], metadata["page"], index, pipeline_version),
+            "pipeline_version": pipeline_version,
+            "parent_id": parent_id,
+            "chunk_index": index,
+            "chunk_count": len(pieces),
+            "start": piece["start"],
+            "end": piece["end"]
+        })
+        for index, piece in enumerate(pieces)
+    ]
+
+    return parent, chunks
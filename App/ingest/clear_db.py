@@ -1,30 +1,77 @@
-import os
-from dotenv import load_dotenv
+"""
+============================================
+YASAA VISION - Veritabanı Temizleme
+============================================
+Kullanım:
+    python -m App.ingest.clear_db                         # Kurulan versiyonun TÜM verisini sil (onaylı)
+    python -m App.ingest.clear_db all --force             # Canlı (aktif) versiyonu da sil
+    python -m App.ingest.clear_db remove "Cheiro.pdf"     # Tek kitabı sil
+    python -m App.ingest.clear_db replace "Cheiro.pdf"    # Tek kitabı yeniden işlenecek işaretle
+
+Kitap; dosya yolu, dosya adı veya içerik hash'inin başı ile verilebilir.
+
+Tüm komutlar ingest'in yazdığı bilgi bankası versiyonuna uygulanır
+(kb_versions: kurulan versiyon varsa o, yoksa aktif versiyon). Canlıyı
+boşaltmadan tam yeniden yükleme için: python -m App.ingest.kb_versions reindex
+
+all, retrieval'ın okuduğu aktif versiyonu boşaltmayı reddeder (kesinti);
+önce kb_versions build ile yeni versiyon kurulur, ya da --force verilir.
+
+remove  → Kitabın parçaları + parent sayfaları + manifest kayıtları silinir
+replace → Sadece manifest kayıtları silinir; eski parçalar yeni ingest
+          aynı _id'lerin üstüne yazıp artakalanları silene kadar aranmaya
+          devam eder (kitap aramada hiç boş kalmaz)
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import argparse
+from pathlib import Path
+from typing import List
+
 from pymongo import MongoClient
 
-# .env yükle (Ana dizinden)
-# Not: Bu dosya App/ingest içinde olduğu için .env bir üst dizinin üstünde olabilir
-# Garanti olsun diye path ayarı:
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(os.path.dirname(current_dir))  # Ablacim/
-load_dotenv(os.path.join(project_root, ".env"))
+from App.core.kb_pointer import read_pointer
+from App.ingest.kb_versions import write_target
+from App.ingest.manifest import IngestManifest, file_sha256
+from App.core.settings import settings
+
+# .env ana dizinden okunur (App.core.settings, DOTENV_PATH ile değiştirilebilir)
 
 # Ayarları Al
-MONGO_URI = os.getenv("MONGO_URI")
-DB_NAME = os.getenv("DB_NAME", "YasaaVisionDB")
-COLLECTION_NAME = os.getenv("COLLECTION_NAME", "palmistry_knowledge")
+MONGO_URI = settings.get("MONGO_URI")
+DB_NAME = settings.get("DB_NAME", "YasaaVisionDB")
+COLLECTION_NAME = settings.get("COLLECTION_NAME", "palmistry_knowledge")
+
 
+def clear_database(force: bool = False):
+    """
+    Ingest'in yazdığı versiyonun tüm parçalarını, sayfalarını ve manifest'ini siler.
 
-def clear_database():
+    Args:
+        force: Aktif (canlı) versiyon olsa bile sil
+    """
     if not MONGO_URI:
         print("❌ HATA: .env dosyası okunamadı veya MONGO_URI eksik.")
         return
 
-    print(f"🔌 MongoDB'ye bağlanılıyor... ({DB_NAME} / {COLLECTION_NAME})")
-
     try:
         client = MongoClient(MONGO_URI)
-        collection = client[DB_NAME][COLLECTION_NAME]
+        target = write_target(client[DB_NAME], COLLECTION_NAME)
+        print(f"🔌 MongoDB'ye bağlanılıyor... ({DB_NAME} / {target.chunks}, v{target.version})")
+
+        if target.version == read_pointer(client[DB_NAME], COLLECTION_NAME)["active"] and not force:
+            print(f"⛔ v{target.version} canlı versiyon: retrieval bu collection'dan okuyor, "
+                  f"silmek aramayı boşaltır.")
+            print("   Kesintisiz yeniden yükleme: python -m App.ingest.kb_versions reindex hybrid")
+            print("   (veya: kb_versions build → ingest → kb_versions switch)")
+            print("   Yine de silmek için: python -m App.ingest.clear_db all --force")
+            return
+
+        collection = client[DB_NAME][target.chunks]
+        parent_collection = client[DB_NAME][target.parents]
 
         # Mevcut kayıt sayısını say
         count_before = collection.count_documents({})
@@ -42,13 +89,109 @@ def clear_database():
 
         # TÜM VERİYİ SİL (Index'i korur, sadece veriyi siler)
         result = collection.delete_many({})
+        parent_collection.delete_many({})
+
+        # Manifest de sıfırlanmalı; yoksa ingest sayfaları "zaten işlenmiş" sayar
+        manifest = IngestManifest(target.manifest_path)
+        manifest.forget_all()
+        manifest.close()
 
         print(f"🗑️ SİLİNDİ: Toplam {result.deleted_count} belge yok edildi.")
-        print("✨ Veritabanı tertemiz! Şimdi yeni 'Overlap'li ingestion işlemini yapabilirsin.")
+        print("✨ Veritabanı tertemiz! Şimdi ingestion işlemini yeniden yapabilirsin.")
+
+    except Exception as e:
+        print(f"❌ Bir hata oluştu: {e}")
+
+
+def resolve_book(collection, manifest: IngestManifest, key: str) -> List[str]:
+    """
+    Kitabı içerik hash'ine çevirir.
+
+    Sıra: mevcut dosya yolu → manifest (ad/yol/hash öneki) → MongoDB "source" alanı
+
+    Returns:
+        List[str]: Eşleşen içerik hash'leri (aynı adlı farklı sürümler olabilir)
+    """
+    if Path(key).is_file():
+        return [file_sha256(Path(key))]
+
+    hashes = {file_hash for file_hash, _ in manifest.find_file_hashes(key)}
+    hashes.update(h for h in collection.distinct("file_hash", {"source": Path(key).name}) if h)
+    return sorted(hashes)
+
+
+def remove_book(key: str, replace: bool = False):
+    """
+    Tek bir kitabı siler (remove) veya yeniden işlenecek diye işaretler (replace).
+
+    Args:
+        key: Dosya yolu, dosya adı veya içerik hash'inin başı
+        replace: True → sadece manifest kayıtları silinir, veri yerinde kalır
+    """
+    if not MONGO_URI:
+        print("❌ HATA: .env dosyası okunamadı veya MONGO_URI eksik.")
+        return
+
+    client = MongoClient(MONGO_URI)
+    target = write_target(client[DB_NAME], COLLECTION_NAME)
+    print(f"📚 Hedef: v{target.version} ({target.chunks})")
+
+    collection = client[DB_NAME][target.chunks]
+    parent_collection = client[DB_NAME][target.parents]
+    manifest = IngestManifest(target.manifest_path)
+
+    try:
+        hashes = resolve_book(collection, manifest, key)
+        # file_hash'siz eski kayıtlar sadece kaynak adıyla bulunabilir
+        legacy_filter = {"source": Path(key).name, "file_hash": {"$exists": False}}
+        legacy_count = collection.count_documents(legacy_filter)
+
+        if not hashes and not legacy_count:
+            print(f"❌ Kitap bulunamadı: {key}")
+            return
+
+        for file_hash in hashes:
+            pages = manifest.forget_file(file_hash)
+            print(f"🗂️ {file_hash[:12]}: {pages} manifest kaydı silindi")
+
+            if replace:
+                continue
+
+            chunks = collection.delete_many({"file_hash": file_hash}).deleted_count
+            parents = parent_collection.delete_many({"file_hash": file_hash}).deleted_count
+            print(f"🗑️ {file_hash[:12]}: {chunks} parça, {parents} parent sayfa silindi")
+
+        if legacy_count and not replace:
+            deleted = collection.delete_many(legacy_filter).deleted_count
+            print(f"🗑️ {deleted} eski (file_hash'siz) kayıt silindi")
+
+        if replace:
+            print("♻️ Kitap yeniden işlenecek. Eski kayıtlar, yeni ingest bitene kadar aranmaya devam eder:")
+            print("   python -m App.ingest.ingest_hybrid   (veya ingest_scanned / ingest_batch)")
 
     except Exception as e:
         print(f"❌ Bir hata oluştu: {e}")
+    finally:
+        manifest.close()
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Yasaa Vision veritabanı temizleme")
+    parser.add_argument(
+        "command", nargs="?", default="all", choices=["all", "remove", "replace"],
+        help="all: her şeyi sil | remove: tek kitabı sil | replace: tek kitabı yeniden işlet"
+    )
+    parser.add_argument("book", nargs="?", help="Dosya yolu, dosya adı veya içerik hash'inin başı")
+    parser.add_argument("--force", action="store_true", help="all: aktif (canlı) versiyonu da sil")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    clear_database()
\ No newline at end of file
+    args = parse_arguments()
+
+    if args.command == "all":
+        clear_database(force=args.force)
+    elif not args.book:
+        print(f"❌ '{args.command}' için kitap belirtilmeli.")
+    else:
+        remove_book(args.book, replace=args.command == "replace")
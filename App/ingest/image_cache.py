@@ -0,0 +1,211 @@
+"""
+============================================
+YASAA VISION - Gömülü Resim Açıklama Önbelleği
+============================================
+PDF'lerdeki aynı resimlerin GPT-4o'ya tekrar tekrar
+gönderilmesini engeller.
+
+İki katman:
+1. Kitap içi xref hafızası:
+   Süsleme çerçeveleri, tekrarlanan levhalar, sayfa başlıkları
+   PDF içinde AYNI xref ile birçok sayfada kullanılır.
+   → Aynı kitapta aynı xref ikinci kez analiz edilmez.
+
+2. Global içerik hash önbelleği (SQLite, kalıcı):
+   Farklı xref'li ama byte-byte aynı resimler (veya başka kitaptaki
+   aynı resim, veya önceki çalıştırma) için.
+   → Anahtar: (resim SHA-256, prompt versiyonu)
+   → Prompt/model değişince eski açıklamalar kullanılmaz.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from App.core.metrics import record_cache
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+IMAGE_CACHE_PATH: str = settings.get("IMAGE_CACHE_PATH", "image_descriptions.db")
+
+# Açıklamanın nereden geldiği (istatistik için)
+SOURCE_MEMO = "memo"      # Aynı kitapta aynı xref
+SOURCE_CACHE = "cache"    # Kalıcı önbellekte aynı içerik
+SOURCE_VISION = "vision"  # Gerçek API çağrısı
+
+# Aynı anda hafızada tutulacak en fazla kitap sayısı
+# (paralel Vision thread'leri kitap sınırında iki kitabı birden işleyebilir)
+_MAX_MEMO_BOOKS: int = 4
+
+
+# ============================================
+# KALICI ÖNBELLEK
+# ============================================
+class ImageDescriptionCache:
+    """
+    (içerik hash'i, prompt versiyonu) → açıklama eşlemesini SQLite'ta tutar.
+    """
+
+    def __init__(self, path: str = IMAGE_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS image_descriptions (
+                    content_hash    TEXT NOT NULL,
+                    prompt_version  TEXT NOT NULL,
+                    description     TEXT NOT NULL,
+                    byte_size       INTEGER NOT NULL,
+                    created_at      TEXT NOT NULL,
+                    PRIMARY KEY (content_hash, prompt_version)
+                )
+            """)
+
+    def get(self, content_hash: str, prompt_version: str) -> Optional[str]:
+        """Önbellekteki açıklamayı döndürür (yoksa None)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT description FROM image_descriptions WHERE content_hash = ? AND prompt_version = ?",
+                (content_hash, prompt_version)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, content_hash: str, prompt_version: str, description: str, byte_size: int) -> None:
+        """Açıklamayı önbelleğe yazar."""
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO image_descriptions
+                    (content_hash, prompt_version, description, byte_size, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (content_hash, prompt_version, description, byte_size, datetime.now().isoformat()))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================
+# AÇIKLAYICI (memo + önbellek + vision)
+# ============================================
+class ImageDescriber:
+    """
+    Gömülü resim açıklamalarını önce hafızadan, sonra önbellekten,
+    en son Vision API'den alır.
+
+    Kullanım:
+        describer = ImageDescriber(cache, prompt_version)
+        describer.start_book(file_hash)
+        text, source = describer.describe(xref, image_bytes, analyze_fn)
+
+    Birden fazla thread farklı kitaplarda çalışıyorsa describe'a
+    book_key verilir; xref hafızası kitap bazında ayrı tutulur.
+    """
+
+    def __init__(self, cache: ImageDescriptionCache, prompt_version: str):
+        self.cache = cache
+        self.prompt_version = prompt_version
+        self._lock = threading.Lock()
+        self._book_key: Optional[str] = None
+        self._xref_memo: "OrderedDict[str, Dict[int, str]]" = OrderedDict()
+        self.stats: Dict[str, int] = {SOURCE_MEMO: 0, SOURCE_CACHE: 0, SOURCE_VISION: 0}
+
+    def start_book(self, book_key: str) -> None:
+        """
+        Yeni kitaba geçildiğini bildirir; xref hafızası sıfırlanır.
+
+        xref numaraları sadece kendi PDF'i içinde anlamlıdır.
+        """
+        with self._lock:
+            self._book_key = book_key
+            self._book_memo(book_key)
+
+    def describe(
+        self,
+        xref: int,
+        image_bytes: bytes,
+        analyze_fn: Callable[[bytes], str],
+        is_error: Optional[Callable[[str], bool]] = None,
+        book_key: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Resmin açıklamasını döndürür.
+
+        Args:
+            xref: Resmin PDF içindeki referansı
+            image_bytes: Resim verisi
+            analyze_fn: Önbellekte yoksa çağrılacak Vision fonksiyonu
+            is_error: Sonuç bir hata metni mi? (hatalar önbelleğe yazılmaz)
+            book_key: Resmin kitabı (verilmezse start_book ile seçilen kitap)
+            content_hash: Orijinal resmin hash'i (image_bytes küçültülmüş kopyaysa)
+
+        Returns:
+            Tuple[description, source]: Açıklama ve kaynağı (memo/cache/vision)
+        """
+        book_key = book_key or self._book_key
+
+        # 1. Aynı kitapta aynı xref
+        with self._lock:
+            memo_hit = self._book_memo(book_key).get(xref)
+        if memo_hit is not None:
+            self._count(SOURCE_MEMO)
+            return memo_hit, SOURCE_MEMO
+
+        # 2. Kalıcı içerik önbelleği
+        content_hash = content_hash or hashlib.sha256(image_bytes).hexdigest()
+        cached = self.cache.get(content_hash, self.prompt_version)
+        if cached is not None:
+            self._remember(book_key, xref, cached)
+            self._count(SOURCE_CACHE)
+            return cached, SOURCE_CACHE
+
+        # 3. Vision API
+        description = analyze_fn(image_bytes)
+        self._count(SOURCE_VISION)
+
+        if is_error is None or not is_error(description):
+            self.cache.put(content_hash, self.prompt_version, description, len(image_bytes))
+            self._remember(book_key, xref, description)
+
+        return description, SOURCE_VISION
+
+    def log_summary(self) -> None:
+        """Kaç Vision çağrısından tasarruf edildiğini loglar."""
+        saved = self.stats[SOURCE_MEMO] + self.stats[SOURCE_CACHE]
+        logger.info(f"   🖼️ Resim açıklamaları: {self.stats[SOURCE_VISION]} Vision çağrısı | "
+                    f"{saved} tekrar önlendi (xref: {self.stats[SOURCE_MEMO]}, "
+                    f"önbellek: {self.stats[SOURCE_CACHE]})")
+
+    def _book_memo(self, book_key: Optional[str]) -> Dict[int, str]:
+        """Kitabın xref hafızası (kilit altında çağrılır). En eski kitap düşürülür."""
+        memo = self._xref_memo.get(book_key)
+        if memo is None:
+            memo = self._xref_memo[book_key] = {}
+            while len(self._xref_memo) > _MAX_MEMO_BOOKS:
+                self._xref_memo.popitem(last=False)
+        else:
+            self._xref_memo.move_to_end(book_key)
+        return memo
+
+    def _remember(self, book_key: Optional[str], xref: int, description: str) -> None:
+        with self._lock:
+            self._book_memo(book_key)[xref] = description
+
+    def _count(self, source: str) -> None:
+        with self._lock:
+            self.stats[source] += 1
+        record_cache("image_description", hit=source != SOURCE_VISION)
@@ -0,0 +1,238 @@
+"""
+============================================
+YASAA VISION - Vision Görsel Optimizasyonu (Ingest)
+============================================
+Vision'a giden resimleri küçültür: daha az upload, daha az
+görsel token, daha düşük gecikme.
+
+Neden?
+- Sayfa her zaman 2x PNG olarak render ediliyordu (tam sayfa, renkli)
+- Gömülü resimler ham haliyle gidiyordu (çok MB'lık taramalar)
+- GPT-4o resmi zaten küçültür: önce 2048x2048 içine sığdırır, sonra
+  kısa kenarı 768'e indirir, 512'lik karolara böler (karo başı 170 token)
+  → Bu sınırdan büyük gönderilen her piksel boşa upload
+
+Yapılanlar:
+1. Render sadece diyagram bölgelerine kırpılır (clip)
+2. Zoom, sağlayıcının göreceği boyuta göre seçilir; karo sınırını
+   az farkla aşan resimler sınırın altına çekilir
+3. Renksiz (çizim, siyah-beyaz tarama) resimler gri tonlu JPEG
+4. Büyük gömülü resimler base64'ten önce küçültülür
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import io
+import math
+import logging
+from typing import Optional, Sequence, Tuple
+
+import fitz  # PyMuPDF
+from PIL import Image, ImageStat
+
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+IMAGE_JPEG_QUALITY: int = int(settings.get("IMAGE_JPEG_QUALITY", "85"))
+REGION_PADDING: float = float(settings.get("REGION_PADDING", "18"))
+TILE_SNAP_TOLERANCE: float = float(settings.get("TILE_SNAP_TOLERANCE", "0.12"))
+GRAYSCALE_SATURATION_MAX: float = float(settings.get("GRAYSCALE_SATURATION_MAX", "24"))
+"""
+IMAGE_JPEG_QUALITY: JPEG kalitesi (OCR için 80+ önerilir)
+REGION_PADDING: Kırpılan bölgenin etrafına bırakılan pay (pt) - etiketler kesilmesin
+TILE_SNAP_TOLERANCE: Karo sınırını en fazla bu oranda aşan resim sınıra küçültülür
+GRAYSCALE_SATURATION_MAX: Ortalama doygunluk (0-255) bunun altındaysa resim gri tonlu sayılır
+"""
+
+# GPT-4o (detail=high) ölçekleme sınırları
+_MAX_LONG_SIDE: int = 2048
+_MAX_SHORT_SIDE: int = 768
+_TILE_SIZE: int = 512
+
+# API'nin doğrudan kabul ettiği formatlar (diğerleri yeniden kodlanır)
+_API_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "GIF": "image/gif", "WEBP": "image/webp"}
+
+Box = Tuple[float, float, float, float]
+
+
+# ============================================
+# BOYUT HESABI
+# ============================================
+def fit_to_tiles(width: float, height: float) -> Tuple[int, int]:
+    """
+    Sağlayıcının resmi küçülteceği boyutu hesaplar; karo sınırını
+    az farkla aşıyorsa sınırın altına çeker.
+
+    Örn: A4 → 768x1087 = 2x3 karo. 1087, 1024 sınırını %6 aşıyor →
+    723x1024 = 2x2 karo (2 karo = 340 token daha az).
+
+    Args:
+        width: Piksel genişlik
+        height: Piksel yükseklik
+
+    Returns:
+        Tuple[int, int]: Gönderilmesi gereken en büyük (genişlik, yükseklik)
+    """
+    if width <= 0 or height <= 0:
+        return int(width), int(height)
+
+    # 1. 2048x2048 içine sığdır, 2. kısa kenar en fazla 768
+    scale = min(1.0, _MAX_LONG_SIDE / max(width, height))
+    scale = min(scale, _MAX_SHORT_SIDE / min(width, height))
+    width, height = width * scale, height * scale
+
+    # 3. Karo sınırına yakalama
+    snap = 1.0
+    for side in (width, height):
+        tiles = math.ceil(side / _TILE_SIZE)
+        boundary = (tiles - 1) * _TILE_SIZE
+        if boundary > 0 and (side - boundary) / side <= TILE_SNAP_TOLERANCE:
+            snap = min(snap, boundary / side)
+
+    return max(int(width * snap), 1), max(int(height * snap), 1)
+
+
+def choose_zoom(width_pt: float, height_pt: float, max_zoom: float) -> float:
+    """
+    Render zoom'unu sağlayıcının göreceği çözünürlüğe göre seçer.
+
+    Args:
+        width_pt: Render edilecek alanın genişliği (pt)
+        height_pt: Render edilecek alanın yüksekliği (pt)
+        max_zoom: Üst sınır (RENDER_ZOOM)
+
+    Returns:
+        float: Kullanılacak zoom (max_zoom'dan büyük olmaz)
+    """
+    if width_pt <= 0 or height_pt <= 0:
+        return max_zoom
+
+    target_width, _ = fit_to_tiles(width_pt * max_zoom, height_pt * max_zoom)
+    return target_width / width_pt
+
+
+def render_clip(page: fitz.Page, regions: Optional[Sequence[Box]] = None) -> fitz.Rect:
+    """
+    Render edilecek alanı döndürür: bölgelerin paylı birleşimi veya tam sayfa.
+
+    Args:
+        page: PyMuPDF sayfa objesi
+        regions: classify_layout'tan gelen diyagram bölgeleri (boşsa tam sayfa)
+
+    Returns:
+        fitz.Rect: Sayfa sınırları içinde kalan kırpma alanı
+    """
+    if not regions:
+        return page.rect
+
+    x0 = min(region[0] for region in regions) - REGION_PADDING
+    y0 = min(region[1] for region in regions) - REGION_PADDING
+    x1 = max(region[2] for region in regions) + REGION_PADDING
+    y1 = max(region[3] for region in regions) + REGION_PADDING
+
+    return fitz.Rect(x0, y0, x1, y1) & page.rect
+
+
+def render_size(page: fitz.Page, max_zoom: float, regions: Optional[Sequence[Box]] = None) -> Tuple[int, int]:
+    """render_for_vision'ın üreteceği resmin piksel boyutu (planlama için, render etmez)."""
+    clip = render_clip(page, regions)
+    zoom = choose_zoom(clip.width, clip.height, max_zoom)
+    return int(clip.width * zoom), int(clip.height * zoom)
+
+
+# ============================================
+# KODLAMA
+# ============================================
+def _is_grayscale(image: Image.Image) -> bool:
+    """Resim renksiz mi? (çizim, siyah-beyaz tarama)"""
+    if image.mode in ("1", "L", "LA"):
+        return True
+    thumbnail = image.convert("RGB")
+    thumbnail.thumbnail((64, 64))
+    saturation = thumbnail.convert("HSV").getchannel("S")
+    return ImageStat.Stat(saturation).mean[0] < GRAYSCALE_SATURATION_MAX
+
+
+def encode_for_vision(image: Image.Image) -> Tuple[bytes, str]:
+    """
+    Resmi Vision için JPEG'e çevirir (renksizse gri tonlu).
+
+    Returns:
+        Tuple[bytes, mime]: Kodlanmış resim ve MIME tipi
+    """
+    # Saydam alanlar JPEG'de siyaha dönmesin → beyaz zemine yerleştir
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        image = Image.alpha_composite(Image.new("RGBA", image.size, "white"), image)
+
+    image = image.convert("L") if _is_grayscale(image) else image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), "image/jpeg"
+
+
+def render_for_vision(
+    page: fitz.Page,
+    max_zoom: float,
+    regions: Optional[Sequence[Box]] = None
+) -> Tuple[bytes, str]:
+    """
+    Sayfayı (veya sadece diyagram bölgelerini) Vision için render eder.
+
+    Args:
+        page: PyMuPDF sayfa objesi
+        max_zoom: En fazla zoom (RENDER_ZOOM)
+        regions: Diyagram bölgeleri; verilirse render bunlara kırpılır
+
+    Returns:
+        Tuple[bytes, mime]: Kodlanmış resim ve MIME tipi
+    """
+    clip = render_clip(page, regions)
+    zoom = choose_zoom(clip.width, clip.height, max_zoom)
+
+    pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+    mode = "L" if pixmap.n == 1 else "RGB"
+    image = Image.frombytes(mode, (pixmap.width, pixmap.height), pixmap.samples)
+
+    return encode_for_vision(image)
+
+
+def optimize_image_bytes(image_bytes: bytes, ext: str = "png") -> Tuple[bytes, str]:
+    """
+    Gömülü resmi Vision'a gönderilecek boyuta indirir.
+
+    Sağlayıcının göreceğinden büyük, API'nin desteklemediği formatta
+    (JPX, TIFF...) veya alfa kanallı resimler yeniden kodlanır; zaten
+    küçük ve uygun olanlar olduğu gibi bırakılır.
+
+    Args:
+        image_bytes: doc.extract_image(xref)["image"]
+        ext: doc.extract_image(xref)["ext"] (Pillow açamazsa MIME için)
+
+    Returns:
+        Tuple[bytes, mime]: Resim ve MIME tipi
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image.load()
+    except Exception as e:
+        # Pillow açamıyorsa (örn. JBIG2) ham veriyi gönder
+        logger.debug(f"         ⚠️ Resim açılamadı, ham gönderiliyor: {e}")
+        return image_bytes, f"image/{'jpeg' if ext in ('jpg', 'jpeg') else ext}"
+
+    target_width, target_height = fit_to_tiles(*image.size)
+    oversized = image.size[0] > target_width or image.size[1] > target_height
+
+    if not oversized and image.format in _API_FORMATS and image.mode in ("L", "RGB", "P"):
+        return image_bytes, _API_FORMATS[image.format]
+
+    if oversized:
+        image = image.resize((target_width, target_height), Image.LANCZOS)
+
+    return encode_for_vision(image)
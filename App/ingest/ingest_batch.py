@@ -5,7 +5,10 @@ YASAA VISION - PDF Ingestion Pipeline (v2)
 Bu script, palmistry (el falı) kitaplarını işleyerek:
 1. PDF'lerden metin çıkarır
 2. Görselleri GPT-4o Vision ile analiz eder
+   (tekrarlanan görseller önbellekten gelir, tekrar analiz edilmez)
 3. Birleştirilmiş veriyi MongoDB Atlas'a vektör olarak kaydeder
+   (sayfalar cümle hizalı parçalara bölünür, toplu embed edilir, toplu yazılır;
+   sayfanın tamamı embedding'siz olarak parent collection'a yazılır)
 
 Yazar: Ahmet Ruçhan
 Tarih: 2024
@@ -15,20 +18,48 @@ Tarih: 2024
 # ============================================
 # IMPORTS - Gerekli Kütüphaneler
 # ============================================
+from __future__ import annotations             # Type hint'ler import anında çözülmez (lazy importlar için)
+
 import os                                      # İşletim sistemi işlemleri (dosya yolları vb.)
 import logging                                 # Log yönetimi (print yerine profesyonel loglama)
 import base64                                  # Görselleri base64 formatına çevirmek için
-from typing import Optional, List              # Type hints için tip tanımlamaları
+from typing import TYPE_CHECKING, Optional, List, Any, Dict  # Type hints için tip tanımlamaları
 
 import fitz                                    # PyMuPDF - PDF işleme kütüphanesi
-from dotenv import load_dotenv                 # .env dosyasından değişken okuma
-from pymongo import MongoClient                # MongoDB bağlantısı için driver
-from langchain_openai import (                 # OpenAI entegrasyonları
-    ChatOpenAI,                                # GPT-4o chat modeli
-    OpenAIEmbeddings                           # text-embedding-3-small
-)
 from langchain_core.messages import HumanMessage  # LangChain mesaj formatı
-from langchain_mongodb import MongoDBAtlasVectorSearch  # MongoDB vektör arama
+
+# Kendi modüllerimiz
+from App.core.cassette import (                # Kayıt/tekrar oynatma (CASSETTE_MODE)
+    cassette_chat_model,
+    cassette_embeddings,
+    cassette_vector_store,
+    is_replaying,
+    mongo_client
+)
+from App.ingest.batch_writer import (          # Toplu embedding + bulk upsert
+    BatchingWriter,
+    upsert_documents
+)
+from App.ingest.chunker import (               # Cümle hizalı parçalama (small-to-big)
+    CHUNK_MAX_CHARS,
+    CHUNK_MIN_CHARS,
+    build_page_records
+)
+from App.ingest.image_cache import (           # Görsel açıklama önbelleği
+    IMAGE_CACHE_PATH,
+    SOURCE_VISION,
+    ImageDescriber,
+    ImageDescriptionCache
+)
+from App.ingest.image_optimizer import optimize_image_bytes  # Vision öncesi küçültme
+from App.ingest.kb_versions import write_target  # Blue/green bilgi bankası versiyonu
+from App.ingest.manifest import file_sha256, fingerprint
+from App.core.settings import settings          # Lazy ayarlar (.env ilk okumada yüklenir)
+
+if TYPE_CHECKING:
+    # Sadece type hint; OpenAI/MongoDB client kütüphaneleri ilk kullanımda yüklenir
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    from langchain_mongodb import MongoDBAtlasVectorSearch
 
 
 # ============================================
@@ -46,42 +77,78 @@ logger = logging.getLogger(__name__)           # Bu modül için logger oluştur
 # ============================================
 # ENVIRONMENT DEĞİŞKENLERİ YÜKLEME
 # ============================================
-# .env dosyasını yükle (proje kök dizininde olmalı)
-load_dotenv()
+# .env (proje kök dizininde) ilk settings.get çağrısında bir kez yüklenir
 
 # --- API Anahtarları ---
-OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")      # OpenAI API anahtarı
-MONGO_URI: str = os.getenv("MONGO_URI", "")                # MongoDB bağlantı URI'si
+OPENAI_API_KEY: str = settings.get("OPENAI_API_KEY", "")      # OpenAI API anahtarı
+MONGO_URI: str = settings.get("MONGO_URI", "")                # MongoDB bağlantı URI'si
 
 # --- MongoDB Ayarları ---
-DB_NAME: str = os.getenv("DB_NAME", "YasaaVisionDB")                    # Veritabanı adı
-COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "palmistry_knowledge")  # Koleksiyon adı
-INDEX_NAME: str = os.getenv("INDEX_NAME", "vector_index")               # Vektör index adı
+DB_NAME: str = settings.get("DB_NAME", "YasaaVisionDB")                    # Veritabanı adı
+COLLECTION_NAME: str = settings.get("COLLECTION_NAME", "palmistry_knowledge")  # Koleksiyon adı
+INDEX_NAME: str = settings.get("INDEX_NAME", "vector_index")               # Vektör index adı
 
 # --- Model Ayarları ---
-VISION_MODEL: str = os.getenv("VISION_MODEL", "gpt-4o")                 # Görsel analiz modeli
-EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")  # Embedding modeli
-MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "3000"))                  # Maksimum token sayısı
+VISION_MODEL: str = settings.get("VISION_MODEL", "gpt-4o")                 # Görsel analiz modeli
+EMBEDDING_MODEL: str = settings.get("EMBEDDING_MODEL", "text-embedding-3-small")  # Embedding modeli
+MAX_TOKENS: int = int(settings.get("MAX_TOKENS", "3000"))                  # Maksimum token sayısı
 
 # --- Dosya Ayarları ---
-PDF_FOLDER: str = os.getenv("PDF_FOLDER", "pdf_storage")                # PDF klasör yolu
-MIN_IMAGE_SIZE: int = int(os.getenv("MIN_IMAGE_SIZE", "3000"))          # Min görsel boyutu (byte)
-LOG_INTERVAL: int = int(os.getenv("LOG_INTERVAL", "10"))                # Kaç sayfada bir log basılsın
+PDF_FOLDER: str = settings.get("PDF_FOLDER", "pdf_storage")                # PDF klasör yolu
+MIN_IMAGE_SIZE: int = int(settings.get("MIN_IMAGE_SIZE", "3000"))          # Min görsel boyutu (byte)
+LOG_INTERVAL: int = int(settings.get("LOG_INTERVAL", "10"))                # Kaç sayfada bir log basılsın
 
-# --- CHUNK OVERLAP AYARLARI ---
-OVERLAP_SIZE: int = int(os.getenv("OVERLAP_SIZE", "500"))               # Önceki sayfadan kaç karakter alınacak
+# --- PARÇALAMA (CHUNKING) ---
 """
-OVERLAP_SIZE: Sayfa sınırlarında bağlam kopukluğunu önler.
-- 500: ~3-4 cümle (önerilen)
-- 1000: ~6-8 cümle (daha fazla bağlam ama daha fazla token)
-- 0: Overlap kapalı
-
-Nasıl çalışır:
-    Sayfa 49'un son 500 karakteri → Sayfa 50'nin başına eklenir
-    Böylece cümle ortasında kopma sorunu çözülür.
+Sayfalar artık overlap ile değil, cümle hizalı parçalar halinde saklanır
+(bkz. App/ingest/chunker.py - CHUNK_MAX_CHARS, CHUNK_MIN_CHARS).
+
+Eskiden:
+    Sayfa 49'un son 500 karakteri → Sayfa 50'nin başına eklenirdi
+    → Aynı metin iki kez embed ediliyordu
+
+Şimdi:
+    Parçalar aranır; sayfa 49 cümle ortasında bitiyorsa retrieval,
+    sayfa 50'nin ilk cümlelerini parent collection'dan ekler.
 """
 
 
+# ============================================
+# VISION PROMPT (Diyagram Analizi)
+# ============================================
+# NOT: Yorum değil, sadece teknik betimleme istenmiş
+VISION_PROMPT_DIAGRAM: str = """
+**ROLE:** Expert Chiromancy (Palmistry) Archivist.
+
+**TASK:** Analyze this scientific diagram from a palmistry book.
+
+**INSTRUCTIONS:**
+1. Identify the specific line, mount, or hand shape shown.
+2. Describe length, depth, curvature of lines technically.
+3. Locate Marks (Stars, Crosses, Islands) relative to mounts accurately.
+4. Read any labels (A, B, C, numbers) if present in the diagram.
+5. Note any arrows or directional indicators.
+
+**OUTPUT FORMAT:**
+A single detailed paragraph description.
+Technical facts only - NO interpretations or predictions.
+Describe as if explaining to a blind person.
+"""
+
+# API hatasında dönen metin (önbelleğe YAZILMAZ)
+VISION_ERROR_TEXT: str = "[GÖRSEL ANALİZ BAŞARISIZ - API Hatası]"
+
+# Görsel açıklama önbelleği anahtarı: prompt veya model değişirse eski açıklamalar kullanılmaz
+IMAGE_PROMPT_VERSION: str = fingerprint(VISION_PROMPT_DIAGRAM, VISION_MODEL)
+
+# Parça kimlikleri: (kitap hash'i, sayfa, parça no, pipeline versiyonu)
+# Aynı kitap aynı ayarlarla tekrar işlenirse kopya eklenmez, üstüne yazılır
+PIPELINE_NAME: str = "batch"
+PIPELINE_VERSION: str = fingerprint(
+    PIPELINE_NAME, IMAGE_PROMPT_VERSION, EMBEDDING_MODEL, MIN_IMAGE_SIZE, CHUNK_MAX_CHARS, CHUNK_MIN_CHARS
+)
+
+
 # ============================================
 # DOĞRULAMA - Kritik değişkenler var mı?
 # ============================================
@@ -101,7 +168,8 @@ def validate_environment() -> bool:
     missing = []  # Eksik değişkenleri topla
 
     for var_name, var_value in required_vars.items():
-        if not var_value:
+        # Kaset replay modunda OpenAI/MongoDB'ye gidilmez
+        if not var_value and not is_replaying():
             missing.append(var_name)
 
     # Eksik varsa hata logla ve False döndür
@@ -126,18 +194,21 @@ def initialize_models() -> tuple[ChatOpenAI, OpenAIEmbeddings]:
     """
     logger.info(f"🤖 Modeller yükleniyor: Vision={VISION_MODEL}, Embedding={EMBEDDING_MODEL}")
 
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
     # GPT-4o Vision modeli (görsel analiz için)
-    llm = ChatOpenAI(
+    # CASSETTE_MODE=record/replay ise çağrılar kasete yazılır / kasetten okunur
+    llm = cassette_chat_model(lambda: ChatOpenAI(
         model=VISION_MODEL,           # gpt-4o
         api_key=OPENAI_API_KEY,       # API anahtarı
         max_tokens=MAX_TOKENS         # Maksimum çıktı token sayısı
-    )
+    ), VISION_MODEL)
 
     # Embedding modeli (vektörleştirme için)
-    embeddings = OpenAIEmbeddings(
+    embeddings = cassette_embeddings(lambda: OpenAIEmbeddings(
         model=EMBEDDING_MODEL,        # text-embedding-3-small
         api_key=OPENAI_API_KEY        # API anahtarı
-    )
+    ), EMBEDDING_MODEL)
 
     logger.info("✅ Modeller başarıyla yüklendi")
     return llm, embeddings
@@ -146,30 +217,33 @@ def initialize_models() -> tuple[ChatOpenAI, OpenAIEmbeddings]:
 # ============================================
 # MONGODB VECTOR STORE BAĞLANTISI
 # ============================================
-def get_vector_store(embeddings: OpenAIEmbeddings) -> MongoDBAtlasVectorSearch:
+def get_vector_store(embeddings: OpenAIEmbeddings, collection_name: str = COLLECTION_NAME) -> MongoDBAtlasVectorSearch:
     """
     MongoDB Atlas Vector Store bağlantısını oluşturur.
 
     Args:
         embeddings: OpenAI embedding modeli instance'ı
+        collection_name: Yazılacak bilgi bankası versiyonunun collection'ı
 
     Returns:
         MongoDBAtlasVectorSearch: Vektör store instance'ı
     """
-    logger.info(f"🔌 MongoDB'ye bağlanılıyor: {DB_NAME}/{COLLECTION_NAME}")
+    logger.info(f"🔌 MongoDB'ye bağlanılıyor: {DB_NAME}/{collection_name}")
+
+    from langchain_mongodb import MongoDBAtlasVectorSearch
 
     # MongoDB client oluştur
-    client = MongoClient(MONGO_URI)
+    client = mongo_client(MONGO_URI)
 
     # Collection referansını al
-    collection = client[DB_NAME][COLLECTION_NAME]
+    collection = client[DB_NAME][collection_name]
 
     # Vector store oluştur
-    vector_store = MongoDBAtlasVectorSearch(
+    vector_store = cassette_vector_store(lambda: MongoDBAtlasVectorSearch(
         collection=collection,        # MongoDB collection
         embedding=embeddings,         # Embedding modeli
         index_name=INDEX_NAME         # Atlas Search index adı
-    )
+    ), collection, embeddings)
 
     logger.info("✅ MongoDB bağlantısı kuruldu")
     return vector_store
@@ -180,7 +254,8 @@ def get_vector_store(embeddings: OpenAIEmbeddings) -> MongoDBAtlasVectorSearch:
 # ============================================
 def analyze_image_with_vision(
     llm: ChatOpenAI,
-    image_bytes: bytes
+    image_bytes: bytes,
+    ext: str = "jpeg"
 ) -> str:
     """
     Bir görseli GPT-4o Vision modeli ile analiz eder.
@@ -189,41 +264,23 @@ def analyze_image_with_vision(
     Args:
         llm: ChatOpenAI instance (GPT-4o)
         image_bytes: Görselin binary verisi
+        ext: PDF'teki orijinal format (doc.extract_image(xref)["ext"])
 
     Returns:
         str: Görselin teknik açıklaması
     """
-    # Görseli base64 formatına çevir (API için gerekli)
+    # Büyük görseli sağlayıcının göreceği boyuta indir, sonra base64'e çevir
+    image_bytes, mime = optimize_image_bytes(image_bytes, ext)
     base64_image = base64.b64encode(image_bytes).decode('utf-8')
 
-    # Vision analiz prompt'u
-    # NOT: Yorum değil, sadece teknik betimleme istenmiş
-    vision_prompt = """
-    **ROLE:** Expert Chiromancy (Palmistry) Archivist.
-    
-    **TASK:** Analyze this scientific diagram from a palmistry book.
-    
-    **INSTRUCTIONS:**
-    1. Identify the specific line, mount, or hand shape shown.
-    2. Describe length, depth, curvature of lines technically.
-    3. Locate Marks (Stars, Crosses, Islands) relative to mounts accurately.
-    4. Read any labels (A, B, C, numbers) if present in the diagram.
-    5. Note any arrows or directional indicators.
-    
-    **OUTPUT FORMAT:** 
-    A single detailed paragraph description. 
-    Technical facts only - NO interpretations or predictions.
-    Describe as if explaining to a blind person.
-    """
-
     # LangChain mesaj formatında hazırla
     message = HumanMessage(
         content=[
-            {"type": "text", "text": vision_prompt},  # Metin talimatı
+            {"type": "text", "text": VISION_PROMPT_DIAGRAM},  # Metin talimatı
             {
                 "type": "image_url",
                 "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_image}"  # Base64 görsel
+                    "url": f"data:{mime};base64,{base64_image}"  # Base64 görsel
                 }
             },
         ]
@@ -235,7 +292,7 @@ def analyze_image_with_vision(
         return response.content
     except Exception as e:
         logger.error(f"❌ Görsel analiz hatası: {e}")
-        return "[GÖRSEL ANALİZ BAŞARISIZ - API Hatası]"
+        return VISION_ERROR_TEXT
 
 
 # ============================================
@@ -245,7 +302,8 @@ def process_page(
     page: fitz.Page,
     page_number: int,
     doc: fitz.Document,
-    llm: ChatOpenAI
+    llm: ChatOpenAI,
+    describer: ImageDescriber
 ) -> Optional[str]:
     """
     Tek bir PDF sayfasını işler: metin + görseller.
@@ -255,6 +313,7 @@ def process_page(
         page_number: Sayfa numarası (1'den başlar)
         doc: PDF doküman objesi (görsel çıkarmak için)
         llm: ChatOpenAI instance
+        describer: Görsel açıklayıcı (xref hafızası + içerik önbelleği)
 
     Returns:
         Optional[str]: Birleştirilmiş içerik veya None
@@ -280,9 +339,14 @@ def process_page(
                 logger.debug(f"   ⏭️ Küçük görsel atlandı: {len(image_bytes)} bytes")
                 continue
 
-            # GPT-4o ile analiz et
+            # GPT-4o ile analiz et (daha önce görülmediyse)
             logger.info(f"   🖼️ Sayfa {page_number} - Görsel {img_index + 1} analiz ediliyor...")
-            description = analyze_image_with_vision(llm, image_bytes)
+            description, _ = describer.describe(
+                xref,
+                image_bytes,
+                lambda data: analyze_image_with_vision(llm, data, base_image.get("ext", "jpeg")),
+                is_error=lambda text: text == VISION_ERROR_TEXT
+            )
             visual_descriptions.append(f"[DIAGRAM {img_index + 1}]: {description}")
 
         except Exception as e:
@@ -309,32 +373,37 @@ def process_page(
 
 
 # ============================================
-# PDF İŞLEME FONKSİYONU (OVERLAP DESTEKLİ)
+# PDF İŞLEME FONKSİYONU (PARÇALI)
 # ============================================
 def process_pdf(
     pdf_path: str,
     llm: ChatOpenAI,
-    embeddings: OpenAIEmbeddings
+    writer: BatchingWriter,
+    describer: ImageDescriber,
+    parent_collection: Any = None
 ) -> int:
     """
-    Tek bir PDF dosyasını OVERLAP (örtüşme) desteğiyle işler.
+    Tek bir PDF dosyasını cümle hizalı parçalar halinde işler.
 
-    OVERLAP NEDİR?
+    PARÇALAMA NEDİR?
     Sayfa 49'un sonu: "...akıl çizgisi çatallı ise bu kişi..."
-    Sayfa 50'nin başı: "[Önceki sayfadan:] ...çatallı ise bu kişi..." + "...yaratıcı düşünce..."
+    → Sayfa 49'un son parçası kaydedilir, parent_id = sayfa 49
+    → Arama bu parçayı bulursa retrieval sayfa 50'nin ilk cümlelerini ekler
 
     Bu sayede:
-    - Cümle ortasında kopma sorunu çözülür
-    - Embedding modeli bağlamı anlar
-    - Arama kalitesi artar
+    - Cümle ortasında kopma sorunu çözülür (overlap olmadan)
+    - Aynı metin iki kez embed edilmez
+    - Arama daha isabetli parçalar döndürür
 
     Args:
         pdf_path: PDF dosyasının tam yolu
         llm: ChatOpenAI instance
-        embeddings: OpenAIEmbeddings instance
+        writer: Toplu embed eden / toplu yazan BatchingWriter
+        describer: Görsel açıklayıcı (xref hafızası + içerik önbelleği)
+        parent_collection: Tam sayfaların yazılacağı collection (None ise yazılmaz)
 
     Returns:
-        int: Başarıyla kaydedilen sayfa sayısı
+        int: Parçaları kaydedilen sayfa sayısı
     """
     file_name = os.path.basename(pdf_path)
 
@@ -343,22 +412,24 @@ def process_pdf(
         logger.error(f"❌ Dosya bulunamadı: {pdf_path}")
         return 0
 
-    # Vector store bağlantısı al
-    vector_store = get_vector_store(embeddings)
+    # xref'ler kitaba özeldir; yeni kitapta xref hafızası sıfırlanır
+    file_hash = file_sha256(pdf_path)
+    describer.start_book(file_hash)
 
     # PDF'i aç
     doc = fitz.open(pdf_path)
     total_pages = len(doc)
-    saved_count = 0
+    written_before = writer.stats["written"]
+    failed_before = writer.stats["failed"]
 
     logger.info(f"📘 KİTAP İŞLENİYOR: '{file_name}' ({total_pages} sayfa)")
-    logger.info(f"   🔗 Overlap aktif: {OVERLAP_SIZE} karakter")
 
     # ==========================================
-    # OVERLAP İÇİN HAFIZA DEĞİŞKENİ
+    # PARENT SAYFALAR
     # ==========================================
-    # Bir önceki sayfanın son kısmını burada tutuyoruz
-    previous_page_text_tail: str = ""
+    # Kitap bitince tek seferde yazılır (embedding'siz)
+    parents: List[Dict[str, Any]] = []
+    chunk_ids: List[str] = []
 
     # Her sayfayı işle
     for page_num, page in enumerate(doc):
@@ -371,39 +442,10 @@ def process_pdf(
         # ==========================================
         # ADIM 1: Mevcut Sayfanın Metnini Al
         # ==========================================
-        current_page_text = page.get_text()
-
-        # ==========================================
-        # ADIM 2: OVERLAP BİRLEŞTİRME
-        # ==========================================
-        # Embedding için kullanılacak metin:
-        # [Önceki Sayfanın Sonu] + [Şu Anki Sayfanın Tamamı]
-
-        text_for_embedding = ""
-
-        # Önceki sayfadan bağlam varsa ekle
-        if previous_page_text_tail and OVERLAP_SIZE > 0:
-            text_for_embedding += f"\n[...Sayfa {real_page_num - 1}'den devam...]\n"
-            text_for_embedding += previous_page_text_tail + "\n"
-            text_for_embedding += "[...Sayfa sonu...]\n\n"
-
-        # Şu anki sayfanın metnini ekle
-        text_for_embedding += current_page_text
-
-        # ==========================================
-        # ADIM 3: BU SAYFANIN SONUNU HAFIZAYA AL
-        # ==========================================
-        # Bir sonraki sayfa için bu sayfanın sonunu sakla
-        if OVERLAP_SIZE > 0:
-            if len(current_page_text) > OVERLAP_SIZE:
-                # Sayfanın son OVERLAP_SIZE karakterini al
-                previous_page_text_tail = current_page_text[-OVERLAP_SIZE:]
-            else:
-                # Sayfa kısaysa tamamını al
-                previous_page_text_tail = current_page_text
+        current_page_text = page.get_text().strip()
 
         # ==========================================
-        # ADIM 4: GÖRSELLERİ İŞLE
+        # ADIM 2: GÖRSELLERİ İŞLE
         # ==========================================
         image_list = page.get_images(full=True)
         visual_descriptions: List[str] = []
@@ -419,8 +461,16 @@ def process_pdf(
                 if len(image_bytes) < MIN_IMAGE_SIZE:
                     continue
 
-                logger.info(f"   🖼️ Sayfa {real_page_num} - Görsel {img_index + 1} analiz ediliyor...")
-                description = analyze_image_with_vision(llm, image_bytes)
+                description, source = describer.describe(
+                    xref,
+                    image_bytes,
+                    lambda data: analyze_image_with_vision(llm, data, base_image.get("ext", "jpeg")),
+                    is_error=lambda text: text == VISION_ERROR_TEXT
+                )
+                if source == SOURCE_VISION:
+                    logger.info(f"   🖼️ Sayfa {real_page_num} - Görsel {img_index + 1} analiz edildi")
+                else:
+                    logger.info(f"   ♻️ Sayfa {real_page_num} - Görsel {img_index + 1} önbellekten ({source})")
                 visual_descriptions.append(f"[DIAGRAM {img_index + 1}]: {description}")
 
             except Exception as e:
@@ -428,47 +478,78 @@ def process_pdf(
                 continue
 
         # ==========================================
-        # ADIM 5: NİHAİ İÇERİK BİRLEŞTİRME
+        # ADIM 3: NİHAİ İÇERİK BİRLEŞTİRME
         # ==========================================
-        combined_content = f"--- PAGE {real_page_num} START ---\n"
-        combined_content += text_for_embedding  # Artık overlap içeriyor!
+        # Sayfa numarası metadata'da; metne PAGE START/END işareti konmaz
+        # (sayfanın cümle ortasında bitip bitmediği metnin sonundan anlaşılır)
+        combined_content = current_page_text
 
         if visual_descriptions:
-            combined_content += "\n\n--- VISUAL CONTENTS ---\n"
+            combined_content += "\n\n[VISUAL CONTENTS]\n"
             combined_content += "\n".join(visual_descriptions)
 
-        combined_content += f"\n--- PAGE {real_page_num} END ---"
-
         # Boş sayfa kontrolü
         if len(combined_content.strip()) < 50:
             continue
 
         # ==========================================
-        # ADIM 6: MongoDB'ye Kaydet
+        # ADIM 4: Parçala ve Toplu Yazıcıya Ver
         # ==========================================
-        try:
-            metadata = {
-                "source": file_name,
-                "page": real_page_num,
-                "type": "hybrid_book_page",
-                "has_overlap": OVERLAP_SIZE > 0  # Overlap bilgisi
-            }
-
-            vector_store.add_texts(
-                texts=[combined_content],
-                metadatas=[metadata]
-            )
-            saved_count += 1
-
-        except Exception as e:
-            logger.error(f"   ❌ Kayıt hatası (sayfa {real_page_num}): {e}")
-            continue
+        # Parçalar hemen yazılmaz; tampon dolunca (veya süre dolunca)
+        # tek embedding isteği + tek bulk upsert ile gider
+        metadata = {
+            "source": file_name,
+            "file_hash": file_hash,
+            "page": real_page_num,
+            "type": "hybrid_book_page",
+            "pipeline": PIPELINE_NAME
+        }
+
+        parent, chunks = build_page_records(combined_content, metadata, PIPELINE_VERSION)
+        parents.append(parent)
+        for chunk_text, chunk_metadata in chunks:
+            chunk_ids.append(chunk_metadata["_id"])
+            writer.add(chunk_text, chunk_metadata)
 
     # PDF'i kapat
     doc.close()
 
-    logger.info(f"✅ TAMAMLANDI: '{file_name}' - {saved_count}/{total_pages} sayfa (overlap: {OVERLAP_SIZE})")
-    return saved_count
+    # Parent sayfaları yaz (kararlı _id → tekrar çalıştırmada kopya yok)
+    parents_written = len(parents)
+    if parent_collection is not None:
+        parents_written = upsert_documents(parent_collection, parents)
+
+    # Kitabın kalan parçalarını yaz
+    writer.flush()
+    saved_count = writer.stats["written"] - written_before
+
+    # Kitap tam yazıldıysa bu kitabın artık üretilmeyen parçalarını ve
+    # sayfalarını sil (eski pipeline versiyonu, azalan parça sayısı, _id'siz
+    # eski kayıtlar). Eski (versiyonsuz) kayıtlardan sadece bu pipeline'ın
+    # yazdıkları gider: ingest_hybrid'in eski kayıtlarında processing_mode var
+    if writer.stats["failed"] == failed_before and parents_written == len(parents):
+        stale = writer.collection.delete_many({
+            "$or": [
+                {"file_hash": file_hash, "pipeline": PIPELINE_NAME},
+                {"source": file_name, "type": "hybrid_book_page", "file_hash": {"$exists": False},
+                 "processing_mode": {"$exists": False}}
+            ],
+            "_id": {"$nin": chunk_ids}
+        })
+        if stale.deleted_count:
+            logger.info(f"   🧹 {stale.deleted_count} eski parça silindi")
+
+        if parent_collection is not None:
+            stale_parents = parent_collection.delete_many({
+                "file_hash": file_hash,
+                "pipeline": PIPELINE_NAME,
+                "_id": {"$nin": [parent["_id"] for parent in parents]}
+            })
+            if stale_parents.deleted_count:
+                logger.info(f"   🧹 {stale_parents.deleted_count} eski sayfa silindi")
+
+    logger.info(f"✅ TAMAMLANDI: '{file_name}' - {len(parents)}/{total_pages} sayfa, {saved_count} parça")
+    return len(parents)
 
 
 # ============================================
@@ -512,6 +593,17 @@ def batch_process_pdfs(folder_path: str) -> dict:
     # Modelleri başlat (bir kez)
     llm, embeddings = initialize_models()
 
+    # Toplu yazıcı (vector store ile aynı koleksiyon ve alan adları)
+    # Yazılacak bilgi bankası versiyonu: kurulan varsa o, yoksa aktif
+    target = write_target(mongo_client(MONGO_URI)[DB_NAME])
+    vector_store = get_vector_store(embeddings, target.chunks)
+    writer = BatchingWriter(embeddings, vector_store.collection)
+    parent_collection = vector_store.collection.database[target.parents]
+
+    # Görsel açıklama önbelleği (çalıştırmalar arası kalıcı)
+    image_cache = ImageDescriptionCache(IMAGE_CACHE_PATH)
+    describer = ImageDescriber(image_cache, IMAGE_PROMPT_VERSION)
+
     # Her PDF'i sırayla işle
     for index, pdf_file in enumerate(pdf_files, start=1):
         logger.info(f"\n{'='*50}")
@@ -521,7 +613,7 @@ def batch_process_pdfs(folder_path: str) -> dict:
         full_path = os.path.join(folder_path, pdf_file)
 
         try:
-            pages_saved = process_pdf(full_path, llm, embeddings)
+            pages_saved = process_pdf(full_path, llm, writer, describer, parent_collection)
             results["total_pages"] += pages_saved
             results["processed_files"].append({
                 "file": pdf_file,
@@ -532,6 +624,13 @@ def batch_process_pdfs(folder_path: str) -> dict:
             logger.error(f"❌ İşlem hatası: {error_msg}")
             results["errors"].append(error_msg)
 
+    writer.close()
+    describer.log_summary()
+    image_cache.close()
+
+    logger.info(f"   📡 Round trip: {writer.stats['embed_requests']} embedding isteği, "
+                f"{writer.stats['write_requests']} bulk insert")
+
     return results
 
 
@@ -8,32 +8,113 @@ Bu dosya hem text-based hem taranmış PDF'leri akıllıca işler.
 - Text varsa → Text'i al
 - Text yoksa → Vision ile oku
 - Gömülü resim varsa → HER ZAMAN Vision'a gönder
-- Diyagram keyword varsa → Sayfayı render edip Vision'a gönder
-- Overlap → Sayfa geçişlerinde bağlam korunur
+- Resimlerle karşılanmamış diyagram varsa (çizim/resim/altyazı geometrisi)
+  → Sayfayı render edip Vision'a gönder
+- Cümle hizalı parçalar (chunk) → parçalar aranır, tam sayfa (parent)
+  ayrı tutulur; sayfa geçişindeki bağlam retrieval'da eklenir (overlap yok)
+- Render/text çıkarma → Process pool'da, tüm kitaplarda paralel
+- Manifest → Kaldığı yerden devam eder, kopya PDF/sayfa yazmaz
+- Tekrarlanan gömülü resimler → xref hafızası + kalıcı önbellek (tek Vision çağrısı)
+- Akışlı pipeline → extract → vision → embed+write, sınırlı kuyruklar
+  (bellek kullanımı kitap uzunluğundan bağımsız)
 
 Kullanım:
-    python -m App.ingest.ingest_hybrid
+    python -m App.ingest.ingest_hybrid                      # Direkt çalıştır
+    python -m App.ingest.ingest_hybrid plan                 # Maliyet/süre planı (ağ çağrısı yok)
+    python -m App.ingest.ingest_hybrid execute --budget 20  # Planı bütçe tavanıyla çalıştır
 
 Yazar: Ahmet Ruçhan
 Tarih: 2024
 ============================================
 """
 
-import os
+from __future__ import annotations  # Type hint'ler import anında çözülmez (lazy importlar için)
+
 import sys
 import base64
+import hashlib
 import logging
+import argparse
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple
 from datetime import datetime
 
 import fitz  # PyMuPDF
-from dotenv import load_dotenv
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from langchain_core.documents import Document
-from pymongo import MongoClient
+from App.core.cassette import (
+    cassette_chat_model,
+    cassette_embeddings,
+    cassette_vector_store,
+    is_replaying,
+    mongo_client
+)
+from App.ingest.batch_writer import BatchingWriter
+from App.ingest.chunker import (
+    CHUNK_MAX_CHARS,
+    CHUNK_MIN_CHARS,
+    build_page_records
+)
+from App.ingest.image_cache import (
+    IMAGE_CACHE_PATH,
+    SOURCE_VISION,
+    ImageDescriber,
+    ImageDescriptionCache
+)
+from App.ingest.image_optimizer import (
+    fit_to_tiles,
+    optimize_image_bytes,
+    render_for_vision,
+    render_size
+)
+from App.ingest.kb_versions import version_target, write_target
+from App.ingest.layout_classifier import (
+    LAYOUT_CAPTION_DISTANCE,
+    LAYOUT_COVERAGE_RATIO,
+    LAYOUT_MERGE_DISTANCE,
+    LAYOUT_MIN_DRAWING_PATHS,
+    LAYOUT_MIN_REGION_RATIO,
+    classify_layout
+)
+from App.ingest.manifest import (
+    COMMIT_BATCH_SIZE,
+    IngestManifest,
+    PageBatchCommitter,
+    dedupe_pdfs,
+    filter_pending_jobs,
+    fingerprint
+)
+from App.ingest.page_workers import (
+    EXTRACT_WORKERS,
+    build_page_jobs,
+    iter_page_results,
+    open_worker_document
+)
+from App.ingest.planner import (
+    INGEST_BUDGET_USD,
+    PLAN_PATH,
+    BudgetedChatModel,
+    BudgetExceeded,
+    BudgetGuard,
+    load_plan,
+    log_plan_summary,
+    page_estimate,
+    select_within_budget,
+    vision_call_estimate,
+    write_plan
+)
+from App.ingest.pipeline import (
+    PIPELINE_QUEUE_SIZE,
+    VISION_CONCURRENCY,
+    Stage,
+    run_pipeline
+)
+from App.core.settings import settings
+
+if TYPE_CHECKING:
+    # Sadece type hint. Render worker'ları (spawn) bu modülü import eder;
+    # langchain/OpenAI client'ları ana process'te, ilk kullanımda yüklenir
+    from langchain_openai import ChatOpenAI
+    from langchain_mongodb import MongoDBAtlasVectorSearch
 
 # ============================================
 # LOGGING
@@ -45,39 +126,26 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ============================================
-# ENVIRONMENT
+# ENVIRONMENT (.env, App.core.settings ile ilk okumada yüklenir)
 # ============================================
-load_dotenv()
-
-OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-MONGO_URI: str = os.getenv("MONGO_URI", "")
-DB_NAME: str = os.getenv("DB_NAME", "YasaaVisionDB")
-COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "palmistry_knowledge")
-INDEX_NAME: str = os.getenv("INDEX_NAME", "vector_index")
+OPENAI_API_KEY: str = settings.get("OPENAI_API_KEY", "")
+MONGO_URI: str = settings.get("MONGO_URI", "")
+DB_NAME: str = settings.get("DB_NAME", "YasaaVisionDB")
+COLLECTION_NAME: str = settings.get("COLLECTION_NAME", "palmistry_knowledge")
+INDEX_NAME: str = settings.get("INDEX_NAME", "vector_index")
 
 # PDF klasörü
-PDF_FOLDER: str = os.getenv("PDF_FOLDER", "pdf_storage")
+PDF_FOLDER: str = settings.get("PDF_FOLDER", "pdf_storage")
 
 # Model ayarları
-VISION_MODEL: str = os.getenv("VISION_MODEL", "gpt-4o")
-VISION_MAX_TOKENS: int = int(os.getenv("VISION_MAX_TOKENS", "3000"))
-EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+VISION_MODEL: str = settings.get("VISION_MODEL", "gpt-4o")
+VISION_MAX_TOKENS: int = int(settings.get("VISION_MAX_TOKENS", "3000"))
+EMBEDDING_MODEL: str = settings.get("EMBEDDING_MODEL", "text-embedding-3-small")
 
 # Hibrit ayarlar
-MIN_TEXT_LENGTH: int = int(os.getenv("MIN_TEXT_LENGTH", "500"))
-RENDER_ZOOM: float = float(os.getenv("RENDER_ZOOM", "2.0"))
-OVERLAP_SIZE: int = int(os.getenv("OVERLAP_SIZE", "500"))
-MIN_IMAGE_SIZE: int = int(os.getenv("MIN_IMAGE_SIZE", "3000"))
-
-# Diyagram anahtar kelimeleri
-DIAGRAM_KEYWORDS = [
-    # İngilizce
-    "Fig", "Figure", "Plate", "Diagram", "See illustration",
-    "Mount", "Line", "drawing", "sketch", "chart", "image",
-    # Türkçe
-    "Şekil", "Çizim", "Resim", "Diyagram", "Tablo",
-    "Çizgi", "Tepe", "şekilde", "görüldüğü", "bakınız"
-]
+MIN_TEXT_LENGTH: int = int(settings.get("MIN_TEXT_LENGTH", "500"))
+RENDER_ZOOM: float = float(settings.get("RENDER_ZOOM", "2.0"))
+MIN_IMAGE_SIZE: int = int(settings.get("MIN_IMAGE_SIZE", "3000"))
 
 
 # ============================================
@@ -124,36 +192,70 @@ Be technical and precise. Output in the same language as typical palmistry termi
 """
 
 
+# ============================================
+# MANIFEST ANAHTARLARI
+# ============================================
+# Prompt veya ayar değişince sadece etkilenen sayfalar yeniden işlenir
+PIPELINE_NAME: str = "hybrid"
+DOC_TYPE: str = "hybrid_book_page"
+PROMPT_VERSION: str = fingerprint(
+    VISION_PROMPT_FULL_PAGE,
+    VISION_PROMPT_DIAGRAM_ONLY,
+    VISION_PROMPT_EMBEDDED_IMAGE
+)
+# Gömülü resim açıklamaları için önbellek anahtarı
+IMAGE_PROMPT_VERSION: str = fingerprint(VISION_PROMPT_EMBEDDED_IMAGE, VISION_MODEL)
+SETTINGS_HASH: str = fingerprint(
+    VISION_MODEL, VISION_MAX_TOKENS, EMBEDDING_MODEL,
+    MIN_TEXT_LENGTH, RENDER_ZOOM, MIN_IMAGE_SIZE, CHUNK_MAX_CHARS, CHUNK_MIN_CHARS,
+    LAYOUT_MIN_REGION_RATIO, LAYOUT_MIN_DRAWING_PATHS, LAYOUT_MERGE_DISTANCE,
+    LAYOUT_CAPTION_DISTANCE, LAYOUT_COVERAGE_RATIO
+)
+# Parça kimliklerine girer (chunker.make_chunk_id): aynı versiyon = aynı _id
+PIPELINE_VERSION: str = fingerprint(PIPELINE_NAME, PROMPT_VERSION, SETTINGS_HASH)
+
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
-def get_vector_store() -> MongoDBAtlasVectorSearch:
-    """MongoDB Vector Store'u döndürür."""
-    embeddings = OpenAIEmbeddings(
+def initialize_vision_model() -> ChatOpenAI:
+    """
+    Vision modelini başlatır (CASSETTE_MODE'a göre kaydedilen / oynatılan).
+
+    Modül seviyesinde: ingest benchmark'ı bu fonksiyonu sahte modelle değiştirir.
+    """
+    from langchain_openai import ChatOpenAI
+
+    return cassette_chat_model(lambda: ChatOpenAI(
+        model=VISION_MODEL,
+        max_tokens=VISION_MAX_TOKENS,
+        openai_api_key=OPENAI_API_KEY
+    ), VISION_MODEL)
+
+
+def get_vector_store(collection_name: str = COLLECTION_NAME) -> MongoDBAtlasVectorSearch:
+    """MongoDB Vector Store'u döndürür (collection_name: yazılacak KB versiyonu)."""
+    from langchain_mongodb import MongoDBAtlasVectorSearch
+    from langchain_openai import OpenAIEmbeddings
+
+    embeddings = cassette_embeddings(lambda: OpenAIEmbeddings(
         model=EMBEDDING_MODEL,
         openai_api_key=OPENAI_API_KEY
-    )
+    ), EMBEDDING_MODEL)
 
-    client = MongoClient(MONGO_URI)
-    collection = client[DB_NAME][COLLECTION_NAME]
+    client = mongo_client(MONGO_URI)
+    collection = client[DB_NAME][collection_name]
 
-    return MongoDBAtlasVectorSearch(
+    return cassette_vector_store(lambda: MongoDBAtlasVectorSearch(
         collection=collection,
         embedding=embeddings,
         index_name=INDEX_NAME,
         text_key="text",
         embedding_key="embedding"
-    )
-
-
-def render_page_to_image(page: fitz.Page, zoom: float = 2.0) -> bytes:
-    """PDF sayfasını PNG resme çevirir."""
-    matrix = fitz.Matrix(zoom, zoom)
-    pixmap = page.get_pixmap(matrix=matrix)
-    return pixmap.tobytes("png")
+    ), collection, embeddings)
 
 
-def analyze_with_vision(llm: ChatOpenAI, image_bytes: bytes, prompt: str) -> str:
+def analyze_with_vision(llm: ChatOpenAI, image_bytes: bytes, prompt: str, mime: str = "image/png") -> str:
     """Resmi GPT-4o Vision ile analiz eder."""
     image_base64 = base64.b64encode(image_bytes).decode("utf-8")
 
@@ -165,7 +267,7 @@ def analyze_with_vision(llm: ChatOpenAI, image_bytes: bytes, prompt: str) -> str
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{image_base64}",
+                        "url": f"data:{mime};base64,{image_base64}",
                         "detail": "high"
                     }
                 }
@@ -177,63 +279,53 @@ def analyze_with_vision(llm: ChatOpenAI, image_bytes: bytes, prompt: str) -> str
     return response.content
 
 
-def has_diagram_keywords(text: str) -> bool:
-    """Metinde diyagram anahtar kelimeleri var mı kontrol eder."""
-    text_lower = text.lower()
-    for keyword in DIAGRAM_KEYWORDS:
-        if keyword.lower() in text_lower:
-            return True
-    return False
-
-
 def extract_embedded_images(
     page: fitz.Page,
     doc: fitz.Document,
-    llm: ChatOpenAI,
-    page_num: int
-) -> List[str]:
+    optimize: bool = True
+) -> List[Dict[str, Any]]:
     """
-    Sayfadaki gömülü resimleri bulur ve Vision ile analiz eder.
+    Sayfadaki gömülü resimleri çıkarır (sadece CPU işi, ağ çağrısı yok).
 
-    HER ZAMAN ÇALIŞIR - Resim varsa Vision'a gönderir!
+    Worker process içinde çalışır. Çok küçük resimler (ikon, süsleme)
+    burada elenir. Kalanlar Vision'ın göreceği boyuta küçültülüp
+    (optimize_image_bytes) Vision aşamasına byte olarak taşınır;
+    çok MB'lık ham taramalar kuyruğa hiç girmez.
 
     Args:
         page: PyMuPDF sayfa objesi
         doc: PyMuPDF döküman objesi
-        llm: ChatOpenAI instance
-        page_num: Sayfa numarası
+        optimize: False ise resim küçültülmez, "bytes" alanı eklenmez (planlama)
 
     Returns:
-        List[str]: Her resim için Vision açıklamaları
+        List[Dict[str, Any]]: Her resim için {"index", "xref", "sha256", "width",
+        "height", "bytes", "mime"} - sha256 orijinal resmin hash'idir (önbellek anahtarı)
     """
-    descriptions = []
+    images: List[Dict[str, Any]] = []
 
     try:
-        images = page.get_images(full=True)
-
-        if not images:
-            return descriptions
-
-        logger.info(f"      🖼️ {len(images)} gömülü resim bulundu")
-
-        for img_idx, img_info in enumerate(images):
+        for img_idx, img_info in enumerate(page.get_images(full=True)):
             try:
                 xref = img_info[0]
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
+                extracted = doc.extract_image(xref)
+                image_bytes = extracted["image"]
 
                 # Çok küçük resimleri atla (ikonlar, süslemeler)
-                if  50 < len(image_bytes) < MIN_IMAGE_SIZE:
-                    logger.info(f"         ⏭️ Resim {img_idx+1} çok küçük ({len(image_bytes)} bytes), atlanıyor")
+                if 50 < len(image_bytes) < MIN_IMAGE_SIZE:
+                    logger.debug(f"         ⏭️ Resim {img_idx+1} çok küçük ({len(image_bytes)} bytes), atlanıyor")
                     continue
 
-                logger.info(f"         🔍 Resim {img_idx+1} Vision'a gönderiliyor ({len(image_bytes)} bytes)")
-
-                # Vision'a gönder
-                description = analyze_with_vision(llm, image_bytes, VISION_PROMPT_EMBEDDED_IMAGE)
-                descriptions.append(f"[IMAGE {img_idx+1} - Page {page_num}]: {description}")
+                image = {
+                    "index": img_idx + 1,
+                    "xref": xref,
+                    "sha256": hashlib.sha256(image_bytes).hexdigest(),
+                    "width": extracted.get("width", 0),
+                    "height": extracted.get("height", 0)
+                }
+                if optimize:
+                    image["bytes"], image["mime"] = optimize_image_bytes(image_bytes, extracted.get("ext", "png"))
 
-                logger.info(f"         ✅ Resim {img_idx+1} analiz edildi")
+                images.append(image)
 
             except Exception as e:
                 logger.warning(f"         ⚠️ Resim {img_idx+1} hatası: {e}")
@@ -242,86 +334,298 @@ def extract_embedded_images(
     except Exception as e:
         logger.warning(f"      ⚠️ Resim çıkarma hatası: {e}")
 
+    return images
+
+
+def analyze_embedded_images(
+    images: List[Dict[str, Any]],
+    llm: ChatOpenAI,
+    page_num: int,
+    describer: ImageDescriber,
+    book_key: Optional[str] = None
+) -> List[str]:
+    """
+    Çıkarılmış gömülü resimleri Vision ile analiz eder.
+
+    HER ZAMAN ÇALIŞIR - ama aynı resim (aynı xref veya aynı içerik)
+    daha önce analiz edildiyse açıklama önbellekten gelir.
+
+    Args:
+        images: extract_embedded_images çıktısı
+        llm: ChatOpenAI instance
+        page_num: Sayfa numarası
+        describer: xref hafızası + içerik önbelleği
+        book_key: Resimlerin kitabı (xref'ler kitaba özeldir)
+
+    Returns:
+        List[str]: Her resim için Vision açıklamaları
+    """
+    descriptions = []
+
+    if not images:
+        return descriptions
+
+    logger.info(f"      🖼️ {len(images)} gömülü resim bulundu")
+
+    for image in images:
+        img_idx = image["index"]
+        image_bytes = image["bytes"]
+
+        try:
+            # Önbellekte yoksa Vision'a gönder
+            description, source = describer.describe(
+                image["xref"],
+                image_bytes,
+                lambda data: analyze_with_vision(llm, data, VISION_PROMPT_EMBEDDED_IMAGE, image["mime"]),
+                book_key=book_key,
+                content_hash=image["sha256"]
+            )
+            descriptions.append(f"[IMAGE {img_idx} - Page {page_num}]: {description}")
+
+            if source == SOURCE_VISION:
+                logger.info(f"         ✅ Resim {img_idx} analiz edildi ({len(image_bytes)} bytes)")
+            else:
+                logger.info(f"         ♻️ Resim {img_idx} önbellekten ({source})")
+
+        except BudgetExceeded:
+            # Sayfa eksik açıklamayla kaydedilmesin → hata yukarı çıksın
+            raise
+        except Exception as e:
+            logger.warning(f"         ⚠️ Resim {img_idx} hatası: {e}")
+            continue
+
     return descriptions
 
 
-def process_page_hybrid(
+def classify_page(
     page: fitz.Page,
-    doc: fitz.Document,
-    page_num: int,
+    raw_text: str,
+    images: List[Dict[str, Any]]
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Sayfanın işlem modunu belirler (ağ çağrısı yok).
+
+    Hem ingest worker'ı hem planlayıcı aynı kararı verir; böylece
+    plandaki tahmin gerçek çalıştırmayla örtüşür.
+
+    Args:
+        page: PyMuPDF sayfa objesi (düzen verisi için)
+        raw_text: Sayfadan çıkarılan text
+        images: extract_embedded_images çıktısı (ayrıca analiz edilecek resimler)
+
+    Returns:
+        Tuple[mode, layout]: TEXT_ONLY / TEXT_WITH_IMAGES / HYBRID / VISION_FULL
+        ve classify_layout sonucu
+    """
+    # Durum A: Text çok az → Sayfayı komple render et
+    if len(raw_text) < MIN_TEXT_LENGTH:
+        return "VISION_FULL", {"needs_render": True, "regions": [], "reason": "text yetersiz"}
+
+    # Durum B: Resim analiziyle karşılanmamış diyagram var → Sayfayı da render et
+    layout = classify_layout(page, {image["xref"] for image in images})
+    if layout["needs_render"]:
+        return "HYBRID", layout
+    # Durum C: Text var + resim var
+    if images:
+        return "TEXT_WITH_IMAGES", layout
+    # Durum D: Sadece text
+    return "TEXT_ONLY", layout
+
+
+def extract_page_hybrid(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Bir sayfanın CPU-yoğun kısmını yapar (process pool worker'ı).
+
+    1. Text çıkar
+    2. Gömülü resimleri çıkar
+    3. İşlem modunu belirle (TEXT_ONLY / TEXT_WITH_IMAGES / HYBRID / VISION_FULL)
+       - HYBRID kararı sayfa düzeninden verilir (classify_layout)
+    4. Gerekiyorsa sayfayı (HYBRID'de sadece diyagram bölgesini) render et
+
+    Ağ çağrısı YAPMAZ; sonuç process_page_hybrid'e verilir.
+
+    Args:
+        job: {"pdf_path", "page_index", "page_count", ...}
+
+    Returns:
+        Dict[str, Any]: İş bilgisi + raw_text, images, mode, layout_reason,
+        page_image, page_image_mime
+    """
+    doc = open_worker_document(job["pdf_path"])
+    page = doc[job["page_index"]]
+
+    raw_text = page.get_text().strip()
+    images = extract_embedded_images(page, doc)
+    mode, layout = classify_page(page, raw_text, images)
+
+    # VISION_FULL → tam sayfa, HYBRID → sadece diyagram bölgeleri
+    page_image, page_image_mime = None, None
+    if mode in ("VISION_FULL", "HYBRID"):
+        page_image, page_image_mime = render_for_vision(page, RENDER_ZOOM, layout["regions"])
+
+    return {
+        **job,
+        "page_num": job["page_index"] + 1,
+        "raw_text": raw_text,
+        "images": images,
+        "mode": mode,
+        "layout_reason": layout["reason"],
+        "page_image": page_image,
+        "page_image_mime": page_image_mime
+    }
+
+
+def plan_page_hybrid(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Planlama worker'ı: sayfayı sınıflandırır ama render ETMEZ.
+
+    Resim byte'ları yerine sadece hash ve boyut döner; ana process
+    bunlarla kopya/önbellek kontrolü yapıp maliyeti hesaplar.
+
+    Args:
+        job: {"pdf_path", "page_index", "page_count", "file_hash"}
+
+    Returns:
+        Dict[str, Any]: İş bilgisi + mode, text_chars, render_size, images
+    """
+    doc = open_worker_document(job["pdf_path"])
+    page = doc[job["page_index"]]
+
+    raw_text = page.get_text().strip()
+    images = extract_embedded_images(page, doc, optimize=False)
+    mode, layout = classify_page(page, raw_text, images)
+
+    page_render_size = None
+    if mode in ("VISION_FULL", "HYBRID"):
+        page_render_size = render_size(page, RENDER_ZOOM, layout["regions"])
+
+    return {
+        **job,
+        "mode": mode,
+        "layout_reason": layout["reason"],
+        "text_chars": len(raw_text),
+        "render_size": page_render_size,
+        "images": images
+    }
+
+
+def estimate_planned_page(
+    planned: Dict[str, Any],
+    seen_images: set,
+    image_cache: ImageDescriptionCache
+) -> Dict[str, Any]:
+    """
+    plan_page_hybrid çıktısından sayfanın Vision çağrılarını ve maliyetini tahmin eder.
+
+    Gerçek çalıştırmadaki gibi: aynı kitapta aynı xref, aynı içerikli
+    resim veya önbellekte açıklaması olan resim tekrar SAYILMAZ.
+
+    Args:
+        planned: plan_page_hybrid çıktısı
+        seen_images: Bu planda daha önce sayılmış (file_hash, xref) ve sha256 anahtarları
+        image_cache: Kalıcı resim açıklama önbelleği
+
+    Returns:
+        Dict[str, Any]: Plan sayfa kaydı (iş bilgisi + mode + tahminler)
+    """
+    vision_calls = []
+
+    for image in planned["images"]:
+        xref_key = (planned["file_hash"], image["xref"])
+        if xref_key in seen_images or image["sha256"] in seen_images:
+            continue
+        seen_images.add(xref_key)
+        seen_images.add(image["sha256"])
+
+        if image_cache.get(image["sha256"], IMAGE_PROMPT_VERSION) is not None:
+            continue
+
+        vision_calls.append(vision_call_estimate(
+            VISION_PROMPT_EMBEDDED_IMAGE, *fit_to_tiles(image["width"], image["height"])
+        ))
+
+    if planned["mode"] == "VISION_FULL":
+        vision_calls.append(vision_call_estimate(VISION_PROMPT_FULL_PAGE, *planned["render_size"]))
+    elif planned["mode"] == "HYBRID":
+        vision_calls.append(vision_call_estimate(VISION_PROMPT_DIAGRAM_ONLY, *planned["render_size"]))
+
+    return {
+        "pdf_path": planned["pdf_path"],
+        "file_hash": planned["file_hash"],
+        "page_index": planned["page_index"],
+        "page_count": planned["page_count"],
+        "mode": planned["mode"],
+        "layout_reason": planned["layout_reason"],
+        **page_estimate(vision_calls, planned["text_chars"])
+    }
+
+
+def process_page_hybrid(
+    extracted: Dict[str, Any],
     llm: ChatOpenAI,
-    previous_tail: str = ""
-) -> Tuple[str, str, str]:
+    describer: ImageDescriber
+) -> Tuple[str, str]:
     """
-    Sayfayı hibrit şekilde işler.
+    Worker'da çıkarılmış sayfayı hibrit şekilde işler (ağ aşaması).
 
     Mantık:
-    1. Her zaman text çıkarmayı dene
-    2. Her zaman gömülü resimleri ara ve Vision'a gönder
-    3. Text azsa veya diyagram keyword varsa sayfayı da render et
-    4. Hepsini birleştir + Overlap ekle
+    1. Text ve mod worker'da belirlendi (extract_page_hybrid)
+    2. Her zaman gömülü resimleri Vision'a gönder
+    3. Mod VISION_FULL/HYBRID ise render edilmiş sayfayı da gönder
+    4. Hepsini birleştir
 
     Args:
-        page: PyMuPDF sayfa objesi
-        doc: PyMuPDF döküman objesi
-        page_num: Sayfa numarası
+        extracted: extract_page_hybrid çıktısı
         llm: ChatOpenAI instance
-        previous_tail: Önceki sayfanın son 500 karakteri (overlap için)
+        describer: Gömülü resim açıklayıcı (önbellekli)
 
     Returns:
-        Tuple[content, new_tail, mode]: İşlenmiş içerik, yeni overlap, işlem modu
+        Tuple[content, mode]: İşlenmiş içerik, işlem modu
     """
+    page_num = extracted["page_num"]
+    raw_text = extracted["raw_text"]
+    processing_mode = extracted["mode"]
 
-    # ========== 1. TEXT ÇIKAR ==========
-    raw_text = page.get_text().strip()
-    text_length = len(raw_text)
-    logger.info(f"      📝 Text: {text_length} karakter")
+    # ========== 1. TEXT (worker'da çıkarıldı) ==========
+    logger.info(f"      📝 Text: {len(raw_text)} karakter")
 
     # ========== 2. GÖMÜLÜ RESİMLERİ ANALİZ ET (HER ZAMAN) ==========
-    image_descriptions = extract_embedded_images(page, doc, llm, page_num)
-    has_images = len(image_descriptions) > 0
+    image_descriptions = analyze_embedded_images(
+        extracted["images"], llm, page_num, describer, book_key=extracted.get("file_hash")
+    )
 
     # ========== 3. EK ANALİZ GEREKİYOR MU? ==========
     page_render_description = ""
-    processing_mode = "TEXT_ONLY"
 
     # Durum A: Text çok az → Sayfayı komple render et
-    if text_length < MIN_TEXT_LENGTH:
-        processing_mode = "VISION_FULL"
-        logger.info(f"      🔍 Mode: VISION_FULL (text yetersiz, sayfa render ediliyor)")
-
-        image_bytes = render_page_to_image(page, RENDER_ZOOM)
-        page_render_description = analyze_with_vision(llm, image_bytes, VISION_PROMPT_FULL_PAGE)
-
-    # Durum B: Text var ama diyagram keyword var → Sayfayı da render et
-    elif has_diagram_keywords(raw_text):
-        processing_mode = "HYBRID"
-        logger.info(f"      🔍 Mode: HYBRID (text + diyagram keyword bulundu)")
-
-        image_bytes = render_page_to_image(page, RENDER_ZOOM)
-        vision_result = analyze_with_vision(llm, image_bytes, VISION_PROMPT_DIAGRAM_ONLY)
+    if processing_mode == "VISION_FULL":
+        logger.info(f"      🔍 Mode: VISION_FULL (text yetersiz, sayfa render edildi)")
+        page_render_description = analyze_with_vision(
+            llm, extracted["page_image"], VISION_PROMPT_FULL_PAGE, extracted["page_image_mime"]
+        )
+
+    # Durum B: Resimlerle karşılanmamış diyagram bölgesi var → Sayfa da render edildi
+    elif processing_mode == "HYBRID":
+        logger.info(f"      🔍 Mode: HYBRID (text + {extracted.get('layout_reason', 'diyagram')})")
+        vision_result = analyze_with_vision(
+            llm, extracted["page_image"], VISION_PROMPT_DIAGRAM_ONLY, extracted["page_image_mime"]
+        )
 
         if "NO_DIAGRAMS_FOUND" not in vision_result:
             page_render_description = vision_result
 
     # Durum C: Text var + resim var
-    elif has_images:
-        processing_mode = "TEXT_WITH_IMAGES"
+    elif processing_mode == "TEXT_WITH_IMAGES":
         logger.info(f"      🔍 Mode: TEXT_WITH_IMAGES (text + gömülü resimler)")
 
     # Durum D: Sadece text
     else:
-        processing_mode = "TEXT_ONLY"
         logger.info(f"      🔍 Mode: TEXT_ONLY")
 
     # ========== 4. HEPSİNİ BİRLEŞTİR ==========
     final_content = ""
 
-    # 4a. Overlap (önceki sayfadan gelen kuyruk)
-    if previous_tail and OVERLAP_SIZE > 0:
-        final_content += f"[...önceki sayfadan devam...]\n{previous_tail}\n\n"
-
-    # 4b. Ana text (veya vision full page sonucu)
+    # 4a. Ana text (veya vision full page sonucu)
     if processing_mode == "VISION_FULL":
         # Text yok, vision sonucunu ana içerik olarak kullan
         final_content += page_render_description
@@ -334,29 +638,17 @@ def process_page_hybrid(
         if page_render_description:
             final_content += f"\n\n[DIAGRAM ANALYSIS]\n{page_render_description}"
 
-    # 4c. Gömülü resim açıklamaları
+    # 4b. Gömülü resim açıklamaları
     if image_descriptions:
         final_content += f"\n\n[EMBEDDED IMAGES]\n"
         final_content += "\n\n".join(image_descriptions)
 
-    # ========== 5. OVERLAP HAZIRLA (Sonraki sayfa için) ==========
-    # Not: Overlap için sadece raw_text kullanılır (vision açıklamaları değil)
-    if len(raw_text) > OVERLAP_SIZE:
-        new_tail = raw_text[-OVERLAP_SIZE:]
-    else:
-        new_tail = raw_text
-
-    return final_content, new_tail, processing_mode
+    return final_content, processing_mode
 
 
-def process_pdf(
-    pdf_path: Path,
-    llm: ChatOpenAI,
-    vector_store: MongoDBAtlasVectorSearch
-) -> Dict[str, Any]:
-    """Tek bir PDF'i işler."""
-
-    stats = {
+def _new_pdf_stats(pdf_path: Path) -> Dict[str, Any]:
+    """Bir PDF için boş istatistik sözlüğü."""
+    return {
         "file_name": pdf_path.name,
         "total_pages": 0,
         "text_only_pages": 0,
@@ -365,92 +657,140 @@ def process_pdf(
         "hybrid_pages": 0,
         "skipped_pages": 0,
         "documents_added": 0,
+        "chunks_added": 0,
         "total_images_analyzed": 0
     }
 
-    logger.info(f"📖 PDF açılıyor: {pdf_path.name}")
 
-    try:
-        doc = fitz.open(str(pdf_path))
-        stats["total_pages"] = len(doc)
-        logger.info(f"   📄 Toplam sayfa: {len(doc)}")
+def vision_stage(
+    extracted: Dict[str, Any],
+    llm: ChatOpenAI,
+    describer: ImageDescriber
+) -> Dict[str, Any]:
+    """
+    Pipeline'ın Vision aşaması (VISION_CONCURRENCY thread'de çalışır).
 
-        documents: List[Document] = []
-        previous_tail = ""  # Overlap için
+    Worker'dan gelen sayfayı process_page_hybrid ile işler, cümle hizalı
+    parçalara böler ve SADECE küçük bir sonuç döndürür. Render edilmiş PNG ve gömülü
+    resim byte'ları burada bırakılır; yazma kuyruğunda bekleyen
+    öğeler birkaç KB metinden ibarettir.
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            real_page = page_num + 1
+    Args:
+        extracted: extract_page_hybrid çıktısı
+        llm: ChatOpenAI instance
+        describer: Gömülü resim açıklayıcı (önbellekli)
 
-            logger.info(f"   🔄 Sayfa {real_page}/{len(doc)} işleniyor...")
+    Returns:
+        Dict[str, Any]: {"pdf_path", "file_hash", "page", "page_count",
+                         "mode", "documents", "parent", "image_count", "error"}
+    """
+    real_page = extracted["page_index"] + 1
+    pdf_name = Path(extracted["pdf_path"]).name
+
+    result = {
+        "pdf_path": extracted["pdf_path"],
+        "file_hash": extracted["file_hash"],
+        "page": real_page,
+        "page_count": extracted["page_count"],
+        "mode": None,
+        "documents": [],
+        "parent": None,
+        "image_count": 0,
+        "error": None
+    }
 
-            try:
-                # Hibrit işleme
-                content, previous_tail, mode = process_page_hybrid(
-                    page=page,
-                    doc=doc,
-                    page_num=real_page,
-                    llm=llm,
-                    previous_tail=previous_tail
-                )
-
-                # İstatistik güncelle
-                if mode == "TEXT_ONLY":
-                    stats["text_only_pages"] += 1
-                elif mode == "TEXT_WITH_IMAGES":
-                    stats["text_with_images_pages"] += 1
-                elif mode == "VISION_FULL":
-                    stats["vision_full_pages"] += 1
-                elif mode == "HYBRID":
-                    stats["hybrid_pages"] += 1
-
-                # Resim sayısını say
-                if "[IMAGE" in content:
-                    image_count = content.count("[IMAGE")
-                    stats["total_images_analyzed"] += image_count
-
-                # Boş kontrolü
-                if len(content.strip()) < 50:
-                    logger.warning(f"      ⚠️ İçerik çok kısa, atlanıyor")
-                    stats["skipped_pages"] += 1
-                    continue
+    # Worker tarafında hata olduysa
+    if extracted.get("error"):
+        logger.error(f"      ❌ {pdf_name} s.{real_page} çıkarma hatası: {extracted['error']}")
+        result["error"] = extracted["error"]
+        return result
 
-                # Document oluştur
-                metadata = {
-                    "source": pdf_path.name,
-                    "page": real_page,
-                    "type": "hybrid_book_page",
-                    "processing_mode": mode,
-                    "has_overlap": OVERLAP_SIZE > 0,
-                    "processed_at": datetime.now().isoformat()
-                }
+    logger.info(f"   🔄 {pdf_name} - Sayfa {real_page}/{extracted['page_count']} işleniyor...")
 
-                documents.append(Document(
-                    page_content=content,
-                    metadata=metadata
-                ))
+    try:
+        # Hibrit işleme
+        content, mode = process_page_hybrid(
+            extracted=extracted,
+            llm=llm,
+            describer=describer
+        )
+    except Exception as e:
+        logger.error(f"      ❌ {pdf_name} s.{real_page} hatası: {e}")
+        result["error"] = str(e)
+        return result
+
+    result["mode"] = mode
+    result["image_count"] = content.count("[IMAGE")
+
+    # Boş kontrolü
+    if len(content.strip()) < 50:
+        logger.warning(f"      ⚠️ {pdf_name} s.{real_page} içerik çok kısa, atlanıyor")
+        return result
+
+    # Parent sayfa + aranacak parçalar
+    metadata = {
+        "source": pdf_name,
+        "file_hash": extracted["file_hash"],
+        "page": real_page,
+        "type": DOC_TYPE,
+        "pipeline": PIPELINE_NAME,
+        "processing_mode": mode,
+        "prompt_version": PROMPT_VERSION,
+        "processed_at": datetime.now().isoformat()
+    }
 
-                logger.info(f"      ✅ Sayfa {real_page} tamamlandı [{mode}]")
+    from langchain_core.documents import Document
 
-            except Exception as e:
-                logger.error(f"      ❌ Sayfa {real_page} hatası: {e}")
-                stats["skipped_pages"] += 1
-                continue
+    parent, chunks = build_page_records(content, metadata, PIPELINE_VERSION)
+    result["parent"] = parent
+    result["documents"] = [Document(page_content=text, metadata=meta) for text, meta in chunks]
 
-        # MongoDB'ye kaydet
-        if documents:
-            logger.info(f"   💾 {len(documents)} döküman MongoDB'ye kaydediliyor...")
-            vector_store.add_documents(documents)
-            stats["documents_added"] = len(documents)
-            logger.info(f"   ✅ Kayıt tamamlandı!")
+    logger.info(f"      ✅ {pdf_name} s.{real_page} tamamlandı [{mode}, {len(chunks)} parça]")
+    return result
 
-        doc.close()
 
-    except Exception as e:
-        logger.error(f"❌ PDF hatası: {e}")
-        raise
+def write_stage(
+    result: Dict[str, Any],
+    committer: PageBatchCommitter,
+    all_stats: Dict[str, Dict[str, Any]]
+) -> None:
+    """
+    Pipeline'ın yazma aşaması (tek thread).
 
-    return stats
+    Sayfa sonucunu istatistiklere işler ve PageBatchCommitter'a verir.
+    Committer COMMIT_BATCH_SIZE sayfada bir toplu embed + yazma yapar
+    ve manifest'e işler; çökme olursa en fazla bir parti tekrar yapılır.
+
+    Args:
+        result: vision_stage çıktısı
+        committer: Parti parti yazan PageBatchCommitter
+        all_stats: {pdf_path: istatistik} (sadece bu thread yazar)
+    """
+    stats = all_stats.setdefault(result["pdf_path"], _new_pdf_stats(Path(result["pdf_path"])))
+    stats["total_pages"] = result["page_count"]
+
+    # Hatalı sayfa manifest'e işlenmez → sonraki çalıştırmada tekrar denenir
+    if result["error"]:
+        stats["skipped_pages"] += 1
+        return
+
+    mode_keys = {
+        "TEXT_ONLY": "text_only_pages",
+        "TEXT_WITH_IMAGES": "text_with_images_pages",
+        "VISION_FULL": "vision_full_pages",
+        "HYBRID": "hybrid_pages"
+    }
+    stats[mode_keys[result["mode"]]] += 1
+    stats["total_images_analyzed"] += result["image_count"]
+
+    if result["parent"] is None:
+        stats["skipped_pages"] += 1
+        committer.add(result["file_hash"], result["page"], [])
+        return
+
+    stats["documents_added"] += 1
+    stats["chunks_added"] += len(result["documents"])
+    committer.add(result["file_hash"], result["page"], result["documents"], parents=[result["parent"]])
 
 
 def find_pdfs(folder: str) -> List[Path]:
@@ -465,69 +805,290 @@ def find_pdfs(folder: str) -> List[Path]:
     return list(path.rglob("*.pdf"))
 
 
+# ============================================
+# PLAN / EXECUTE
+# ============================================
+def plan_ingest(
+    jobs: List[Dict[str, Any]],
+    image_cache: ImageDescriptionCache,
+    plan_path: str,
+    budget_usd: float
+) -> Dict[str, Any]:
+    """
+    Ağ çağrısı yapmadan bekleyen sayfaların planını çıkarır ve yazar.
+
+    Args:
+        jobs: Manifest'e göre bekleyen sayfa işleri
+        image_cache: Önbellekte olan resimler maliyete sayılmaz
+        plan_path: Planın yazılacağı JSON dosyası
+        budget_usd: Özette gösterilecek bütçe
+
+    Returns:
+        Dict[str, Any]: Plan
+    """
+    logger.info(f"🧮 {len(jobs)} sayfa {EXTRACT_WORKERS} worker ile planlanıyor (ağ çağrısı yok)...")
+
+    seen_images: set = set()
+    pages = []
+
+    for planned in iter_page_results(jobs, plan_page_hybrid):
+        if planned.get("error"):
+            logger.error(f"   ❌ {Path(planned['pdf_path']).name} s.{planned['page_index'] + 1} "
+                         f"planlanamadı: {planned['error']}")
+            continue
+        pages.append(estimate_planned_page(planned, seen_images, image_cache))
+
+    plan = write_plan(plan_path, PIPELINE_NAME, PROMPT_VERSION, SETTINGS_HASH, pages, VISION_CONCURRENCY)
+    log_plan_summary(plan, budget_usd)
+    logger.info(f"💾 Plan kaydedildi: {plan_path}")
+    logger.info(f"   Çalıştırmak için: python -m App.ingest.ingest_hybrid execute --budget <USD>")
+
+    return plan
+
+
+def jobs_from_plan(plan_path: str, manifest: IngestManifest, budget_usd: float) -> List[Dict[str, Any]]:
+    """
+    Plandaki sayfalardan bütçeye sığanları iş listesine çevirir.
+
+    Plan çıkarıldıktan sonra tamamlanmış sayfalar (manifest) atlanır.
+
+    Args:
+        plan_path: plan_ingest ile yazılmış JSON
+        manifest: IngestManifest
+        budget_usd: Tahmini maliyet tavanı (0 = sınırsız)
+
+    Returns:
+        List[Dict[str, Any]]: Sayfa işleri
+    """
+    plan = load_plan(plan_path, PIPELINE_NAME, PROMPT_VERSION, SETTINGS_HASH)
+    selected, deferred = select_within_budget(plan["pages"], budget_usd)
+
+    if deferred:
+        deferred_cost = sum(page["cost_usd"] for page in deferred)
+        logger.warning(f"🧾 Bütçe ${budget_usd:.2f}: {len(deferred)} sayfa (~${deferred_cost:.2f}) "
+                       f"sonraki çalıştırmaya ertelendi")
+
+    done_cache: Dict[str, set] = {}
+    jobs = []
+
+    for page in selected:
+        file_hash = page["file_hash"]
+        if file_hash not in done_cache:
+            done_cache[file_hash] = manifest.completed_pages(
+                file_hash, PIPELINE_NAME, PROMPT_VERSION, SETTINGS_HASH
+            )
+        if page["page_index"] + 1 in done_cache[file_hash]:
+            continue
+
+        jobs.append({
+            "pdf_path": page["pdf_path"],
+            "page_index": page["page_index"],
+            "page_count": page["page_count"],
+            "file_hash": file_hash
+        })
+
+    selected_cost = sum(page["cost_usd"] for page in selected)
+    logger.info(f"📋 Plan: {len(jobs)} sayfa çalıştırılacak (tahmini ${selected_cost:.2f})")
+    return jobs
+
+
+def parse_arguments() -> argparse.Namespace:
+    """
+    Komut satırı argümanlarını parse eder.
+
+    Returns:
+        argparse.Namespace: Parse edilmiş argümanlar
+    """
+    parser = argparse.ArgumentParser(
+        description="🔮 Yasaa Vision - Hybrid PDF Ingest",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Örnekler:
+  python -m App.ingest.ingest_hybrid                      # Planlamadan direkt çalıştır
+  python -m App.ingest.ingest_hybrid plan                 # Sadece maliyet/süre tahmini
+  python -m App.ingest.ingest_hybrid plan --kb-version 3  # v3'ün manifest'ine göre tahmin
+  python -m App.ingest.ingest_hybrid execute --budget 20  # Planı en fazla $20 ile çalıştır
+        """
+    )
+
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["run", "plan", "execute"],
+        default="run",
+        help="run: direkt çalıştır | plan: tahmin çıkar | execute: planı çalıştır"
+    )
+
+    parser.add_argument(
+        "--plan-file",
+        type=str,
+        default=PLAN_PATH,
+        help=f"Plan JSON dosyası (varsayılan: {PLAN_PATH})"
+    )
+
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=INGEST_BUDGET_USD,
+        help="USD bütçe tavanı, 0 = sınırsız (varsayılan: INGEST_BUDGET_USD)"
+    )
+
+    parser.add_argument(
+        "--kb-version",
+        type=int,
+        default=0,
+        help="plan: bekleyen sayfaların okunacağı KB versiyonunun manifest'i "
+             "(MongoDB'ye bağlanılmaz; varsayılan: 0 = versiyonsuz)"
+    )
+
+    return parser.parse_args()
+
+
 # ============================================
 # MAIN
 # ============================================
 def main():
+    args = parse_arguments()
+
     logger.info("=" * 60)
     logger.info("🔮 YASAA VISION - Hybrid PDF Ingest Pipeline")
     logger.info("=" * 60)
     logger.info(f"📁 PDF Klasörü: {PDF_FOLDER}")
     logger.info(f"🔧 Ayarlar:")
     logger.info(f"   - Min Text Length: {MIN_TEXT_LENGTH} karakter")
-    logger.info(f"   - Overlap Size: {OVERLAP_SIZE} karakter")
+    logger.info(f"   - Chunk: {CHUNK_MIN_CHARS}-{CHUNK_MAX_CHARS} karakter")
     logger.info(f"   - Min Image Size: {MIN_IMAGE_SIZE} bytes")
     logger.info(f"   - Render Zoom: {RENDER_ZOOM}x")
+    logger.info(f"   - Extract Workers: {EXTRACT_WORKERS}")
+    logger.info(f"   - Vision Concurrency: {VISION_CONCURRENCY} (kuyruk: {PIPELINE_QUEUE_SIZE})")
+    logger.info(f"   - Manifest Partisi: {COMMIT_BATCH_SIZE} sayfa")
+    logger.info(f"   - Prompt/Ayar Versiyonu: {PROMPT_VERSION}/{SETTINGS_HASH}")
+    logger.info(f"   - Resim Önbelleği: {IMAGE_CACHE_PATH}")
+    logger.info(f"   - Komut: {args.command}" + (f" (bütçe: ${args.budget:.2f})" if args.budget > 0 else ""))
     logger.info("=" * 60)
 
-    # Kontroller
-    if not OPENAI_API_KEY:
-        logger.error("❌ OPENAI_API_KEY bulunamadı!")
-        sys.exit(1)
+    # Kontroller (plan çıkarmak ve kaset replay için API anahtarı gerekmez)
+    if args.command != "plan" and not is_replaying():
+        if not OPENAI_API_KEY:
+            logger.error("❌ OPENAI_API_KEY bulunamadı!")
+            sys.exit(1)
 
-    if not MONGO_URI:
-        logger.error("❌ MONGO_URI bulunamadı!")
-        sys.exit(1)
+        if not MONGO_URI:
+            logger.error("❌ MONGO_URI bulunamadı!")
+            sys.exit(1)
 
-    logger.info("✅ API anahtarları mevcut")
+        logger.info("✅ API anahtarları mevcut")
 
-    # PDF'leri bul
-    pdf_files = find_pdfs(PDF_FOLDER)
+    # Yazılacak bilgi bankası versiyonu: kurulan varsa o, yoksa aktif.
+    # plan ağa gitmez: manifest'i --kb-version ile seçilen versiyondan okur
+    if args.command == "plan":
+        target = version_target(args.kb_version)
+    else:
+        target = write_target(mongo_client(MONGO_URI)[DB_NAME])
+    logger.info(f"📚 Hedef: v{target.version} ({target.chunks} + {target.parents}, "
+                f"manifest: {target.manifest_path})")
 
-    if not pdf_files:
-        logger.warning(f"⚠️ {PDF_FOLDER} klasöründe PDF bulunamadı!")
-        logger.info(f"   PDF dosyalarınızı şu klasöre koyun: {PDF_FOLDER}")
-        sys.exit(0)
+    manifest = IngestManifest(target.manifest_path)
+    image_cache = ImageDescriptionCache(IMAGE_CACHE_PATH)
 
-    logger.info(f"📚 {len(pdf_files)} adet PDF bulundu:")
-    for pdf in pdf_files:
-        logger.info(f"   📄 {pdf.name}")
+    if args.command == "execute":
+        try:
+            jobs = jobs_from_plan(args.plan_file, manifest, args.budget)
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Plan okunamadı: {e}")
+            manifest.close()
+            image_cache.close()
+            sys.exit(1)
+    else:
+        # PDF'leri bul
+        pdf_files = find_pdfs(PDF_FOLDER)
+
+        if not pdf_files:
+            logger.warning(f"⚠️ {PDF_FOLDER} klasöründe PDF bulunamadı!")
+            logger.info(f"   PDF dosyalarınızı şu klasöre koyun: {PDF_FOLDER}")
+            sys.exit(0)
+
+        logger.info(f"📚 {len(pdf_files)} adet PDF bulundu:")
+        for pdf in pdf_files:
+            logger.info(f"   📄 {pdf.name}")
+
+        # Kopya PDF'leri ele, manifest'te bitmiş sayfaları çıkar
+        unique_pdfs = dedupe_pdfs(pdf_files)
+        file_hashes = {str(path): file_hash for path, file_hash in unique_pdfs}
+
+        jobs = filter_pending_jobs(
+            manifest,
+            build_page_jobs([path for path, _ in unique_pdfs]),
+            file_hashes,
+            PIPELINE_NAME,
+            PROMPT_VERSION,
+            SETTINGS_HASH
+        )
+
+    if not jobs:
+        logger.info("✅ Tüm sayfalar güncel, yapılacak iş yok.")
+        manifest.close()
+        image_cache.close()
+        return
+
+    if args.command == "plan":
+        plan_ingest(jobs, image_cache, args.plan_file, args.budget)
+        manifest.close()
+        image_cache.close()
+        return
 
     # LLM ve Vector Store
     logger.info("-" * 40)
     logger.info("🤖 Modeller yükleniyor...")
 
-    llm = ChatOpenAI(
-        model=VISION_MODEL,
-        max_tokens=VISION_MAX_TOKENS,
-        openai_api_key=OPENAI_API_KEY
-    )
+    llm = initialize_vision_model()
     logger.info(f"   ✅ Vision Model: {VISION_MODEL}")
 
-    vector_store = get_vector_store()
-    logger.info(f"   ✅ MongoDB Vector Store: {DB_NAME}/{COLLECTION_NAME}")
+    # Bütçe varsa her Vision çağrısının gerçek maliyeti sayılır
+    budget_guard = BudgetGuard(args.budget)
+    if args.budget > 0:
+        llm = BudgetedChatModel(llm, budget_guard)
+
+    vector_store = get_vector_store(target.chunks)
+    logger.info(f"   ✅ MongoDB Vector Store: {DB_NAME}/{target.chunks}")
+
+    writer = BatchingWriter(vector_store.embeddings, vector_store.collection)
+    committer = PageBatchCommitter(
+        writer=writer,
+        manifest=manifest,
+        pipeline=PIPELINE_NAME,
+        doc_type=DOC_TYPE,
+        prompt_version=PROMPT_VERSION,
+        settings_hash=SETTINGS_HASH,
+        parent_collection=vector_store.collection.database[target.parents]
+    )
+    describer = ImageDescriber(image_cache, IMAGE_PROMPT_VERSION)
 
-    # Her PDF'i işle
-    all_stats = []
+    # Akış: process pool (extract+render) → Vision thread'leri → tek yazıcı
+    # Her aşama arası kuyruk sınırlı; yavaş aşama öncekini bekletir
+    logger.info(f"   ⚙️ {len(jobs)} sayfa {EXTRACT_WORKERS} worker ile çıkarılacak, "
+                f"{VISION_CONCURRENCY} paralel Vision çağrısı")
+    logger.info("=" * 60)
 
-    for pdf_path in pdf_files:
-        logger.info("=" * 60)
-        try:
-            stats = process_pdf(pdf_path, llm, vector_store)
-            all_stats.append(stats)
-        except Exception as e:
-            logger.error(f"❌ {pdf_path.name} işlenemedi: {e}")
-            all_stats.append({"file_name": pdf_path.name, "error": str(e)})
+    page_stats: Dict[str, Dict[str, Any]] = {}
+
+    run_pipeline(
+        iter_page_results(jobs, extract_page_hybrid),
+        [
+            Stage("vision", lambda extracted: vision_stage(extracted, llm, describer), VISION_CONCURRENCY),
+            Stage("write", lambda result: write_stage(result, committer, page_stats))
+        ]
+    )
+
+    # Kalan partiyi MongoDB'ye kaydet
+    try:
+        committer.flush()
+    except Exception as e:
+        logger.error(f"❌ Son parti yazılamadı: {e}")
+
+    manifest.close()
+    all_stats = list(page_stats.values())
+    image_cache.close()
 
     # ========== ÖZET ==========
     logger.info("=" * 60)
@@ -541,6 +1102,7 @@ def main():
     total_hybrid = 0
     total_skipped = 0
     total_docs = 0
+    total_chunks = 0
     total_images = 0
 
     for s in all_stats:
@@ -560,6 +1122,7 @@ def main():
             total_hybrid += s["hybrid_pages"]
             total_skipped += s["skipped_pages"]
             total_docs += s["documents_added"]
+            total_chunks += s["chunks_added"]
             total_images += s["total_images_analyzed"]
 
     logger.info("-" * 40)
@@ -571,7 +1134,12 @@ def main():
     logger.info(f"   🔀 Hybrid: {total_hybrid}")
     logger.info(f"   ⏭️ Atlanan: {total_skipped}")
     logger.info(f"   🖼️ Analiz Edilen Resim: {total_images}")
-    logger.info(f"   💾 MongoDB'ye Kaydedilen: {total_docs} döküman")
+    describer.log_summary()
+    if args.budget > 0:
+        logger.info(f"   🧾 Vision harcaması: ${budget_guard.spent_usd:.2f} / ${args.budget:.2f} "
+                    f"({budget_guard.calls} çağrı)")
+    logger.info(f"   💾 MongoDB'ye Kaydedilen: {committer.documents_written}/{total_chunks} parça, "
+                f"{total_docs} sayfa ({writer.stats['embed_requests']} embedding isteği)")
     logger.info("=" * 60)
     logger.info("✅ Hybrid Ingest tamamlandı!")
 
@@ -8,7 +8,11 @@ Normal PDF'lerden farkı:
 - page.get_text() çalışmaz (metin yok, sadece resim var)
 - Her sayfa resme çevrilir (render)
 - GPT-4o Vision ile metin çıkarılır (OCR + Analiz)
-- Sonuç embedding'e çevrilip MongoDB'ye kaydedilir
+- Sonuç cümle hizalı parçalara bölünüp embedding'e çevrilir ve
+  MongoDB'ye kaydedilir (tam sayfa ayrı parent collection'da)
+- Render işi process pool'da, tüm kitaplarda paralel yapılır
+- Akışlı pipeline → render → vision → embed+write, sınırlı kuyruklar
+- Manifest → Kaldığı yerden devam eder, kopya PDF/sayfa yazmaz
 
 Kullanım:
     python -m App.ingest.ingest_scanned
@@ -18,21 +22,57 @@ Tarih: 2024
 ============================================
 """
 
-import os
+from __future__ import annotations  # Type hint'ler import anında çözülmez (lazy importlar için)
+
 import sys
 import base64
 import logging
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 from datetime import datetime
 
-import fitz  # PyMuPDF
-from dotenv import load_dotenv
+from App.core.cassette import (
+    cassette_chat_model,
+    cassette_embeddings,
+    cassette_vector_store,
+    is_replaying,
+    mongo_client
+)
+from App.ingest.batch_writer import BatchingWriter
+from App.ingest.chunker import (
+    CHUNK_MAX_CHARS,
+    CHUNK_MIN_CHARS,
+    build_page_records
+)
+from App.ingest.image_optimizer import render_for_vision
+from App.ingest.kb_versions import write_target
+from App.ingest.manifest import (
+    COMMIT_BATCH_SIZE,
+    IngestManifest,
+    PageBatchCommitter,
+    dedupe_pdfs,
+    filter_pending_jobs,
+    fingerprint
+)
+from App.ingest.page_workers import (
+    EXTRACT_WORKERS,
+    build_page_jobs,
+    iter_page_results,
+    open_worker_document
+)
+from App.ingest.pipeline import (
+    PIPELINE_QUEUE_SIZE,
+    VISION_CONCURRENCY,
+    Stage,
+    run_pipeline
+)
+from App.core.settings import settings
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from langchain_core.documents import Document
-from pymongo import MongoClient
+if TYPE_CHECKING:
+    # Sadece type hint. Render worker'ları (spawn) bu modülü import eder;
+    # langchain/OpenAI client'ları ana process'te, ilk kullanımda yüklenir
+    from langchain_openai import ChatOpenAI
+    from langchain_mongodb import MongoDBAtlasVectorSearch
 
 # ============================================
 # LOGGING
@@ -44,25 +84,23 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ============================================
-# ENVIRONMENT
+# ENVIRONMENT (.env, App.core.settings ile ilk okumada yüklenir)
 # ============================================
-load_dotenv()
-
-OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
-MONGO_URI: str = os.getenv("MONGO_URI", "")
-DB_NAME: str = os.getenv("DB_NAME", "YasaaVisionDB")
-COLLECTION_NAME: str = os.getenv("COLLECTION_NAME", "palmistry_knowledge")
-INDEX_NAME: str = os.getenv("INDEX_NAME", "vector_index")
+OPENAI_API_KEY: str = settings.get("OPENAI_API_KEY", "")
+MONGO_URI: str = settings.get("MONGO_URI", "")
+DB_NAME: str = settings.get("DB_NAME", "YasaaVisionDB")
+COLLECTION_NAME: str = settings.get("COLLECTION_NAME", "palmistry_knowledge")
+INDEX_NAME: str = settings.get("INDEX_NAME", "vector_index")
 
 # Scanned PDF klasörü (ayrı tutuyoruz)
-SCANNED_PDF_FOLDER: str = os.getenv("SCANNED_PDF_FOLDER", "App/pdf_storage/scanned")
+SCANNED_PDF_FOLDER: str = settings.get("SCANNED_PDF_FOLDER", "App/pdf_storage/scanned")
 
 # Vision ayarları
-VISION_MODEL: str = os.getenv("VISION_MODEL", "gpt-4o")
-VISION_MAX_TOKENS: int = int(os.getenv("VISION_MAX_TOKENS", "2000"))
+VISION_MODEL: str = settings.get("VISION_MODEL", "gpt-4o")
+VISION_MAX_TOKENS: int = int(settings.get("VISION_MAX_TOKENS", "2000"))
 
 # Render ayarları
-RENDER_ZOOM: float = float(os.getenv("RENDER_ZOOM", "2.0"))  # 2x zoom = daha net görüntü
+RENDER_ZOOM: float = float(settings.get("RENDER_ZOOM", "2.0"))  # 2x zoom = daha net görüntü
 
 # ============================================
 # VISION PROMPT (Taranmış Sayfa İçin)
@@ -97,61 +135,102 @@ IMPORTANT:
 - Output should be in the SAME LANGUAGE as the source (Turkish or English)
 """
 
+# ============================================
+# MANIFEST ANAHTARLARI
+# ============================================
+PIPELINE_NAME: str = "scanned"
+DOC_TYPE: str = "scanned_book_page"
+PROMPT_VERSION: str = fingerprint(SCANNED_PAGE_PROMPT)
+SETTINGS_HASH: str = fingerprint(
+    VISION_MODEL, VISION_MAX_TOKENS, RENDER_ZOOM, CHUNK_MAX_CHARS, CHUNK_MIN_CHARS
+)
+# Parça kimliklerine girer (chunker.make_chunk_id): aynı versiyon = aynı _id
+PIPELINE_VERSION: str = fingerprint(PIPELINE_NAME, PROMPT_VERSION, SETTINGS_HASH)
+
 
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 def get_mongo_collection():
     """MongoDB koleksiyonuna bağlanır."""
-    client = MongoClient(MONGO_URI)
+    client = mongo_client(MONGO_URI)
     db = client[DB_NAME]
     return db[COLLECTION_NAME]
 
 
-def get_vector_store() -> MongoDBAtlasVectorSearch:
-    """MongoDB Vector Store'u döndürür."""
-    embeddings = OpenAIEmbeddings(
+def initialize_vision_model() -> ChatOpenAI:
+    """
+    Vision modelini başlatır (CASSETTE_MODE'a göre kaydedilen / oynatılan).
+
+    Modül seviyesinde: ingest benchmark'ı bu fonksiyonu sahte modelle değiştirir.
+    """
+    from langchain_openai import ChatOpenAI
+
+    return cassette_chat_model(lambda: ChatOpenAI(
+        model=VISION_MODEL,
+        max_tokens=VISION_MAX_TOKENS,
+        openai_api_key=OPENAI_API_KEY
+    ), VISION_MODEL)
+
+
+def get_vector_store(collection_name: str = COLLECTION_NAME) -> MongoDBAtlasVectorSearch:
+    """MongoDB Vector Store'u döndürür (collection_name: yazılacak KB versiyonu)."""
+    from langchain_mongodb import MongoDBAtlasVectorSearch
+    from langchain_openai import OpenAIEmbeddings
+
+    embeddings = cassette_embeddings(lambda: OpenAIEmbeddings(
         model="text-embedding-3-small",
         openai_api_key=OPENAI_API_KEY
-    )
+    ), "text-embedding-3-small")
 
-    client = MongoClient(MONGO_URI)
-    collection = client[DB_NAME][COLLECTION_NAME]
+    client = mongo_client(MONGO_URI)
+    collection = client[DB_NAME][collection_name]
 
-    vector_store = MongoDBAtlasVectorSearch(
+    vector_store = cassette_vector_store(lambda: MongoDBAtlasVectorSearch(
         collection=collection,
         embedding=embeddings,
         index_name=INDEX_NAME,
         text_key="text",
         embedding_key="embedding"
-    )
+    ), collection, embeddings)
 
     return vector_store
 
 
-def render_page_to_image(page: fitz.Page, zoom: float = 2.0) -> bytes:
+def extract_page_scanned(job: Dict[str, Any]) -> Dict[str, Any]:
     """
-    PDF sayfasını PNG resme çevirir.
+    Taranmış sayfayı render eder (process pool worker'ı).
+
+    Ağ çağrısı YAPMAZ; resim byte'ları Vision aşamasına taşınır.
+    Zoom, Vision'ın göreceği çözünürlüğe göre seçilir (RENDER_ZOOM üst
+    sınırdır); taramalar genelde renksiz olduğundan gri tonlu JPEG gider.
 
     Args:
-        page: PyMuPDF sayfa objesi
-        zoom: Büyütme faktörü (2.0 = 2x çözünürlük)
+        job: {"pdf_path", "page_index", "page_count"}
 
     Returns:
-        bytes: PNG formatında resim
+        Dict[str, Any]: İş bilgisi + page_image, page_image_mime
     """
-    matrix = fitz.Matrix(zoom, zoom)
-    pixmap = page.get_pixmap(matrix=matrix)
-    return pixmap.tobytes("png")
+    doc = open_worker_document(job["pdf_path"])
+    page = doc[job["page_index"]]
 
+    page_image, page_image_mime = render_for_vision(page, RENDER_ZOOM)
 
-def analyze_page_with_vision(llm: ChatOpenAI, image_bytes: bytes) -> str:
+    return {
+        **job,
+        "page_image": page_image,
+        "page_image_mime": page_image_mime
+    }
+
+
+def analyze_page_with_vision(llm: ChatOpenAI, image_bytes: bytes, mime: str = "image/png") -> str:
     """
     Taranmış sayfa resmini GPT-4o Vision ile analiz eder.
 
     Args:
         llm: ChatOpenAI instance
-        image_bytes: PNG formatında sayfa resmi
+        image_bytes: Sayfa resmi
+        mime: Resmin MIME tipi (render_for_vision çıktısı)
 
     Returns:
         str: Sayfadan çıkarılan metin ve açıklamalar
@@ -168,7 +247,7 @@ def analyze_page_with_vision(llm: ChatOpenAI, image_bytes: bytes) -> str:
                 {
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/png;base64,{image_base64}",
+                        "url": f"data:{mime};base64,{image_base64}",
                         "detail": "high"  # Yüksek detay modu
                     }
                 }
@@ -180,97 +259,122 @@ def analyze_page_with_vision(llm: ChatOpenAI, image_bytes: bytes) -> str:
     return response.content
 
 
-def process_scanned_pdf(
-        pdf_path: Path,
-        llm: ChatOpenAI,
-        vector_store: MongoDBAtlasVectorSearch
-) -> Dict[str, Any]:
+def vision_stage(rendered: Dict[str, Any], llm: ChatOpenAI) -> Dict[str, Any]:
     """
-    Tek bir taranmış PDF'i işler.
+    Pipeline'ın Vision aşaması (VISION_CONCURRENCY thread'de çalışır).
+
+    Render edilmiş sayfayı Vision'a gönderir, sonucu cümle hizalı
+    parçalara böler; PNG byte'ları bu aşamadan sonra tutulmaz.
 
     Args:
-        pdf_path: PDF dosya yolu
+        rendered: extract_page_scanned çıktısı
         llm: ChatOpenAI instance
-        vector_store: MongoDB Vector Store
 
     Returns:
-        Dict: İşlem istatistikleri
+        Dict[str, Any]: {"pdf_path", "file_hash", "page", "page_count",
+                         "documents", "parent", "error"}
     """
-    stats = {
-        "file_name": pdf_path.name,
-        "total_pages": 0,
-        "processed_pages": 0,
-        "failed_pages": 0,
-        "documents_added": 0
+    real_page_num = rendered["page_index"] + 1
+    pdf_name = Path(rendered["pdf_path"]).name
+
+    result = {
+        "pdf_path": rendered["pdf_path"],
+        "file_hash": rendered["file_hash"],
+        "page": real_page_num,
+        "page_count": rendered["page_count"],
+        "documents": [],
+        "parent": None,
+        "error": None
     }
 
-    logger.info(f"📖 PDF açılıyor: {pdf_path.name}")
+    # Worker tarafında hata olduysa
+    if rendered.get("error"):
+        logger.error(f"      ❌ {pdf_name} s.{real_page_num} render hatası: {rendered['error']}")
+        result["error"] = rendered["error"]
+        return result
+
+    logger.info(f"   🔄 {pdf_name} - Sayfa {real_page_num}/{rendered['page_count']} işleniyor...")
 
     try:
-        doc = fitz.open(str(pdf_path))
-        stats["total_pages"] = len(doc)
-        logger.info(f"   📄 Toplam sayfa: {len(doc)}")
-
-        documents_to_add: List[Document] = []
-
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            real_page_num = page_num + 1
-
-            logger.info(f"   🔄 Sayfa {real_page_num}/{len(doc)} işleniyor...")
-
-            try:
-                # 1. Sayfayı resme çevir
-                image_bytes = render_page_to_image(page, zoom=RENDER_ZOOM)
-                logger.info(f"      📸 Sayfa render edildi ({len(image_bytes)} bytes)")
-
-                # 2. GPT-4o Vision ile analiz et
-                extracted_text = analyze_page_with_vision(llm, image_bytes)
-                logger.info(f"      🔍 Vision analizi tamamlandı ({len(extracted_text)} karakter)")
-
-                # 3. Boş kontrolü
-                if len(extracted_text.strip()) < 50:
-                    logger.warning(f"      ⚠️ Sayfa {real_page_num} çok az içerik, atlanıyor...")
-                    continue
-
-                # 4. Document oluştur
-                metadata = {
-                    "source": pdf_path.name,
-                    "page": real_page_num,
-                    "type": "scanned_book_page",
-                    "processed_at": datetime.now().isoformat(),
-                    "vision_model": VISION_MODEL
-                }
+        # 1. Sayfa worker'da resme çevrildi
+        image_bytes = rendered["page_image"]
+        logger.info(f"      📸 Sayfa render edildi ({len(image_bytes)} bytes)")
+
+        # 2. GPT-4o Vision ile analiz et
+        extracted_text = analyze_page_with_vision(llm, image_bytes, rendered["page_image_mime"])
+        logger.info(f"      🔍 Vision analizi tamamlandı ({len(extracted_text)} karakter)")
+    except Exception as e:
+        logger.error(f"      ❌ {pdf_name} s.{real_page_num} hatası: {e}")
+        result["error"] = str(e)
+        return result
+
+    # 3. Boş kontrolü
+    if len(extracted_text.strip()) < 50:
+        logger.warning(f"      ⚠️ {pdf_name} s.{real_page_num} çok az içerik, atlanıyor...")
+        return result
+
+    # 4. Parent sayfa + aranacak parçalar
+    metadata = {
+        "source": pdf_name,
+        "file_hash": rendered["file_hash"],
+        "page": real_page_num,
+        "type": DOC_TYPE,
+        "pipeline": PIPELINE_NAME,
+        "processed_at": datetime.now().isoformat(),
+        "vision_model": VISION_MODEL,
+        "prompt_version": PROMPT_VERSION
+    }
 
-                document = Document(
-                    page_content=extracted_text,
-                    metadata=metadata
-                )
+    from langchain_core.documents import Document
 
-                documents_to_add.append(document)
-                stats["processed_pages"] += 1
+    parent, chunks = build_page_records(extracted_text, metadata, PIPELINE_VERSION)
+    result["parent"] = parent
+    result["documents"] = [Document(page_content=text, metadata=meta) for text, meta in chunks]
 
-                logger.info(f"      ✅ Sayfa {real_page_num} başarıyla işlendi")
+    logger.info(f"      ✅ {pdf_name} s.{real_page_num} başarıyla işlendi ({len(chunks)} parça)")
+    return result
 
-            except Exception as e:
-                logger.error(f"      ❌ Sayfa {real_page_num} hatası: {e}")
-                stats["failed_pages"] += 1
-                continue
 
-        # 5. MongoDB'ye toplu kaydet
-        if documents_to_add:
-            logger.info(f"   💾 {len(documents_to_add)} döküman MongoDB'ye kaydediliyor...")
-            vector_store.add_documents(documents_to_add)
-            stats["documents_added"] = len(documents_to_add)
-            logger.info(f"   ✅ Kayıt tamamlandı!")
+def write_stage(
+        result: Dict[str, Any],
+        committer: PageBatchCommitter,
+        all_stats: Dict[str, Dict[str, Any]]
+) -> None:
+    """
+    Pipeline'ın yazma aşaması (tek thread).
 
-        doc.close()
+    Sayfalar COMMIT_BATCH_SIZE'lık partiler halinde toplu embed edilip
+    yazılır ve manifest'e işlenir; çökme olursa en fazla bir parti
+    tekrar yapılır.
 
-    except Exception as e:
-        logger.error(f"❌ PDF işleme hatası: {e}")
-        raise
+    Args:
+        result: vision_stage çıktısı
+        committer: Parti parti yazan PageBatchCommitter
+        all_stats: {pdf_path: istatistik} (sadece bu thread yazar)
+    """
+    stats = all_stats.setdefault(result["pdf_path"], {
+        "file_name": Path(result["pdf_path"]).name,
+        "total_pages": 0,
+        "processed_pages": 0,
+        "failed_pages": 0,
+        "documents_added": 0,
+        "chunks_added": 0
+    })
+    stats["total_pages"] = result["page_count"]
+
+    # Hatalı sayfa manifest'e işlenmez → sonraki çalıştırmada tekrar denenir
+    if result["error"]:
+        stats["failed_pages"] += 1
+        return
 
-    return stats
+    if result["parent"] is None:
+        committer.add(result["file_hash"], result["page"], [])
+        return
+
+    committer.add(result["file_hash"], result["page"], result["documents"], parents=[result["parent"]])
+    stats["processed_pages"] += 1
+    stats["documents_added"] += 1
+    stats["chunks_added"] += len(result["documents"])
 
 
 def find_scanned_pdfs(folder_path: str) -> List[Path]:
@@ -296,12 +400,12 @@ def main():
     logger.info("🔮 YASAA VISION - Scanned PDF Ingest Pipeline")
     logger.info("=" * 60)
 
-    # Kontroller
-    if not OPENAI_API_KEY:
+    # Kontroller (kaset replay modunda ağa gidilmez)
+    if not OPENAI_API_KEY and not is_replaying():
         logger.error("❌ OPENAI_API_KEY bulunamadı!")
         sys.exit(1)
 
-    if not MONGO_URI:
+    if not MONGO_URI and not is_replaying():
         logger.error("❌ MONGO_URI bulunamadı!")
         sys.exit(1)
 
@@ -316,28 +420,70 @@ def main():
     logger.info(f"📚 {len(pdf_files)} adet PDF bulundu")
 
     # LLM ve Vector Store oluştur
-    llm = ChatOpenAI(
-        model=VISION_MODEL,
-        max_tokens=VISION_MAX_TOKENS,
-        openai_api_key=OPENAI_API_KEY
+    llm = initialize_vision_model()
+
+    # Yazılacak bilgi bankası versiyonu: kurulan varsa o, yoksa aktif
+    target = write_target(mongo_client(MONGO_URI)[DB_NAME])
+    logger.info(f"📚 Hedef: v{target.version} ({target.chunks} + {target.parents})")
+
+    vector_store = get_vector_store(target.chunks)
+
+    # Kopya PDF'leri ele, manifest'te bitmiş sayfaları çıkar
+    unique_pdfs = dedupe_pdfs(pdf_files)
+    file_hashes = {str(path): file_hash for path, file_hash in unique_pdfs}
+
+    manifest = IngestManifest(target.manifest_path)
+    writer = BatchingWriter(vector_store.embeddings, vector_store.collection)
+    committer = PageBatchCommitter(
+        writer=writer,
+        manifest=manifest,
+        pipeline=PIPELINE_NAME,
+        doc_type=DOC_TYPE,
+        prompt_version=PROMPT_VERSION,
+        settings_hash=SETTINGS_HASH,
+        parent_collection=vector_store.collection.database[target.parents]
+    )
+    logger.info(f"🗂️ Manifest: {target.manifest_path} (parti: {COMMIT_BATCH_SIZE} sayfa, "
+                f"versiyon: {PROMPT_VERSION}/{SETTINGS_HASH})")
+
+    jobs = filter_pending_jobs(
+        manifest,
+        build_page_jobs([path for path, _ in unique_pdfs]),
+        file_hashes,
+        PIPELINE_NAME,
+        PROMPT_VERSION,
+        SETTINGS_HASH
     )
 
-    vector_store = get_vector_store()
+    if not jobs:
+        logger.info("✅ Tüm sayfalar güncel, yapılacak iş yok.")
+        manifest.close()
+        return
 
-    # Her PDF'i işle
-    all_stats = []
+    # Akış: process pool (render) → Vision thread'leri → tek yazıcı
+    # Her aşama arası kuyruk sınırlı; yavaş aşama öncekini bekletir
+    logger.info(f"⚙️ {len(jobs)} sayfa {EXTRACT_WORKERS} worker ile render edilecek, "
+                f"{VISION_CONCURRENCY} paralel Vision çağrısı (kuyruk: {PIPELINE_QUEUE_SIZE})")
+    logger.info("-" * 40)
+
+    page_stats: Dict[str, Dict[str, Any]] = {}
+
+    run_pipeline(
+        iter_page_results(jobs, extract_page_scanned),
+        [
+            Stage("vision", lambda rendered: vision_stage(rendered, llm), VISION_CONCURRENCY),
+            Stage("write", lambda result: write_stage(result, committer, page_stats))
+        ]
+    )
+
+    # 5. Kalan partiyi MongoDB'ye kaydet
+    try:
+        committer.flush()
+    except Exception as e:
+        logger.error(f"❌ Son parti yazılamadı: {e}")
 
-    for pdf_path in pdf_files:
-        logger.info("-" * 40)
-        try:
-            stats = process_scanned_pdf(pdf_path, llm, vector_store)
-            all_stats.append(stats)
-        except Exception as e:
-            logger.error(f"❌ {pdf_path.name} işlenemedi: {e}")
-            all_stats.append({
-                "file_name": pdf_path.name,
-                "error": str(e)
-            })
+    manifest.close()
+    all_stats = list(page_stats.values())
 
     # Özet
     logger.info("=" * 60)
@@ -348,6 +494,7 @@ def main():
     total_processed = 0
     total_failed = 0
     total_docs = 0
+    total_chunks = 0
 
     for stat in all_stats:
         if "error" in stat:
@@ -360,10 +507,11 @@ def main():
             total_processed += stat["processed_pages"]
             total_failed += stat["failed_pages"]
             total_docs += stat["documents_added"]
+            total_chunks += stat["chunks_added"]
 
     logger.info("-" * 40)
     logger.info(
-        f"📈 TOPLAM: {total_pages} sayfa | {total_processed} işlendi | {total_failed} hata | {total_docs} döküman")
+        f"📈 TOPLAM: {total_pages} sayfa | {total_processed} işlendi | {total_failed} hata | {total_docs} döküman ({total_chunks} parça)")
     logger.info("=" * 60)
     logger.info("✅ Scanned PDF Ingest tamamlandı!")
 
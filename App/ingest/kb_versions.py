@@ -0,0 +1,446 @@
+"""
+============================================
+YASAA VISION - Bilgi Bankası Versiyonları (Blue/Green)
+============================================
+Ingest artık retrieval'ın okuduğu collection'a doğrudan yazmaz.
+
+Eskiden:
+- Ingest, canlı aramanın yaptığı collection'a yazıyordu
+- Temizleme (clear_db) canlı sistemi boşaltıyordu
+- Embedding modeli değişince tam yeniden yükleme = kesinti
+
+Şimdi:
+- Her versiyon ayrı collection çifti: palmistry_knowledge_v{n} + palmistry_pages_v{n}
+- Küçük bir pointer dökümanı hangi versiyonun aktif olduğunu söyler
+- Retrieval pointer'ı okur ve KB_POINTER_TTL_SECONDS boyunca önbellekte tutar
+  (okuma tarafı: App.core.kb_pointer)
+- Yeni versiyon arka planda kurulur (canlı arama eskisinden devam eder),
+  smoke search'ten geçerse pointer TEK update ile (atomik) değiştirilir,
+  eski versiyon silinir
+
+Pointer dökümanı (KB_POINTER_COLLECTION içinde, _id = COLLECTION_NAME):
+    {"_id": "palmistry_knowledge", "active": 3, "building": 4, "retired": [2]}
+
+Pointer yoksa (eski kurulum) versiyon 0 = versiyonsuz collection'lar
+(COLLECTION_NAME, PARENT_COLLECTION_NAME) aktiftir.
+
+Kullanım:
+    python -m App.ingest.kb_versions status
+    python -m App.ingest.kb_versions build                # Yeni boş versiyon + vector index
+    python -m App.ingest.ingest_hybrid                    # Ingest'ler kurulan versiyona yazar
+    python -m App.ingest.kb_versions switch               # Smoke search + atomik geçiş + GC
+    python -m App.ingest.kb_versions reindex hybrid       # build + ingest + switch tek komutta
+    python -m App.ingest.kb_versions abort                # Kurulan versiyonu iptal et
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import subprocess
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from App.core.kb_pointer import (
+    KB_POINTER_COLLECTION,
+    KB_POINTER_TTL_SECONDS,
+    read_pointer,
+    versioned_name
+)
+from App.ingest.chunker import PARENT_COLLECTION_NAME
+from App.ingest.manifest import MANIFEST_PATH
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+COLLECTION_NAME: str = settings.get("COLLECTION_NAME", "palmistry_knowledge")
+INDEX_NAME: str = settings.get("INDEX_NAME", "vector_index")
+EMBEDDING_MODEL: str = settings.get("EMBEDDING_MODEL", "text-embedding-3-small")
+
+KB_KEEP_PREVIOUS: int = int(settings.get("KB_KEEP_PREVIOUS", "0"))
+KB_INDEX_TIMEOUT_SECONDS: float = float(settings.get("KB_INDEX_TIMEOUT_SECONDS", "600"))
+KB_MIN_DOC_RATIO: float = float(settings.get("KB_MIN_DOC_RATIO", "0.5"))
+KB_SMOKE_QUERY: str = settings.get(
+    "KB_SMOKE_QUERY", "Life line, head line and heart line on the palm; mount of Venus"
+)
+EMBEDDING_DIMENSIONS: int = int(settings.get("EMBEDDING_DIMENSIONS", "0"))
+"""
+KB_KEEP_PREVIOUS: Geçişten sonra silinmeden tutulacak eski versiyon sayısı
+KB_INDEX_TIMEOUT_SECONDS: Yeni vector index'in sorgulanabilir olmasını bekleme süresi
+KB_MIN_DOC_RATIO: Yeni versiyon, aktif versiyonun en az bu oranı kadar parça
+    içermeli (yarım kalmış ingest'in canlıya alınmasını önler; --force ile geçilir)
+KB_SMOKE_QUERY: Geçiş öncesi yeni versiyonda denenen arama
+EMBEDDING_DIMENSIONS: Vector index boyutu (0 = EMBEDDING_MODEL'den)
+"""
+
+# Bilinen embedding modellerinin boyutları
+_MODEL_DIMENSIONS: Dict[str, int] = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536
+}
+
+# reindex komutunun çalıştırabileceği ingest modülleri
+_INGEST_MODULES: Dict[str, str] = {
+    "hybrid": "App.ingest.ingest_hybrid",
+    "scanned": "App.ingest.ingest_scanned",
+    "batch": "App.ingest.ingest_batch"
+}
+
+
+# ============================================
+# VERSİYON HEDEFİ
+# ============================================
+@dataclass(frozen=True)
+class KBTarget:
+    """Bir bilgi bankası versiyonunun collection ve manifest adları."""
+    version: int
+    chunks: str
+    parents: str
+    manifest_path: str
+
+
+def version_target(version: int, base: str = COLLECTION_NAME) -> KBTarget:
+    """
+    Versiyon numarasından collection/manifest adlarını üretir.
+
+    Versiyon 0 = versiyonsuz (eski) kurulum: COLLECTION_NAME,
+    PARENT_COLLECTION_NAME ve MANIFEST_PATH olduğu gibi kullanılır.
+    Her versiyonun ayrı manifest'i vardır; yeni versiyon boş başlar ve
+    ingest tüm sayfaları ona yeniden yazar.
+    """
+    if version == 0:
+        return KBTarget(0, base, PARENT_COLLECTION_NAME, MANIFEST_PATH)
+
+    manifest = Path(MANIFEST_PATH)
+    return KBTarget(
+        version=version,
+        chunks=versioned_name(base, version),
+        parents=versioned_name(PARENT_COLLECTION_NAME, version),
+        manifest_path=str(manifest.with_name(f"{manifest.stem}.v{version}{manifest.suffix}"))
+    )
+
+
+def active_target(db: Any, base: str = COLLECTION_NAME) -> KBTarget:
+    """Retrieval'ın okuması gereken versiyon."""
+    return version_target(read_pointer(db, base)["active"], base)
+
+
+def write_target(db: Any, base: str = COLLECTION_NAME) -> KBTarget:
+    """
+    Ingest'in yazması gereken versiyon.
+
+    Kurulmakta olan bir versiyon varsa ona, yoksa aktif versiyona yazılır
+    (tek kitap ekleme/çıkarma gibi artımlı güncellemeler canlıya gider).
+    """
+    pointer = read_pointer(db, base)
+    building = pointer.get("building")
+    return version_target(pointer["active"] if building is None else building, base)
+
+
+# ============================================
+# VECTOR INDEX
+# ============================================
+def embedding_dimensions() -> int:
+    """Vector index boyutu."""
+    if EMBEDDING_DIMENSIONS > 0:
+        return EMBEDDING_DIMENSIONS
+    if EMBEDDING_MODEL not in _MODEL_DIMENSIONS:
+        raise ValueError(f"❌ {EMBEDDING_MODEL} boyutu bilinmiyor, EMBEDDING_DIMENSIONS ayarlayın")
+    return _MODEL_DIMENSIONS[EMBEDDING_MODEL]
+
+
+def create_vector_index(collection: Any, index_name: str = INDEX_NAME) -> None:
+    """Collection üzerinde Atlas Vector Search index'i oluşturur."""
+    from pymongo.operations import SearchIndexModel
+
+    collection.create_search_index(SearchIndexModel(
+        definition={
+            "fields": [{
+                "type": "vector",
+                "path": "embedding",
+                "numDimensions": embedding_dimensions(),
+                "similarity": "cosine"
+            }]
+        },
+        name=index_name,
+        type="vectorSearch"
+    ))
+
+
+def wait_for_index(collection: Any, index_name: str = INDEX_NAME,
+                   timeout: float = KB_INDEX_TIMEOUT_SECONDS) -> bool:
+    """Index sorgulanabilir olana kadar bekler."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        indexes = list(collection.list_search_indexes(index_name))
+        if indexes and indexes[0].get("queryable"):
+            return True
+        time.sleep(5)
+    return False
+
+
+def smoke_search(collection: Any, embeddings: Any, index_name: str = INDEX_NAME,
+                 query: str = KB_SMOKE_QUERY, limit: int = 3) -> List[Dict[str, Any]]:
+    """
+    Versiyonda gerçek bir vektör araması yapar.
+
+    Returns:
+        List[Dict[str, Any]]: Bulunan parçalar (source, page)
+    """
+    return list(collection.aggregate([
+        {
+            "$vectorSearch": {
+                "index": index_name,
+                "path": "embedding",
+                "queryVector": embeddings.embed_query(query),
+                "numCandidates": limit * 20,
+                "limit": limit
+            }
+        },
+        {"$project": {"_id": 0, "source": 1, "page": 1}}
+    ]))
+
+
+# ============================================
+# YAŞAM DÖNGÜSÜ
+# ============================================
+def start_build(db: Any, base: str = COLLECTION_NAME) -> KBTarget:
+    """
+    Yeni (boş) versiyon açar: collection'lar + vector index + pointer.building.
+
+    Raises:
+        RuntimeError: Zaten kurulmakta olan bir versiyon varsa
+    """
+    pointer = read_pointer(db, base)
+    if pointer.get("building") is not None:
+        raise RuntimeError(f"v{pointer['building']} zaten kuruluyor (switch veya abort)")
+
+    existing = [pointer["active"], *pointer.get("retired", [])]
+    target = version_target(max(existing) + 1, base)
+
+    # Önce pointer: sadece building yoksa işaretle (aynı anda iki build'e karşı).
+    # Sonraki adımlarda hata olursa "abort" ile temizlenebilir.
+    from pymongo.errors import DuplicateKeyError
+    try:
+        db[KB_POINTER_COLLECTION].update_one(
+            {"_id": base, "building": None},
+            {"$set": {"building": target.version},
+             "$setOnInsert": {"active": pointer["active"], "retired": pointer.get("retired", [])}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        raise RuntimeError("Başka bir build aynı anda başladı")
+
+    db.create_collection(target.chunks)
+    db.create_collection(target.parents)
+    create_vector_index(db[target.chunks])
+
+    logger.info(f"🏗️ v{target.version} kuruluyor: {target.chunks} + {target.parents} "
+                f"(manifest: {target.manifest_path})")
+    return target
+
+
+def switch_version(db: Any, embeddings: Any, base: str = COLLECTION_NAME, force: bool = False) -> KBTarget:
+    """
+    Kurulan versiyonu doğrular ve pointer'ı atomik olarak ona çevirir.
+
+    Doğrulama:
+    1. Vector index sorgulanabilir
+    2. Parça sayısı aktif versiyonun en az KB_MIN_DOC_RATIO'su (force hariç)
+    3. Smoke search en az bir sonuç döndürüyor
+
+    Raises:
+        RuntimeError: Kurulan versiyon yoksa veya doğrulama başarısızsa
+    """
+    pointer = read_pointer(db, base)
+    if pointer.get("building") is None:
+        raise RuntimeError("Kurulmakta olan versiyon yok (önce build)")
+
+    old = version_target(pointer["active"], base)
+    new = version_target(pointer["building"], base)
+
+    if not wait_for_index(db[new.chunks]):
+        raise RuntimeError(f"{new.chunks} vector index'i {KB_INDEX_TIMEOUT_SECONDS:.0f} sn'de hazır olmadı")
+
+    new_count = db[new.chunks].count_documents({})
+    old_count = db[old.chunks].count_documents({})
+    logger.info(f"   📊 Parça sayısı: v{old.version}={old_count} → v{new.version}={new_count}")
+
+    if not force and new_count < old_count * KB_MIN_DOC_RATIO:
+        raise RuntimeError(f"v{new.version} çok az parça içeriyor ({new_count}/{old_count}); "
+                           f"ingest bitmemiş olabilir (--force ile geçilebilir)")
+
+    hits = smoke_search(db[new.chunks], embeddings)
+    if not hits:
+        raise RuntimeError(f"v{new.version} smoke search sonuç döndürmedi")
+    found = ", ".join(f"{hit.get('source')} s.{hit.get('page')}" for hit in hits)
+    logger.info(f"   🔍 Smoke search: {found}")
+
+    # Atomik geçiş: tek dökümanda tek update; aynı anda abort/başka switch olduysa eşleşmez
+    result = db[KB_POINTER_COLLECTION].update_one(
+        {"_id": base, "building": new.version, "active": old.version},
+        {"$set": {"active": new.version, "building": None, "switched_at": datetime.now().isoformat()},
+         "$push": {"retired": old.version}},
+        upsert=False
+    )
+    if result.modified_count != 1:
+        raise RuntimeError("Pointer bu sırada değişti, geçiş yapılmadı")
+
+    logger.info(f"🔀 Aktif versiyon: v{old.version} → v{new.version} "
+                f"(retrieval en geç {KB_POINTER_TTL_SECONDS:.0f} sn içinde geçer)")
+    return new
+
+
+def garbage_collect(db: Any, base: str = COLLECTION_NAME, keep: int = KB_KEEP_PREVIOUS,
+                    grace_seconds: float = KB_POINTER_TTL_SECONDS) -> List[int]:
+    """
+    Emekli versiyonlardan en yeni `keep` tanesi dışındakileri siler.
+
+    Retrieval pointer'ı önbellekte tuttuğu için eski versiyon, geçişten
+    sonra en az bir TTL süresi boyunca silinmez.
+
+    Returns:
+        List[int]: Silinen versiyonlar
+    """
+    pointer = read_pointer(db, base)
+    retired = sorted(pointer.get("retired", []))
+    doomed = retired[:max(len(retired) - keep, 0)]
+    if not doomed:
+        return []
+
+    switched_at = pointer.get("switched_at")
+    if switched_at:
+        elapsed = (datetime.now() - datetime.fromisoformat(switched_at)).total_seconds()
+        if elapsed < grace_seconds:
+            logger.info(f"   ⏳ Eski versiyon okuyucuları için {grace_seconds - elapsed:.0f} sn bekleniyor...")
+            time.sleep(grace_seconds - elapsed)
+
+    for version in doomed:
+        target = version_target(version, base)
+        db.drop_collection(target.chunks)
+        db.drop_collection(target.parents)
+        if version != 0 and os.path.exists(target.manifest_path):
+            os.remove(target.manifest_path)
+        db[KB_POINTER_COLLECTION].update_one({"_id": base}, {"$pull": {"retired": version}})
+        logger.info(f"🧹 v{version} silindi ({target.chunks}, {target.parents})")
+
+    return doomed
+
+
+def abort_build(db: Any, base: str = COLLECTION_NAME) -> Optional[int]:
+    """Kurulan versiyonu iptal eder ve collection'larını siler."""
+    pointer = read_pointer(db, base)
+    building = pointer.get("building")
+    if building is None:
+        return None
+
+    result = db[KB_POINTER_COLLECTION].update_one(
+        {"_id": base, "building": building}, {"$set": {"building": None}}
+    )
+    if result.modified_count == 1:
+        target = version_target(building, base)
+        db.drop_collection(target.chunks)
+        db.drop_collection(target.parents)
+        if os.path.exists(target.manifest_path):
+            os.remove(target.manifest_path)
+        logger.info(f"🗑️ v{building} iptal edildi")
+    return building
+
+
+# ============================================
+# CLI
+# ============================================
+def _connect() -> Tuple[Any, Any]:
+    """(db, embeddings) - sadece CLI için."""
+    from pymongo import MongoClient
+    from langchain_openai import OpenAIEmbeddings
+
+    mongo_uri = settings.secret("MONGO_URI")
+    if not mongo_uri:
+        logger.error("❌ MONGO_URI bulunamadı!")
+        sys.exit(1)
+
+    db = MongoClient(mongo_uri)[settings.get("DB_NAME", "YasaaVisionDB")]
+    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=settings.secret("OPENAI_API_KEY"))
+    return db, embeddings
+
+
+def _log_status(db: Any) -> None:
+    pointer = read_pointer(db)
+    active = version_target(pointer["active"])
+    logger.info(f"📚 Aktif: v{active.version} ({active.chunks}, "
+                f"{db[active.chunks].estimated_document_count()} parça)")
+    if pointer.get("building") is not None:
+        building = version_target(pointer["building"])
+        logger.info(f"🏗️ Kuruluyor: v{building.version} ({building.chunks}, "
+                    f"{db[building.chunks].estimated_document_count()} parça)")
+    if pointer.get("retired"):
+        logger.info(f"🗄️ Emekli: {', '.join(f'v{v}' for v in pointer['retired'])}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="🔮 Yasaa Vision - Bilgi bankası versiyonları")
+    parser.add_argument("command", choices=["status", "build", "switch", "gc", "abort", "reindex"])
+    parser.add_argument("pipelines", nargs="*", default=["hybrid"],
+                        help=f"reindex için ingest pipeline'ları: {', '.join(_INGEST_MODULES)} (varsayılan: hybrid)")
+    parser.add_argument("--force", action="store_true", help="Parça sayısı kontrolünü atla")
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    args = parse_arguments()
+
+    unknown = [pipeline for pipeline in args.pipelines if pipeline not in _INGEST_MODULES]
+    if unknown:
+        logger.error(f"❌ Bilinmeyen pipeline: {', '.join(unknown)}")
+        sys.exit(1)
+
+    db, embeddings = _connect()
+
+    try:
+        if args.command == "status":
+            _log_status(db)
+
+        elif args.command == "build":
+            start_build(db)
+
+        elif args.command == "switch":
+            switch_version(db, embeddings, force=args.force)
+            garbage_collect(db)
+
+        elif args.command == "gc":
+            garbage_collect(db)
+
+        elif args.command == "abort":
+            if abort_build(db) is None:
+                logger.info("ℹ️ Kurulmakta olan versiyon yok")
+
+        elif args.command == "reindex":
+            # Canlı arama aktif versiyondan devam ederken yeni versiyon kurulur
+            if read_pointer(db).get("building") is None:
+                start_build(db)
+            for pipeline in args.pipelines:
+                logger.info(f"▶️ {_INGEST_MODULES[pipeline]} çalıştırılıyor...")
+                subprocess.run([sys.executable, "-m", _INGEST_MODULES[pipeline]], check=True)
+            switch_version(db, embeddings, force=args.force)
+            garbage_collect(db)
+
+    except (RuntimeError, ValueError, subprocess.CalledProcessError) as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+============================================
+YASAA VISION - Sayfa Düzeni (Layout) Sınıflandırıcı
+============================================
+Bir text sayfasının ayrıca render edilip Vision'a gönderilmesi
+gerekip gerekmediğine PyMuPDF'in düzen verisiyle karar verir.
+
+Eski yöntem (anahtar kelime):
+- "Line", "Mount", "image" gibi kelimeler el falı kitabında
+  neredeyse HER sayfada geçer → neredeyse her sayfa render edilir
+- Vision çoğu zaman "NO_DIAGRAMS_FOUND" döner → boşa para
+
+Yeni yöntem (geometri, ağ çağrısı yok):
+1. Vektör çizimler (page.get_drawings) yakınlığa göre bölgelere toplanır
+   → Yeterince büyük ve yoğun bölge = çizilmiş diyagram
+2. Gömülü resimlerin konumu (page.get_image_info)
+   → Zaten tek tek analiz edilen resimlerin kapladığı bölge tekrar gönderilmez
+3. Figür altyazıları ("Fig. 3", "Plate II", "Şekil 4")
+   → Altyazının yanındaki küçük çizim kümeleri de diyagram sayılır
+
+Sonuç: Sadece resim analiziyle karşılanmamış bir diyagram varsa render.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import re
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import fitz  # PyMuPDF
+
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+LAYOUT_MIN_REGION_RATIO: float = float(settings.get("LAYOUT_MIN_REGION_RATIO", "0.03"))
+LAYOUT_MIN_DRAWING_PATHS: int = int(settings.get("LAYOUT_MIN_DRAWING_PATHS", "15"))
+LAYOUT_MERGE_DISTANCE: float = float(settings.get("LAYOUT_MERGE_DISTANCE", "12"))
+LAYOUT_CAPTION_DISTANCE: float = float(settings.get("LAYOUT_CAPTION_DISTANCE", "72"))
+LAYOUT_COVERAGE_RATIO: float = float(settings.get("LAYOUT_COVERAGE_RATIO", "0.6"))
+"""
+LAYOUT_MIN_REGION_RATIO: Diyagram sayılacak bölgenin sayfaya oranı (0.03 = %3)
+LAYOUT_MIN_DRAWING_PATHS: Bölgede en az kaç çizim komutu olmalı (çizgi, eğri...)
+LAYOUT_MERGE_DISTANCE: Bu mesafedeki (pt) çizimler aynı bölgeye toplanır
+LAYOUT_CAPTION_DISTANCE: Altyazı bir bölgeye bu mesafedeyse (pt) onu "sahiplenir"
+LAYOUT_COVERAGE_RATIO: Bölgenin bu oranı analiz edilen resimlerle kaplıysa render gerekmez
+"""
+
+# Sayfanın tamamına yakınını kaplayan kutular çerçeve/arka plandır
+_FRAME_RATIO: float = 0.9
+
+# Altyazı: blok başında "Fig. 3", "Figure 12", "Plate IV", "Şekil 2" ...
+_CAPTION_PATTERN = re.compile(
+    r"^\s*(fig(ure)?|plate|diagram|illustration|şekil|çizim|resim|levha)\.?\s*(no\.?\s*)?[0-9ivxlc]+\b",
+    re.IGNORECASE
+)
+_MAX_CAPTION_LENGTH: int = 300
+
+Box = Tuple[float, float, float, float]
+
+
+# ============================================
+# KUTU YARDIMCILARI
+# ============================================
+def _area(box: Box) -> float:
+    return max(box[2] - box[0], 0.0) * max(box[3] - box[1], 0.0)
+
+
+def _union(a: Box, b: Box) -> Box:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _intersection_area(a: Box, b: Box) -> float:
+    return _area((max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])))
+
+
+def _distance(a: Box, b: Box) -> float:
+    """İki kutu arasındaki en kısa mesafe (kesişiyorsa 0)."""
+    dx = max(b[0] - a[2], a[0] - b[2], 0.0)
+    dy = max(b[1] - a[3], a[1] - b[3], 0.0)
+    return (dx * dx + dy * dy) ** 0.5
+
+
+def _coverage(region: Box, boxes: Iterable[Box]) -> float:
+    """Bölgenin ne kadarının verilen kutularla kaplı olduğu (0-1, yaklaşık)."""
+    region_area = _area(region)
+    if region_area <= 0:
+        return 1.0
+    covered = sum(_intersection_area(region, box) for box in boxes)
+    return min(covered / region_area, 1.0)
+
+
+def _as_box(rect: Any) -> Box:
+    return (float(rect[0]), float(rect[1]), float(rect[2]), float(rect[3]))
+
+
+# ============================================
+# BÖLGE ÇIKARMA
+# ============================================
+def _drawing_regions(page: fitz.Page, page_box: Box) -> List[Dict[str, Any]]:
+    """
+    Vektör çizimleri yakınlığa göre bölgelere toplar.
+
+    Returns:
+        List[Dict[str, Any]]: {"bbox", "paths"} listesi
+    """
+    page_area = _area(page_box)
+    page_width = page_box[2] - page_box[0]
+    regions: List[Dict[str, Any]] = []
+
+    for drawing in page.get_drawings():
+        box = _as_box(drawing["rect"])
+        width, height = box[2] - box[0], box[3] - box[1]
+
+        # Sayfa çerçevesi / arka plan dolgusu
+        if _area(box) >= _FRAME_RATIO * page_area:
+            continue
+        # Yatay/dikey ayraç çizgileri (başlık altı, sütun ayracı)
+        if (height < 2 and width > page_width / 2) or (width < 2 and height > (page_box[3] - page_box[1]) / 2):
+            continue
+
+        paths = max(len(drawing.get("items", [])), 1)
+
+        # Yakındaki tüm bölgeleri bu çizimle birleştir
+        merged = {"bbox": box, "paths": paths}
+        remaining = []
+        for region in regions:
+            if _distance(region["bbox"], merged["bbox"]) <= LAYOUT_MERGE_DISTANCE:
+                merged = {
+                    "bbox": _union(region["bbox"], merged["bbox"]),
+                    "paths": region["paths"] + merged["paths"]
+                }
+            else:
+                remaining.append(region)
+        remaining.append(merged)
+        regions = remaining
+
+    return regions
+
+
+def _caption_boxes(page: fitz.Page) -> List[Box]:
+    """Figür altyazısına benzeyen text bloklarının kutuları."""
+    captions: List[Box] = []
+
+    for block in page.get_text("blocks"):
+        # (x0, y0, x1, y1, text, block_no, block_type) - block_type 0 = text
+        if len(block) > 6 and block[6] != 0:
+            continue
+        text = block[4].strip()
+        if text and len(text) <= _MAX_CAPTION_LENGTH and _CAPTION_PATTERN.match(text):
+            captions.append(_as_box(block[:4]))
+
+    return captions
+
+
+# ============================================
+# KARAR
+# ============================================
+def classify_layout(page: fitz.Page, analyzed_xrefs: Optional[Set[int]] = None) -> Dict[str, Any]:
+    """
+    Sayfanın render edilip Vision'a gönderilmesi gerekiyor mu?
+
+    Args:
+        page: PyMuPDF sayfa objesi
+        analyzed_xrefs: Ayrıca tek tek analiz edilecek gömülü resimlerin xref'leri
+
+    Returns:
+        Dict[str, Any]:
+            needs_render: Render gerekli mi
+            regions: Resim analiziyle karşılanmamış diyagram bölgeleri (pt, sayfa koordinatı)
+            reason: Log için kısa açıklama
+            covered: Resim analiziyle zaten karşılanan bölge sayısı
+            captions: Bulunan altyazı sayısı
+    """
+    analyzed_xrefs = analyzed_xrefs or set()
+    page_box = _as_box(page.rect)
+    page_area = _area(page_box) or 1.0
+    min_area = LAYOUT_MIN_REGION_RATIO * page_area
+
+    # 1. Gömülü resimler: analiz edilenler "karşılanmış" alan,
+    #    edilmeyen büyük resimler (inline/filtrelenmiş) aday bölge
+    analyzed_boxes: List[Box] = []
+    candidates: List[Dict[str, Any]] = []
+
+    for info in page.get_image_info(xrefs=True):
+        box = _as_box(info["bbox"])
+        if _area(box) >= _FRAME_RATIO * page_area:
+            continue
+        if info.get("xref") in analyzed_xrefs:
+            analyzed_boxes.append(box)
+        elif _area(box) >= min_area:
+            candidates.append({"bbox": box, "paths": LAYOUT_MIN_DRAWING_PATHS, "kind": "image"})
+
+    # 2. Vektör çizim bölgeleri
+    for region in _drawing_regions(page, page_box):
+        candidates.append({**region, "kind": "vector"})
+
+    # 3. Altyazılar: yanındaki küçük kümeyi de diyagram yapar
+    captions = _caption_boxes(page)
+
+    def _has_caption(box: Box) -> bool:
+        return any(_distance(box, caption) <= LAYOUT_CAPTION_DISTANCE for caption in captions)
+
+    uncovered: List[Box] = []
+    covered = 0
+
+    for candidate in candidates:
+        box = candidate["bbox"]
+        captioned = _has_caption(box)
+
+        # Altyazılı bölgelerde eşikler üçte birine iner
+        required_paths = LAYOUT_MIN_DRAWING_PATHS // 3 if captioned else LAYOUT_MIN_DRAWING_PATHS
+        required_area = min_area / 3 if captioned else min_area
+        if candidate["paths"] < required_paths or _area(box) < required_area:
+            continue
+
+        # Resim üstüne çizilmiş ok/etiketler → resim analizi zaten kapsıyor
+        if _coverage(box, analyzed_boxes) >= LAYOUT_COVERAGE_RATIO:
+            covered += 1
+            continue
+
+        uncovered.append(box)
+
+    if uncovered:
+        reason = f"{len(uncovered)} diyagram bölgesi"
+    elif covered:
+        reason = f"{covered} diyagram resim analiziyle karşılandı"
+    elif captions:
+        reason = f"{len(captions)} altyazı, yakınında çizim yok"
+    else:
+        reason = "diyagram yok"
+
+    return {
+        "needs_render": bool(uncovered),
+        "regions": uncovered,
+        "reason": reason,
+        "covered": covered,
+        "captions": len(captions)
+    }
@@ -0,0 +1,456 @@
+"""
+============================================
+YASAA VISION - Ingest Manifest (Sayfa Defteri)
+============================================
+Ingest işlemlerinin sayfa bazında kaydını yerel bir SQLite
+dosyasında tutar.
+
+Neden?
+- 300 sayfalık kitabın 290. sayfasında çökme = tüm Vision harcaması çöpe
+- Tekrar çalıştırma = her şey baştan + MongoDB'de kopyalar
+- rglob aynı PDF'i farklı klasörlerde iki kez bulabilir
+
+Anahtar:
+    (dosya içerik hash'i, sayfa no, işlem modu, prompt versiyonu)
+
+- Dosya adı değil İÇERİK hash'i kullanılır → taşınan/yeniden adlandırılan
+  dosya tekrar işlenmez, aynı içerikli iki dosya tek sefer işlenir
+- Prompt veya ayarlar değişince sadece etkilenen sayfalar yeniden işlenir
+
+Kullanım:
+    manifest = IngestManifest()
+    done = manifest.completed_pages(file_hash, "hybrid", prompt_v, settings_h)
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import json
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from App.ingest.batch_writer import upsert_documents
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+MANIFEST_PATH: str = settings.get("MANIFEST_PATH", "ingest_manifest.db")
+COMMIT_BATCH_SIZE: int = int(settings.get("COMMIT_BATCH_SIZE", "10"))
+"""
+MANIFEST_PATH: SQLite manifest dosyası
+COMMIT_BATCH_SIZE: Kaç sayfada bir MongoDB'ye yazılıp manifest'e işlenecek
+- Küçük (5): Çökmede az kayıp, daha çok round trip
+- Büyük (50): Az round trip, çökmede daha çok tekrar iş
+"""
+
+# Sayfa durumları
+STATUS_DONE = "done"          # Döküman(lar) yazıldı
+STATUS_SKIPPED = "skipped"    # İçerik çok kısa, bilerek atlandı
+
+
+# ============================================
+# HASH YARDIMCILARI
+# ============================================
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Dosyanın içerik hash'ini hesaplar (SHA-256).
+
+    Args:
+        path: Dosya yolu
+        chunk_size: Okuma parça boyutu (büyük PDF'lerde bellek dostu)
+
+    Returns:
+        str: Hex hash
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Prompt metinleri veya ayarlardan kısa, kararlı bir versiyon üretir.
+
+    Prompt'ta tek karakter değişse bile versiyon değişir;
+    böylece elle versiyon numarası artırmaya gerek kalmaz.
+
+    Args:
+        *parts: JSON'a çevrilebilir parçalar (str, sayı, liste...)
+
+    Returns:
+        str: 12 karakterlik hex özet
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def dedupe_pdfs(pdf_paths: Iterable[Path]) -> List[Tuple[Path, str]]:
+    """
+    Aynı içerikli PDF'leri eler (rglob kopyaları yakalar).
+
+    Args:
+        pdf_paths: Bulunan PDF yolları
+
+    Returns:
+        List[Tuple[Path, str]]: Benzersiz (yol, içerik hash'i) çiftleri
+    """
+    seen: Dict[str, Path] = {}
+    unique: List[Tuple[Path, str]] = []
+
+    for pdf_path in pdf_paths:
+        try:
+            file_hash = file_sha256(pdf_path)
+        except OSError as e:
+            logger.error(f"❌ Dosya okunamadı, atlanıyor: {pdf_path} ({e})")
+            continue
+
+        if file_hash in seen:
+            logger.warning(f"   ♊ Kopya PDF atlanıyor: {pdf_path} (= {seen[file_hash]})")
+            continue
+
+        seen[file_hash] = pdf_path
+        unique.append((pdf_path, file_hash))
+
+    return unique
+
+
+# ============================================
+# MANIFEST
+# ============================================
+class IngestManifest:
+    """
+    Sayfa bazlı ingest defteri (SQLite).
+
+    Tablolar:
+        files: Görülen her PDF içeriği (hash, son yol, sayfa sayısı)
+        pages: İşlenmiş sayfalar
+               PK = (file_hash, page, pipeline, prompt_version)
+               settings_hash ayrı kolon: ayar değişince sayfa "bitmemiş" sayılır
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+
+    def _create_tables(self) -> None:
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS files (
+                    file_hash   TEXT PRIMARY KEY,
+                    path        TEXT NOT NULL,
+                    page_count  INTEGER,
+                    first_seen  TEXT NOT NULL,
+                    last_seen   TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    file_hash       TEXT NOT NULL,
+                    page            INTEGER NOT NULL,
+                    pipeline        TEXT NOT NULL,
+                    prompt_version  TEXT NOT NULL,
+                    settings_hash   TEXT NOT NULL,
+                    status          TEXT NOT NULL,
+                    documents       INTEGER NOT NULL DEFAULT 0,
+                    updated_at      TEXT NOT NULL,
+                    PRIMARY KEY (file_hash, page, pipeline, prompt_version)
+                )
+            """)
+
+    def register_file(self, file_hash: str, path: Path, page_count: Optional[int] = None) -> None:
+        """Dosyayı kaydeder veya son görülme bilgisini günceller."""
+        now = datetime.now().isoformat()
+        with self._conn:
+            self._conn.execute("""
+                INSERT INTO files (file_hash, path, page_count, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(file_hash) DO UPDATE SET
+                    path = excluded.path,
+                    page_count = COALESCE(excluded.page_count, files.page_count),
+                    last_seen = excluded.last_seen
+            """, (file_hash, str(path), page_count, now, now))
+
+    def completed_pages(
+        self,
+        file_hash: str,
+        pipeline: str,
+        prompt_version: str,
+        settings_hash: str
+    ) -> Set[int]:
+        """
+        Mevcut prompt ve ayarlarla tamamlanmış sayfaları döndürür.
+
+        Returns:
+            Set[int]: Sayfa numaraları (1'den başlar)
+        """
+        rows = self._conn.execute("""
+            SELECT page FROM pages
+            WHERE file_hash = ? AND pipeline = ? AND prompt_version = ? AND settings_hash = ?
+        """, (file_hash, pipeline, prompt_version, settings_hash))
+        return {row[0] for row in rows}
+
+    def mark_pages(
+        self,
+        file_hash: str,
+        pipeline: str,
+        prompt_version: str,
+        settings_hash: str,
+        pages: Dict[int, Tuple[str, int]]
+    ) -> None:
+        """
+        Bir grup sayfayı tek transaction'da tamamlandı olarak işaretler.
+
+        Args:
+            pages: {sayfa_no: (durum, döküman_sayısı)}
+        """
+        now = datetime.now().isoformat()
+        with self._conn:
+            self._conn.executemany("""
+                INSERT OR REPLACE INTO pages
+                    (file_hash, page, pipeline, prompt_version, settings_hash, status, documents, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (file_hash, page, pipeline, prompt_version, settings_hash, status, documents, now)
+                for page, (status, documents) in pages.items()
+            ])
+
+    def find_file_hashes(self, key: str) -> List[Tuple[str, str]]:
+        """
+        Dosya adı, yol parçası veya hash önekiyle kayıtlı kitapları bulur.
+
+        Returns:
+            List[Tuple[file_hash, path]]
+        """
+        rows = self._conn.execute("""
+            SELECT file_hash, path FROM files
+            WHERE file_hash LIKE ? OR path = ? OR path LIKE ?
+        """, (f"{key}%", key, f"%{key}"))
+        return [(row[0], row[1]) for row in rows]
+
+    def forget_file(self, file_hash: str, pipeline: Optional[str] = None) -> int:
+        """
+        Kitabın sayfa kayıtlarını siler → sonraki ingest kitabı baştan işler.
+
+        Args:
+            file_hash: Kitabın içerik hash'i
+            pipeline: Sadece bu işlem modunun kayıtları (None = hepsi)
+
+        Returns:
+            int: Silinen sayfa kaydı sayısı
+        """
+        with self._conn:
+            if pipeline is None:
+                cursor = self._conn.execute("DELETE FROM pages WHERE file_hash = ?", (file_hash,))
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM pages WHERE file_hash = ? AND pipeline = ?", (file_hash, pipeline)
+                )
+        return cursor.rowcount
+
+    def forget_all(self) -> int:
+        """Tüm sayfa kayıtlarını siler (veritabanı tamamen temizlenince)."""
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM pages")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ============================================
+# BEKLEYEN İŞLERİ SEÇME
+# ============================================
+def filter_pending_jobs(
+    manifest: IngestManifest,
+    jobs: Iterable[Dict[str, Any]],
+    file_hashes: Dict[str, str],
+    pipeline: str,
+    prompt_version: str,
+    settings_hash: str
+) -> List[Dict[str, Any]]:
+    """
+    Sayfa işlerinden manifest'te tamamlanmış olanları çıkarır.
+
+    Kalan işlere "file_hash" alanı eklenir (worker'dan geri döner,
+    yazma aşamasında kullanılır).
+
+    Args:
+        manifest: IngestManifest
+        jobs: build_page_jobs çıktısı
+        file_hashes: {pdf_path (str): içerik hash'i}
+        pipeline: İşlem modu ("hybrid", "scanned"...)
+        prompt_version: Prompt parmak izi
+        settings_hash: Ayar parmak izi
+
+    Returns:
+        List[Dict[str, Any]]: Yapılması gereken sayfa işleri
+    """
+    pending: List[Dict[str, Any]] = []
+    done_cache: Dict[str, Set[int]] = {}
+    skipped: Dict[str, int] = {}
+
+    for job in jobs:
+        pdf_path = job["pdf_path"]
+        file_hash = file_hashes[pdf_path]
+
+        if file_hash not in done_cache:
+            manifest.register_file(file_hash, Path(pdf_path), job["page_count"])
+            done_cache[file_hash] = manifest.completed_pages(
+                file_hash, pipeline, prompt_version, settings_hash
+            )
+
+        if job["page_index"] + 1 in done_cache[file_hash]:
+            skipped[pdf_path] = skipped.get(pdf_path, 0) + 1
+            continue
+
+        pending.append({**job, "file_hash": file_hash})
+
+    for pdf_path, count in skipped.items():
+        logger.info(f"   ⏭️ {Path(pdf_path).name}: {count} sayfa zaten işlenmiş, atlanıyor")
+
+    return pending
+
+
+# ============================================
+# PARTİ PARTİ YAZMA
+# ============================================
+class PageBatchCommitter:
+    """
+    Sayfaları küçük partiler halinde MongoDB'ye yazar ve manifest'e işler.
+
+    Sıra önemli:
+    1. Parent sayfaları upsert et (embedding'siz), sonra parçaları toplu
+       embed edip upsert et (BatchingWriter) → hiçbir parça sahipsiz kalmaz
+    2. Bu sayfaların artık üretilmeyen eski kayıtlarını sil (eski prompt
+       versiyonu, azalan parça sayısı, atlanan sayfa) - sadece yazma tam
+       başarılıysa
+    3. Manifest'e "tamamlandı" yaz
+
+    Kimlikler kararlı olduğundan (chunker.make_chunk_id) tekrar yazma
+    kopya üretmez; eski kayıtlar yenisi yazıldıktan SONRA silindiği için
+    sayfa aramada hiçbir an boş kalmaz.
+    """
+
+    def __init__(
+        self,
+        writer: Any,
+        manifest: IngestManifest,
+        pipeline: str,
+        doc_type: str,
+        prompt_version: str,
+        settings_hash: str,
+        batch_size: int = COMMIT_BATCH_SIZE,
+        parent_collection: Any = None
+    ):
+        self.writer = writer
+        self.parent_collection = parent_collection
+        self.manifest = manifest
+        self.pipeline = pipeline
+        self.doc_type = doc_type
+        self.prompt_version = prompt_version
+        self.settings_hash = settings_hash
+        self.batch_size = max(batch_size, 1)
+
+        self._file_hash: Optional[str] = None
+        self._documents: List[Any] = []
+        self._parents: List[Dict[str, Any]] = []
+        self._pages: Dict[int, Tuple[str, int]] = {}
+        self.documents_written = 0
+
+    def add(
+        self,
+        file_hash: str,
+        page: int,
+        documents: List[Any],
+        parents: Optional[List[Dict[str, Any]]] = None
+    ) -> None:
+        """
+        Bir sayfanın sonucunu partiye ekler; parti dolunca yazar.
+
+        Args:
+            file_hash: Sayfanın ait olduğu PDF'in hash'i
+            page: Sayfa numarası (1'den başlar)
+            documents: Sayfadan üretilen parça Document'ları (boşsa "skipped")
+            parents: Sayfanın tam hali (build_page_records parent kaydı)
+        """
+        # Parti tek bir dosyaya ait olmalı (silme filtresi dosya bazlı)
+        if self._file_hash is not None and file_hash != self._file_hash:
+            self.flush()
+
+        self._file_hash = file_hash
+        self._documents.extend(documents)
+        self._parents.extend(parents or [])
+        status = STATUS_DONE if documents else STATUS_SKIPPED
+        self._pages[page] = (status, len(documents))
+
+        if len(self._pages) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Bekleyen partiyi yazar ve manifest'e işler."""
+        if not self._pages:
+            return
+
+        pages = sorted(self._pages)
+
+        documents, parents, page_status = self._documents, self._parents, self._pages
+        self._documents, self._parents, self._pages = [], [], {}
+
+        # Aynı type'ı kullanan başka pipeline'ın (ingest_batch) kayıtlarına dokunma;
+        # "pipeline" alanı olmayanlar bu değişiklikten önceki eski kayıtlar
+        page_filter = {
+            "file_hash": self._file_hash,
+            "type": self.doc_type,
+            "page": {"$in": pages},
+            "pipeline": {"$in": [self.pipeline, None]}
+        }
+
+        # 1a. Parent sayfalar (embedding yok, tek round trip)
+        parents_written = 0
+        if self.parent_collection is not None:
+            parents_written = upsert_documents(self.parent_collection, parents)
+
+        # 1b. Parçaları toplu embed et + upsert
+        written = self.writer.write_batch(
+            [document.page_content for document in documents],
+            [document.metadata for document in documents]
+        )
+        self.documents_written += written
+
+        # Eksik yazıldıysa eskiyi silme, manifest'e işleme → sonraki çalıştırmada tekrar denenir
+        expected_parents = len(parents) if self.parent_collection is not None else 0
+        if written < len(documents) or parents_written < expected_parents:
+            logger.error(f"   ❌ {len(documents) - written} döküman yazılamadı, "
+                         f"s.{pages[0]}-{pages[-1]} tekrar işlenecek")
+            return
+
+        # 2. Bu sayfaların artık üretilmeyen kayıtlarını temizle
+        self.writer.collection.delete_many({
+            **page_filter,
+            "_id": {"$nin": [document.metadata["_id"] for document in documents]}
+        })
+        if self.parent_collection is not None:
+            self.parent_collection.delete_many({
+                **page_filter,
+                "_id": {"$nin": [parent["_id"] for parent in parents]}
+            })
+
+        # 3. Manifest'e işle
+        self.manifest.mark_pages(
+            self._file_hash, self.pipeline, self.prompt_version, self.settings_hash, page_status
+        )
+
+        logger.info(f"   💾 {len(pages)} sayfa ({written} döküman) kaydedildi "
+                    f"[s.{pages[0]}-{pages[-1]}]")
@@ -0,0 +1,213 @@
+"""
+============================================
+YASAA VISION - Paralel Sayfa Çıkarma (Process Pool)
+============================================
+PyMuPDF ile yapılan CPU-yoğun işleri (sayfa render, text çıkarma,
+gömülü resim çıkarma) ayrı process'lerde çalıştırır.
+
+Neden?
+- render_page_to_image ve page.get_text() saf CPU işidir
+- Vision/Embedding çağrıları ise ağ beklemesidir
+- İkisi aynı thread'de olunca makinenin tek çekirdeği kullanılır
+
+Akış:
+    [Sayfa işleri] → ProcessPool (her worker kendi fitz.Document'ını açar)
+                   → Sıralı, sınırlı kuyruk
+                   → Ağ aşaması (Vision + Embedding) kuyruktan tüketir
+
+Sonuçlar işlerin verildiği SIRADA döner. Böylece bir kitabın
+sayfaları ardışık gelir ve overlap gibi sıralı mantık bozulmaz.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import queue
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+import fitz  # PyMuPDF
+
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+EXTRACT_WORKERS: int = int(settings.get("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_QUEUE_SIZE: int = int(settings.get("EXTRACT_QUEUE_SIZE", "16"))
+"""
+EXTRACT_WORKERS: Kaç process render/çıkarma yapacak (varsayılan: çekirdek sayısı)
+EXTRACT_QUEUE_SIZE: Ağ aşamasını bekleyen en fazla kaç sayfa sonucu tutulacak
+"""
+
+# Worker başına açık tutulacak en fazla döküman sayısı
+_MAX_OPEN_DOCS: int = 4
+
+# Kuyruk bitiş işareti
+_DONE = object()
+
+
+# ============================================
+# WORKER TARAFI
+# ============================================
+# Her worker process kendi dökümanlarını açar (fitz objeleri process'ler
+# arasında paylaşılamaz). Aynı kitabın sayfaları aynı worker'a düştüğünde
+# PDF'i tekrar açmamak için küçük bir LRU tutulur.
+_worker_docs: "OrderedDict[str, fitz.Document]" = OrderedDict()
+
+
+def open_worker_document(pdf_path: str) -> fitz.Document:
+    """
+    Worker process içinde PDF'i açar (veya açık olanı döndürür).
+
+    Args:
+        pdf_path: PDF dosya yolu
+
+    Returns:
+        fitz.Document: Bu process'e ait döküman objesi
+    """
+    doc = _worker_docs.get(pdf_path)
+    if doc is not None:
+        _worker_docs.move_to_end(pdf_path)
+        return doc
+
+    # Çok fazla açık döküman varsa en eskisini kapat
+    while len(_worker_docs) >= _MAX_OPEN_DOCS:
+        _, old_doc = _worker_docs.popitem(last=False)
+        old_doc.close()
+
+    doc = fitz.open(pdf_path)
+    _worker_docs[pdf_path] = doc
+    return doc
+
+
+# ============================================
+# İŞ LİSTESİ
+# ============================================
+def build_page_jobs(pdf_paths: Iterable[Path]) -> List[Dict[str, Any]]:
+    """
+    PDF listesinden sayfa bazlı iş listesi oluşturur.
+
+    Her iş bir dict'tir: {"pdf_path", "page_index", "page_count"}
+    Kitaplar sırayla, sayfalar kitap içinde sırayla dizilir.
+
+    Args:
+        pdf_paths: İşlenecek PDF dosyaları
+
+    Returns:
+        List[Dict[str, Any]]: Sayfa işleri
+    """
+    jobs: List[Dict[str, Any]] = []
+
+    for pdf_path in pdf_paths:
+        try:
+            with fitz.open(str(pdf_path)) as doc:
+                page_count = len(doc)
+        except Exception as e:
+            logger.error(f"❌ PDF açılamadı, atlanıyor: {pdf_path.name} ({e})")
+            continue
+
+        for page_index in range(page_count):
+            jobs.append({
+                "pdf_path": str(pdf_path),
+                "page_index": page_index,
+                "page_count": page_count
+            })
+
+    return jobs
+
+
+# ============================================
+# PROCESS POOL AŞAMASI
+# ============================================
+def iter_page_results(
+    jobs: Iterable[Dict[str, Any]],
+    worker_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+    workers: int = EXTRACT_WORKERS,
+    queue_size: int = EXTRACT_QUEUE_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Sayfa işlerini process pool'da çalıştırır, sonuçları sırayla verir.
+
+    Arka planda bir besleyici thread işleri pool'a gönderir ve
+    tamamlanan sonuçları sınırlı bir kuyruğa koyar. Bu generator
+    kuyruğu tüketir; ağ aşaması yavaşsa kuyruk dolar ve pool'a yeni
+    iş gönderilmez (backpressure).
+
+    Args:
+        jobs: Sayfa işleri (build_page_jobs çıktısı)
+        worker_fn: Modül seviyesinde tanımlı (pickle edilebilir) worker fonksiyonu
+        workers: Process sayısı
+        queue_size: Kuyruk kapasitesi
+
+    Yields:
+        Dict[str, Any]: worker_fn sonucu. Worker hata verirse işin kendisi
+        + "error" alanı döner.
+    """
+    results: queue.Queue = queue.Queue(maxsize=max(queue_size, 1))
+    stop = threading.Event()
+
+    # Pool'u boş bırakmamak için uçuştaki iş sayısı en az worker sayısı kadar olmalı
+    window = max(queue_size, workers * 2, 1)
+
+    def _put(item: Any) -> None:
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _collect(job: Dict[str, Any], future) -> None:
+        try:
+            _put(future.result())
+        except Exception as e:
+            logger.error(f"      ❌ Worker hatası ({Path(job['pdf_path']).name} s.{job['page_index'] + 1}): {e}")
+            _put({**job, "error": str(e)})
+
+    def _feeder() -> None:
+        # spawn: worker'lar ana process'in thread/bağlantı durumunu kopyalamaz
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=max(workers, 1), mp_context=context) as executor:
+                pending: deque = deque()
+
+                for job in jobs:
+                    if stop.is_set():
+                        break
+                    pending.append((job, executor.submit(worker_fn, job)))
+                    if len(pending) >= window:
+                        _collect(*pending.popleft())
+
+                while pending and not stop.is_set():
+                    _collect(*pending.popleft())
+
+                # Erken durdurulduysa bekleyen işleri iptal et
+                for _, future in pending:
+                    future.cancel()
+        except Exception as e:
+            logger.error(f"❌ Process pool hatası: {e}")
+        finally:
+            _put(_DONE)
+
+    feeder = threading.Thread(target=_feeder, name="page-extract-feeder", daemon=True)
+    feeder.start()
+
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+        feeder.join()
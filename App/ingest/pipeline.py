@@ -0,0 +1,128 @@
+"""
+============================================
+YASAA VISION - Akışlı (Streaming) Ingest Pipeline
+============================================
+Ingest işini aşamalara böler ve aşamaları SINIRLI kuyruklarla bağlar:
+
+    [extract + render]  →  [vision]  →  [embed + write]
+     (process pool)        (N thread)    (1 thread, partili)
+
+Neden?
+- Eskiden bir kitabın tüm PNG'leri, Vision cevapları ve Document'ları
+  kitap bitene kadar bellekte duruyordu → RSS kitap uzunluğuyla büyüyordu
+- Şimdi her kuyruk en fazla PIPELINE_QUEUE_SIZE öğe tutar
+- Sonraki aşama yavaşsa önceki aşama bekler (backpressure)
+- Render edilen PNG, Vision aşamasından sonra hiçbir yerde tutulmaz
+
+Sonuç: Bellek kullanımı PDF uzunluğundan bağımsız, düz kalır.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import queue
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+PIPELINE_QUEUE_SIZE: int = int(settings.get("PIPELINE_QUEUE_SIZE", "8"))
+VISION_CONCURRENCY: int = int(settings.get("VISION_CONCURRENCY", "4"))
+"""
+PIPELINE_QUEUE_SIZE: Aşamalar arası kuyruk kapasitesi (bellek tavanını belirler)
+VISION_CONCURRENCY: Aynı anda kaç Vision çağrısı yapılacak (rate limit'e dikkat!)
+"""
+
+# Kuyruk bitiş işareti
+_END = object()
+
+
+@dataclass
+class Stage:
+    """
+    Pipeline'daki tek bir aşama.
+
+    Attributes:
+        name: Log'larda görünecek ad
+        fn: Öğeyi işleyen fonksiyon. None dönerse öğe sonraki aşamaya geçmez.
+        workers: Bu aşamada kaç thread çalışacak
+    """
+    name: str
+    fn: Callable[[Any], Optional[Any]]
+    workers: int = 1
+
+
+def run_pipeline(
+    source: Iterable[Any],
+    stages: List[Stage],
+    queue_size: int = PIPELINE_QUEUE_SIZE
+) -> None:
+    """
+    Kaynaktan gelen öğeleri aşamalardan sırayla geçirir.
+
+    Kaynak çağıran thread'de tüketilir; her aşama kendi thread'lerinde
+    çalışır. Aşamalar arası kuyruklar sınırlıdır, dolu kuyruğa yazan
+    taraf bekler. Son aşamanın dönüş değeri atılır (sink).
+
+    Bir öğede hata olursa loglanır ve öğe düşürülür; pipeline durmaz.
+    Hata yönetimi (istatistik vb.) aşama fonksiyonlarının işidir.
+
+    Args:
+        source: Girdi öğeleri (örn. iter_page_results çıktısı)
+        stages: Sırayla çalışacak aşamalar
+        queue_size: Her kuyruğun kapasitesi
+    """
+    queues = [queue.Queue(maxsize=max(queue_size, 1)) for _ in stages]
+    threads: List[threading.Thread] = []
+
+    for index, stage in enumerate(stages):
+        inbox = queues[index]
+        outbox = queues[index + 1] if index + 1 < len(stages) else None
+        remaining = [max(stage.workers, 1)]
+        remaining_lock = threading.Lock()
+
+        def _worker(stage=stage, inbox=inbox, outbox=outbox,
+                    remaining=remaining, remaining_lock=remaining_lock) -> None:
+            while True:
+                item = inbox.get()
+
+                if item is _END:
+                    # Kardeş thread'ler de görsün diye işareti geri koy;
+                    # son çıkan thread işareti bir sonraki aşamaya iletir
+                    inbox.put(_END)
+                    with remaining_lock:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    if last and outbox is not None:
+                        outbox.put(_END)
+                    return
+
+                try:
+                    result = stage.fn(item)
+                except Exception as e:
+                    logger.error(f"   ❌ Pipeline aşaması '{stage.name}' hatası: {e}")
+                    continue
+
+                if result is not None and outbox is not None:
+                    outbox.put(result)
+
+        for n in range(max(stage.workers, 1)):
+            thread = threading.Thread(target=_worker, name=f"ingest-{stage.name}-{n}", daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    try:
+        for item in source:
+            queues[0].put(item)
+    finally:
+        queues[0].put(_END)
+        for thread in threads:
+            thread.join()
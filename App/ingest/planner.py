@@ -0,0 +1,363 @@
+"""
+============================================
+YASAA VISION - Ingest Planı (Maliyet + Süre Tahmini)
+============================================
+Büyük bir ingest başlatmadan ÖNCE kaç GPT-4o çağrısı yapılacağını,
+kaç token harcanacağını ve ne kadar süreceğini hesaplar.
+
+İki adım:
+1. plan:    Ağ çağrısı YOK. Her sayfa yerelde sınıflandırılır
+            (TEXT_ONLY / TEXT_WITH_IMAGES / HYBRID / VISION_FULL),
+            gömülü resimler sayılır, tahminler JSON plana yazılır.
+2. execute: Plan okunur, bütçeye sığan sayfalar seçilir ve
+            çalıştırılır. Çalışma sırasında gerçek token kullanımı
+            sayılır; bütçe aşılınca yeni Vision çağrısı YAPILMAZ.
+
+Görsel token formülü (GPT-4o, detail=high):
+    - Resim 2048x2048 içine sığdırılır
+    - Kısa kenar 768'e indirilir
+    - 512x512'lik karo sayısı × 170 + 85
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import json
+import math
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from App.ingest.batch_writer import EMBED_BATCH_SIZE, estimate_tokens
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+PLAN_PATH: str = settings.get("PLAN_PATH", "ingest_plan.json")
+INGEST_BUDGET_USD: float = float(settings.get("INGEST_BUDGET_USD", "0"))
+"""
+PLAN_PATH: Planın yazılacağı JSON dosyası
+INGEST_BUDGET_USD: Tek çalıştırmada harcanabilecek en fazla tutar (0 = sınırsız)
+"""
+
+# Fiyatlar (USD / 1M token) - model değişince .env'den güncelleyin
+VISION_INPUT_PRICE_PER_1M: float = float(settings.get("VISION_INPUT_PRICE_PER_1M", "2.50"))
+VISION_OUTPUT_PRICE_PER_1M: float = float(settings.get("VISION_OUTPUT_PRICE_PER_1M", "10.00"))
+EMBEDDING_PRICE_PER_1M: float = float(settings.get("EMBEDDING_PRICE_PER_1M", "0.02"))
+
+# Tahmin katsayıları (geçmiş çalıştırmalardan ayarlanabilir)
+PLAN_OUTPUT_TOKENS_PER_CALL: int = int(settings.get("PLAN_OUTPUT_TOKENS_PER_CALL", "800"))
+VISION_SECONDS_PER_CALL: float = float(settings.get("VISION_SECONDS_PER_CALL", "8.0"))
+EMBED_SECONDS_PER_REQUEST: float = float(settings.get("EMBED_SECONDS_PER_REQUEST", "1.5"))
+
+# GPT-4o görsel token sabitleri
+_IMAGE_BASE_TOKENS: int = 85
+_IMAGE_TILE_TOKENS: int = 170
+_IMAGE_TILE_SIZE: int = 512
+
+
+class BudgetExceeded(Exception):
+    """Bütçe tavanına ulaşıldı; yeni Vision çağrısı yapılmaz."""
+
+
+# ============================================
+# TOKEN / MALİYET HESABI
+# ============================================
+def vision_image_tokens(width: float, height: float, detail: str = "high") -> int:
+    """
+    Bir resmin GPT-4o'da kaç input token tuttuğunu hesaplar.
+
+    Args:
+        width: Piksel genişlik
+        height: Piksel yükseklik
+        detail: "high" veya "low"
+
+    Returns:
+        int: Görsel token sayısı
+    """
+    if detail == "low" or width <= 0 or height <= 0:
+        return _IMAGE_BASE_TOKENS
+
+    # 1. 2048x2048 kareye sığdır
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+
+    # 2. Kısa kenarı 768'e indir
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / _IMAGE_TILE_SIZE) * math.ceil(height / _IMAGE_TILE_SIZE)
+    return _IMAGE_BASE_TOKENS + _IMAGE_TILE_TOKENS * tiles
+
+
+def vision_cost(input_tokens: int, output_tokens: int) -> float:
+    """Vision çağrılarının USD maliyeti."""
+    return (input_tokens * VISION_INPUT_PRICE_PER_1M + output_tokens * VISION_OUTPUT_PRICE_PER_1M) / 1_000_000
+
+
+def embedding_cost(tokens: int) -> float:
+    """Embedding'in USD maliyeti."""
+    return tokens * EMBEDDING_PRICE_PER_1M / 1_000_000
+
+
+def vision_call_estimate(prompt: str, width: float, height: float) -> Tuple[int, int]:
+    """
+    Tek bir Vision çağrısının tahmini (input, output) token'ı.
+
+    Args:
+        prompt: Gönderilecek prompt metni
+        width: Resim genişliği (piksel)
+        height: Resim yüksekliği (piksel)
+
+    Returns:
+        Tuple[int, int]: (input_tokens, output_tokens)
+    """
+    return (
+        estimate_tokens(prompt) + vision_image_tokens(width, height),
+        PLAN_OUTPUT_TOKENS_PER_CALL
+    )
+
+
+def page_estimate(
+    vision_calls: List[Tuple[int, int]],
+    text_chars: int
+) -> Dict[str, Any]:
+    """
+    Bir sayfanın tahmini token ve maliyetini hesaplar.
+
+    Embedding'e giden metin = sayfa metni + Vision çıktıları.
+
+    Args:
+        vision_calls: Her Vision çağrısı için (input_tokens, output_tokens)
+        text_chars: Sayfadan çıkarılan metin uzunluğu (overlap dahil)
+
+    Returns:
+        Dict[str, Any]: vision_calls, input_tokens, output_tokens, embed_tokens, cost_usd
+    """
+    input_tokens = sum(call[0] for call in vision_calls)
+    output_tokens = sum(call[1] for call in vision_calls)
+    embed_tokens = text_chars // 3 + output_tokens
+
+    return {
+        "vision_calls": len(vision_calls),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "embed_tokens": embed_tokens,
+        "cost_usd": round(vision_cost(input_tokens, output_tokens) + embedding_cost(embed_tokens), 6)
+    }
+
+
+# ============================================
+# PLAN DOSYASI
+# ============================================
+def summarize_pages(pages: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """
+    Sayfa tahminlerini toplar ve duvar saati süresini tahmin eder.
+
+    Args:
+        pages: page_estimate alanlarını içeren sayfa kayıtları
+        concurrency: Aynı anda yapılacak Vision çağrısı sayısı
+
+    Returns:
+        Dict[str, Any]: Toplamlar
+    """
+    totals: Dict[str, Any] = {
+        "pages": len(pages),
+        "modes": {},
+        "vision_calls": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "embed_tokens": 0,
+        "cost_usd": 0.0
+    }
+
+    for page in pages:
+        totals["modes"][page["mode"]] = totals["modes"].get(page["mode"], 0) + 1
+        for key in ("vision_calls", "input_tokens", "output_tokens", "embed_tokens", "cost_usd"):
+            totals[key] += page[key]
+
+    embed_requests = math.ceil(len(pages) / max(EMBED_BATCH_SIZE, 1))
+    totals["cost_usd"] = round(totals["cost_usd"], 4)
+    totals["estimated_seconds"] = round(
+        totals["vision_calls"] * VISION_SECONDS_PER_CALL / max(concurrency, 1)
+        + embed_requests * EMBED_SECONDS_PER_REQUEST
+    )
+    return totals
+
+
+def write_plan(
+    path: str,
+    pipeline: str,
+    prompt_version: str,
+    settings_hash: str,
+    pages: List[Dict[str, Any]],
+    concurrency: int
+) -> Dict[str, Any]:
+    """
+    Planı JSON olarak yazar.
+
+    Plan, üretildiği prompt/ayar versiyonunu taşır; versiyon değişirse
+    load_plan planı reddeder (tahminler artık geçerli değildir).
+
+    Returns:
+        Dict[str, Any]: Yazılan plan
+    """
+    plan = {
+        "pipeline": pipeline,
+        "prompt_version": prompt_version,
+        "settings_hash": settings_hash,
+        "created_at": datetime.now().isoformat(),
+        "concurrency": concurrency,
+        "totals": summarize_pages(pages, concurrency),
+        "pages": pages
+    }
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=1)
+
+    return plan
+
+
+def load_plan(path: str, pipeline: str, prompt_version: str, settings_hash: str) -> Dict[str, Any]:
+    """
+    Planı okur ve güncel olduğunu doğrular.
+
+    Raises:
+        FileNotFoundError: Plan dosyası yok
+        ValueError: Plan başka pipeline'a veya eski prompt/ayarlara ait
+    """
+    with open(path, encoding="utf-8") as f:
+        plan = json.load(f)
+
+    if plan.get("pipeline") != pipeline:
+        raise ValueError(f"Plan '{plan.get('pipeline')}' pipeline'ına ait, '{pipeline}' değil")
+
+    if plan.get("prompt_version") != prompt_version or plan.get("settings_hash") != settings_hash:
+        raise ValueError("Plan eski prompt/ayarlarla üretilmiş, tekrar plan çıkarın")
+
+    return plan
+
+
+def select_within_budget(
+    pages: List[Dict[str, Any]],
+    budget_usd: float
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Plan sırasıyla, toplam tahmini maliyet bütçeyi aşana kadar sayfa seçer.
+
+    Sıra korunur (kitap kitap); bütçe bir kitabın ortasında bitebilir,
+    kalan sayfalar sonraki çalıştırmada manifest sayesinde devam eder.
+
+    Args:
+        pages: Plandaki sayfalar
+        budget_usd: Bütçe (0 veya negatif = sınırsız)
+
+    Returns:
+        Tuple[selected, deferred]: Çalıştırılacak ve ertelenen sayfalar
+    """
+    if budget_usd <= 0:
+        return list(pages), []
+
+    spent = 0.0
+    for index, page in enumerate(pages):
+        if spent + page["cost_usd"] > budget_usd:
+            return list(pages[:index]), list(pages[index:])
+        spent += page["cost_usd"]
+
+    return list(pages), []
+
+
+def log_plan_summary(plan: Dict[str, Any], budget_usd: float = INGEST_BUDGET_USD) -> None:
+    """Planın özetini loglar."""
+    totals = plan["totals"]
+    minutes, seconds = divmod(totals["estimated_seconds"], 60)
+
+    logger.info("=" * 60)
+    logger.info("🧮 INGEST PLANI")
+    logger.info("=" * 60)
+    logger.info(f"   📄 Sayfa: {totals['pages']}")
+    for mode, count in sorted(totals["modes"].items()):
+        logger.info(f"      {mode}: {count}")
+    logger.info(f"   👁️ Vision çağrısı: {totals['vision_calls']}")
+    logger.info(f"   🔢 Token: {totals['input_tokens']} input | {totals['output_tokens']} output | "
+                f"{totals['embed_tokens']} embedding")
+    logger.info(f"   💵 Tahmini maliyet: ${totals['cost_usd']:.2f}")
+    logger.info(f"   ⏱️ Tahmini süre: {minutes} dk {seconds} sn ({plan['concurrency']} paralel Vision)")
+    if budget_usd > 0:
+        selected, deferred = select_within_budget(plan["pages"], budget_usd)
+        logger.info(f"   🧾 Bütçe ${budget_usd:.2f}: {len(selected)} sayfa çalışır, {len(deferred)} sayfa ertelenir")
+    logger.info("=" * 60)
+
+
+# ============================================
+# ÇALIŞMA ZAMANI BÜTÇE KONTROLÜ
+# ============================================
+class BudgetGuard:
+    """
+    Gerçek token kullanımını sayar; tavan aşılınca çağrıları durdurur.
+
+    Plan bir tahmindir; model beklenenden uzun cevap verirse
+    fatura yine tavanda durur. Thread-safe.
+    """
+
+    def __init__(self, limit_usd: float = INGEST_BUDGET_USD):
+        self.limit_usd = limit_usd
+        self.spent_usd = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._warned = False
+
+    def check(self) -> None:
+        """
+        Yeni çağrıdan önce bütçeyi kontrol eder.
+
+        Raises:
+            BudgetExceeded: Tavana ulaşıldıysa
+        """
+        if self.limit_usd <= 0:
+            return
+
+        with self._lock:
+            if self.spent_usd < self.limit_usd:
+                return
+            warn, self._warned = not self._warned, True
+
+        if warn:
+            logger.warning(f"🧾 Bütçe tavanı (${self.limit_usd:.2f}) aşıldı, yeni Vision çağrısı yapılmayacak")
+        raise BudgetExceeded(f"Bütçe aşıldı: ${self.spent_usd:.2f} / ${self.limit_usd:.2f}")
+
+    def charge(self, input_tokens: int, output_tokens: int) -> None:
+        """Bir Vision çağrısının gerçek kullanımını işler."""
+        with self._lock:
+            self.spent_usd += vision_cost(input_tokens, output_tokens)
+            self.calls += 1
+
+
+class BudgetedChatModel:
+    """
+    ChatOpenAI'yi saran ve her çağrıda BudgetGuard'ı kullanan ince katman.
+
+    Sadece invoke kullanılır (ingest kodu başka metod çağırmaz).
+    """
+
+    def __init__(self, llm: Any, guard: BudgetGuard):
+        self.llm = llm
+        self.guard = guard
+
+    def invoke(self, messages: Any, **kwargs: Any) -> Any:
+        self.guard.check()
+        response = self.llm.invoke(messages, **kwargs)
+
+        # LangChain AIMessage.usage_metadata → gerçek token sayıları
+        usage: Optional[Dict[str, int]] = getattr(response, "usage_metadata", None)
+        if usage:
+            self.guard.charge(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+        else:
+            self.guard.charge(0, estimate_tokens(str(response.content)))
+
+        return response
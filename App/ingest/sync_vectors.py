@@ -0,0 +1,258 @@
+"""
+============================================
+YASAA VISION - Yerel Vector Index Senkronizasyonu
+============================================
+Aktif bilgi bankası versiyonunu (MongoDB, bkz. kb_versions) yerel
+arka uçlara (VECTOR_BACKEND=chroma / numpy) kopyalar. Embedding'ler
+yeniden hesaplanmaz; parçalar ve tam sayfalar olduğu gibi aktarılır.
+
+Akış:
+    Mongo parçaları (batch) → damgalı numpy dosyaları / Chroma collection'ı
+    Mongo parent sayfaları  → damgalı SQLite sayfa dosyası
+    → manifest.json atomik olarak değiştirilir → eski damgalı dosyalar silinir
+
+Çalışan uygulama manifest değişikliğini bir sonraki aramada görür ve
+yeni dosyalara geçer; senkronizasyon yarıda kalırsa manifest eski
+dosyaları göstermeye devam eder. Bu çalıştırmada senkronize edilmeyen
+arka uçların bölümleri (kendi KB versiyonu ve sayfa dosyasıyla) yeni
+manifest'e aynen taşınır; dosyalarına dokunulmaz.
+
+Kullanım:
+    python -m App.ingest.sync_vectors                      # chroma + numpy
+    python -m App.ingest.sync_vectors --target numpy
+    python -m App.ingest.sync_vectors --version 3          # Belirli KB versiyonu
+    python -m App.ingest.sync_vectors --dir /srv/vectors
+
+Ingest veya kb_versions switch'ten sonra tekrar çalıştırılmalıdır.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from App.core.cassette import is_replaying, mongo_client
+from App.core.vector_backends import (
+    DB_NAME,
+    EMBEDDING_MODEL,
+    INDEX_WRITERS,
+    LOCAL_BACKENDS,
+    VECTOR_LOCAL_DIR,
+    chroma_collection_name,
+    read_manifest,
+    write_manifest,
+    write_pages
+)
+from App.ingest.kb_versions import KBTarget, active_target, version_target
+from App.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# AYARLAR
+# ============================================
+VECTOR_SYNC_BATCH_SIZE: int = settings.get_int("VECTOR_SYNC_BATCH_SIZE", 1000)
+"""
+VECTOR_SYNC_BATCH_SIZE: Yerel index'e tek seferde yazılan parça sayısı
+(bellek kullanımı ile Chroma yazma hızı arasında denge)
+"""
+
+# Damgalı yerel dosyaların önekleri (temizlik için)
+_STAMPED_PREFIXES = ("pages.", "vectors.", "records.")
+
+
+def _batches(cursor: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Embedding'i olan parçaları size'lık listeler hâlinde verir."""
+    batch: List[Dict[str, Any]] = []
+    for record in cursor:
+        if not record.get("embedding"):
+            continue
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _referenced_files(manifest: Dict[str, Any]) -> List[str]:
+    """Manifest'in kullandığı damgalı dosyalar (taşınan bölümlerin sayfa dosyaları dahil)."""
+    files = [manifest.get("pages", {}).get("file")]
+    files.extend(manifest.get("numpy", {}).get(key) for key in ("vectors", "records"))
+    files.extend(manifest.get(name, {}).get("pages", {}).get("file") for name in LOCAL_BACKENDS)
+    return [name for name in files if name]
+
+
+def _carried_sections(previous: Dict[str, Any], targets: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bu çalıştırmada senkronize edilmeyen arka uçların eski manifest bölümleri.
+
+    Bölüm, yazıldığı senkronizasyonun KB versiyonunu, embedding modelini ve
+    sayfa dosyasını yanında taşır: parçaları ve sayfaları aynı versiyondan
+    okunmaya devam eder.
+    """
+    carried: Dict[str, Dict[str, Any]] = {}
+    for name in LOCAL_BACKENDS:
+        section = previous.get(name)
+        if name in targets or not section:
+            continue
+        section = dict(section)
+        section.setdefault("kb_version", previous.get("kb_version"))
+        section.setdefault("embedding_model", previous.get("embedding_model"))
+        if "pages" in previous:
+            section.setdefault("pages", previous["pages"])
+        carried[name] = section
+    return carried
+
+
+def _remove_stale(directory: str, manifest: Dict[str, Any], targets: Iterable[str]) -> int:
+    """
+    Yeni manifest'in kullanmadığı damgalı dosyaları ve bu senkronizasyonun
+    yerini aldığı Chroma collection'larını siler.
+
+    Senkronize edilmeyen arka uçların dosyalarına dokunulmaz (bölümleri
+    manifest'e taşınmıştır).
+
+    Returns:
+        int: Silinen dosya + collection sayısı
+    """
+    keep = set(_referenced_files(manifest))
+    removed = 0
+    for name in os.listdir(directory):
+        if name.startswith(_STAMPED_PREFIXES) and name not in keep:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+
+    chroma_dir = os.path.join(directory, "chroma")
+    if "chroma" not in targets or not os.path.isdir(chroma_dir):
+        return removed
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=chroma_dir)
+    prefix = chroma_collection_name("")
+    for collection in client.list_collections():
+        name = getattr(collection, "name", collection)
+        if name.startswith(prefix) and name != manifest["chroma"]["collection"]:
+            client.delete_collection(name)
+            removed += 1
+    return removed
+
+
+def sync_local_index(
+    db: Any,
+    targets: Iterable[str] = LOCAL_BACKENDS,
+    directory: str = VECTOR_LOCAL_DIR,
+    version: Optional[int] = None,
+    batch_size: int = VECTOR_SYNC_BATCH_SIZE
+) -> Dict[str, Any]:
+    """
+    Bir bilgi bankası versiyonunu yerel arka uçlara kopyalar.
+
+    Args:
+        db: MongoDB veritabanı
+        targets: Yazılacak yerel arka uçlar (chroma, numpy)
+        directory: VECTOR_LOCAL_DIR
+        version: KB versiyonu (None = aktif versiyon)
+        batch_size: Tek seferde yazılan parça sayısı
+
+    Returns:
+        Dict[str, Any]: Yazılan manifest
+    """
+    targets = list(dict.fromkeys(targets))
+    unknown = [name for name in targets if name not in INDEX_WRITERS]
+    if unknown:
+        raise ValueError(f"❌ Bilinmeyen yerel arka uç: {', '.join(unknown)} ({' | '.join(LOCAL_BACKENDS)})")
+
+    target: KBTarget = version_target(version) if version is not None else active_target(db)
+    os.makedirs(directory, exist_ok=True)
+    stamp = str(int(time.time() * 1000))
+    started = time.perf_counter()
+    logger.info(f"🔄 {DB_NAME}/{target.chunks} (v{target.version}) → {', '.join(targets)} ({directory})")
+
+    writers = [INDEX_WRITERS[name](directory, stamp) for name in targets]
+    pages_file = f"pages.{stamp}.db"
+    dimensions = 0
+
+    try:
+        for batch in _batches(db[target.chunks].find({}), batch_size):
+            dimensions = dimensions or len(batch[0]["embedding"])
+            for writer in writers:
+                writer.add(batch)
+            logger.info(f"   📦 {writers[0].count} parça")
+
+        page_count = write_pages(os.path.join(directory, pages_file), db[target.parents].find({}, {"text": 1}))
+        sections = {writer.name: writer.commit() for writer in writers}
+    except BaseException:
+        # Manifest değişmedi: yarım dosyalar silinir, eski index kullanılmaya devam eder
+        for writer in writers:
+            writer.discard()
+        pages_path = os.path.join(directory, pages_file)
+        if os.path.exists(pages_path):
+            os.remove(pages_path)
+        raise
+
+    chunk_count = writers[0].count if writers else 0
+    if chunk_count == 0:
+        logger.warning(f"   ⚠️ v{target.version} içinde embedding'li parça yok; yerel index boş")
+
+    manifest = {
+        "kb_version": target.version,
+        "source": f"{DB_NAME}/{target.chunks}",
+        "embedding_model": EMBEDDING_MODEL,
+        "dimensions": dimensions,
+        "synced_at": datetime.now().isoformat(timespec="seconds"),
+        "pages": {"file": pages_file, "count": page_count},
+        **sections
+    }
+    previous = read_manifest(directory) or {}
+    carried = _carried_sections(previous, targets)
+    for name, section in carried.items():
+        if section.get("kb_version") != target.version:
+            logger.warning(f"   ⚠️ {name} index'i v{section.get('kb_version')}'de kaldı; "
+                           f"güncellemek için: --target {name}")
+    manifest.update(carried)
+    write_manifest(directory, manifest)
+
+    removed = _remove_stale(directory, manifest, targets)
+    logger.info(f"✅ {chunk_count} parça, {page_count} sayfa senkronize edildi "
+                f"(v{previous.get('kb_version', '-')} → v{target.version}, "
+                f"{time.perf_counter() - started:.1f} sn, {removed} eski dosya silindi)")
+    return manifest
+
+
+# ============================================
+# CLI
+# ============================================
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="🔮 Yasaa Vision - Yerel vector index senkronizasyonu")
+    parser.add_argument("--target", nargs="+", choices=LOCAL_BACKENDS, default=list(LOCAL_BACKENDS),
+                        help="Yazılacak yerel arka uçlar (varsayılan: hepsi)")
+    parser.add_argument("--version", type=int, default=None, help="KB versiyonu (varsayılan: aktif)")
+    parser.add_argument("--dir", default=VECTOR_LOCAL_DIR, help=f"Yerel index dizini (varsayılan: {VECTOR_LOCAL_DIR})")
+    parser.add_argument("--batch-size", type=int, default=VECTOR_SYNC_BATCH_SIZE)
+    return parser.parse_args()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    args = parse_arguments()
+
+    mongo_uri = settings.secret("MONGO_URI")
+    if not mongo_uri and not is_replaying():
+        logger.error("❌ MONGO_URI bulunamadı!")
+        sys.exit(1)
+
+    db = mongo_client(mongo_uri)[DB_NAME]
+    sync_local_index(db, args.target, args.dir, args.version, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+============================================
+YASAA VISION - Cümle Sınırları ve Parçalama Testleri
+============================================
+App.core.text (split_sentences, head/tail_sentences) ve
+App.ingest.chunker.chunk_text:
+- Offset'ler metne geri döner (text[start:end] == parça)
+- Kısaltmalar ve ondalık sayılar cümleyi bölmez
+- Bölüm başlıkları yeni parça başlatır, sınırlar aşılmaz
+
+Çalıştırma:
+    python -m pytest -q Test
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import pytest
+
+from App.core.text import (
+    split_sentences,
+    head_sentences,
+    tail_sentences,
+    ends_mid_sentence,
+    starts_mid_sentence
+)
+from App.ingest.chunker import chunk_text
+
+PAGE = (
+    "The heart line begins under the index finger. According to Dr. Benham, "
+    "a forked ending shows balance (see Fig. 3). The angle is 2.5 degrees wider "
+    "in most hands, e.g. in the square type!\n\n"
+    "[DIAGRAM ANALYSIS]: The diagram shows the life line. Is it long? "
+    "It curves around the thumb… Şek. 4 ve bkz. s. 12 aynı çizgiyi gösterir."
+)
+
+
+# ============================================
+# CÜMLELER
+# ============================================
+def test_sentence_offsets_round_trip():
+    spans = split_sentences(PAGE)
+
+    assert spans
+    for start, end in spans:
+        sentence = PAGE[start:end]
+        assert sentence == sentence.strip()
+    # Cümleler sırayla ve çakışmadan gelir
+    assert all(previous[1] <= current[0] for previous, current in zip(spans, spans[1:]))
+    # Cümleler arasında sadece boşluk kalır
+    rest = PAGE
+    for start, end in reversed(spans):
+        rest = rest[:start] + rest[end:]
+    assert rest.strip() == ""
+
+
+@pytest.mark.parametrize("text", [
+    "According to Dr. Benham the line is long.",
+    "See Fig. 3 for the forked ending.",
+    "The angle is 2.5 degrees wider.",
+    "Small hands, e.g. the conic type, differ.",
+    "Şek. 4 ve bkz. s. 12 aynı çizgiyi gösterir."
+])
+def test_abbreviations_and_decimals_do_not_split(text):
+    assert split_sentences(text) == [(0, len(text))]
+
+
+def test_sentence_ends_and_paragraphs_split():
+    text = "First line is long. Second? Third!\n\nNew paragraph without a period"
+    sentences = [text[start:end] for start, end in split_sentences(text)]
+
+    assert sentences == ["First line is long.", "Second?", "Third!", "New paragraph without a period"]
+
+
+def test_head_and_tail_sentences_keep_whole_sentences():
+    text = "One two three. Four five six. Seven eight nine."
+
+    assert head_sentences(text, 20) == "One two three."
+    assert tail_sentences(text, 20) == "Seven eight nine."
+    # Sınır ilk cümleden kısa olsa da en az bir cümle döner
+    assert head_sentences(text, 3) == "One two three."
+    assert tail_sentences(text, 3) == "Seven eight nine."
+
+
+def test_mid_sentence_page_boundaries():
+    assert ends_mid_sentence("The line continues on the")
+    assert not ends_mid_sentence("The line ends here.")
+    assert starts_mid_sentence("next page with the rest.")
+    assert not starts_mid_sentence("A new sentence.")
+    assert not ends_mid_sentence("   ")
+
+
+# ============================================
+# PARÇALAR
+# ============================================
+@pytest.mark.parametrize("max_chars,min_chars", [(80, 20), (200, 50), (1200, 200)])
+def test_chunk_offsets_round_trip(max_chars, min_chars):
+    chunks = chunk_text(PAGE, max_chars=max_chars, min_chars=min_chars)
+
+    assert chunks
+    for chunk in chunks:
+        assert chunk["text"] == PAGE[chunk["start"]:chunk["end"]]
+    assert all(previous["end"] <= current["start"] for previous, current in zip(chunks, chunks[1:]))
+    assert chunks[0]["start"] == 0
+    assert chunks[-1]["end"] == len(PAGE.rstrip())
+
+
+def test_chunks_align_to_sentences_and_respect_max_chars():
+    chunks = chunk_text(PAGE, max_chars=120, min_chars=20)
+    boundaries = {end for _, end in split_sentences(PAGE)}
+
+    for chunk in chunks:
+        assert len(chunk["text"]) <= 120
+        assert chunk["end"] in boundaries
+
+
+def test_section_header_starts_new_chunk():
+    chunks = chunk_text(PAGE, max_chars=1200, min_chars=0)
+
+    assert [chunk["text"].startswith("[DIAGRAM ANALYSIS]") for chunk in chunks] == [False, True]
+
+
+def test_long_sentence_split_at_word_boundary():
+    text = " ".join(f"word{index}" for index in range(100)) + "."
+    chunks = chunk_text(text, max_chars=50, min_chars=10)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk["text"] == text[chunk["start"]:chunk["end"]]
+        assert len(chunk["text"]) <= 50 + 10
+        assert not chunk["text"].startswith(" ") and not chunk["text"].endswith(" ")
@@ -0,0 +1,144 @@
+"""
+============================================
+YASAA VISION - Kararlı Kimlik ve Parti Yazma Testleri
+============================================
+- make_chunk_id / make_parent_id: aynı girdi → aynı _id (tekrar ingest kopya üretmez)
+- PageBatchCommitter.flush: yeni kayıtları upsert eder, sadece aynı
+  dosya + type + sayfa + pipeline'ın artık üretilmeyen kayıtlarını siler,
+  yazma eksikse hiçbir şey silmez ve manifest'e işlemez
+
+MongoDB yerine App.bench.fakes'in bellek içi collection'ı kullanılır.
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import pytest
+from langchain_core.documents import Document
+
+from App.bench.fakes import FakeEmbeddings, InMemoryDatabase
+from App.core.kb_pointer import make_parent_id
+from App.ingest.batch_writer import BatchingWriter
+from App.ingest.chunker import build_page_records, make_chunk_id
+from App.ingest.manifest import IngestManifest, PageBatchCommitter
+
+FILE_HASH = "ab" * 32
+OTHER_HASH = "cd" * 32
+PIPELINE = "ingest_hybrid"
+DOC_TYPE = "hybrid_book_page"
+CONTENT = "The heart line begins under the index finger. " * 40
+
+
+def _metadata(page: int, file_hash: str = FILE_HASH) -> dict:
+    return {"type": DOC_TYPE, "file_hash": file_hash, "page": page, "pipeline": PIPELINE}
+
+
+def _page(page: int, version: str = "v2"):
+    """build_page_records çıktısını PageBatchCommitter girdisine çevirir."""
+    parent, chunks = build_page_records(CONTENT, _metadata(page), version)
+    return [Document(page_content=text, metadata=metadata) for text, metadata in chunks], [parent]
+
+
+@pytest.fixture
+def store(tmp_path):
+    database = InMemoryDatabase("test")
+    manifest = IngestManifest(str(tmp_path / "manifest.db"))
+    yield database["chunks"], database["pages"], manifest
+    manifest.close()
+
+
+def _committer(chunks, pages, manifest, embeddings=None) -> PageBatchCommitter:
+    writer = BatchingWriter(embeddings or FakeEmbeddings(latency=0, error_rate=0), chunks)
+    return PageBatchCommitter(
+        writer, manifest, PIPELINE, DOC_TYPE, "prompt-v2", "settings", batch_size=10, parent_collection=pages
+    )
+
+
+# ============================================
+# KİMLİKLER
+# ============================================
+def test_ids_are_stable_and_distinct():
+    assert make_chunk_id(FILE_HASH, 3, 0, "v2") == make_chunk_id(FILE_HASH, 3, 0, "v2")
+    assert make_chunk_id(FILE_HASH, 3, 0, "v2") == f"{FILE_HASH[:16]}:3:0:v2"
+    assert len({
+        make_chunk_id(FILE_HASH, 3, 0, "v2"),
+        make_chunk_id(FILE_HASH, 3, 1, "v2"),
+        make_chunk_id(FILE_HASH, 4, 0, "v2"),
+        make_chunk_id(FILE_HASH, 3, 0, "v3"),
+        make_chunk_id(OTHER_HASH, 3, 0, "v2")
+    }) == 5
+
+    # Pipeline parent kimliğine girer: aynı type'ı yazan pipeline'lar birbirini ezmez
+    assert make_parent_id(DOC_TYPE, FILE_HASH, 3) == f"{DOC_TYPE}:{FILE_HASH[:16]}:3"
+    assert make_parent_id(DOC_TYPE, FILE_HASH, 3, PIPELINE) != make_parent_id(DOC_TYPE, FILE_HASH, 3, "ingest_batch")
+
+
+def test_build_page_records_is_deterministic():
+    first_parent, first_chunks = build_page_records(CONTENT, _metadata(1), "v2")
+    second_parent, second_chunks = build_page_records(CONTENT, _metadata(1), "v2")
+
+    assert first_parent == second_parent
+    assert first_chunks == second_chunks
+    assert len(first_chunks) > 1
+    for index, (text, metadata) in enumerate(first_chunks):
+        assert metadata["parent_id"] == first_parent["_id"]
+        assert metadata["chunk_index"] == index
+        assert CONTENT[metadata["start"]:metadata["end"]] == text
+
+
+# ============================================
+# PARTİ YAZMA
+# ============================================
+def test_flush_upserts_and_deletes_only_stale_records(store):
+    chunks, pages, manifest = store
+    stale = {"file_hash": FILE_HASH, "type": DOC_TYPE, "page": 1}
+    chunks.insert_many([
+        {**stale, "_id": make_chunk_id(FILE_HASH, 1, 0, "v1"), "pipeline": PIPELINE},   # eski versiyon
+        {**stale, "_id": "legacy-1"},                                                    # pipeline alanı yok
+        {**stale, "_id": "batch-1", "pipeline": "ingest_batch"},                         # başka pipeline
+        {**stale, "_id": "page-9", "page": 9, "pipeline": PIPELINE},                     # partide olmayan sayfa
+        {**stale, "_id": "other-file", "file_hash": OTHER_HASH, "pipeline": PIPELINE},   # başka dosya
+        {**stale, "_id": "other-type", "type": "book_page", "pipeline": PIPELINE}        # başka type
+    ])
+    pages.insert_one({**stale, "_id": "old-parent", "pipeline": PIPELINE})
+
+    documents, parents = _page(1)
+    committer = _committer(chunks, pages, manifest)
+    committer.add(FILE_HASH, 1, documents, parents)
+    committer.flush()
+
+    new_ids = {document.metadata["_id"] for document in documents}
+    assert set(chunks.distinct("_id")) == new_ids | {"batch-1", "page-9", "other-file", "other-type"}
+    assert set(pages.distinct("_id")) == {parents[0]["_id"]}
+    assert committer.documents_written == len(documents)
+    assert manifest.completed_pages(FILE_HASH, PIPELINE, "prompt-v2", "settings") == {1}
+
+    # Tekrar yazma kopya üretmez
+    committer.add(FILE_HASH, 1, *_page(1))
+    committer.flush()
+    assert chunks.count_documents({**stale, "pipeline": PIPELINE}) == len(documents)
+
+
+def test_failed_write_keeps_old_records_and_manifest(store):
+    chunks, pages, manifest = store
+    chunks.insert_one({"_id": "old", "file_hash": FILE_HASH, "type": DOC_TYPE, "page": 1, "pipeline": PIPELINE})
+
+    committer = _committer(chunks, pages, manifest, FakeEmbeddings(latency=0, error_rate=1.0))
+    committer.add(FILE_HASH, 1, *_page(1))
+    committer.flush()
+
+    assert chunks.distinct("_id") == ["old"]
+    assert manifest.completed_pages(FILE_HASH, PIPELINE, "prompt-v2", "settings") == set()
+
+
+def test_batch_is_flushed_per_file(store):
+    chunks, pages, manifest = store
+    committer = _committer(chunks, pages, manifest)
+
+    committer.add(FILE_HASH, 1, *_page(1))
+    committer.add(OTHER_HASH, 1, [], [])   # Dosya değişti → önceki parti yazılır; boş sayfa "skipped"
+    assert manifest.completed_pages(FILE_HASH, PIPELINE, "prompt-v2", "settings") == {1}
+
+    committer.flush()
+    assert manifest.completed_pages(OTHER_HASH, PIPELINE, "prompt-v2", "settings") == {1}
@@ -0,0 +1,153 @@
+"""
+============================================
+YASAA VISION - Algısal Hash ve BK-tree Testleri
+============================================
+- perceptual_hash: yeniden sıkıştırma, ölçekleme, parlaklık ve ekran
+  görüntüsü çubukları VISION_CACHE_MAX_DISTANCE içinde kalır; farklı
+  fotoğraf eşiğin çok üstündedir
+- BKTree.search: yarıçap içindeki tüm kayıtları (kaba kuvvetle aynı)
+  yakından uzağa döndürür
+- VisionReportCache: yakın kopya sadece aynı owner'da, birebir aynı
+  fotoğraf herkese bulunur
+
+Yazar: Ahmet Ruçhan
+Tarih: 2024
+============================================
+"""
+
+import io
+import base64
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from App.agent.vision_cache import (
+    VISION_CACHE_MAX_DISTANCE,
+    BKTree,
+    VisionReportCache,
+    hamming_distance,
+    perceptual_hash
+)
+
+
+def _photo(seed: int, size=(480, 640)) -> "Image.Image":
+    """Gürültülü, düşük frekanslı yapısı olan sahte fotoğraf (seed başına farklı)."""
+    generator = np.random.default_rng(seed)
+    coarse = generator.uniform(0, 255, (6, 8, 3)).astype(np.uint8)
+    image = Image.fromarray(coarse).resize((size[1], size[0]), Image.BICUBIC)
+    noise = generator.normal(0, 8, (size[0], size[1], 3))
+    return Image.fromarray(np.clip(np.asarray(image, dtype=np.float64) + noise, 0, 255).astype(np.uint8))
+
+
+def _encode(image: "Image.Image", quality: int = 90) -> str:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+@pytest.fixture(scope="module")
+def original():
+    return _photo(1)
+
+
+# ============================================
+# ALGISAL HASH
+# ============================================
+def _with_bars(image: "Image.Image") -> "Image.Image":
+    """Ekran görüntüsü: üstte ve altta düz siyah çubuklar."""
+    canvas = Image.new("RGB", (image.width, image.height + 160), (0, 0, 0))
+    canvas.paste(image, (0, 80))
+    return canvas
+
+
+@pytest.mark.parametrize("variant", [
+    lambda image: image,
+    lambda image: image.resize((image.width // 2, image.height // 2)),
+    lambda image: image.point(lambda value: min(255, int(value * 1.1) + 10)),
+    _with_bars
+], ids=["recompress", "resize", "brightness", "screenshot_bars"])
+def test_near_duplicates_within_threshold(original, variant):
+    base = perceptual_hash(_encode(original))
+    copy = perceptual_hash(_encode(variant(original), quality=60))
+
+    assert base is not None and copy is not None
+    assert hamming_distance(base, copy) <= VISION_CACHE_MAX_DISTANCE
+
+
+def test_different_photos_beyond_threshold(original):
+    base = perceptual_hash(_encode(original))
+    distances = [hamming_distance(base, perceptual_hash(_encode(_photo(seed)))) for seed in range(2, 8)]
+
+    assert min(distances) > VISION_CACHE_MAX_DISTANCE * 2
+
+
+def test_undecodable_image_has_no_hash():
+    assert perceptual_hash(base64.b64encode(b"not an image").decode("ascii")) is None
+
+
+# ============================================
+# BK-TREE
+# ============================================
+def test_bk_tree_search_matches_brute_force():
+    generator = random.Random(3)
+    values = [generator.getrandbits(64) for _ in range(300)]
+    # Yakın kopyalar: birkaç biti çevrilmiş hash'ler
+    values += [value ^ (1 << generator.randrange(64)) ^ (1 << generator.randrange(64)) for value in values[:50]]
+
+    tree = BKTree()
+    for index, value in enumerate(values):
+        tree.add(value, f"ref-{index}")
+    assert tree.size == len(values)
+
+    for query in values[:20] + [generator.getrandbits(64) for _ in range(5)]:
+        for radius in (0, 2, 6, 20):
+            expected = sorted(
+                (hamming_distance(query, value), f"ref-{index}")
+                for index, value in enumerate(values)
+                if hamming_distance(query, value) <= radius
+            )
+            assert tree.search(query, radius) == expected
+
+
+def test_bk_tree_duplicates_and_empty():
+    tree = BKTree()
+    assert tree.search(0, 64) == []
+
+    tree.add(0b1010, "a")
+    tree.add(0b1010, "b")
+    tree.add(0b1011, "c")
+
+    assert tree.search(0b1010, 0) == [(0, "a"), (0, "b")]
+    assert tree.search(0b1010, 1) == [(0, "a"), (0, "b"), (1, "c")]
+
+
+# ============================================
+# RAPOR ÖNBELLEĞİ
+# ============================================
+def test_cache_near_duplicates_scoped_to_owner(tmp_path, original):
+    cache = VisionReportCache(version="test", path=str(tmp_path / "vision.db"))
+    phash = perceptual_hash(_encode(original))
+    near = phash ^ 0b111  # 3 bit fark
+
+    cache.put("ref-original", phash, "rapor", {"hand_shape": "square"}, owner="session-a")
+
+    hit = cache.lookup("ref-copy", near, owner="session-a")
+    assert hit is not None and hit.image_ref == "ref-original" and hit.distance == 3
+    assert hit.hand_features == {"hand_shape": "square"}
+
+    # Başka oturum: yakın kopya verilmez, birebir aynı fotoğraf verilir
+    assert cache.lookup("ref-copy", near, owner="session-b") is None
+    assert cache.lookup("ref-original", phash, owner="session-b").distance == 0
+
+    # Eşiğin dışı
+    far = phash ^ ((1 << (VISION_CACHE_MAX_DISTANCE + 1)) - 1)
+    assert cache.lookup("ref-far", far, owner="session-a") is None
+
+    # Yeniden açılınca SQLite'tan aynı ağaç kurulur
+    reopened = VisionReportCache(version="test", path=str(tmp_path / "vision.db"))
+    assert reopened.lookup("ref-copy", near, owner="session-a").image_ref == "ref-original"
+    assert VisionReportCache(version="other", path=str(tmp_path / "vision.db")).lookup(
+        "ref-original", phash, owner="session-a"
+    ) is None
@@ -8,7 +8,7 @@ SOHBET edebileceği chat tabanlı arayüz.
 Özellikler:
 - Mistik/Karanlık tema
 - Chat arayüzü (WhatsApp tarzı)
-- Session State ile hafıza (konuşma geçmişi korunur)
+- Oturum deposu ile hafıza (konuşma geçmişi yeniden başlatmada da korunur)
 - Fotoğraf bir kere yüklenir, sonra sohbet devam eder
 - Akademik referans gösterimi
 
@@ -23,34 +23,49 @@ Tarih: 2024
 # ============================================
 # IMPORTS - Gerekli Kütüphaneler
 # ============================================
-import os                                      # Environment değişkenleri için
+import uuid                                    # Oturum kimliği için
 import base64                                  # Görsel encoding için
 import logging                                 # Profesyonel loglama
 from typing import Optional, Dict, Any, List   # Type hints için
 
 import streamlit as st                         # Ana UI framework
 from PIL import Image                          # Görsel işleme
-from dotenv import load_dotenv                 # .env dosyası okuma
 from langchain_core.messages import (          # Mesaj formatları
     HumanMessage,
     AIMessage
 )
 
 # Kendi modüllerimiz
-from App.agent.graph import build_graph        # LangGraph akışı
+from App.agent.graph import (                  # LangGraph akışı
+    build_graph,
+    create_checkpointer,
+    delete_checkpoint_threads
+)
 from App.agent.state import AgentState         # State tipi
+from App.agent.documents import describe_reference  # Kaynak önizlemesi
+from App.core.metrics import (                 # Gecikme/token/önbellek metrikleri
+    metrics_summary,
+    render_metrics,
+    start_metrics_server
+)
+from App.core.tracing import span              # Okuma başına kök span
+from App.core.session_store import (           # Kalıcı oturum deposu (LRU + SQLite/dosya)
+    SessionData,
+    get_session_store,
+    is_valid_session_id
+)
+from App.core.settings import settings         # Lazy ayarlar (ortam / .env / secrets)
 
 
 # ============================================
 # ENVIRONMENT DEĞİŞKENLERİ
 # ============================================
-# .env dosyasını yükle
-load_dotenv()
+# .env ilk settings.get çağrısında yüklenir; anahtarlar Streamlit secrets'tan da okunur
 
 # --- UI Ayarları ---
-APP_TITLE: str = os.getenv("APP_TITLE", "Yasaa Vision")
-APP_SUBTITLE: str = os.getenv("APP_SUBTITLE", "Dijital Abla")
-DEBUG_MODE: bool = os.getenv("DEBUG_MODE", "false").lower() == "true"
+APP_TITLE: str = settings.get("APP_TITLE", "Yasaa Vision")
+APP_SUBTITLE: str = settings.get("APP_SUBTITLE", "Dijital Abla")
+DEBUG_MODE: bool = settings.get("DEBUG_MODE", "false").lower() == "true"
 
 
 # ============================================
@@ -62,6 +77,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# METRICS_PORT ayarlıysa /metrics endpoint'i (rerun'larda tekrar açılmaz)
+start_metrics_server()
+
 
 # ============================================
 # SAYFA KONFİGÜRASYONU
@@ -149,28 +167,66 @@ st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 # ============================================
 def initialize_session_state() -> None:
     """
-    Streamlit session state'ini başlatır.
+    Oturum kimliğini belirler.
+
+    st.session_state'te sadece oturum kimliği tutulur; sohbet geçmişi,
+    fotoğraf ve Vision raporu oturum deposundadır (App.core.session_store).
+    Böylece process belleği kullanıcı sayısıyla sınırsız büyümez ve
+    sayfa yenilense / uygulama yeniden başlasa da sohbet kaybolmaz.
+
+    Kimlik URL'deki ?sid= parametresinde taşınır (tahmin edilemez uuid4).
+    uuid4().hex biçiminde olmayan sid (örn. "../../x") kabul edilmez,
+    yeni oturum açılır: kimlik dosya adı olarak da kullanılır.
+    """
+    get_checkpointer()  # Oturum deposu silinen oturumların thread'lerini buraya bildirir
 
-    Session state, sayfa yenilendiğinde bile verileri korur.
-    Kullanıcı aynı oturumda kaldığı sürece:
-    - Sohbet geçmişi korunur
-    - Yüklenen fotoğraf hafızada kalır
-    - El analiz raporu saklanır
+    if "session_id" not in st.session_state:
+        session_id = st.query_params.get("sid")
+        if not is_valid_session_id(session_id):
+            session_id = uuid.uuid4().hex
+        st.query_params["sid"] = session_id
+        st.session_state.session_id = session_id
+        logger.info(f"📝 Oturum: {session_id[:8]}")
+
+
+def current_session() -> SessionData:
     """
-    # Sohbet geçmişi (HumanMessage ve AIMessage listesi)
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-        logger.info("📝 Session state: messages oluşturuldu")
+    Bu tarayıcı oturumunun verisini döndürür.
 
-    # Yüklenen el fotoğrafı (Base64 formatında)
-    if "uploaded_image_base64" not in st.session_state:
-        st.session_state.uploaded_image_base64 = None
-        logger.info("📸 Session state: uploaded_image_base64 oluşturuldu")
+    Returns:
+        SessionData: messages, image_base64, vision_report
+    """
+    return get_session_store().get(st.session_state.session_id)
 
-    # El analiz raporu (Vision Node'dan gelen)
-    if "vision_report_memory" not in st.session_state:
-        st.session_state.vision_report_memory = None
-        logger.info("📋 Session state: vision_report_memory oluşturuldu")
+
+def save_session(session: SessionData) -> None:
+    """Oturumu depoya yazar (diğer replikalar ve yeniden başlatma için)."""
+    get_session_store().save(session)
+
+
+@st.cache_resource
+def get_checkpointer():
+    """
+    Process başına tek checkpointer.
+
+    Oturum deposu bir oturumu sildiğinde (TTL / boyut temizliği) o
+    oturumun checkpoint thread'i de silinir; yoksa checkpoints.db
+    her sohbetin her turuyla sınırsız büyür.
+    """
+    checkpointer = create_checkpointer()
+    get_session_store().on_delete = lambda thread_ids: delete_checkpoint_threads(checkpointer, thread_ids)
+    return checkpointer
+
+
+@st.cache_resource
+def get_graph():
+    """
+    Checkpointer'lı graph'ı process başına bir kez derler.
+
+    Graph state'i (sohbet geçmişi, Vision raporu, image_ref) thread_id
+    başına checkpoint'te durur; her tur sadece yeni mesajı gönderir.
+    """
+    return build_graph(checkpointer=get_checkpointer())
 
 
 # ============================================
@@ -204,8 +260,14 @@ def clear_chat_history() -> None:
     Sohbet geçmişini temizler.
     Yeni bir konuşma başlatmak için kullanılır.
     """
-    st.session_state.messages = []
-    st.session_state.vision_report_memory = None
+    session = current_session()
+    old_thread_id = session.graph_thread_id
+    session.messages = []
+    session.vision_report = None
+    session.thread_id = uuid.uuid4().hex  # Yeni checkpoint thread'i = temiz graph hafızası
+    save_session(session)
+    # Eski thread'e bir daha dönülmez: checkpoint'leri diskte kalmasın
+    delete_checkpoint_threads(get_checkpointer(), [old_thread_id])
     logger.info("🗑️ Sohbet geçmişi temizlendi")
 
 
@@ -219,6 +281,8 @@ def render_sidebar() -> None:
     - Kullanım talimatları
     - Sohbet temizleme butonu
     """
+    session = current_session()
+
     with st.sidebar:
         # Logo / Başlık
         st.markdown("""
@@ -253,10 +317,11 @@ def render_sidebar() -> None:
             encoded_img = encode_image_to_base64(uploaded_file)
 
             # Yeni fotoğraf mı kontrol et
-            if encoded_img != st.session_state.uploaded_image_base64:
-                st.session_state.uploaded_image_base64 = encoded_img
+            if encoded_img != session.image_base64:
+                session.image_base64 = encoded_img
                 # Yeni fotoğraf = Yeni analiz gerekli
-                st.session_state.vision_report_memory = None
+                session.vision_report = None
+                save_session(session)
                 st.success("✅ Fotoğraf hafızaya alındı!")
                 logger.info("📸 Yeni fotoğraf yüklendi")
 
@@ -283,9 +348,32 @@ def render_sidebar() -> None:
         if DEBUG_MODE:
             st.markdown("---")
             st.error("🔧 DEBUG MODU AKTİF")
-            st.caption(f"Mesaj sayısı: {len(st.session_state.messages)}")
-            st.caption(f"Fotoğraf: {'Var' if st.session_state.uploaded_image_base64 else 'Yok'}")
-            st.caption(f"Rapor: {'Var' if st.session_state.vision_report_memory else 'Yok'}")
+            st.caption(f"Oturum: {st.session_state.session_id[:8]}")
+            st.caption(f"Mesaj sayısı: {len(session.messages)}")
+            st.caption(f"Fotoğraf: {'Var' if session.image_base64 else 'Yok'}")
+            st.caption(f"Rapor: {'Var' if session.vision_report else 'Yok'}")
+            usage = get_session_store().hot_usage()
+            st.caption(f"Bellekteki oturumlar: {usage['sessions']} ({usage['mb']} MB)")
+
+            # --- Metrikler ---
+            with st.expander("📈 Metrikler"):
+                summary = metrics_summary()
+                if summary["nodes"]:
+                    st.caption("Düğümler (ms)")
+                    st.dataframe(summary["nodes"], hide_index=True)
+                else:
+                    st.caption("Henüz ölçüm yok, bir soru sor.")
+                if summary["external"]:
+                    st.caption("Dış çağrılar (ms)")
+                    st.dataframe(summary["external"], hide_index=True)
+                if summary["tokens"]:
+                    st.caption("Token")
+                    st.dataframe(summary["tokens"], hide_index=True)
+                if summary["caches"]:
+                    st.caption("Önbellek")
+                    st.dataframe(summary["caches"], hide_index=True)
+                st.download_button("⬇️ Prometheus metni", render_metrics(),
+                                   file_name="metrics.txt", use_container_width=True)
 
 
 # ============================================
@@ -296,7 +384,7 @@ def render_chat_history() -> None:
     Önceki mesajları ekrana basar.
     Her mesaj için uygun avatar ve stil kullanır.
     """
-    for message in st.session_state.messages:
+    for message in current_session().messages:
         # Kullanıcı mesajı
         if isinstance(message, HumanMessage):
             with st.chat_message("user"):
@@ -324,44 +412,61 @@ def process_user_message(user_input: str) -> None:
     3. Graph'ı çalıştırır
     4. Cevabı gösterir ve hafızaya ekler
     """
+    session = current_session()
+
     # --- 1. Kullanıcı mesajını ekrana bas ve hafızaya ekle ---
-    st.session_state.messages.append(HumanMessage(content=user_input))
+    session.messages.append(HumanMessage(content=user_input))
 
     with st.chat_message("user"):
         st.markdown(user_input)
 
     # --- 2. Fotoğraf kontrolü ---
-    if not st.session_state.uploaded_image_base64:
+    if not session.image_base64:
         with st.chat_message("assistant", avatar="🔮"):
             error_msg = "Kuzum önce soldan bir el fotoğrafı yükle ki bakayım! 📸"
             st.warning(error_msg)
-            st.session_state.messages.append(AIMessage(content=error_msg))
+            session.messages.append(AIMessage(content=error_msg))
+        save_session(session)
         return
 
     # --- 3. Abla düşünüyor ---
     with st.chat_message("assistant", avatar="🔮"):
         with st.spinner("🔮 Yıldızlara ve Benham'a bakıyorum... Sabret kuzum..."):
             try:
-                # Graph'ı oluştur
-                app = build_graph()
-                logger.info("🧠 Graph oluşturuldu")
+                # Checkpointer'lı graph (process başına bir kez derlenir)
+                app = get_graph()
+                config = {"configurable": {"thread_id": session.graph_thread_id}}
 
                 # Input state hazırla
-                # ÖNEMLİ: Tüm mesaj geçmişini gönder!
+                # Sadece YENİ mesaj: geçmiş, rapor ve image_ref checkpoint'te
                 inputs = {
-                    "user_image_bytes": st.session_state.uploaded_image_base64,
-                    "messages": st.session_state.messages,  # Tüm geçmiş
-                    "visual_analysis_report": st.session_state.vision_report_memory,  # Önceki rapor (varsa)
+                    "messages": [HumanMessage(content=user_input)],
+                    "session_id": session.session_id,  # Rapor önbelleğinin kapsamı
                     "retrieved_documents": [],
                     "final_response": None,
                     "is_hand_detected": False,
                     "error_message": None
                 }
 
-                logger.info(f"📤 Input hazır: {len(st.session_state.messages)} mesaj")
-
-                # Graph'ı çalıştır
-                final_state = app.invoke(inputs)
+                # Fotoğraf sadece yeni yüklendiyse (veya checkpoint'te rapor yoksa,
+                # örn. önceki analiz başarısız ya da checkpoint silinmiş) gönderilir
+                checkpoint_values = app.get_state(config).values
+                if not session.vision_report or not checkpoint_values.get("visual_analysis_report"):
+                    inputs["user_image_bytes"] = session.image_base64
+                    inputs["visual_analysis_report"] = None
+                    logger.info("📸 Fotoğraf Gözcü'ye gönderiliyor")
+
+                logger.info(f"📤 Input hazır: thread {session.graph_thread_id[:8]}, "
+                            f"{len(session.messages)} mesajlık sohbet")
+
+                # Graph'ı çalıştır (kök span: düğüm ve API span'leri altına düşer)
+                with span("reading", entrypoint="streamlit",
+                          messages=len(session.messages),
+                          sends_image="user_image_bytes" in inputs) as reading_span:
+                    final_state = app.invoke(inputs, config=config)
+                    reading_span.set_attribute("is_hand_detected", bool(final_state.get("is_hand_detected")))
+                    if final_state.get("error_message"):
+                        reading_span.set_error(final_state["error_message"])
                 logger.info("✅ Graph çalıştırıldı")
 
                 # Sonuçları al
@@ -372,7 +477,7 @@ def process_user_message(user_input: str) -> None:
 
                 # Vision raporunu hafızaya kaydet (bir sonraki soru için)
                 if vision_report:
-                    st.session_state.vision_report_memory = vision_report
+                    session.vision_report = vision_report
                     logger.info("📋 Vision raporu hafızaya kaydedildi")
 
                 # --- 4. Sonucu göster ---
@@ -380,45 +485,53 @@ def process_user_message(user_input: str) -> None:
                 # Hata varsa
                 if error_message:
                     st.error(f"🚫 {error_message}")
-                    st.session_state.messages.append(AIMessage(content=error_message))
+                    session.messages.append(AIMessage(content=error_message))
                     logger.warning(f"Hata: {error_message}")
 
                 # El tespit edilemedi
                 elif not is_hand:
                     warning_msg = "👀 Kuzum ben burada el göremedim. Başka bir fotoğraf dener misin?"
                     st.warning(warning_msg)
-                    st.session_state.messages.append(AIMessage(content=warning_msg))
+                    session.messages.append(AIMessage(content=warning_msg))
                     logger.warning("El tespit edilemedi")
 
                 # Başarılı - Abla'nın cevabı
                 elif response_text:
                     st.markdown(response_text)
-                    st.session_state.messages.append(AIMessage(content=response_text))
+                    session.messages.append(AIMessage(content=response_text))
                     logger.info(f"✅ Cevap alındı: {len(response_text)} karakter")
 
                     # Akademik referansları göster (opsiyonel)
                     retrieved_docs = final_state.get("retrieved_documents", [])
                     if retrieved_docs:
                         with st.expander("📚 Akademik Kaynaklar"):
-                            for i, doc in enumerate(retrieved_docs, 1):
-                                preview = doc[:200] + "..." if len(doc) > 200 else doc
-                                st.caption(f"**Referans {i}:** {preview}")
+                            for i, reference in enumerate(retrieved_docs, 1):
+                                info = describe_reference(reference)
+                                title = info["source"] or "Kitap"
+                                if info["page"] is not None:
+                                    title += f" - s. {info['page']}"
+                                if info["score"] is not None:
+                                    title += f" (skor {info['score']:.2f})"
+                                st.caption(f"**Referans {i}:** {title}\n\n{info['snippet']}")
 
                 else:
                     unknown_msg = "🤔 Bir şeyler yolunda gitmedi. Tekrar dener misin?"
                     st.warning(unknown_msg)
-                    st.session_state.messages.append(AIMessage(content=unknown_msg))
+                    session.messages.append(AIMessage(content=unknown_msg))
                     logger.warning("Beklenmeyen durum: response_text boş")
 
             except Exception as e:
                 error_msg = f"💥 Bir hata oluştu: {str(e)}"
                 st.error(error_msg)
-                st.session_state.messages.append(AIMessage(content=error_msg))
+                session.messages.append(AIMessage(content=error_msg))
                 logger.exception("İşlem hatası:")
 
                 if DEBUG_MODE:
                     st.exception(e)
 
+    # Cevap (veya hata mesajı) ile birlikte oturumu kaydet
+    save_session(session)
+
 
 # ============================================
 # ANA ARAYÜZ
@@ -454,11 +567,11 @@ def main() -> None:
     logger.info("🚀 Yasaa Vision UI başlatılıyor...")
 
     # Environment kontrolü
-    if not os.getenv("OPENAI_API_KEY"):
+    if not settings.secret("OPENAI_API_KEY"):
         st.error("❌ OPENAI_API_KEY bulunamadı! `.env` dosyanızı kontrol edin.")
         st.stop()
 
-    if not os.getenv("MONGO_URI"):
+    if not settings.secret("MONGO_URI"):
         st.error("❌ MONGO_URI bulunamadı! `.env` dosyanızı kontrol edin.")
         st.stop()
 
@@ -25,11 +25,11 @@ import logging  # Profesyonel loglama
 import argparse  # Komut satırı argümanları
 from typing import Optional  # Type hints için
 
-from dotenv import load_dotenv  # .env dosyası okuma
-
 # Kendi modüllerimiz
 from App.agent.graph import build_graph  # Ana graph
 from App.agent.state import AgentState  # State tipi
+from App.core.tracing import span  # Okuma başına kök span
+from App.core.settings import settings  # Lazy ayarlar (ortam / .env)
 
 
 # ============================================
@@ -181,23 +181,26 @@ def run_fortune_telling(image_path: str) -> None:
     error_occurred = False
 
     try:
-        # Streaming mode - her node tamamlandığında çıktı al
-        for output in app.stream(input_state):
-            # Her node'un çıktısını işle
-            for node_name, node_output in output.items():
-                print(f"   📍 {node_name} tamamlandı")
-
-                # Son node'un çıktısını sakla
-                final_output = node_output
-
-                # Hata kontrolü
-                if node_output.get("error_message"):
-                    error_occurred = True
+        # Kök span: düğüm ve API çağrısı span'leri bunun altına düşer
+        with span("reading", entrypoint="cli", image_chars=len(image_base64)) as reading_span:
+            # Streaming mode - her node tamamlandığında çıktı al
+            for output in app.stream(input_state):
+                # Her node'un çıktısını işle
+                for node_name, node_output in output.items():
+                    print(f"   📍 {node_name} tamamlandı")
+
+                    # Son node'un çıktısını sakla
+                    final_output = node_output
+
+                    # Hata kontrolü
+                    if node_output.get("error_message"):
+                        error_occurred = True
+                        reading_span.set_error(node_output["error_message"])
+                        break
+
+                if error_occurred:
                     break
 
-            if error_occurred:
-                break
-
     except Exception as e:
         print(f"\n❌ Çalıştırma hatası: {e}")
         logging.exception("Detaylı hata:")
@@ -290,16 +293,13 @@ def main():
     # Logging'i ayarla
     setup_logging(debug=args.debug)
 
-    # .env dosyasını yükle
-    load_dotenv()
-
-    # API key kontrolü
-    if not os.getenv("OPENAI_API_KEY"):
+    # API key kontrolü (.env ilk okumada yüklenir)
+    if not settings.get("OPENAI_API_KEY"):
         print("\n❌ HATA: OPENAI_API_KEY bulunamadı!")
         print("   Lütfen .env dosyanızı kontrol edin.")
         sys.exit(1)
 
-    if not os.getenv("MONGO_URI"):
+    if not settings.get("MONGO_URI"):
         print("\n❌ HATA: MONGO_URI bulunamadı!")
         print("   Lütfen .env dosyanızı kontrol edin.")
         sys.exit(1)